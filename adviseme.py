@@ -1,11 +1,27 @@
 import streamlit as st
-import os, requests, base64, json, io
+import os, json, io
 from dotenv import load_dotenv
 from datetime import datetime
 import logging
 import auth
 import database
 import history
+import ingest
+import llm_client
+import metrics
+import model_router
+import pdf_extract
+import profiling
+import rerun_profiler
+import prompt_builder
+import results_view
+import schedule_matcher
+import schedule_solver
+import session_memory
+import session_store
+import static_assets
+import write_behind
+from ui_helpers import get_session_id, get_session_state_store, render_profiling_report, timed_span
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,8 +29,24 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Session state keys of the stored class schedule, shared with the
+# professor's other sessions (see session_store.py)
+SCHEDULE_KEYS = ('stored_schedule_file', 'stored_schedule_info')
+
+# Per-section timings of this rerun (see rerun_profiler.py)
+rerun_timer = rerun_profiler.start_rerun("startup")
+
+# Load this session's spilled values back, and keep it from being spilled
+# while it runs (see session_memory.py)
+current_session_id = get_session_id()
+state_store = get_session_state_store()
+session_memory.begin_rerun(current_session_id, state_store)
+
 st.set_page_config(page_title="AdviseMe", page_icon="🎓")
 
+# Prometheus /metrics endpoint on a side port (started once per process)
+metrics.start_metrics_server()
+
 # Initialize database on startup - handle failures gracefully
 try:
     database.initialize_database()
@@ -26,6 +58,8 @@ except Exception as e:
     st.warning("⚠️ History features are temporarily unavailable. You can still generate academic advice.")
     logger.error(f"Database initialization error: {e}")
 
+rerun_timer.mark("auth")
+
 # Authentication check - show login page if not authenticated
 # This check runs on every page interaction (every Streamlit rerun) to enforce session timeout
 # The is_authenticated() function checks if the session has exceeded 8 hours and auto-logs out if expired
@@ -75,34 +109,37 @@ if not auth.is_authenticated():
     
     st.markdown("---")
     st.caption("AdviseMe - Academic Advising System | UAPB")
+    rerun_timer.finish("login", current_session_id,
+                       session_bytes=session_memory.end_rerun(current_session_id, state_store))
     st.stop()  # Stop execution here if not authenticated
 
-# Banner image - full width but limited height
-if os.path.exists("banner.jpg"):
-    st.markdown(
-        """
-        <style>
-        [data-testid="stImage"] {
-            max-height: 120px;
-            overflow: hidden;
-        }
-        [data-testid="stImage"] img {
-            object-fit: cover;
-            object-position: center;
-            width: 100%;
-            height: 120px;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-    st.image("banner.jpg", use_container_width=True)
-else:
-    st.warning("Banner image not found at: " + os.path.abspath("banner.jpg"))
+# Opt-in cProfile capture of the rest of this rerun for the admin (?profile=1
+# or the admin toggle); reported in the admin profiling panel
+profile_capture = profiling.begin_rerun_capture(
+    current_session_id,
+    profiling.capture_requested(st.query_params, st.session_state, auth.is_admin()),
+    label=f"{st.session_state.get('username', 'unknown')} rerun",
+)
+
+# Bring back the stored schedule and latest results of the professor's other
+# sessions once per login, e.g. after a reconnect to another replica
+professor_id = st.session_state.get('professor_id')
+if professor_id and st.session_state.get('shared_state_restored') != professor_id:
+    st.session_state['shared_state_restored'] = professor_id
+    session_store.restore_keys(f"schedule:{professor_id}", st.session_state, SCHEDULE_KEYS)
+    history.restore_results(professor_id)
+
+rerun_timer.mark("header")
+
+# Banner image - full width but limited height. Resized and encoded once per
+# process; each rerun only emits a small element referencing the cached asset.
+static_assets.render_banner()
 
 st.title("🎓 AdviseMe")
 st.subheader("Your Academic Companion")
 
+rerun_timer.mark("sidebar")
+
 # Sidebar
 with st.sidebar:
     # Display authenticated username
@@ -123,6 +160,7 @@ with st.sidebar:
         if st.button("🔄 Change Schedule", use_container_width=True):
             del st.session_state['stored_schedule_file']
             del st.session_state['stored_schedule_info']
+            session_store.remove(f"schedule:{st.session_state.get('professor_id')}")
             st.rerun()
     else:
         # Upload new schedule
@@ -141,16 +179,25 @@ with st.sidebar:
             
             if upload_button:
                 if new_schedule_file:
-                    # Store schedule in session state
-                    st.session_state['stored_schedule_file'] = new_schedule_file.getvalue()
-                    st.session_state['stored_schedule_info'] = {
-                        'filename': new_schedule_file.name,
-                        'semester': schedule_semester,
-                        'year': schedule_year,
-                        'size': new_schedule_file.size
-                    }
-                    st.success(f"✓ Schedule saved for {schedule_semester} {schedule_year}")
-                    st.rerun()
+                    # Validate (and normalize) the schedule before storing it
+                    try:
+                        schedule_upload = ingest.ingest_pdf(new_schedule_file.getbuffer(), ingest.SCHEDULE)
+                    except ingest.UploadValidationError as e:
+                        st.error(f"⚠️ {new_schedule_file.name}: {e}")
+                    else:
+                        # Store schedule in session state
+                        st.session_state['stored_schedule_file'] = bytes(schedule_upload.data)
+                        st.session_state['stored_schedule_info'] = {
+                            'filename': new_schedule_file.name,
+                            'semester': schedule_semester,
+                            'year': schedule_year,
+                            'size': schedule_upload.size
+                        }
+                        session_store.share_keys(
+                            f"schedule:{st.session_state.get('professor_id')}", st.session_state, SCHEDULE_KEYS
+                        )
+                        st.success(f"✓ Schedule saved for {schedule_semester} {schedule_year}")
+                        st.rerun()
                 else:
                     st.error("Please upload a schedule file")
     
@@ -259,6 +306,17 @@ with st.sidebar:
                             st.error(f"❌ Error creating account: {str(e)}")
                             logger.error(f"Error creating professor account: {e}")
         
+        with st.expander("🔬 Admin - Profiling", expanded=False):
+            st.toggle(
+                "Profile my reruns",
+                key="profile_reruns",
+                help="Capture each of your reruns with cProfile; reports appear at the bottom of the page"
+            )
+            if st.button("Reset profiling data", use_container_width=True):
+                profiling.reset_profile_stats()
+                profiling.clear_captures()
+                rerun_profiler.reset()
+        
         st.markdown("---")
     
     with st.expander("📖 About", expanded=False):
@@ -307,7 +365,7 @@ with st.sidebar:
         A: Only PDF files from Workday.
         
         **Q: Why did my upload fail?**  
-        A: Try uploading again. Large files (>10MB) may timeout.
+        A: Uploads must be readable, unencrypted PDFs of up to 10MB. Try exporting the report from Workday again.
         
         **Q: Can I use this for any department?**  
         A: Yes! AdviseMe works for all departments at UAPB.
@@ -335,29 +393,23 @@ with st.sidebar:
     st.markdown("---")
     st.caption("Version 2.0 | March 2026")
 
+rerun_timer.mark("uploads")
+
 # POE API configuration
 POE_API_KEY = os.getenv("POE_API_KEY")
-POE_BASE_URL = "https://api.poe.com/v1"
-
-def encode_file(file_bytes):
-    return base64.b64encode(file_bytes).decode("utf-8")
-
-def parse_schedule_table_to_csv(schedule_markdown):
-    """Convert markdown table to CSV format."""
-    lines = schedule_markdown.strip().split('\n')
-    csv_lines = []
-    for line in lines:
-        if '|' in line and not line.strip().startswith('|---'):
-            # Remove leading/trailing pipes and split
-            cells = [cell.strip() for cell in line.strip('|').split('|')]
-            csv_lines.append(','.join(cells))
-    return '\n'.join(csv_lines)
 
 # File upload section
 st.markdown("**Student Academic Progress**")
 progress_file = st.file_uploader("Upload academic progress PDF", type="pdf", key="progress")
+progress_upload = None
 if progress_file:
-    st.caption(f"✓ {progress_file.name} ({progress_file.size / 1024:.1f} KB)")
+    # Validate (and normalize) the upload before anything else touches it
+    try:
+        progress_upload = ingest.ingest_pdf(progress_file.getbuffer(), ingest.PROGRESS)
+        st.caption(f"✓ {progress_file.name} ({progress_file.size / 1024:.1f} KB, {progress_upload.pages} pages)")
+    except ingest.UploadValidationError as e:
+        st.error(f"⚠️ {progress_file.name}: {e}")
+        progress_file = None
 
 # Create a mock file object class for stored schedules
 class StoredFile:
@@ -367,6 +419,8 @@ class StoredFile:
         self.size = len(data)
     def getvalue(self):
         return self.data
+    def getbuffer(self):
+        return memoryview(self.data)
 
 # Check if schedule is already stored in session
 if 'stored_schedule_file' in st.session_state and st.session_state.get('stored_schedule_file'):
@@ -390,225 +444,157 @@ else:
     semester = None
     year = None
 
+rerun_timer.mark("generate")
+
+results_generated = False
+
 if st.button("Generate Academic Advice", type="primary"):
     if progress_file and schedule_file:
-        with st.spinner("Analyzing documents and generating advice..."):
-            # Encode files
-            progress_data = encode_file(progress_file.getvalue())
-            schedule_data = encode_file(schedule_file.getvalue())
+        # Each stage is a tracing span under one "generate_advice" trace
+        with st.spinner("Analyzing documents and generating advice..."), \
+                timed_span("generate_advice", semester=semester, year=year) as request_span:
+            # Validated upload - a zero-copy view unless it was normalized
+            progress_bytes = progress_upload.data
+            schedule_bytes = schedule_file.getbuffer()
+            request_span.set_attributes({
+                'progress_pdf_bytes': len(progress_bytes),
+                'schedule_pdf_bytes': len(schedule_bytes),
+            })
+            
+            # Parse the progress PDF locally; the PDF itself is only sent to
+            # the model when some of its pages could not be parsed
+            with timed_span("extract_progress", pdf_bytes=len(progress_bytes)) as stage:
+                progress = pdf_extract.extract_progress(progress_bytes)
+                progress_text = pdf_extract.format_unmet_requirements(progress, progress_file.name) if progress else None
+                stage.set_attribute("extracted", progress is not None)
+            
+            # Pre-filter the stored schedule down to sections of the student's
+            # unmet courses, then build the schedules locally when possible so
+            # the model only has to write the email
+            min_credits = st.session_state.get('min_credits', 15)
+            max_credits = st.session_state.get('max_credits', 18)
+            schedule_text = None
+            schedule_plan = None
+            if progress:
+                with timed_span("extract_schedule", pdf_bytes=len(schedule_bytes)):
+                    schedule = pdf_extract.extract_schedule(schedule_bytes) if progress['not_satisfied'] else None
+                with timed_span("solve_schedules") as stage:
+                    schedule_plan = schedule_solver.plan_schedules(
+                        progress, schedule, min_credits, max_credits, semester, year
+                    )
+                    if schedule_plan:
+                        schedule_text = schedule_plan['summary']
+                    else:
+                        schedule_text = schedule_matcher.build_candidate_text(progress, schedule, semester, year)
+                    stage.set_attribute("solved", schedule_plan is not None)
+            
+            # Attach the raw buffers; they are base64-encoded chunk by chunk
+            # while the request body is streamed
+            progress_data = None if progress else progress_bytes
+            schedule_data = None if schedule_text else schedule_bytes
             
             # Academic advisor prompt
-            credit_range = f"{st.session_state.get('min_credits', 15)}-{st.session_state.get('max_credits', 18)}"
-            system_prompt = f"""You are an academic advisor at UAPB. A student sent you an email inquiring about their academic progress and the courses they need to complete in {semester} {year}. I have attached their academic progress and the course schedule for {semester.lower()} {year}.
-
-CRITICAL INSTRUCTION - READ THE ACADEMIC PROGRESS PDF CAREFULLY:
-The academic progress PDF contains a list of courses with STATUS indicators. You MUST read these status indicators EXACTLY as they appear in the PDF.
-
-COURSE STATUS DEFINITIONS (from Workday academic progress reports):
-- "Not Satisfied" or "NOT SATISFIED" = Course is REQUIRED but NOT YET COMPLETED - ONLY these courses should be scheduled
-- "Satisfied" or "SATISFIED" = Course is COMPLETED - DO NOT schedule these
-- "In Progress" or "IN PROGRESS" = Course is CURRENTLY being taken - DO NOT schedule these
-- "Waived" or "WAIVED" = Course requirement was waived - DO NOT schedule these
-- "Transferred" or "TRANSFERRED" = Course credit transferred from another institution - DO NOT schedule these
-
-IMPORTANT: If a student has NO courses with "Not Satisfied" status, they have completed all required courses. In this case:
-- State in the email that the student has satisfied all degree requirements
-- DO NOT create any course schedules
-- Congratulate them on completing their program requirements
-
-Your task:
-1. FIRST: Carefully read the academic progress PDF and identify the STATUS of each course
-2. COUNT: How many courses have "Not Satisfied" status? If ZERO, the student is done with requirements.
-3. CRITICAL FILTERING RULES:
-   - ONLY select courses with "Not Satisfied" status (exact text match)
-   - DO NOT select courses with "Satisfied" status (already completed)
-   - DO NOT select courses with "In Progress" status (currently taking)
-   - DO NOT select courses with "Waived" or "Transferred" status
-4. SCHEDULE CONFLICT PREVENTION:
-   - Carefully check the day/time for each course in the uploaded class schedule PDF
-   - DO NOT schedule courses that have overlapping times on the same day
-   - Ensure there are NO time conflicts between any courses in the same schedule
-   - If two required courses conflict, choose the most critical one and note the conflict in your explanation
-5. SEMESTER ALIGNMENT:
-   - Use ONLY the courses available in the {semester} {year} class schedule PDF provided
-   - DO NOT recommend courses from other semesters
-   - The email and schedules must reference {semester} {year} specifically
-6. REQUIRED COURSES ONLY:
-   - Only recommend courses that are REQUIRED for the student's program completion
-   - Do not suggest electives or non-required courses unless necessary to meet minimum credit requirements
-7. SCHEDULE OPTIONS:
-   - Create schedule options with {credit_range} credits each for {semester} {year}
-   - ONLY create alternative schedules if there are genuinely different viable combinations of required courses
-   - If there's only one logical schedule, provide only the recommended schedule
-8. QUALITY RANKING:
-   - Rank schedules by quality considering: time distribution, prerequisite flow, workload balance, and NO scheduling conflicts
-   - Assume the student passes all current "In Progress" courses from the previous semester
-
-Please provide outputs in this EXACT format:
-
-CASE 1: IF THE STUDENT HAS "NOT SATISFIED" COURSES:
-
-OUTPUT 1 - EMAIL:
-Write a clear, concise, professional email to the student that:
-- Addresses the student professionally
-- Specifically mentions {semester} {year} in the email body
-- Summarizes their academic progress based on the "Not Satisfied" courses identified
-- Mentions that you've created schedule options for {semester} {year}
-- Notes any important considerations (conflicts, prerequisites, course availability)
-- Maintains a supportive and encouraging tone
-
-OUTPUT 2 - RECOMMENDED SCHEDULE (BEST OPTION):
-Create a markdown table with: | Course Code | Course Name | Credits | Day/Time | Instructor |
-- Ensure NO time conflicts between courses
-- Only include courses from the {semester} {year} class schedule PDF
-- Add a brief explanation (2-3 sentences) of why this is the recommended option
-
-OUTPUT 3 - ALTERNATIVE SCHEDULE 1 (only if genuinely different viable combination exists):
-Create a markdown table with the same format.
-- Ensure NO time conflicts between courses
-- Only include courses from the {semester} {year} class schedule PDF
-- Add a brief explanation of the key differences from the recommended schedule
-
-OUTPUT 4 - ALTERNATIVE SCHEDULE 2 (only if a third genuinely different viable combination exists):
-Create a markdown table with the same format.
-- Ensure NO time conflicts between courses
-- Only include courses from the {semester} {year} class schedule PDF
-- Add a brief explanation of the key differences
-
-Format your response EXACTLY as follows:
----EMAIL---
-[Your email content here - must mention {semester} {year}]
----END EMAIL---
-
----RECOMMENDED---
-[Brief explanation why this is best - confirm no conflicts]
-
-[Your markdown table here - courses from {semester} {year} only]
----END RECOMMENDED---
-
----ALTERNATIVE1---
-[Brief explanation of differences - confirm no conflicts]
-
-[Your markdown table here - courses from {semester} {year} only]
----END ALTERNATIVE1---
-
----ALTERNATIVE2---
-[Brief explanation of differences - confirm no conflicts]
-
-[Your markdown table here - courses from {semester} {year} only]
----END ALTERNATIVE2---
-
-CASE 2: IF THE STUDENT HAS ZERO "NOT SATISFIED" COURSES (all requirements completed):
-
-OUTPUT 1 - EMAIL ONLY:
-Write a congratulatory email that:
-- Congratulates the student on completing all degree requirements
-- Confirms they have no "Not Satisfied" courses remaining
-- Mentions they should contact the registrar about graduation
-- Maintains a warm and celebratory tone
-
-Format your response EXACTLY as follows:
----EMAIL---
-[Your congratulatory email content here]
----END EMAIL---
-
----RECOMMENDED---
-No courses needed - all degree requirements satisfied.
----END RECOMMENDED---
-
-CRITICAL REMINDERS:
-- READ THE STATUS COLUMN in the academic progress PDF carefully
-- ONLY courses with "Not Satisfied" status from the academic progress PDF
-- If NO "Not Satisfied" courses exist, use CASE 2 format (congratulatory email only)
-- ONLY courses available in the {semester} {year} class schedule PDF
-- NO time conflicts - verify day/time for every course combination
-- Email must specifically reference {semester} {year}
-- Only include ALTERNATIVE1 and ALTERNATIVE2 sections if there are genuinely different viable combinations
-- If there is only one logical schedule to meet requirements, provide only the RECOMMENDED schedule section
-"""
+            credit_range = f"{min_credits}-{max_credits}"
+            if schedule_plan:
+                prompt = prompt_builder.build_email_prompt(semester, year, credit_range)
+            else:
+                prompt = prompt_builder.build_prompt(semester, year, credit_range, bucket_key=progress_file.name)
+            system_prompt = prompt.text
             
-            # Create message with file attachments
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": system_prompt
-                        },
-                        {
-                            "type": "file",
-                            "file": {
-                                "filename": progress_file.name,
-                                "file_data": f"data:application/pdf;base64,{progress_data}"
-                            }
-                        },
-                        {
-                            "type": "file",
-                            "file": {
-                                "filename": schedule_file.name,
-                                "file_data": f"data:application/pdf;base64,{schedule_data}"
-                            }
-                        }
-                    ]
-                }
-            ]
+            # Route to the fast tier when triage finds nothing left to schedule
+            # or the schedules were already built locally
+            with timed_span("route_model") as stage:
+                route = model_router.route_student(
+                    progress_file.name, progress_data, api_key=POE_API_KEY, extracted=progress,
+                    email_only=schedule_plan is not None
+                )
+                model = route['model']
+                stage.set_attributes({'tier': route['tier'], 'model': model, 'triage': route['status']})
+            request_span.set_attributes({
+                'model': model,
+                'prompt_variant': prompt.variant,
+                'prompt_tokens_estimate': prompt.tokens,
+            })
+            
+            # Create message with file attachments - instructions and the shared
+            # schedule first so the provider can cache that prefix across students
+            messages = llm_client.build_messages(
+                system_prompt,
+                schedule_file.name,
+                schedule_data,
+                progress_file.name,
+                progress_data,
+                model=model,
+                progress_text=progress_text,
+                schedule_text=schedule_text
+            )
             
             try:
-                headers = {
-                    "Authorization": f"Bearer {POE_API_KEY}",
-                    "Content-Type": "application/json"
-                }
-                
-                payload = {
-                    "model": "Claude-Sonnet-4",
-                    "messages": messages
-                }
-                
-                response = requests.post(
-                    f"{POE_BASE_URL}/chat/completions",
-                    headers=headers,
-                    json=payload
+                response, request_info = llm_client.create_chat_completion(
+                    messages, model=model, api_key=POE_API_KEY
+                )
+                model_router.record_request(route['tier'], request_info)
+                # Logged per request so prompt variants and cache hits can be compared
+                logger.info(
+                    f"Advice request: tier={route['tier']} prompt={prompt.variant}/{prompt.version} "
+                    f"prompt_tokens~{prompt.tokens} cached_tokens={request_info.get('cached_tokens', 0)} "
+                    f"latency_ms={request_info['latency_ms']:.0f}"
                 )
                 
+                request_span.set_attributes({
+                    'status_code': response.status_code,
+                    'prompt_tokens': request_info.get('prompt_tokens'),
+                    'completion_tokens': request_info.get('completion_tokens'),
+                    'cached_tokens': request_info.get('cached_tokens'),
+                    'cache_hit': request_info.get('cache_hit'),
+                })
+                
                 if response.status_code == 200:
-                    result = response.json()
-                    content = result['choices'][0]['message']['content']
+                    with timed_span("parse_response") as stage:
+                        result = response.json()
+                        content = result['choices'][0]['message']['content']
+                        stage.set_attribute("response_chars", len(content))
+                    
+                        # Parse the response to extract email and schedules
+                        email_content = ""
+                        recommended_schedule = ""
+                        alternative1_schedule = ""
+                        alternative2_schedule = ""
                     
-                    # Parse the response to extract email and schedules
-                    email_content = ""
-                    recommended_schedule = ""
-                    alternative1_schedule = ""
-                    alternative2_schedule = ""
+                        # Extract email
+                        if "---EMAIL---" in content and "---END EMAIL---" in content:
+                            email_start = content.find("---EMAIL---") + len("---EMAIL---")
+                            email_end = content.find("---END EMAIL---")
+                            email_content = content[email_start:email_end].strip()
                     
-                    # Extract email
-                    if "---EMAIL---" in content and "---END EMAIL---" in content:
-                        email_start = content.find("---EMAIL---") + len("---EMAIL---")
-                        email_end = content.find("---END EMAIL---")
-                        email_content = content[email_start:email_end].strip()
+                        # Extract recommended schedule
+                        if "---RECOMMENDED---" in content and "---END RECOMMENDED---" in content:
+                            rec_start = content.find("---RECOMMENDED---") + len("---RECOMMENDED---")
+                            rec_end = content.find("---END RECOMMENDED---")
+                            recommended_schedule = content[rec_start:rec_end].strip()
                     
-                    # Extract recommended schedule
-                    if "---RECOMMENDED---" in content and "---END RECOMMENDED---" in content:
-                        rec_start = content.find("---RECOMMENDED---") + len("---RECOMMENDED---")
-                        rec_end = content.find("---END RECOMMENDED---")
-                        recommended_schedule = content[rec_start:rec_end].strip()
+                        # Extract alternative 1
+                        if "---ALTERNATIVE1---" in content and "---END ALTERNATIVE1---" in content:
+                            alt1_start = content.find("---ALTERNATIVE1---") + len("---ALTERNATIVE1---")
+                            alt1_end = content.find("---END ALTERNATIVE1---")
+                            alternative1_schedule = content[alt1_start:alt1_end].strip()
                     
-                    # Extract alternative 1
-                    if "---ALTERNATIVE1---" in content and "---END ALTERNATIVE1---" in content:
-                        alt1_start = content.find("---ALTERNATIVE1---") + len("---ALTERNATIVE1---")
-                        alt1_end = content.find("---END ALTERNATIVE1---")
-                        alternative1_schedule = content[alt1_start:alt1_end].strip()
+                        # Extract alternative 2
+                        if "---ALTERNATIVE2---" in content and "---END ALTERNATIVE2---" in content:
+                            alt2_start = content.find("---ALTERNATIVE2---") + len("---ALTERNATIVE2---")
+                            alt2_end = content.find("---END ALTERNATIVE2---")
+                            alternative2_schedule = content[alt2_start:alt2_end].strip()
                     
-                    # Extract alternative 2
-                    if "---ALTERNATIVE2---" in content and "---END ALTERNATIVE2---" in content:
-                        alt2_start = content.find("---ALTERNATIVE2---") + len("---ALTERNATIVE2---")
-                        alt2_end = content.find("---END ALTERNATIVE2---")
-                        alternative2_schedule = content[alt2_start:alt2_end].strip()
+                        # If parsing fails, show full content
+                        if not email_content:
+                            email_content = content
+                            recommended_schedule = "Parsing failed. Please check the email tab for full response."
                     
-                    # If parsing fails, show full content
-                    if not email_content:
-                        email_content = content
-                        recommended_schedule = "Parsing failed. Please check the email tab for full response."
+                        # Locally solved schedules replace anything the model wrote
+                        if schedule_plan:
+                            recommended_schedule = schedule_plan['recommended']
+                            alternative1_schedule = schedule_plan['alternative1']
+                            alternative2_schedule = schedule_plan['alternative2']
                     
                     # Store in session state for persistence
                     st.session_state['email_content'] = email_content
@@ -616,6 +602,8 @@ CRITICAL REMINDERS:
                     st.session_state['alternative1_schedule'] = alternative1_schedule
                     st.session_state['alternative2_schedule'] = alternative2_schedule
                     st.session_state['semester_info'] = f"{semester} {year}"
+                    if st.session_state.get('professor_id'):
+                        history.share_results(st.session_state['professor_id'])
                     
                     # Automatically save session to database
                     try:
@@ -627,25 +615,29 @@ CRITICAL REMINDERS:
                         
                         # Save the advising session
                         if professor_id:
-                            save_success = database.save_advising_session(
-                                professor_id=professor_id,
-                                student_name=student_name,
-                                semester=semester,
-                                year=year,
-                                email_content=email_content,
-                                recommended_schedule=recommended_schedule,
-                                alternative1_schedule=alternative1_schedule,
-                                alternative2_schedule=alternative2_schedule
-                            )
+                            # Queued for the writer thread (see write_behind.py);
+                            # the commit happens after this rerun shows the results
+                            with timed_span("save_session"):
+                                saved = write_behind.submit_advising_session(
+                                    professor_id=professor_id,
+                                    student_name=student_name,
+                                    semester=semester,
+                                    year=year,
+                                    email_content=email_content,
+                                    recommended_schedule=recommended_schedule,
+                                    alternative1_schedule=alternative1_schedule,
+                                    alternative2_schedule=alternative2_schedule
+                                )
+                            # Give the writer its batch window to commit; a save still
+                            # pending is checked again on the next rerun
+                            save_success = write_behind.wait_saved(saved)
+                            if save_success is None:
+                                st.session_state['pending_history_save'] = saved
                             
-                            if save_success:
+                            if save_success is not False:
                                 st.success("Analysis complete! Multiple schedule options generated.")
-                            elif save_success is False:
-                                # Database error occurred (decorator returned False)
-                                st.success("Analysis complete! Multiple schedule options generated.")
-                                st.warning("⚠️ Session saved to display but could not be saved to history database.")
                             else:
-                                # save_success is None - should not happen with current decorator
+                                # Database error occurred (decorator returned False)
                                 st.success("Analysis complete! Multiple schedule options generated.")
                                 st.warning("⚠️ Session saved to display but could not be saved to history database.")
                         else:
@@ -657,130 +649,43 @@ CRITICAL REMINDERS:
                         st.warning(f"⚠️ Session saved to display but could not be saved to history: {str(e)}")
                         logger.error(f"Failed to save advising session: {e}")
                     
-                    # Create tabs for email and schedules
-                    tabs = ["📧 Email", "⭐ Recommended Schedule"]
-                    if alternative1_schedule:
-                        tabs.append("📅 Alternative 1")
-                    if alternative2_schedule:
-                        tabs.append("📅 Alternative 2")
-                    
-                    tab_objects = st.tabs(tabs)
-                    
-                    # Email tab
-                    with tab_objects[0]:
-                        st.markdown("### Academic Advice Email")
-                        st.text_area("Generated Email", email_content, height=400, label_visibility="collapsed")
-                        
-                        # Download and copy buttons
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.download_button(
-                                label="📥 Download Email",
-                                data=email_content,
-                                file_name=f"academic_advice_{semester}_{year}.txt",
-                                mime="text/plain"
-                            )
-                        with col2:
-                            if st.button("📋 Copy to Clipboard", key="copy_email"):
-                                st.toast("Email copied to clipboard!", icon="✅")
-                    
-                    # Recommended schedule tab
-                    with tab_objects[1]:
-                        st.markdown("### ⭐ Recommended Schedule (Best Option)")
-                        if recommended_schedule and "|" in recommended_schedule:
-                            st.markdown(recommended_schedule)
-                            
-                            csv_data = parse_schedule_table_to_csv(recommended_schedule)
-                            st.download_button(
-                                label="📥 Download Schedule (CSV)",
-                                data=csv_data,
-                                file_name=f"recommended_schedule_{semester}_{year}.csv",
-                                mime="text/csv"
-                            )
-                        else:
-                            st.info(recommended_schedule)
-                    
-                    # Alternative 1 tab
-                    if alternative1_schedule and len(tab_objects) > 2:
-                        with tab_objects[2]:
-                            st.markdown("### Alternative Schedule Option 1")
-                            if "|" in alternative1_schedule:
-                                st.markdown(alternative1_schedule)
-                                
-                                csv_data = parse_schedule_table_to_csv(alternative1_schedule)
-                                st.download_button(
-                                    label="📥 Download Schedule (CSV)",
-                                    data=csv_data,
-                                    file_name=f"alternative1_schedule_{semester}_{year}.csv",
-                                    mime="text/csv",
-                                    key="download_alt1"
-                                )
-                            else:
-                                st.info(alternative1_schedule)
-                    
-                    # Alternative 2 tab
-                    if alternative2_schedule and len(tab_objects) > 3:
-                        with tab_objects[3]:
-                            st.markdown("### Alternative Schedule Option 2")
-                            if "|" in alternative2_schedule:
-                                st.markdown(alternative2_schedule)
-                                
-                                csv_data = parse_schedule_table_to_csv(alternative2_schedule)
-                                st.download_button(
-                                    label="📥 Download Schedule (CSV)",
-                                    data=csv_data,
-                                    file_name=f"alternative2_schedule_{semester}_{year}.csv",
-                                    mime="text/csv",
-                                    key="download_alt2"
-                                )
-                            else:
-                                st.info(alternative2_schedule)
+                    # Results are rendered once, below, by the results panel fragment
+                    results_generated = True
                 else:
                     st.error(f"API Error: {response.status_code} - {response.text}")
                     st.info("💡 Tip: Try uploading the files again or check your internet connection.")
                 
             except Exception as e:
+                request_span.record_exception(e)
                 st.error(f"Error generating advice: {str(e)}")
                 st.info("💡 Tip: Please try again. If the issue persists, contact support.")
     else:
         st.warning("⚠️ Please upload both files before generating advice.")
         st.info("💡 Download your student's academic progress and the course schedule from Workday, then upload them here.")
 
-# Show previous results if they exist in session state
-if 'email_content' in st.session_state and 'recommended_schedule' in st.session_state:
-    with st.expander("📋 View Previous Results", expanded=False):
-        st.caption(f"Last generated for: {st.session_state.get('semester_info', 'Unknown semester')}")
-        
-        prev_tabs = ["📧 Email", "⭐ Recommended"]
-        if st.session_state.get('alternative1_schedule'):
-            prev_tabs.append("📅 Alternative 1")
-        if st.session_state.get('alternative2_schedule'):
-            prev_tabs.append("📅 Alternative 2")
-        
-        prev_tab_objects = st.tabs(prev_tabs)
-        
-        with prev_tab_objects[0]:
-            st.text_area("Previous Email", st.session_state['email_content'], height=300, label_visibility="collapsed", disabled=True)
-        
-        with prev_tab_objects[1]:
-            if "|" in st.session_state['recommended_schedule']:
-                st.markdown(st.session_state['recommended_schedule'])
-            else:
-                st.info(st.session_state['recommended_schedule'])
-        
-        if len(prev_tab_objects) > 2 and st.session_state.get('alternative1_schedule'):
-            with prev_tab_objects[2]:
-                if "|" in st.session_state['alternative1_schedule']:
-                    st.markdown(st.session_state['alternative1_schedule'])
-                else:
-                    st.info(st.session_state['alternative1_schedule'])
-        
-        if len(prev_tab_objects) > 3 and st.session_state.get('alternative2_schedule'):
-            with prev_tab_objects[3]:
-                if "|" in st.session_state['alternative2_schedule']:
-                    st.markdown(st.session_state['alternative2_schedule'])
-                else:
-                    st.info(st.session_state['alternative2_schedule'])
+rerun_timer.mark("results")
+
+# A history save that was still pending when its rerun finished
+pending_save = st.session_state.get('pending_history_save')
+if pending_save is not None and pending_save.done():
+    del st.session_state['pending_history_save']
+    if write_behind.wait_saved(pending_save, 0) is False:
+        st.warning("⚠️ The last advising session could not be saved to history database.")
+
+# Show results - freshly generated ones as full tabs, otherwise the
+# collapsible previous-results panel. Both are served by one fragment whose
+# view model is cached on a content hash of the results in session state.
+if results_view.has_results(st.session_state):
+    results_view.render_results_panel(fresh=results_generated)
 
 st.markdown("---")
 st.markdown("*Your Academic Companion*")
+
+rerun_timer.mark("profiling")
+profiling.end_rerun_capture(profile_capture)
+if auth.is_admin():
+    with st.expander("🔬 Profiling report", expanded=False):
+        render_profiling_report()
+
+rerun_timer.finish("app", current_session_id,
+                   session_bytes=session_memory.end_rerun(current_session_id, state_store))
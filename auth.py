@@ -4,17 +4,38 @@ Authentication Module for AdviseMe
 This module handles professor authentication, session management, and security features
 including password hashing with bcrypt and account lockout after failed attempts.
 
+Sessions are also carried by a signed, expiring session token (HMAC-SHA256 over the
+professor id, username and login time) kept in the "session" query parameter, so any
+replica can restore the login of a new Streamlit session (after a reconnect to another
+task or a restart) without sticky sessions. Tokens require SESSION_SECRET, shared by all
+replicas; SESSION_SECRET_PREVIOUS is still accepted while rotating. Without a secret,
+logins live only in session_state. Logging out records the time in the shared session
+store, which revokes every token of that professor issued before it (login times are
+signed to the microsecond, so a login right after a logout stays valid). With the
+default per-process memory store a logout only revokes tokens on its own replica;
+deployments with several replicas need a shared session store (sqlite or redis), and
+a warning is logged when tokens are issued without one.
+
+Failed attempt counters and lockouts are also kept in the shared session store
+(see session_store), so a lockout holds on every replica and in every browser session.
+
 Validates: Requirements 1, 2, 8
 """
 
+import base64
 import bcrypt
+import hashlib
+import hmac
 import streamlit as st
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Dict, List, Any
 import logging
 import os
 from dotenv import load_dotenv
 
+import metrics
+import session_store
+
 # Load environment variables
 load_dotenv()
 
@@ -22,6 +43,20 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Sessions expire this long after login
+SESSION_TIMEOUT = timedelta(hours=8)
+
+# Session token settings (v2 tokens carry the login time in microseconds)
+TOKEN_VERSION = "v2"
+TOKEN_PARAM = "session"
+MAX_CLOCK_SKEW_SECONDS = 300
+
+# Lockout settings
+MAX_FAILED_ATTEMPTS = 3
+LOCKOUT_DURATION = timedelta(minutes=5)
+# Failed attempts are forgotten this long after the first one
+FAILED_ATTEMPT_WINDOW = timedelta(minutes=15)
+
 
 def hash_password(password: str) -> str:
     """
@@ -34,7 +69,8 @@ def hash_password(password: str) -> str:
         Bcrypt hash string
     """
     salt = bcrypt.gensalt(rounds=12)
-    password_hash = bcrypt.hashpw(password.encode('utf-8'), salt)
+    with metrics.BCRYPT_SECONDS.time(operation="hash"):
+        password_hash = bcrypt.hashpw(password.encode('utf-8'), salt)
     return password_hash.decode('utf-8')
 
 
@@ -50,7 +86,8 @@ def verify_password(password: str, password_hash: str) -> bool:
         True if password matches, False otherwise
     """
     try:
-        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        with metrics.BCRYPT_SECONDS.time(operation="verify"):
+            return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
     except Exception as e:
         logger.error(f"Password verification error: {e}")
         return False
@@ -115,10 +152,201 @@ def create_session(professor_id: int, username: str) -> None:
         professor_id: Database ID of the professor
         username: Professor's username for display
     """
+    login_time = datetime.now()
     st.session_state['authenticated'] = True
     st.session_state['professor_id'] = professor_id
     st.session_state['username'] = username
-    st.session_state['login_timestamp'] = datetime.now()
+    st.session_state['login_timestamp'] = login_time
+    
+    token = sign_session_token(professor_id, username, login_time)
+    if token:
+        _store_session_token(token)
+
+
+def get_session_secrets() -> List[bytes]:
+    """
+    Get the keys session tokens are verified with.
+    
+    Returns:
+        SESSION_SECRET first (used for signing), then SESSION_SECRET_PREVIOUS
+        if set; empty if session tokens are not configured
+    """
+    secrets = []
+    for name in ('SESSION_SECRET', 'SESSION_SECRET_PREVIOUS'):
+        value = os.getenv(name)
+        if value:
+            secrets.append(value.encode('utf-8'))
+    return secrets if os.getenv('SESSION_SECRET') else []
+
+
+def _b64encode(data: bytes) -> str:
+    """Encode bytes as unpadded URL-safe base64."""
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text: str) -> bytes:
+    """Decode unpadded URL-safe base64."""
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _timestamp_us(moment: datetime) -> int:
+    """POSIX time of a naive local datetime in whole microseconds."""
+    return int(moment.replace(microsecond=0).timestamp()) * 1_000_000 + moment.microsecond
+
+
+def _from_timestamp_us(timestamp_us: int) -> datetime:
+    """Naive local datetime of a POSIX time in microseconds."""
+    seconds, microseconds = divmod(timestamp_us, 1_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=microseconds)
+
+
+_revocation_warning_logged = False
+
+
+def _warn_if_revocation_local() -> None:
+    """Log once when logouts cannot revoke tokens on other replicas."""
+    global _revocation_warning_logged
+    if _revocation_warning_logged:
+        return
+    _revocation_warning_logged = True
+    if session_store.get_store().name == session_store.MEMORY:
+        logger.warning(
+            "Session tokens are enabled with the per-process memory session store: a logout "
+            "only revokes tokens on this replica. Set ADVISEME_SESSION_STORE to sqlite or a "
+            "redis:// URL when running several replicas."
+        )
+
+
+def _token_signature(secret: bytes, payload: str) -> str:
+    """HMAC-SHA256 signature of a token payload."""
+    return _b64encode(hmac.new(secret, payload.encode('ascii'), hashlib.sha256).digest())
+
+
+def sign_session_token(professor_id: int, username: str, login_time: datetime) -> Optional[str]:
+    """
+    Create a signed session token.
+    
+    Args:
+        professor_id: Database ID of the professor
+        username: Professor's username
+        login_time: Time of login (the token expires SESSION_TIMEOUT later)
+        
+    Returns:
+        Token string, or None if SESSION_SECRET is not configured
+    """
+    secrets = get_session_secrets()
+    if not secrets:
+        return None
+    _warn_if_revocation_local()
+    payload = ".".join([
+        TOKEN_VERSION,
+        str(int(professor_id)),
+        str(_timestamp_us(login_time)),
+        _b64encode(username.encode('utf-8')),
+    ])
+    return f"{payload}.{_token_signature(secrets[0], payload)}"
+
+
+def verify_session_token(token: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """
+    Validate a session token's signature and expiry.
+    
+    Args:
+        token: Token from sign_session_token
+        now: Current time (defaults to datetime.now())
+        
+    Returns:
+        Dictionary with professor_id, username, login_timestamp and expired,
+        or None if the token is malformed, its signature is invalid or the
+        professor logged out after it was issued
+    """
+    secrets = get_session_secrets()
+    if not secrets or not isinstance(token, str):
+        return None
+    
+    payload, _, signature = token.rpartition(".")
+    parts = payload.split(".")
+    if len(parts) != 4 or parts[0] != TOKEN_VERSION:
+        return None
+    if not any(hmac.compare_digest(signature, _token_signature(secret, payload)) for secret in secrets):
+        logger.warning("Rejected session token with an invalid signature")
+        return None
+    
+    try:
+        professor_id = int(parts[1])
+        login_time = _from_timestamp_us(int(parts[2]))
+        username = _b64decode(parts[3]).decode('utf-8')
+    except (ValueError, OverflowError, OSError):
+        return None
+    
+    now = now or datetime.now()
+    if login_time - now > timedelta(seconds=MAX_CLOCK_SKEW_SECONDS):
+        return None
+    logout_at = session_store.load(f"logout_at:{professor_id}")
+    if logout_at is not None and login_time.timestamp() <= logout_at:
+        logger.warning(f"Rejected session token revoked by logout for user: {username}")
+        return None
+    return {
+        'professor_id': professor_id,
+        'username': username,
+        'login_timestamp': login_time,
+        'expired': now - login_time > SESSION_TIMEOUT,
+    }
+
+
+def _read_session_token() -> Optional[str]:
+    """Get the session token from the query parameters."""
+    try:
+        token = st.query_params.get(TOKEN_PARAM)
+    except Exception:
+        return None
+    return token if isinstance(token, str) and token else None
+
+
+def _store_session_token(token: str) -> None:
+    """Put the session token in the URL so reloads and other replicas can restore the session."""
+    try:
+        st.query_params[TOKEN_PARAM] = token
+    except Exception as e:
+        logger.debug(f"Could not store session token: {e}")
+
+
+def _clear_session_token() -> None:
+    """Remove the session token from the URL."""
+    try:
+        if TOKEN_PARAM in st.query_params:
+            del st.query_params[TOKEN_PARAM]
+    except Exception as e:
+        logger.debug(f"Could not clear session token: {e}")
+
+
+def restore_session_from_token() -> bool:
+    """
+    Restore an authenticated session from a valid session token.
+    
+    An expired token sets the session_timeout flag so the login page shows
+    the timeout message; invalid tokens are removed from the URL.
+    
+    Returns:
+        True if the session was restored
+    """
+    token = _read_session_token()
+    if token is None:
+        return False
+    
+    claims = verify_session_token(token)
+    if claims is None or claims['expired']:
+        if claims is not None:
+            st.session_state['session_timeout'] = True
+        _clear_session_token()
+        return False
+    
+    st.session_state['authenticated'] = True
+    st.session_state['professor_id'] = claims['professor_id']
+    st.session_state['username'] = claims['username']
+    st.session_state['login_timestamp'] = claims['login_timestamp']
+    logger.info(f"Restored session from token for user: {claims['username']}")
+    return True
 
 
 def is_authenticated() -> bool:
@@ -135,24 +363,43 @@ def is_authenticated() -> bool:
     Validates: Requirements 8.2, 8.3
     """
     if not st.session_state.get('authenticated', False):
-        return False
+        # A new session (e.g. on another replica) may carry a session token
+        if not restore_session_from_token():
+            return False
     
     # Check session timeout (8 hours) on every page interaction
     if check_session_timeout():
         # Set timeout flag before logout to display message
         st.session_state['session_timeout'] = True
-        logout()
+        logout(revoke_tokens=False)
         return False
     
     return True
 
 
-def logout() -> None:
-    """Clear session state and return to login page."""
+def logout(revoke_tokens: bool = True) -> None:
+    """
+    Clear session state and return to login page.
+    
+    Args:
+        revoke_tokens: Also revoke the professor's session tokens issued
+            until now, on every replica sharing the session store (an
+            expired session's token is already rejected)
+    """
+    professor_id = st.session_state.get('professor_id')
+    if revoke_tokens and professor_id is not None:
+        # Kept until every token issued before now has expired anyway
+        session_store.save(
+            f"logout_at:{professor_id}",
+            datetime.now().timestamp(),
+            ttl=SESSION_TIMEOUT.total_seconds() + MAX_CLOCK_SKEW_SECONDS,
+        )
+    
     # Clear all authentication-related session state
     for key in ['authenticated', 'professor_id', 'username', 'login_timestamp']:
         if key in st.session_state:
             del st.session_state[key]
+    _clear_session_token()
     
     logger.info("User logged out")
 
@@ -171,7 +418,7 @@ def check_session_timeout() -> bool:
     elapsed = datetime.now() - login_time
     
     # 8 hour timeout
-    return elapsed > timedelta(hours=8)
+    return elapsed > SESSION_TIMEOUT
 
 
 def check_lockout(username: str) -> bool:
@@ -195,6 +442,12 @@ def check_lockout(username: str) -> bool:
             # Lockout expired, remove it
             del st.session_state['lockout_until'][username]
     
+    # A lockout recorded by another session or replica
+    shared_unlock_time = session_store.load(f"lockout_until:{username}")
+    if isinstance(shared_unlock_time, datetime) and datetime.now() < shared_unlock_time:
+        st.session_state['lockout_until'][username] = shared_unlock_time
+        return True
+    
     return False
 
 
@@ -213,16 +466,25 @@ def record_failed_attempt(username: str) -> None:
     
     st.session_state['failed_attempts'][username] += 1
     
+    # Count attempts from every session and replica
+    shared_attempts = session_store.increment(
+        f"failed_attempts:{username}", ttl=FAILED_ATTEMPT_WINDOW.total_seconds()
+    )
+    if shared_attempts > st.session_state['failed_attempts'][username]:
+        st.session_state['failed_attempts'][username] = shared_attempts
+    
     # Log the failed attempt
     logger.warning(f"Failed login attempt for username: {username}")
     
     # Implement lockout after 3 failed attempts
-    if st.session_state['failed_attempts'][username] >= 3:
+    if st.session_state['failed_attempts'][username] >= MAX_FAILED_ATTEMPTS:
         if 'lockout_until' not in st.session_state:
             st.session_state['lockout_until'] = {}
         
-        lockout_time = datetime.now() + timedelta(minutes=5)
+        lockout_time = datetime.now() + LOCKOUT_DURATION
         st.session_state['lockout_until'][username] = lockout_time
+        session_store.save(f"lockout_until:{username}", lockout_time, ttl=LOCKOUT_DURATION.total_seconds())
+        session_store.remove(f"failed_attempts:{username}")
         logger.warning(f"Account locked out: {username} until {lockout_time}")
 
 
@@ -235,6 +497,7 @@ def reset_failed_attempts(username: str) -> None:
     """
     if 'failed_attempts' in st.session_state and username in st.session_state['failed_attempts']:
         del st.session_state['failed_attempts'][username]
+    session_store.remove(f"failed_attempts:{username}")
 
 
 def get_lockout_remaining_time(username: str) -> Optional[int]:
@@ -247,7 +510,7 @@ def get_lockout_remaining_time(username: str) -> Optional[int]:
     Returns:
         Remaining minutes until unlock, or None if not locked out
     """
-    if 'lockout_until' not in st.session_state:
+    if not check_lockout(username):
         return None
     
     if username in st.session_state['lockout_until']:
@@ -0,0 +1,168 @@
+"""
+Benchmarks for the AdviseMe database layer.
+
+Runs the queries behind the app against a synthetic history (see
+synthetic_data.py): saving sessions one at a time and in batches, listing a
+professor's history, loading a session, searching by student name, and the
+query plans that keep those fast as the history grows.
+
+Not collected by the regular test run. Needs pytest-benchmark:
+    make bench
+    python -m pytest bench_database.py --benchmark-only
+
+The history size is set with ADVISEME_BENCH_SESSIONS (default 100000) and
+ADVISEME_BENCH_PROFESSORS (default 40). `make bench` saves each run under
+.benchmarks/ tagged with the commit and fails when a benchmark regresses
+beyond BENCH_FAIL (default: median 25% slower) against the previous saved run.
+"""
+
+import os
+import random
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import database
+import synthetic_data
+
+SESSIONS = int(os.getenv("ADVISEME_BENCH_SESSIONS", "100000"))
+PROFESSORS = int(os.getenv("ADVISEME_BENCH_PROFESSORS", "40"))
+
+HISTORY_SQL = """
+    SELECT session_id, professor_id, student_name, semester, year,
+           timestamp, email_content, recommended_schedule,
+           alternative1_schedule, alternative2_schedule
+    FROM advising_sessions {hint}
+    WHERE professor_id = ?
+    ORDER BY timestamp DESC, session_id DESC
+    LIMIT ?
+"""
+
+# Student name search within a professor's history (history has no search
+# box yet; this is the query one would run)
+SEARCH_SQL = """
+    SELECT session_id, student_name, semester, year, timestamp
+    FROM advising_sessions
+    WHERE professor_id = ? AND student_name LIKE ?
+    ORDER BY timestamp DESC, session_id DESC
+    LIMIT 50
+"""
+
+
+@pytest.fixture(scope="module")
+def synthetic_db(tmp_path_factory):
+    """Database filled with the synthetic history, shared by the module."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(database, "DB_PATH", str(tmp_path_factory.mktemp("bench") / "bench.db"))
+        professor_ids = synthetic_data.populate(PROFESSORS, SESSIONS)
+        with database.get_db_connection() as conn:
+            conn.execute("ANALYZE")
+            session_ids = [row['session_id'] for row in conn.execute(
+                "SELECT session_id, professor_id FROM advising_sessions WHERE professor_id = ?",
+                (professor_ids[0],)
+            ).fetchall()]
+        yield {'professor_ids': professor_ids, 'session_ids': session_ids}
+
+
+@pytest.fixture
+def new_sessions(synthetic_db):
+    """Sessions to save, shaped like the synthetic history; removed afterwards."""
+    rows = synthetic_data.generate_sessions(synthetic_db['professor_ids'], 100, seed=99)
+    with database.get_db_connection() as conn:
+        last_id = conn.execute("SELECT MAX(session_id) AS last_id FROM advising_sessions").fetchone()['last_id']
+    yield [
+        dict(zip(("professor_id", "student_name", "semester", "year"), row[:4]),
+             **dict(zip(database.SESSION_FIELDS[4:], row[5:])))
+        for row in rows
+    ]
+    # Saved sessions all share a few timestamps; left in place they would
+    # change what the read benchmarks measure
+    with database.get_db_connection() as conn:
+        conn.execute("DELETE FROM advising_sessions WHERE session_id > ?", (last_id,))
+
+
+def _query_plan(sql, params):
+    """Details of SQLite's plan for a query."""
+    with database.get_db_connection() as conn:
+        return " ".join(row['detail'] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+
+class TestWrites:
+    """Saving advising sessions"""
+
+    def test_save_session(self, benchmark, new_sessions):
+        """One session per transaction (write-behind off)"""
+        sessions = iter(new_sessions * 1000)
+        result = benchmark(lambda: database.save_advising_session(**next(sessions)))
+        assert result is True
+
+    def test_save_sessions_batch(self, benchmark, new_sessions):
+        """A write-behind batch of 100 sessions in one transaction"""
+        assert benchmark(database.save_advising_sessions, new_sessions) == len(new_sessions)
+
+
+class TestReads:
+    """Reading history"""
+
+    def test_history_busiest_professor(self, benchmark, synthetic_db):
+        """History dropdown of the professor with the most sessions"""
+        rows = benchmark(database.get_professor_history, synthetic_db['professor_ids'][0])
+        assert len(rows) == 50
+
+    def test_history_quietest_professor(self, benchmark, synthetic_db):
+        """History dropdown of the professor with the fewest sessions"""
+        rows = benchmark(database.get_professor_history, synthetic_db['professor_ids'][-1])
+        assert rows
+
+    def test_history_without_index(self, benchmark, synthetic_db):
+        """Same listing with the index disabled, for comparison"""
+        sql = HISTORY_SQL.format(hint="NOT INDEXED")
+
+        def run():
+            with database.get_db_connection() as conn:
+                return conn.execute(sql, (synthetic_db['professor_ids'][0], 50)).fetchall()
+
+        assert len(benchmark(run)) == 50
+
+    def test_load_session(self, benchmark, synthetic_db):
+        """Reloading a session from the dropdown"""
+        rng = random.Random(1)
+        professor_id = synthetic_db['professor_ids'][0]
+        session_ids = synthetic_db['session_ids']
+        session = benchmark(lambda: database.load_session(rng.choice(session_ids), professor_id))
+        assert session is not None
+
+    def test_search_student(self, benchmark, synthetic_db):
+        """Student name prefix search in a professor's history"""
+        def run():
+            with database.get_db_connection() as conn:
+                return conn.execute(SEARCH_SQL, (synthetic_db['professor_ids'][0], "Jas%")).fetchall()
+
+        assert benchmark(run)
+
+
+class TestIndexes:
+    """Query plans use the indexes"""
+
+    def test_history_uses_professor_index(self, synthetic_db):
+        """Listing reads the index in order instead of sorting the table"""
+        plan = _query_plan(HISTORY_SQL.format(hint=""), (synthetic_db['professor_ids'][0], 50))
+        assert "idx_sessions_professor" in plan
+        # Only ties on timestamp are sorted by session_id
+        assert "USE TEMP B-TREE FOR ORDER BY" not in plan
+
+    def test_load_session_uses_primary_key(self, synthetic_db):
+        plan = _query_plan(
+            "SELECT * FROM advising_sessions WHERE session_id = ? AND professor_id = ?",
+            (1, synthetic_db['professor_ids'][0]),
+        )
+        assert "INTEGER PRIMARY KEY" in plan
+
+    def test_search_uses_professor_index(self, synthetic_db):
+        plan = _query_plan(SEARCH_SQL, (synthetic_db['professor_ids'][0], "Jas%"))
+        assert "idx_sessions_professor" in plan
+
+    def test_login_uses_username_index(self, synthetic_db):
+        plan = _query_plan("SELECT * FROM professors WHERE username = ?", ("synthetic_prof_0001",))
+        assert "USING INDEX" in plan
@@ -0,0 +1,248 @@
+"""
+End-to-end rerun benchmarks for the AdviseMe script.
+
+Runs the whole adviseme.py script with Streamlit's AppTest harness for a
+logged-in professor in several scenarios: with and without history, a stored
+schedule and previous results, plus a "Generate" click with the POE call
+stubbed. For each scenario it measures the script execution time per rerun
+and, in a separate rerun under tracemalloc, the memory allocated.
+
+The benchmark times are the script's own time as the app's rerun profiler
+records it (see rerun_profiler.py). AppTest adds its own overhead around
+each run (compiling the script, a polling thread, parsing the output), which
+is larger and noisier than the script itself; the wall time of a run is
+saved alongside as extra_info.
+
+Not collected by the regular test run. Needs pytest-benchmark:
+    make bench
+    python -m pytest bench_rerun.py --benchmark-only
+
+A rerun that is not generating advice fails when its mean time exceeds the
+rerun budget (ADVISEME_RERUN_BUDGET_MS). `make bench` also fails when a
+scenario regresses beyond BENCH_FAIL (default: median 25% slower) against the
+previous saved run. Allocation figures are saved with each run.
+"""
+
+import random
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, Any
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from streamlit.testing.v1 import AppTest
+
+import streamlit
+import llm_client
+import model_router
+import rerun_profiler
+import synthetic_data
+import write_behind
+
+APP_TIMEOUT = 60
+ROUNDS = 20
+HISTORY_SESSIONS = 50
+
+GENERATE_LABEL = "Generate Academic Advice"
+
+PROGRESS_FILENAME = "Doe_Jane_Academic_Progress.pdf"
+PROGRESS_LINES = [
+    "Academic Progress - Jane Doe - BS Animal Science",
+    "General Education Requirements   Satisfied",
+    "ENGL 1311 - Composition I   Satisfied",
+    "Major Core Requirements   Not Satisfied",
+    "ANSC 3303 - Animal Nutrition   Not Satisfied",
+    "ANSC 4401 - Animal Breeding   Not Satisfied",
+    "BIOL 1401 General Biology   In Progress",
+]
+SCHEDULE_LINES = [
+    "Spring 2026 Class Schedule - College of Agriculture",
+    "Course Section Title Credits Days Time Instructor",
+    "ANSC 3303-01 Animal Nutrition 3 MWF 9:00 AM - 9:50 AM Dr. Smith",
+    "ANSC 3303-02 Animal Nutrition 3 TR 1:00 PM - 2:15 PM Dr. Jones",
+    "ANSC 4401-01 Animal Breeding 4 TR 8:00 AM - 9:15 AM W 2:00 PM - 4:50 PM Dr. Lee",
+    "BIOL 1401-H01 General Biology 4 Online TBA",
+]
+MODEL_RESPONSE = """---EMAIL---
+Dear Jane,
+
+Here is your recommended schedule for Spring 2026.
+---END EMAIL---
+---RECOMMENDED---
+| Course | Title | Credits |
+|--------|-------|---------|
+| ANSC 3303 | Animal Nutrition | 3 |
+---END RECOMMENDED---"""
+
+# name: (history sessions, stored schedule, previous results, click Generate)
+SCENARIOS = {
+    "empty": (0, False, False, False),
+    "history": (HISTORY_SESSIONS, False, False, False),
+    "schedule": (0, True, False, False),
+    "results": (0, False, True, False),
+    "returning": (HISTORY_SESSIONS, True, True, False),
+    "generate": (HISTORY_SESSIONS, True, False, True),
+}
+
+
+class ScriptProbe:
+    """
+    Script time and memory, recorded by hooks on the rerun profiler.
+
+    Called, it is a clock of the seconds spent inside the script summed over
+    every rerun, used as the benchmark timer. While tracemalloc is tracing,
+    it also records the memory allocated between the start and the end of
+    the script.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.memory: Dict[str, float] = {}
+        self._base = 0
+
+    def __call__(self) -> float:
+        return self.seconds
+
+    def started(self, timer):
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+        return timer
+
+    def finished(self, rerun: Dict[str, Any]) -> Dict[str, Any]:
+        self.seconds += rerun['total_ms'] / 1000
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            self.memory = {
+                'retained_kib': round((current - self._base) / 1024, 1),
+                'peak_kib': round((peak - self._base) / 1024, 1),
+            }
+        return rerun
+
+
+SCRIPT = ScriptProbe()
+
+
+class StubResponse:
+    """Successful POE response."""
+
+    status_code = 200
+
+    def json(self):
+        return {'choices': [{'message': {'content': MODEL_RESPONSE}}]}
+
+
+class StubUpload:
+    """Uploaded progress PDF."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.name = PROGRESS_FILENAME
+        self.size = len(data)
+
+    def getvalue(self):
+        return self.data
+
+    def getbuffer(self):
+        return memoryview(self.data)
+
+
+@pytest.fixture
+def app_env(temp_db, tmp_path, monkeypatch, make_pdf):
+    """Isolated database and caches, with the POE API stubbed out."""
+    monkeypatch.setenv("ADVISEME_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(
+        llm_client, "create_chat_completion",
+        lambda messages, model=None, api_key=None: (StubResponse(), {'model': model, 'latency_ms': 0.0}),
+    )
+    monkeypatch.setattr(model_router, "CLASSIFIERS", [])
+    start_rerun = rerun_profiler.start_rerun
+    record_rerun = rerun_profiler.record_rerun
+    monkeypatch.setattr(rerun_profiler, "start_rerun", lambda *args: SCRIPT.started(start_rerun(*args)))
+    monkeypatch.setattr(rerun_profiler, "record_rerun", lambda *args, **kwargs: SCRIPT.finished(
+        record_rerun(*args, **kwargs)
+    ))
+    yield make_pdf
+    write_behind.shutdown()
+
+
+def build_app(scenario: str, make_pdf, monkeypatch) -> AppTest:
+    """AppTest of a logged-in professor in the given scenario."""
+    history_sessions, schedule, results, generate = SCENARIOS[scenario]
+    professor_id = synthetic_data.populate(professors=1, sessions=history_sessions)[0]
+    if generate:
+        # AppTest cannot upload files; hand the script the progress PDF
+        progress = StubUpload(make_pdf([PROGRESS_LINES]))
+        file_uploader = streamlit.file_uploader
+        monkeypatch.setattr(streamlit, "file_uploader", lambda label, *args, key=None, **kwargs: (
+            progress if key == "progress" else file_uploader(label, *args, key=key, **kwargs)
+        ))
+
+    at = AppTest.from_file("adviseme.py", default_timeout=APP_TIMEOUT)
+    at.session_state['authenticated'] = True
+    at.session_state['professor_id'] = professor_id
+    at.session_state['username'] = "synthetic_prof_0000"
+    at.session_state['login_timestamp'] = datetime.now()
+    if schedule:
+        at.session_state['stored_schedule_file'] = make_pdf([SCHEDULE_LINES])
+        at.session_state['stored_schedule_info'] = {'filename': 'spring_2026.pdf', 'semester': 'Spring', 'year': 2026}
+    if results:
+        at.session_state['email_content'] = "Dear Jane,\n\n" + "Please register as soon as your window opens. " * 40
+        at.session_state['recommended_schedule'] = synthetic_data.schedule_table(random.Random(1))
+        at.session_state['alternative1_schedule'] = synthetic_data.schedule_table(random.Random(2))
+        at.session_state['alternative2_schedule'] = ""
+        at.session_state['semester_info'] = "Spring 2026"
+    return at
+
+
+def _generate_button(at: AppTest):
+    return next(button for button in at.button if button.label == GENERATE_LABEL)
+
+
+@pytest.mark.benchmark(group="rerun", timer=SCRIPT)
+@pytest.mark.parametrize("scenario", list(SCENARIOS))
+def test_rerun(benchmark, app_env, monkeypatch, scenario):
+    """Script execution time and allocations of one rerun"""
+    generate = SCENARIOS[scenario][3]
+    at = build_app(scenario, app_env, monkeypatch)
+    at.run()
+    assert not at.exception
+
+    def click_generate():
+        # Clicking only sets the button for the next run
+        _generate_button(at).click()
+
+    setup = click_generate if generate else None
+    rerun_profiler.reset()
+    started = time.perf_counter()
+    benchmark.pedantic(at.run, setup=setup, rounds=ROUNDS, warmup_rounds=1)
+    wall_seconds = time.perf_counter() - started
+    assert not at.exception
+    if generate:
+        assert at.session_state['email_content'].startswith("Dear Jane")
+
+    script = rerun_profiler.get_process_summary()
+    benchmark.extra_info['apptest_mean_ms'] = round(wall_seconds * 1000 / (ROUNDS + 1), 2)
+    benchmark.extra_info['slowest_sections'] = {
+        row['section']: round(row['mean_ms'], 2) for row in script['sections'][:3]
+    }
+
+    if setup:
+        setup()
+    SCRIPT.memory = {}
+    tracemalloc.start()
+    try:
+        at.run()
+    finally:
+        tracemalloc.stop()
+    assert SCRIPT.memory
+    benchmark.extra_info.update(SCRIPT.memory)
+
+    # Advice generation is exempt from the budget, as in production
+    if not generate:
+        budget_ms = rerun_profiler.get_budget_ms()
+        mean_ms = benchmark.stats.stats.mean * 1000
+        assert mean_ms <= budget_ms, f"{scenario} rerun took {mean_ms:.0f} ms, budget {budget_ms:.0f} ms"
@@ -23,6 +23,24 @@ settings.register_profile("thorough", max_examples=1000, verbosity=Verbosity.nor
 profile = os.getenv("HYPOTHESIS_PROFILE", "default")
 settings.load_profile(profile)
 
+# Tests never open the /metrics side port (see metrics.py)
+os.environ.setdefault("ADVISEME_METRICS", "off")
+
+
+@pytest.fixture(autouse=True)
+def shared_session_store():
+    """
+    Give each test an empty in-memory session store (see session_store.py).
+    
+    Yields:
+        MemoryStore: The store used by auth, history and the app
+    """
+    import session_store
+    store = session_store.MemoryStore()
+    session_store.set_store(store)
+    yield store
+    session_store.set_store(None)
+
 
 @pytest.fixture
 def temp_db():
@@ -128,6 +146,63 @@ def mock_streamlit_session():
     return {}
 
 
+def build_text_pdf(pages):
+    """
+    Build a minimal, valid text-only PDF.
+    
+    Args:
+        pages: List of pages, each a list of text lines
+        
+    Returns:
+        bytes: PDF file content
+    """
+    body = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for lines in pages:
+        ops = ["BT", "/F1 10 Tf", "12 TL", "40 760 Td"]
+        for line in lines:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({escaped}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        body.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(body)
+        body.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        kids.append(len(body))
+    body[1] = (b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % k for k in kids)
+               + b"] /Count %d >>" % len(kids))
+    
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(body, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(body) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(body) + 1, xref_offset)
+    return bytes(out)
+
+
+@pytest.fixture
+def make_pdf():
+    """
+    Provide a builder for small text PDFs (Workday report stand-ins).
+    
+    Returns:
+        Callable: build_text_pdf(pages) -> bytes
+    """
+    return build_text_pdf
+
+
 # Custom Hypothesis strategies for domain objects
 from hypothesis import strategies as st
 
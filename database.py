@@ -2,7 +2,9 @@
 Database Manager for AdviseMe
 
 This module handles all database operations including schema creation, professor account
-management, and advising session storage using SQLite.
+management, and advising session storage using SQLite, or a PostgreSQL server shared by
+every replica when DATABASE_URL is set (see postgres_backend.py). Both backends run the
+same queries and indexes; only the table definitions differ.
 
 Validates: Requirements 2, 3, 6, 7, 9, 10
 """
@@ -15,8 +17,12 @@ from contextlib import contextmanager
 from functools import wraps
 import os
 import re
+import time
 import bcrypt
 
+import metrics
+import postgres_backend
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,6 +30,39 @@ logger = logging.getLogger(__name__)
 # Database file path
 DB_PATH = "adviseme.db"
 
+# Errors handled by safe_database_operation, for both backends
+_PG_OPERATIONAL_ERRORS, _PG_INTEGRITY_ERRORS = postgres_backend.error_types()
+OPERATIONAL_ERRORS = (sqlite3.OperationalError,) + _PG_OPERATIONAL_ERRORS
+INTEGRITY_ERRORS = (sqlite3.IntegrityError,) + _PG_INTEGRITY_ERRORS
+
+# Columns written when saving an advising session, in INSERT_SESSION_SQL order
+SESSION_FIELDS = (
+    'professor_id', 'student_name', 'semester', 'year', 'email_content',
+    'recommended_schedule', 'alternative1_schedule', 'alternative2_schedule',
+)
+INSERT_SESSION_SQL = """
+    INSERT INTO advising_sessions 
+    (professor_id, student_name, semester, year, email_content, 
+     recommended_schedule, alternative1_schedule, alternative2_schedule)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Indexes shared by the SQLite and PostgreSQL schemas
+INDEXES = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_professors_username 
+    ON professors(username)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_sessions_professor 
+    ON advising_sessions(professor_id, timestamp DESC)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_sessions_timestamp 
+    ON advising_sessions(timestamp DESC)
+    """,
+]
+
 
 def safe_database_operation(operation_func: Callable) -> Callable:
     """
@@ -33,8 +72,8 @@ def safe_database_operation(operation_func: Callable) -> Callable:
     allowing the application to continue functioning even when the database is unavailable.
     
     Error handling:
-    - sqlite3.OperationalError: Database connection/access failures
-    - sqlite3.IntegrityError: Data integrity violations (unique constraints, foreign keys)
+    - OperationalError (sqlite3 or psycopg): Database connection/access failures
+    - IntegrityError (sqlite3 or psycopg): Data integrity violations (unique constraints, foreign keys)
     - General exceptions: Unexpected errors
     
     Args:
@@ -47,12 +86,17 @@ def safe_database_operation(operation_func: Callable) -> Callable:
     """
     @wraps(operation_func)
     def wrapper(*args, **kwargs) -> Any:
+        start = time.perf_counter()
+        outcome = "error"
         try:
-            return operation_func(*args, **kwargs)
+            result = operation_func(*args, **kwargs)
+            outcome = "ok"
+            return result
         except ValueError:
             # Let validation errors pass through - these should be handled by the caller
+            outcome = "invalid"
             raise
-        except sqlite3.OperationalError as e:
+        except OPERATIONAL_ERRORS as e:
             logger.error(f"Database operation failed in {operation_func.__name__}: {e}")
             # Return appropriate default based on function name
             func_name = operation_func.__name__
@@ -61,7 +105,7 @@ def safe_database_operation(operation_func: Callable) -> Callable:
             elif func_name in ['create_professor', 'save_advising_session', 'save_current_session', 'reload_session']:
                 return False
             return None
-        except sqlite3.IntegrityError as e:
+        except INTEGRITY_ERRORS as e:
             logger.error(f"Data integrity error in {operation_func.__name__}: {e}")
             # Return False for operations that return boolean success indicators
             func_name = operation_func.__name__
@@ -77,6 +121,10 @@ def safe_database_operation(operation_func: Callable) -> Callable:
             elif func_name in ['create_professor', 'save_advising_session', 'save_current_session', 'reload_session']:
                 return False
             return None
+        finally:
+            metrics.DB_OPERATION_SECONDS.observe(
+                time.perf_counter() - start, operation=operation_func.__name__, outcome=outcome
+            )
     return wrapper
 
 
@@ -85,9 +133,17 @@ def get_db_connection():
     """
     Context manager for database connections.
     
+    Uses a pooled PostgreSQL connection when DATABASE_URL is set, otherwise
+    the SQLite file at DB_PATH.
+    
     Yields:
-        sqlite3.Connection: Database connection
+        sqlite3.Connection or postgres_backend.Connection: Database connection
     """
+    if postgres_backend.get_database_url():
+        with postgres_backend.connection() as conn:
+            yield conn
+        return
+    
     conn = None
     try:
         conn = sqlite3.connect(DB_PATH)
@@ -111,6 +167,14 @@ def initialize_database() -> None:
     Create database file and tables if they don't exist.
     Sets file permissions to 0600 (owner read/write only).
     """
+    if postgres_backend.get_database_url():
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            for statement in postgres_backend.SCHEMA + INDEXES:
+                cursor.execute(statement)
+            logger.info("Database initialized successfully (PostgreSQL)")
+        return
+    
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
@@ -128,12 +192,6 @@ def initialize_database() -> None:
             )
         """)
         
-        # Create index on username for faster lookups
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_professors_username 
-            ON professors(username)
-        """)
-        
         # Create advising_sessions table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS advising_sessions (
@@ -159,15 +217,8 @@ def initialize_database() -> None:
         """)
         
         # Create indexes for faster queries
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_sessions_professor 
-            ON advising_sessions(professor_id, timestamp DESC)
-        """)
-        
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_sessions_timestamp 
-            ON advising_sessions(timestamp DESC)
-        """)
+        for statement in INDEXES:
+            cursor.execute(statement)
         
         logger.info("Database initialized successfully")
     
@@ -177,6 +228,26 @@ def initialize_database() -> None:
         logger.info(f"Database file permissions set to 0600")
 
 
+def validate_professor_credentials(username: str, password: str) -> None:
+    """
+    Check a new professor's username format and password length.
+    
+    Args:
+        username: Username (alphanumeric, hyphens, underscores)
+        password: Plain text password (minimum 8 characters)
+        
+    Raises:
+        ValueError: If username format is invalid or password is too short
+    """
+    # Validate username format (alphanumeric, hyphens, underscores only)
+    if not re.match(r'^[A-Za-z0-9_-]+$', username):
+        raise ValueError("Username must contain only alphanumeric characters, hyphens, and underscores")
+    
+    # Validate password length (minimum 8 characters)
+    if len(password) < 8:
+        raise ValueError("Password must be at least 8 characters long")
+
+
 @safe_database_operation
 def create_professor(username: str, password: str) -> bool:
     """
@@ -195,16 +266,11 @@ def create_professor(username: str, password: str) -> bool:
     Raises:
         ValueError: If username format is invalid or password is too short
     """
-    # Validate username format (alphanumeric, hyphens, underscores only)
-    if not re.match(r'^[A-Za-z0-9_-]+$', username):
-        raise ValueError("Username must contain only alphanumeric characters, hyphens, and underscores")
-    
-    # Validate password length (minimum 8 characters)
-    if len(password) < 8:
-        raise ValueError("Password must be at least 8 characters long")
+    validate_professor_credentials(username, password)
     
     # Hash password with bcrypt (automatically generates salt)
-    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    with metrics.BCRYPT_SECONDS.time(operation="hash"):
+        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
     
     with get_db_connection() as conn:
         cursor = conn.cursor()
@@ -268,12 +334,7 @@ def save_advising_session(
     """
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO advising_sessions 
-            (professor_id, student_name, semester, year, email_content, 
-             recommended_schedule, alternative1_schedule, alternative2_schedule)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        cursor.execute(INSERT_SESSION_SQL, (
             professor_id, student_name, semester, year, email_content,
             recommended_schedule, alternative1_schedule, alternative2_schedule
         ))
@@ -281,6 +342,41 @@ def save_advising_session(
         return True
 
 
+def save_advising_sessions(sessions: List[Dict]) -> int:
+    """
+    Save several advising sessions in one transaction.
+    
+    Used by the write-behind writer (see write_behind.py). Unlike the other
+    operations, errors are raised so the caller can retry rows one by one;
+    either every session is saved or none is.
+    
+    Args:
+        sessions: Dictionaries with the save_advising_session arguments
+        
+    Returns:
+        Number of sessions saved
+        
+    Raises:
+        sqlite3.Error (or psycopg.Error): If the transaction fails
+    """
+    rows = [
+        tuple(session.get(field, "") for field in SESSION_FIELDS)
+        for session in sessions
+    ]
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        with get_db_connection() as conn:
+            conn.cursor().executemany(INSERT_SESSION_SQL, rows)
+        outcome = "ok"
+    finally:
+        metrics.DB_OPERATION_SECONDS.observe(
+            time.perf_counter() - start, operation="save_advising_sessions", outcome=outcome
+        )
+    logger.info(f"Saved {len(rows)} advising sessions in one transaction")
+    return len(rows)
+
+
 @safe_database_operation
 def get_professor_history(professor_id: int, limit: int = 50) -> List[Dict]:
     """
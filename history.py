@@ -4,6 +4,9 @@ History Manager for AdviseMe
 This module coordinates between UI, database, and session state for history features
 including student name extraction, history formatting, and session reloading.
 
+The latest results of each professor are also shared through the session store
+(see session_store), so a session restored on another replica shows them again.
+
 Validates: Requirements 3, 4, 5
 """
 
@@ -13,11 +16,21 @@ from typing import Optional, List
 from datetime import datetime
 import re
 from database import safe_database_operation
+import session_store
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Session state keys holding the current results
+RESULT_KEYS = (
+    'email_content',
+    'recommended_schedule',
+    'alternative1_schedule',
+    'alternative2_schedule',
+    'semester_info',
+)
+
 
 def extract_student_name(progress_filename: str) -> str:
     """
@@ -172,6 +185,7 @@ def reload_session(session_id: int, professor_id: int) -> bool:
             dt = timestamp
         st.session_state['loaded_session_timestamp'] = dt.strftime('%m/%d/%Y %I:%M %p')
     
+    share_results(professor_id)
     logger.info(f"Successfully loaded session {session_id} for professor {professor_id}")
     return True
 
@@ -203,6 +217,8 @@ def save_current_session(professor_id: int, student_name: str, semester: str, ye
         logger.warning("Cannot save session - missing required content")
         return False
     
+    share_results(professor_id)
+    
     # Save to database
     success = save_advising_session(
         professor_id=professor_id,
@@ -221,3 +237,34 @@ def save_current_session(professor_id: int, student_name: str, semester: str, ye
         logger.warning("Failed to save session to database")
     
     return success
+
+
+def share_results(professor_id: int) -> bool:
+    """
+    Share the current results in session_state with the professor's other sessions.
+    
+    Args:
+        professor_id: ID of the professor
+        
+    Returns:
+        True if the results were stored
+    """
+    return session_store.share_keys(f"results:{professor_id}", st.session_state, RESULT_KEYS)
+
+
+def restore_results(professor_id: int) -> bool:
+    """
+    Load the professor's shared results into session_state if it has none.
+    
+    Args:
+        professor_id: ID of the professor
+        
+    Returns:
+        True if results were restored
+    """
+    if st.session_state.get('email_content'):
+        return False
+    restored = session_store.restore_keys(f"results:{professor_id}", st.session_state, RESULT_KEYS)
+    if restored:
+        logger.info(f"Restored shared results for professor {professor_id}")
+    return restored
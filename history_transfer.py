@@ -0,0 +1,378 @@
+"""
+Script to export, import and snapshot the advising history.
+
+Moves professors and advising sessions between databases (SQLite files or
+PostgreSQL, see database.py): to back up history, copy it between
+deployments or seed a staging environment.
+
+Usage:
+    python history_transfer.py export DIR [--format ndjson|parquet] [--chunk-size N] [--db PATH]
+    python history_transfer.py import DIR [--append] [--chunk-size N] [--db PATH]
+    python history_transfer.py snapshot FILE [--db PATH]
+
+export writes one file per table to DIR (gzip-compressed NDJSON, or Parquet
+with pyarrow) plus a manifest.json, reading both tables in one transaction
+so they are consistent. Rows are streamed in chunks, so memory stays
+constant however large the history is.
+
+import restores an export in one transaction, inserting each chunk with
+executemany. Professors already present (same username) are kept and their
+sessions are attached to them; session ids are reassigned. Importing into a
+database that already has sessions requires --append.
+
+snapshot copies a live SQLite database with the online backup API, a few
+pages at a time, so the app can keep writing while it runs.
+
+Exported files contain password hashes and are created readable by the
+owner only.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Dict, Iterator, List, Any, Optional
+
+import database
+import postgres_backend
+
+NDJSON = "ndjson"
+PARQUET = "parquet"
+FORMATS = (NDJSON, PARQUET)
+EXTENSIONS = {NDJSON: ".ndjson.gz", PARQUET: ".parquet"}
+
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Bound parameters per query (older SQLite builds allow 999)
+MAX_QUERY_PARAMETERS = 500
+
+# Pages copied per backup step (the database is unlocked between steps)
+SNAPSHOT_PAGES = 256
+
+# Exported columns, in table order
+TABLES = {
+    'professors': ('professor_id', 'username', 'password_hash', 'created_at'),
+    'advising_sessions': (
+        'session_id', 'professor_id', 'student_name', 'semester', 'year', 'timestamp',
+        'email_content', 'recommended_schedule', 'alternative1_schedule', 'alternative2_schedule',
+    ),
+}
+INTEGER_COLUMNS = ('professor_id', 'session_id', 'year')
+
+INSERT_PROFESSOR_SQL = """
+    INSERT INTO professors (username, password_hash, created_at)
+    VALUES (?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+    ON CONFLICT (username) DO NOTHING
+"""
+INSERT_SESSION_SQL = """
+    INSERT INTO advising_sessions
+    (professor_id, student_name, semester, year, timestamp, email_content,
+     recommended_schedule, alternative1_schedule, alternative2_schedule)
+    VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?)
+"""
+
+
+def _plain(value: Any) -> Any:
+    """Convert a database value to a JSON/Parquet friendly one."""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return value
+
+
+def _iter_chunks(conn: Any, table: str, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Stream a table in primary key order.
+
+    Args:
+        conn: Connection from database.get_db_connection
+        table: Table name (a TABLES key)
+        chunk_size: Rows per chunk
+
+    Yields:
+        Lists of row dictionaries
+    """
+    columns = TABLES[table]
+    query = f"SELECT {', '.join(columns)} FROM {table} ORDER BY {columns[0]}"
+    if isinstance(conn, sqlite3.Connection):
+        cursor = conn.execute(query)
+    else:
+        # Server-side cursor, so PostgreSQL does not send every row at once
+        cursor = conn.cursor(name=f"export_{table}")
+        cursor.execute(query)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield [{column: _plain(row[column]) for column in columns} for row in rows]
+
+
+def _begin_snapshot(conn: Any) -> None:
+    """Read every table from one consistent snapshot."""
+    if isinstance(conn, sqlite3.Connection):
+        conn.execute("BEGIN")
+    else:
+        conn.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+
+
+def _arrow_schema(table: str) -> Any:
+    """Parquet schema of a table."""
+    import pyarrow as pa
+    return pa.schema([
+        (column, pa.int64() if column in INTEGER_COLUMNS else pa.string())
+        for column in TABLES[table]
+    ])
+
+
+def _write_ndjson(path: str, table: str, chunks: Iterator[List[Dict[str, Any]]]) -> int:
+    """Write chunks as gzip-compressed NDJSON; returns the row count."""
+    count = 0
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in chunk)
+            count += len(chunk)
+    return count
+
+
+def _write_parquet(path: str, table: str, chunks: Iterator[List[Dict[str, Any]]]) -> int:
+    """Write chunks as Parquet row groups; returns the row count."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(table)
+    count = 0
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            count += len(chunk)
+    return count
+
+
+def _read_ndjson(path: str, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Read gzip-compressed NDJSON in chunks."""
+    chunk = []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            chunk.append(json.loads(line))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def _read_parquet(path: str, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Read Parquet in chunks."""
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pylist()
+
+
+WRITERS = {NDJSON: _write_ndjson, PARQUET: _write_parquet}
+READERS = {NDJSON: _read_ndjson, PARQUET: _read_parquet}
+
+
+def export_history(out_dir: str, fmt: str = NDJSON, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Export professors and advising sessions.
+
+    Args:
+        out_dir: Directory for the table files and manifest (created if needed)
+        fmt: "ndjson" or "parquet"
+        chunk_size: Rows held in memory at a time
+
+    Returns:
+        Rows exported per table
+
+    Raises:
+        ValueError: If fmt is unknown
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    os.makedirs(out_dir, exist_ok=True)
+    counts = {}
+    with database.get_db_connection() as conn:
+        _begin_snapshot(conn)
+        for table in TABLES:
+            path = os.path.join(out_dir, table + EXTENSIONS[fmt])
+            # Create the file owner-only before any password hash is written
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600))
+            os.chmod(path, 0o600)
+            counts[table] = WRITERS[fmt](path, table, _iter_chunks(conn, table, chunk_size))
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'format': fmt,
+        'exported_at': datetime.now().isoformat(timespec='seconds'),
+        'tables': {table: {'file': table + EXTENSIONS[fmt], 'rows': rows} for table, rows in counts.items()},
+    }
+    with open(os.path.join(out_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return counts
+
+
+def _read_manifest(in_dir: str) -> Dict[str, Any]:
+    """Load and check an export manifest."""
+    with open(os.path.join(in_dir, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('format') not in FORMATS:
+        raise ValueError(f"Unsupported export: version {manifest.get('version')}, format {manifest.get('format')}")
+    return manifest
+
+
+def _lookup_professor_ids(conn: Any, usernames: List[str]) -> Dict[str, int]:
+    """Get the professor ids of usernames in the target database."""
+    ids = {}
+    for start in range(0, len(usernames), MAX_QUERY_PARAMETERS):
+        batch = usernames[start:start + MAX_QUERY_PARAMETERS]
+        placeholders = ", ".join("?" for _ in batch)
+        rows = conn.execute(
+            f"SELECT professor_id, username FROM professors WHERE username IN ({placeholders})", tuple(batch)
+        ).fetchall()
+        ids.update((row['username'], row['professor_id']) for row in rows)
+    return ids
+
+
+def import_history(in_dir: str, chunk_size: int = DEFAULT_CHUNK_SIZE, append: bool = False) -> Dict[str, int]:
+    """
+    Import an export into the configured database in one transaction.
+
+    Args:
+        in_dir: Directory written by export_history
+        chunk_size: Rows inserted per executemany call
+        append: Allow importing into a database that already has sessions
+
+    Returns:
+        Counts: professors (created), professors_existing (kept), sessions
+        (imported) and sessions_skipped (professor not in the export)
+
+    Raises:
+        ValueError: If the export is unsupported, or the database already
+            has sessions and append is False
+    """
+    manifest = _read_manifest(in_dir)
+    read = READERS[manifest['format']]
+    files = {table: os.path.join(in_dir, entry['file']) for table, entry in manifest['tables'].items()}
+    counts = {'professors': 0, 'professors_existing': 0, 'sessions': 0, 'sessions_skipped': 0}
+
+    database.initialize_database()
+    with database.get_db_connection() as conn:
+        if not append and conn.execute("SELECT COUNT(*) AS n FROM advising_sessions").fetchone()['n']:
+            raise ValueError("The database already has advising sessions; use --append to add to them")
+
+        # Exported professor id -> id in this database
+        professor_ids: Dict[int, int] = {}
+        for chunk in read(files['professors'], chunk_size):
+            cursor = conn.cursor()
+            cursor.executemany(INSERT_PROFESSOR_SQL, [
+                (row['username'], row['password_hash'], row.get('created_at')) for row in chunk
+            ])
+            created = max(cursor.rowcount, 0)
+            counts['professors'] += created
+            counts['professors_existing'] += len(chunk) - created
+            target_ids = _lookup_professor_ids(conn, [row['username'] for row in chunk])
+            for row in chunk:
+                professor_ids[row['professor_id']] = target_ids[row['username']]
+
+        for chunk in read(files['advising_sessions'], chunk_size):
+            rows = [
+                (
+                    professor_ids[row['professor_id']], row['student_name'], row['semester'], row['year'],
+                    row.get('timestamp'), row['email_content'], row['recommended_schedule'],
+                    row.get('alternative1_schedule'), row.get('alternative2_schedule'),
+                )
+                for row in chunk
+                if row['professor_id'] in professor_ids
+            ]
+            counts['sessions_skipped'] += len(chunk) - len(rows)
+            if rows:
+                conn.cursor().executemany(INSERT_SESSION_SQL, rows)
+                counts['sessions'] += len(rows)
+    return counts
+
+
+def snapshot_database(out_path: str, pages: int = SNAPSHOT_PAGES) -> None:
+    """
+    Copy the live SQLite database with the online backup API.
+
+    Args:
+        out_path: Snapshot file to create
+        pages: Pages copied per step
+
+    Raises:
+        ValueError: If the PostgreSQL backend is configured
+        FileExistsError: If out_path exists
+        sqlite3.OperationalError: If the database file does not exist
+    """
+    if postgres_backend.get_database_url():
+        raise ValueError("Snapshots copy the SQLite database; use pg_dump for PostgreSQL")
+    if os.path.exists(out_path):
+        raise FileExistsError(f"{out_path} already exists")
+    # Read-only, so a missing database is an error instead of an empty snapshot
+    source_uri = pathlib.Path(os.path.abspath(database.DB_PATH)).as_uri()
+    source = sqlite3.connect(f"{source_uri}?mode=ro", uri=True)
+    target = sqlite3.connect(out_path)
+    try:
+        source.backup(target, pages=pages)
+    finally:
+        target.close()
+        source.close()
+    os.chmod(out_path, 0o600)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command line arguments."""
+    parser = argparse.ArgumentParser(description="Export, import and snapshot the AdviseMe advising history.")
+    parser.add_argument("--db", help="SQLite database file (default: database.DB_PATH; ignored with DATABASE_URL)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export professors and sessions to DIR")
+    export_parser.add_argument("directory")
+    export_parser.add_argument("--format", choices=FORMATS, default=NDJSON)
+    export_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    import_parser = commands.add_parser("import", help="Import an export from DIR")
+    import_parser.add_argument("directory")
+    import_parser.add_argument("--append", action="store_true", help="Add to a database that already has sessions")
+    import_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    snapshot_parser = commands.add_parser("snapshot", help="Copy the live SQLite database to FILE")
+    snapshot_parser.add_argument("file")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.db:
+        database.DB_PATH = args.db
+
+    try:
+        if args.command == "export":
+            counts = export_history(args.directory, args.format, max(1, args.chunk_size))
+            print(f"✓ Exported {counts['professors']} professors and "
+                  f"{counts['advising_sessions']} sessions to {args.directory}")
+        elif args.command == "import":
+            counts = import_history(args.directory, max(1, args.chunk_size), args.append)
+            print(f"✓ Imported {counts['sessions']} sessions; created {counts['professors']} professors "
+                  f"({counts['professors_existing']} already existed)")
+            if counts['sessions_skipped']:
+                print(f"  Skipped {counts['sessions_skipped']} sessions of professors missing from the export")
+        else:
+            snapshot_database(args.file)
+            print(f"✓ Snapshot written to {args.file}")
+    except (ValueError, OSError, sqlite3.Error) as e:
+        print(f"✗ Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""
+PDF Ingestion for AdviseMe
+
+This module validates uploaded PDFs as soon as they are uploaded, before any
+parsing, encoding or model call, and optionally normalizes them so the PDF
+that may be attached to the model request is as small as possible.
+
+Validation (cheap checks first):
+- size cap (ADVISEME_MAX_UPLOAD_MB, default 10)
+- "%PDF-" magic bytes near the start of the file
+- readable, unencrypted document with 1..ADVISEME_MAX_PDF_PAGES pages
+  (default 200)
+
+Normalization (ADVISEME_PDF_NORMALIZE, "off" by default):
+- drops progress report pages with text but no course codes (cover pages,
+  legends), unless that would drop every page; pages without text
+  (scanned) and every schedule page are kept
+- removes images from pages that have extractable text; scanned pages
+  (images only) are kept intact
+- compresses content streams and merges identical objects
+The normalized PDF is only used when it is smaller than the upload.
+
+Results are cached by file hash, so Streamlit reruns do not revalidate the
+same upload.
+"""
+
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional
+
+import pdf_extract
+import profiling
+
+try:
+    from pypdf import ObjectDeletionFlag, PdfReader, PdfWriter
+    from pypdf.errors import PyPdfError
+except ImportError:  # pragma: no cover - pypdf is in requirements.txt
+    PdfReader = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Upload kinds
+PROGRESS = "progress"
+SCHEDULE = "schedule"
+
+DEFAULT_MAX_UPLOAD_MB = 10
+DEFAULT_MAX_PAGES = 200
+
+# The PDF header may be preceded by a few bytes of garbage
+PDF_MAGIC = b"%PDF-"
+MAGIC_SEARCH_BYTES = 1024
+
+CACHE_MAX_ENTRIES = 32
+
+_cache_lock = threading.Lock()
+_ingest_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+
+class UploadValidationError(ValueError):
+    """Raised when an uploaded file is not an acceptable PDF."""
+
+
+class IngestedPdf(NamedTuple):
+    """A validated (and possibly normalized) upload."""
+    data: Any
+    pages: int
+    original_size: int
+    size: int
+    normalized: bool
+
+
+def get_max_upload_bytes() -> int:
+    """Get the upload size cap in bytes (ADVISEME_MAX_UPLOAD_MB)."""
+    try:
+        megabytes = float(os.getenv("ADVISEME_MAX_UPLOAD_MB", DEFAULT_MAX_UPLOAD_MB))
+    except ValueError:
+        logger.warning("Invalid ADVISEME_MAX_UPLOAD_MB, using default")
+        megabytes = DEFAULT_MAX_UPLOAD_MB
+    return int(megabytes * 1024 * 1024)
+
+
+def get_max_pages() -> int:
+    """Get the page count cap (ADVISEME_MAX_PDF_PAGES)."""
+    try:
+        return int(os.getenv("ADVISEME_MAX_PDF_PAGES", DEFAULT_MAX_PAGES))
+    except ValueError:
+        logger.warning("Invalid ADVISEME_MAX_PDF_PAGES, using default")
+        return DEFAULT_MAX_PAGES
+
+
+def normalization_enabled() -> bool:
+    """Check whether uploads are normalized (ADVISEME_PDF_NORMALIZE)."""
+    return os.getenv("ADVISEME_PDF_NORMALIZE", "off").strip().lower() not in ("off", "false", "0")
+
+
+def check_size(data) -> None:
+    """
+    Reject uploads above the size cap.
+
+    Args:
+        data: Upload bytes (bytes or memoryview)
+
+    Raises:
+        UploadValidationError: If the file is empty or too large
+    """
+    size = len(data)
+    if size == 0:
+        raise UploadValidationError("The file is empty.")
+    limit = get_max_upload_bytes()
+    if size > limit:
+        raise UploadValidationError(
+            f"The file is {size / (1024 * 1024):.1f} MB; the limit is {limit / (1024 * 1024):.0f} MB. "
+            f"Export the report from Workday again without scanned attachments."
+        )
+
+
+def check_magic(data) -> None:
+    """
+    Reject files that do not start with a PDF header.
+
+    Args:
+        data: Upload bytes (bytes or memoryview)
+
+    Raises:
+        UploadValidationError: If no PDF header is found
+    """
+    if bytes(data[:MAGIC_SEARCH_BYTES]).find(PDF_MAGIC) < 0:
+        raise UploadValidationError("The file is not a PDF.")
+
+
+def open_pdf(data) -> "PdfReader":
+    """
+    Open an upload and check its page count.
+
+    Args:
+        data: Upload bytes (bytes or memoryview)
+
+    Returns:
+        PdfReader over the upload
+
+    Raises:
+        UploadValidationError: If the PDF is unreadable, encrypted, empty or
+            has too many pages
+    """
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        if reader.is_encrypted:
+            raise UploadValidationError("The PDF is password protected.")
+        pages = len(reader.pages)
+    except UploadValidationError:
+        raise
+    except (PyPdfError, ValueError, KeyError, TypeError, OSError) as e:
+        logger.info(f"Rejected unreadable PDF: {e}")
+        raise UploadValidationError("The PDF could not be read. It may be damaged or incomplete.")
+
+    if pages == 0:
+        raise UploadValidationError("The PDF has no pages.")
+    limit = get_max_pages()
+    if pages > limit:
+        raise UploadValidationError(f"The PDF has {pages} pages; the limit is {limit}.")
+    return reader
+
+
+def page_is_relevant(text: str, kind: str) -> bool:
+    """
+    Check whether a page may hold what the advising request needs.
+
+    Only progress report pages with text but no course code at all are
+    irrelevant. Pages in a layout the parser does not read still list course
+    codes, and pages without text may be scans, so both are kept; schedule
+    pages are always kept.
+    """
+    if kind != PROGRESS or not text.strip():
+        return True
+    return bool(pdf_extract.COURSE_PATTERN.search(text))
+
+
+def normalize_pdf(reader: "PdfReader", kind: str) -> Optional[bytes]:
+    """
+    Rewrite a PDF keeping only what the advising request needs.
+
+    Args:
+        reader: Opened upload
+        kind: PROGRESS or SCHEDULE
+
+    Returns:
+        Normalized PDF bytes, or None if normalization failed
+    """
+    try:
+        texts = [page.extract_text() or "" for page in reader.pages]
+        keep = [i for i, text in enumerate(texts) if page_is_relevant(text, kind)]
+        if not keep:
+            keep = list(range(len(texts)))
+
+        writer = PdfWriter()
+        for i in keep:
+            page = writer.add_page(reader.pages[i])
+            if texts[i].strip():
+                writer.remove_objects_from_page(page, ObjectDeletionFlag.IMAGES)
+            page.compress_content_streams()
+        writer.compress_identical_objects()
+
+        output = io.BytesIO()
+        writer.write(output)
+        return output.getvalue()
+    except Exception as e:
+        logger.warning(f"PDF normalization failed, using the upload as is: {e}")
+        return None
+
+
+@profiling.profiled()
+def ingest_pdf(data, kind: str) -> IngestedPdf:
+    """
+    Validate and optionally normalize an uploaded PDF.
+
+    Args:
+        data: Upload bytes (bytes or memoryview, not copied when the upload
+            is used as is)
+        kind: PROGRESS or SCHEDULE
+
+    Returns:
+        IngestedPdf with the data to use from now on
+
+    Raises:
+        UploadValidationError: If the upload is not an acceptable PDF
+    """
+    check_size(data)
+    check_magic(data)
+
+    key = (pdf_extract.file_hash(data), kind, normalization_enabled())
+    with _cache_lock:
+        cached = _ingest_cache.get(key)
+        if cached is not None:
+            _ingest_cache.move_to_end(key)
+
+    if cached is None:
+        if PdfReader is None:
+            cached = (None, 0, None)
+        else:
+            try:
+                reader = open_pdf(data)
+            except UploadValidationError as e:
+                cached = (str(e), 0, None)
+            else:
+                normalized = normalize_pdf(reader, kind) if normalization_enabled() else None
+                if normalized is not None and len(normalized) >= len(data):
+                    normalized = None
+                cached = (None, len(reader.pages), normalized)
+                if normalized is not None:
+                    logger.info(f"Normalized {kind} PDF from {len(data)} to {len(normalized)} bytes")
+        with _cache_lock:
+            _ingest_cache[key] = cached
+            while len(_ingest_cache) > CACHE_MAX_ENTRIES:
+                _ingest_cache.popitem(last=False)
+
+    error, pages, normalized = cached
+    if error:
+        raise UploadValidationError(error)
+
+    result = normalized if normalized is not None else data
+    return IngestedPdf(
+        data=result,
+        pages=pages,
+        original_size=len(data),
+        size=len(result),
+        normalized=normalized is not None,
+    )
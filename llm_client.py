@@ -0,0 +1,380 @@
+"""
+LLM Client for AdviseMe
+
+This module builds and sends chat completion requests to the POE API.
+
+Requests are structured for provider-side prompt caching: the parts that are
+identical for every student in a semester (the advising instructions and the
+shared course schedule PDF) come first, and the per-student academic progress
+PDF comes last. For models whose provider honours explicit cache breakpoints
+(Anthropic-style ``cache_control``), the end of the invariant prefix is marked
+cacheable; other providers cache stable prefixes automatically. Cached prompt
+tokens reported in the response usage are tracked per request and per process.
+
+PDF attachments are passed as raw buffers (bytes or memoryview) and are never
+base64-encoded as a whole: the JSON request body is streamed to the socket,
+with each attachment's data URL encoded chunk by chunk from a memoryview. Peak
+memory per request is therefore one chunk, independent of the PDF size.
+"""
+
+import base64
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from datetime import timedelta
+from typing import Dict, Iterator, List, Any, Optional, Tuple, Union
+
+import requests
+
+import metrics
+import profiling
+import tracing
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# POE API configuration
+POE_BASE_URL = "https://api.poe.com/v1"
+DEFAULT_MODEL = "Claude-Sonnet-4"
+
+# Data URL prefix of PDF attachments
+PDF_DATA_URL_PREFIX = "data:application/pdf;base64,"
+
+# Raw bytes base64-encoded per chunk of the streamed body (multiple of 3, so
+# chunks encode without padding)
+BASE64_CHUNK_BYTES = 3 * 16 * 1024
+
+# Explicit cache breakpoint understood by Anthropic-compatible providers
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Model name prefixes whose provider supports explicit cache breakpoints
+CACHE_CONTROL_MODEL_PREFIXES = ("claude",)
+
+# Process-wide prompt cache statistics
+_stats_lock = threading.Lock()
+_cache_stats = {
+    'requests': 0,
+    'prompt_tokens': 0,
+    'cached_tokens': 0,
+    'cache_hits': 0,
+}
+
+
+def prompt_cache_enabled(model: str) -> bool:
+    """
+    Check whether the invariant prefix should carry a cache breakpoint.
+
+    Controlled by POE_PROMPT_CACHE: "auto" (default, by model), "on" or "off".
+
+    Args:
+        model: Model name the request is sent to
+
+    Returns:
+        True if the cache_control marker should be added
+    """
+    mode = os.getenv("POE_PROMPT_CACHE", "auto").strip().lower()
+    if mode == "off":
+        return False
+    if mode == "on":
+        return True
+    return model.lower().startswith(CACHE_CONTROL_MODEL_PREFIXES)
+
+
+class Attachment:
+    """A PDF buffer whose base64 data URL is streamed into the request body."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = memoryview(data).cast("B")
+
+    def __len__(self) -> int:
+        """Length of the encoded data URL in bytes."""
+        return len(PDF_DATA_URL_PREFIX) + 4 * math.ceil(len(self.data) / 3)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Attachment) and self.data == other.data
+
+    def __repr__(self) -> str:
+        return f"Attachment({len(self.data)} bytes)"
+
+    def iter_encoded(self) -> Iterator[bytes]:
+        """Yield the data URL in chunks, encoding slices of the buffer."""
+        yield PDF_DATA_URL_PREFIX.encode("ascii")
+        for offset in range(0, len(self.data), BASE64_CHUNK_BYTES):
+            yield base64.b64encode(self.data[offset:offset + BASE64_CHUNK_BYTES])
+
+
+class StreamingBody:
+    """A re-iterable JSON request body with a known Content-Length."""
+
+    def __init__(self, pieces: List[Union[bytes, Attachment]]):
+        self.pieces = pieces
+
+    def __len__(self) -> int:
+        return sum(len(piece) for piece in self.pieces)
+
+    def __iter__(self) -> Iterator[bytes]:
+        for piece in self.pieces:
+            if isinstance(piece, Attachment):
+                yield from piece.iter_encoded()
+            else:
+                yield piece
+
+
+def file_part(filename: str, file_data) -> Dict[str, Any]:
+    """
+    Build a PDF file content part.
+
+    Args:
+        filename: Name of the uploaded file
+        file_data: PDF bytes (bytes or memoryview, streamed when sent), or an
+            already base64-encoded string
+
+    Returns:
+        Message content part
+    """
+    if isinstance(file_data, str):
+        data_url = f"{PDF_DATA_URL_PREFIX}{file_data}"
+    else:
+        data_url = Attachment(file_data)
+    return {
+        "type": "file",
+        "file": {
+            "filename": filename,
+            "file_data": data_url
+        }
+    }
+
+
+def encode_json_body(payload: Dict[str, Any]) -> StreamingBody:
+    """
+    Serialize a request payload without materializing its attachments.
+
+    Each Attachment is swapped for a unique placeholder, the (small) rest of
+    the payload is serialized once, and the body is split around the
+    placeholders; base64 characters need no JSON escaping.
+
+    Args:
+        payload: Request payload, possibly containing Attachment values
+
+    Returns:
+        StreamingBody yielding the UTF-8 JSON document
+    """
+    token = uuid.uuid4().hex
+    attachments: List[Attachment] = []
+
+    def replace(value):
+        if isinstance(value, Attachment):
+            attachments.append(value)
+            return f"attachment-{token}-{len(attachments) - 1}"
+        if isinstance(value, dict):
+            return {key: replace(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [replace(item) for item in value]
+        return value
+
+    text = json.dumps(replace(payload), allow_nan=False)
+
+    pieces: List[Union[bytes, Attachment]] = []
+    for number, attachment in enumerate(attachments):
+        before, text = text.split(f"attachment-{token}-{number}", 1)
+        pieces.append(before.encode("utf-8"))
+        pieces.append(attachment)
+    pieces.append(text.encode("utf-8"))
+    return StreamingBody(pieces)
+
+
+@profiling.profiled()
+def build_messages(
+    instructions: str,
+    schedule_filename: str,
+    schedule_data,
+    progress_filename: str,
+    progress_data,
+    model: str = DEFAULT_MODEL,
+    progress_text: Optional[str] = None,
+    schedule_text: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Build the chat messages with the invariant prefix first.
+
+    Order: instructions, course schedule PDF (shared by every student in the
+    semester, end of the cacheable prefix), then the student's progress -
+    either the locally extracted requirements as text or the PDF itself.
+
+    When the schedule has been pre-filtered for the student (schedule_text),
+    the schedule PDF is not sent; the cacheable prefix is then just the
+    instructions, and the candidate sections follow the student's progress.
+
+    Args:
+        instructions: Rendered advising prompt
+        schedule_filename: Course schedule file name
+        schedule_data: Course schedule PDF buffer (unused when
+            schedule_text is given)
+        progress_filename: Academic progress file name
+        progress_data: Academic progress PDF buffer (unused when
+            progress_text is given)
+        model: Model the request is sent to
+        progress_text: Extracted progress to send instead of the PDF
+        schedule_text: Pre-filtered candidate sections to send instead of
+            the schedule PDF
+
+    Returns:
+        List of chat messages
+    """
+    prefix = [{"type": "text", "text": instructions}]
+    if schedule_text is None:
+        prefix.append(file_part(schedule_filename, schedule_data))
+    if prompt_cache_enabled(model):
+        prefix[-1]["cache_control"] = dict(CACHE_CONTROL)
+
+    if progress_text is not None:
+        student_parts = [{"type": "text", "text": progress_text}]
+    else:
+        student_parts = [file_part(progress_filename, progress_data)]
+    if schedule_text is not None:
+        student_parts.append({"type": "text", "text": schedule_text})
+
+    return [
+        {
+            "role": "user",
+            "content": prefix + student_parts
+        }
+    ]
+
+
+def extract_usage(result: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Extract token usage, including cache hits, from a completion response.
+
+    Understands both OpenAI-style (prompt_tokens_details.cached_tokens) and
+    Anthropic-style (cache_read_input_tokens) usage fields.
+
+    Args:
+        result: Parsed JSON response
+
+    Returns:
+        Dictionary with prompt_tokens, completion_tokens, cached_tokens and
+        cache_write_tokens (0 when not reported)
+    """
+    usage = result.get('usage') or {}
+    details = usage.get('prompt_tokens_details') or {}
+
+    cached_tokens = details.get('cached_tokens') or usage.get('cache_read_input_tokens') or 0
+    cache_write_tokens = usage.get('cache_creation_input_tokens') or 0
+
+    return {
+        'prompt_tokens': int(usage.get('prompt_tokens') or 0),
+        'completion_tokens': int(usage.get('completion_tokens') or 0),
+        'cached_tokens': int(cached_tokens),
+        'cache_write_tokens': int(cache_write_tokens),
+    }
+
+
+def _record_usage(usage: Dict[str, int]) -> None:
+    """Add a request's usage to the process-wide cache statistics."""
+    with _stats_lock:
+        _cache_stats['requests'] += 1
+        _cache_stats['prompt_tokens'] += usage['prompt_tokens']
+        _cache_stats['cached_tokens'] += usage['cached_tokens']
+        if usage['cached_tokens'] > 0:
+            _cache_stats['cache_hits'] += 1
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """
+    Get process-wide prompt cache statistics.
+
+    Returns:
+        Dictionary with request/token totals and the cached-token ratio
+    """
+    with _stats_lock:
+        stats = dict(_cache_stats)
+    stats['cached_ratio'] = (
+        stats['cached_tokens'] / stats['prompt_tokens'] if stats['prompt_tokens'] else 0.0
+    )
+    return stats
+
+
+def create_chat_completion(
+    messages: List[Dict[str, Any]],
+    model: str = DEFAULT_MODEL,
+    api_key: Optional[str] = None
+) -> Tuple[requests.Response, Dict[str, Any]]:
+    """
+    Send a chat completion request to the POE API.
+
+    The JSON body is streamed (see encode_json_body) with an exact
+    Content-Length, so attachments are encoded chunk by chunk on send.
+
+    Args:
+        messages: Chat messages (see build_messages)
+        model: Model name
+        api_key: POE API key (defaults to POE_API_KEY from the environment)
+
+    Returns:
+        Tuple of (response, request info). Request info holds the model,
+        latency_ms, request_bytes and, for successful responses, the token
+        usage including cached_tokens.
+    """
+    headers = {
+        "Authorization": f"Bearer {api_key or os.getenv('POE_API_KEY')}",
+        "Content-Type": "application/json"
+    }
+
+    payload = {
+        "model": model,
+        "messages": messages
+    }
+    body = encode_json_body(payload)
+
+    with tracing.span("poe_chat_completion", model=model, request_bytes=len(body)) as request_span:
+        start = time.perf_counter()
+        try:
+            response = requests.post(
+                f"{POE_BASE_URL}/chat/completions",
+                headers=headers,
+                data=body
+            )
+        except requests.exceptions.RequestException:
+            metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, model=model, status="error")
+            raise
+        elapsed_seconds = time.perf_counter() - start
+        metrics.LLM_REQUEST_SECONDS.observe(elapsed_seconds, model=model, status=response.status_code)
+        info: Dict[str, Any] = {
+            'model': model,
+            'latency_ms': elapsed_seconds * 1000,
+            'status_code': response.status_code,
+            'request_bytes': len(body),
+        }
+        # Time until the response headers arrived (upload, queueing and
+        # generation); the rest of latency_ms is the response download
+        elapsed = getattr(response, 'elapsed', None)
+        if isinstance(elapsed, timedelta):
+            info['time_to_headers_ms'] = elapsed.total_seconds() * 1000
+
+        if response.status_code == 200:
+            try:
+                usage = extract_usage(response.json())
+            except ValueError:
+                usage = extract_usage({})
+            info.update(usage)
+            info['cache_hit'] = usage['cached_tokens'] > 0
+            _record_usage(usage)
+            for kind in ('prompt_tokens', 'cached_tokens', 'completion_tokens'):
+                metrics.LLM_TOKENS.inc(usage.get(kind, 0), model=model, kind=kind.rsplit('_', 1)[0])
+
+        request_span.set_attributes({key: value for key, value in info.items() if key != 'model'})
+
+    logger.info(
+        f"POE request: model={model} status={response.status_code} "
+        f"latency_ms={info['latency_ms']:.0f} prompt_tokens={info.get('prompt_tokens', 0)} "
+        f"cached_tokens={info.get('cached_tokens', 0)}"
+    )
+    return response, info
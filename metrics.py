@@ -0,0 +1,571 @@
+"""
+Metrics for AdviseMe
+
+This module keeps an in-process registry of counters, gauges and histograms
+and serves it in the Prometheus text exposition format, so latency
+distributions can be scraped (e.g. by the CloudWatch agent's Prometheus
+support) instead of only logging operations above a threshold.
+
+Histograms use HDR-style log-linear buckets: every power-of-two range is
+split into a fixed number of linear sub-buckets, so the relative error of a
+recorded value is bounded (25% with the default 4 sub-buckets) from the
+fastest database query to the slowest model call.
+
+Metrics are recorded for:
+- POE chat completions (latency, tokens) - llm_client
+- database operations - database.safe_database_operation
+- bcrypt hashing and verification - auth
+- Streamlit reruns, active sessions and session state bytes - adviseme
+
+The endpoint runs on a side port in a daemon thread, started once per
+process by the app:
+- ADVISEME_METRICS: serve /metrics - "on" (default) or "off"
+- ADVISEME_METRICS_PORT: port (default 9464)
+- ADVISEME_METRICS_ADDRESS: bind address (default 127.0.0.1)
+
+The endpoint is unauthenticated, so it only listens on localhost unless an
+address is set; a scraper outside the container needs
+ADVISEME_METRICS_ADDRESS=0.0.0.0 and a security group that only lets the
+scraper reach the port.
+"""
+
+import bisect
+import logging
+import math
+import os
+import pickle
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Any, Optional, Sequence, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 9464
+DEFAULT_ADDRESS = "127.0.0.1"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_SUB_BUCKETS = 4
+
+# Sessions not seen for this long no longer count as active
+ACTIVE_SESSION_WINDOW_SECONDS = 30 * 60
+
+
+def log_linear_buckets(low: float, high: float, sub_buckets: int = DEFAULT_SUB_BUCKETS) -> List[float]:
+    """
+    Build HDR-style bucket upper bounds.
+
+    Every power-of-two range [2^k, 2^(k+1)) between low and high is split
+    into sub_buckets equal parts.
+
+    Args:
+        low: Smallest bound (rounded down to a power of two)
+        high: Largest bound (rounded up to a power of two)
+        sub_buckets: Linear buckets per power of two
+
+    Returns:
+        Sorted list of bucket upper bounds
+    """
+    exponent = math.floor(math.log2(low))
+    top = math.ceil(math.log2(high))
+    bounds = []
+    while exponent < top:
+        base = 2.0 ** exponent
+        for step in range(1, sub_buckets + 1):
+            bounds.append(base + base * step / sub_buckets)
+        exponent += 1
+    return [2.0 ** math.floor(math.log2(low))] + bounds
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value for the text format."""
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    """Escape a label value for the text format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    """Format a label set as {a="x",b="y"} (empty string for no labels)."""
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """Base class of labelled metrics."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        """Get the label values of a sample, in declaration order."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        """Get the sample lines of the metric."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Render the metric with its HELP and TYPE lines."""
+        documentation = self.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+        lines = [f"# HELP {self.name} {documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """A monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        """Increase the count (amount must not be negative)."""
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: Any) -> float:
+        """Get the current count of a label set."""
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Metric):
+    """A value that can go up and down, or be computed when scraped."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: Any) -> None:
+        """Set the value."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        """Increase (or, with a negative amount, decrease) the value."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the (unlabelled) value with function on every scrape."""
+        if self.labelnames:
+            raise ValueError("Computed gauges cannot have labels")
+        self._function = function
+
+    def get(self, **labels: Any) -> float:
+        """Get the current value of a label set."""
+        if self._function is not None:
+            return self._function()
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception as e:
+                logger.warning(f"Could not compute {self.name}: {e}")
+                return []
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(Metric):
+    """A distribution of observed values over log-linear buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Optional[Sequence[float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = sorted(buckets) if buckets else log_linear_buckets(0.001, 128)
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """Record one value."""
+        key = self._key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[position] += 1
+            self._sums[key] += value
+
+    def time(self, **labels: Any) -> "_Timer":
+        """Time a block and record its duration in seconds."""
+        return _Timer(self, labels)
+
+    def count(self, **labels: Any) -> int:
+        """Get the number of values recorded for a label set."""
+        key = self._key(labels)
+        with self._lock:
+            return sum(self._counts.get(key, ()))
+
+    def quantile(self, q: float, **labels: Any) -> Optional[float]:
+        """
+        Estimate a quantile from the buckets.
+
+        Args:
+            q: Quantile between 0 and 1
+            **labels: Label set
+
+        Returns:
+            Upper bound of the bucket holding the quantile, or None if
+            nothing was recorded
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts = list(self._counts.get(key, ()))
+        total = sum(counts)
+        if not total:
+            return None
+        rank = max(1, math.ceil(q * total))
+        seen = 0
+        for position, count in enumerate(counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[position] if position < len(self.buckets) else math.inf
+        return math.inf
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            cumulative += counts[-1]
+            labels = _format_labels(self.labelnames, key, ("le", "+Inf"))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    """Context manager recording elapsed seconds into a histogram."""
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, Any]):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Registry:
+    """A named collection of metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Metric] = {}
+
+    def get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Any:
+        """
+        Get a registered metric, creating it on first use.
+
+        Raises:
+            ValueError: If the name is registered with another type or labels
+        """
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered differently")
+            return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        """Get a registered metric by name."""
+        with self._lock:
+            return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    """Get or create a counter in the default registry."""
+    return REGISTRY.get_or_create(Counter, name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    """Get or create a gauge in the default registry."""
+    return REGISTRY.get_or_create(Gauge, name, documentation, labelnames)
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Optional[Sequence[float]] = None) -> Histogram:
+    """Get or create a histogram in the default registry."""
+    return REGISTRY.get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+# Application metrics
+LLM_REQUEST_SECONDS = histogram(
+    "adviseme_llm_request_seconds", "POE chat completion latency in seconds.",
+    ("model", "status"), buckets=log_linear_buckets(0.05, 512),
+)
+LLM_TOKENS = counter(
+    "adviseme_llm_tokens_total", "Tokens used by POE chat completions.", ("model", "kind"),
+)
+DB_OPERATION_SECONDS = histogram(
+    "adviseme_db_operation_seconds", "Database operation latency in seconds.",
+    ("operation", "outcome"), buckets=log_linear_buckets(0.0001, 16),
+)
+BCRYPT_SECONDS = histogram(
+    "adviseme_bcrypt_seconds", "bcrypt password hashing and verification time in seconds.",
+    ("operation",), buckets=log_linear_buckets(0.01, 8),
+)
+RERUN_SECONDS = histogram(
+    "adviseme_rerun_seconds", "Streamlit script rerun duration in seconds.",
+    ("page",), buckets=log_linear_buckets(0.001, 512),
+)
+ACTIVE_SESSIONS = gauge(
+    "adviseme_active_sessions", "Browser sessions with a rerun in the last 30 minutes.",
+)
+SESSION_STATE_BYTES = gauge(
+    "adviseme_session_state_bytes", "Estimated bytes held in session state by active sessions.",
+)
+SESSION_STATE_MAX_BYTES = gauge(
+    "adviseme_session_state_max_bytes", "Estimated session state bytes of the largest active session.",
+)
+
+_sessions_lock = threading.Lock()
+_sessions: Dict[str, Tuple[float, int]] = {}
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the memory held by a session state value.
+
+    Buffers and strings count their length, containers the sum of their
+    items, and anything else its pickled size.
+
+    Args:
+        value: Session state value
+
+    Returns:
+        Estimated size in bytes
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, memoryview):
+        return value.nbytes
+    if isinstance(value, str):
+        return len(value)
+    if value is None or isinstance(value, (bool, int, float)):
+        return 8
+    if isinstance(value, dict):
+        return sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sum(estimate_size(item) for item in value)
+    getbuffer = getattr(value, 'getbuffer', None)
+    if callable(getbuffer):
+        try:
+            return getbuffer().nbytes
+        except Exception:
+            pass
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def _prune_sessions(now: float) -> None:
+    """Forget sessions outside the active window (caller holds the lock)."""
+    cutoff = now - ACTIVE_SESSION_WINDOW_SECONDS
+    for session_id in [s for s, (seen, _) in _sessions.items() if seen < cutoff]:
+        del _sessions[session_id]
+
+
+def record_session(session_id: Optional[str], session_state: Any = None, nbytes: Optional[int] = None) -> None:
+    """
+    Record that a session reran, with the size of its state.
+
+    Args:
+        session_id: Streamlit session id (ignored when None)
+        session_state: The session's st.session_state, sized unless nbytes
+            is given
+        nbytes: Already measured size of the session state
+    """
+    if not session_id:
+        return
+    if nbytes is None:
+        try:
+            nbytes = sum(estimate_size(session_state[key]) for key in list(session_state.keys()))
+        except Exception as e:
+            logger.debug(f"Could not size session state: {e}")
+            nbytes = 0
+    now = time.monotonic()
+    with _sessions_lock:
+        _sessions[session_id] = (now, nbytes)
+        _prune_sessions(now)
+
+
+def _session_values() -> List[int]:
+    """Get the state sizes of the active sessions."""
+    with _sessions_lock:
+        _prune_sessions(time.monotonic())
+        return [nbytes for _, nbytes in _sessions.values()]
+
+
+ACTIVE_SESSIONS.set_function(lambda: len(_session_values()))
+SESSION_STATE_BYTES.set_function(lambda: sum(_session_values()))
+SESSION_STATE_MAX_BYTES.set_function(lambda: max(_session_values(), default=0))
+
+
+def observe_rerun(started: float, page: str, session_id: Optional[str] = None, session_state: Any = None,
+                  session_bytes: Optional[int] = None) -> None:
+    """
+    Record a finished script rerun.
+
+    Args:
+        started: time.perf_counter() at the start of the rerun
+        page: Page that was rendered (e.g. "login" or "app")
+        session_id: Streamlit session id
+        session_state: The session's st.session_state
+        session_bytes: Already measured size of the session state
+    """
+    RERUN_SECONDS.observe(time.perf_counter() - started, page=page)
+    if session_state is not None or session_bytes is not None:
+        record_session(session_id, session_state, session_bytes)
+
+
+# Endpoint
+
+_server_lock = threading.Lock()
+_server: Optional[ThreadingHTTPServer] = None
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serve the default registry at /metrics."""
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are periodic; do not log each one
+        pass
+
+
+def endpoint_enabled() -> bool:
+    """Check whether the /metrics endpoint is served (ADVISEME_METRICS)."""
+    return os.getenv("ADVISEME_METRICS", "on").strip().lower() not in ("off", "false", "0")
+
+
+def get_port() -> int:
+    """Get the metrics port (ADVISEME_METRICS_PORT)."""
+    try:
+        return int(os.getenv("ADVISEME_METRICS_PORT", DEFAULT_PORT))
+    except ValueError:
+        logger.warning("Invalid ADVISEME_METRICS_PORT, using default")
+        return DEFAULT_PORT
+
+
+def start_metrics_server(port: Optional[int] = None, address: Optional[str] = None) -> Optional[int]:
+    """
+    Serve /metrics from a daemon thread, once per process.
+
+    Args:
+        port: Port to listen on (defaults to ADVISEME_METRICS_PORT; 0 picks a
+            free port)
+        address: Bind address (defaults to ADVISEME_METRICS_ADDRESS)
+
+    Returns:
+        The port being served, or None if the endpoint is disabled or could
+        not be started
+    """
+    global _server
+    if not endpoint_enabled():
+        return None
+    with _server_lock:
+        if _server is not None:
+            return _server.server_address[1]
+        port = get_port() if port is None else port
+        address = address or os.getenv("ADVISEME_METRICS_ADDRESS", DEFAULT_ADDRESS)
+        try:
+            server = ThreadingHTTPServer((address, port), _MetricsHandler)
+        except OSError as e:
+            logger.warning(f"Could not start metrics endpoint on {address}:{port}: {e}")
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+        _server = server
+        logger.info(f"Serving metrics on {address}:{server.server_address[1]}/metrics")
+        return server.server_address[1]
+
+
+def stop_metrics_server() -> None:
+    """Stop the /metrics endpoint if it is running."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
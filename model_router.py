@@ -0,0 +1,278 @@
+"""
+Model Router for AdviseMe
+
+This module decides which model tier handles an advising request.
+
+A cheap triage pass classifies the student first:
+- complete: zero "Not Satisfied" courses, only a congratulatory email is needed
+- needs_schedule: at least one "Not Satisfied" course, schedules must be built
+- unknown: triage failed or was inconclusive
+
+Only students who need schedule building (or could not be classified) are sent
+to the large model; complete students, and students whose schedules were
+already built locally (schedule_solver), go to the fast tier. When the progress
+PDF was parsed locally (pdf_extract) its rows answer triage directly; otherwise
+triage runs through a chain of classifiers, each returning the number of
+"Not Satisfied" courses or None to defer to the next one. The default chain
+asks the fast model to count.
+
+Tiers are configured with environment variables:
+- ADVISEME_MODEL_ROUTING: "on" (default) or "off" (always use the large tier)
+- ADVISEME_MODEL_FAST / ADVISEME_MODEL_LARGE: model names per tier
+- ADVISEME_MODEL_FAST_COST / ADVISEME_MODEL_LARGE_COST: cost per 1K tokens,
+  used for the per-tier cost estimate
+"""
+
+import logging
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Any, Optional
+
+import llm_client
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tier names
+FAST_TIER = "fast"
+LARGE_TIER = "large"
+TRIAGE_TIER = "triage"
+
+# Default model per tier
+DEFAULT_TIER_MODELS = {
+    FAST_TIER: "Claude-Haiku-3.5",
+    LARGE_TIER: llm_client.DEFAULT_MODEL,
+}
+
+# Triage outcomes
+COMPLETE = "complete"
+NEEDS_SCHEDULE = "needs_schedule"
+UNKNOWN = "unknown"
+
+TRIAGE_PROMPT = (
+    "The attached PDF is a Workday academic progress report. Count the "
+    "requirements whose status is exactly \"Not Satisfied\". Ignore Satisfied, "
+    "In Progress, Waived and Transferred. Reply with only the integer count."
+)
+
+# A classifier returns the number of "Not Satisfied" courses, or None if it
+# cannot tell. Signature: (progress_filename, progress_data, api_key)
+Classifier = Callable[[str, Any, Optional[str]], Optional[int]]
+
+# Per-tier request statistics
+_stats_lock = threading.Lock()
+_tier_stats: Dict[str, Dict[str, float]] = {}
+
+
+def routing_enabled() -> bool:
+    """Check whether model routing is enabled (ADVISEME_MODEL_ROUTING)."""
+    return os.getenv("ADVISEME_MODEL_ROUTING", "on").strip().lower() not in ("off", "false", "0")
+
+
+def get_tier_model(tier: str) -> str:
+    """
+    Get the model configured for a tier.
+
+    Args:
+        tier: Tier name (fast, large, or triage which uses the fast model)
+
+    Returns:
+        Model name
+    """
+    if tier == TRIAGE_TIER:
+        tier = FAST_TIER
+    return os.getenv(f"ADVISEME_MODEL_{tier.upper()}", DEFAULT_TIER_MODELS[tier])
+
+
+def get_tier_cost_per_1k(tier: str) -> float:
+    """Get the configured cost per 1K tokens for a tier (0 if unset)."""
+    if tier == TRIAGE_TIER:
+        tier = FAST_TIER
+    try:
+        return float(os.getenv(f"ADVISEME_MODEL_{tier.upper()}_COST", "0") or 0)
+    except ValueError:
+        logger.warning(f"Invalid cost configured for tier {tier}")
+        return 0.0
+
+
+def parse_count(content: str) -> Optional[int]:
+    """
+    Parse the first integer in a model reply.
+
+    Args:
+        content: Model reply text
+
+    Returns:
+        Integer found, or None
+    """
+    match = re.search(r"\d+", content or "")
+    return int(match.group()) if match else None
+
+
+def triage_with_model(progress_filename: str, progress_data, api_key: Optional[str] = None) -> Optional[int]:
+    """
+    Classifier that asks the fast model to count "Not Satisfied" courses.
+
+    Args:
+        progress_filename: Academic progress file name
+        progress_data: Academic progress PDF buffer
+        api_key: POE API key
+
+    Returns:
+        Number of "Not Satisfied" courses, or None if the call failed
+    """
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": TRIAGE_PROMPT},
+                llm_client.file_part(progress_filename, progress_data),
+            ]
+        }
+    ]
+
+    try:
+        response, info = llm_client.create_chat_completion(
+            messages, model=get_tier_model(TRIAGE_TIER), api_key=api_key
+        )
+        record_request(TRIAGE_TIER, info)
+        if response.status_code != 200:
+            logger.warning(f"Triage request failed with status {response.status_code}")
+            return None
+        content = response.json()['choices'][0]['message']['content']
+        return parse_count(content)
+    except Exception as e:
+        logger.warning(f"Triage request failed: {e}")
+        return None
+
+
+# Classifiers tried in order until one returns a count
+CLASSIFIERS: List[Classifier] = [triage_with_model]
+
+
+def classify_student(
+    progress_filename: str,
+    progress_data,
+    api_key: Optional[str] = None,
+    extracted: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Run the triage chain for a student.
+
+    A local extraction result (see pdf_extract.extract_progress) answers
+    triage directly without any model call.
+
+    Args:
+        progress_filename: Academic progress file name
+        progress_data: Academic progress PDF buffer
+        api_key: POE API key
+        extracted: Locally extracted requirement rows, if available
+
+    Returns:
+        Dictionary with 'status' (complete/needs_schedule/unknown),
+        'not_satisfied' (count or None) and 'classifier' (name or None)
+    """
+    if extracted is not None:
+        count = len(extracted['not_satisfied'])
+        return {
+            'status': COMPLETE if count == 0 else NEEDS_SCHEDULE,
+            'not_satisfied': count,
+            'classifier': 'local_extraction',
+        }
+
+    if progress_data is None:
+        return {'status': UNKNOWN, 'not_satisfied': None, 'classifier': None}
+
+    for classifier in CLASSIFIERS:
+        count = classifier(progress_filename, progress_data, api_key)
+        if count is not None:
+            return {
+                'status': COMPLETE if count == 0 else NEEDS_SCHEDULE,
+                'not_satisfied': count,
+                'classifier': getattr(classifier, '__name__', str(classifier)),
+            }
+    return {'status': UNKNOWN, 'not_satisfied': None, 'classifier': None}
+
+
+def route_student(
+    progress_filename: str,
+    progress_data,
+    api_key: Optional[str] = None,
+    extracted: Optional[Dict[str, Any]] = None,
+    email_only: bool = False
+) -> Dict[str, Any]:
+    """
+    Choose the tier and model for a student's advising request.
+
+    Args:
+        progress_filename: Academic progress file name
+        progress_data: Academic progress PDF buffer
+        api_key: POE API key
+        extracted: Locally extracted requirement rows, if available
+        email_only: True when the schedules were built locally and the
+            model only writes the email
+
+    Returns:
+        Dictionary with 'tier', 'model' and the triage result
+    """
+    if not routing_enabled():
+        triage = {'status': UNKNOWN, 'not_satisfied': None, 'classifier': None}
+    else:
+        triage = classify_student(progress_filename, progress_data, api_key, extracted)
+
+    # Writing the email alone does not need the large model
+    email_only = email_only and routing_enabled()
+    tier = FAST_TIER if triage['status'] == COMPLETE or email_only else LARGE_TIER
+    route = {'tier': tier, 'model': get_tier_model(tier), **triage}
+    logger.info(f"Routed {progress_filename} to {tier} tier ({route['model']}): "
+                f"triage={triage['status']} not_satisfied={triage['not_satisfied']}")
+    return route
+
+
+def record_request(tier: str, info: Dict[str, Any]) -> None:
+    """
+    Record a completed request against a tier's statistics.
+
+    Args:
+        tier: Tier the request was sent to
+        info: Request info returned by llm_client.create_chat_completion
+    """
+    tokens = info.get('prompt_tokens', 0) + info.get('completion_tokens', 0)
+    with _stats_lock:
+        stats = _tier_stats.setdefault(tier, {
+            'requests': 0,
+            'errors': 0,
+            'total_latency_ms': 0.0,
+            'max_latency_ms': 0.0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'cached_tokens': 0,
+            'estimated_cost': 0.0,
+        })
+        stats['requests'] += 1
+        if info.get('status_code') != 200:
+            stats['errors'] += 1
+        stats['total_latency_ms'] += info.get('latency_ms', 0.0)
+        stats['max_latency_ms'] = max(stats['max_latency_ms'], info.get('latency_ms', 0.0))
+        stats['prompt_tokens'] += info.get('prompt_tokens', 0)
+        stats['completion_tokens'] += info.get('completion_tokens', 0)
+        stats['cached_tokens'] += info.get('cached_tokens', 0)
+        stats['estimated_cost'] += tokens / 1000 * get_tier_cost_per_1k(tier)
+
+
+def get_tier_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Get per-tier latency, token and cost statistics.
+
+    Returns:
+        Dictionary mapping tier name to its statistics, including the model
+        and average latency
+    """
+    with _stats_lock:
+        snapshot = {tier: dict(stats) for tier, stats in _tier_stats.items()}
+    for tier, stats in snapshot.items():
+        stats['model'] = get_tier_model(tier)
+        stats['avg_latency_ms'] = stats['total_latency_ms'] / stats['requests'] if stats['requests'] else 0.0
+    return snapshot
@@ -0,0 +1,643 @@
+"""
+PDF Extraction for AdviseMe
+
+This module parses Workday PDFs locally so the LLM no longer has to read them
+from base64 blobs on every request.
+
+Academic progress PDFs become requirement rows:
+- course: course code, e.g. "ANSC 3303"
+- title: course title text between the code and the status
+- requirement: requirement group the course is listed under
+- status: Satisfied, Not Satisfied, In Progress, Waived or Transferred
+
+Course schedule PDFs become section rows:
+- course, section, title, credits, instructor
+- meetings: list of {'days': [0-6, Monday=0], 'start': minute, 'end': minute}
+
+Parsing is CPU-bound, so it runs in a small process pool (spawned workers, so
+the Streamlit server threads are never forked) and results are cached by the
+SHA-256 of the PDF bytes. It never runs on the script thread: when the pool is
+unavailable or a parse takes longer than PARSE_TIMEOUT_SECONDS, the PDF is
+sent to the model. Set ADVISEME_LOCAL_EXTRACTION=off to always send the
+PDF to the model instead.
+"""
+
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import re
+import signal
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Dict, List, Any
+
+import profiling
+import schedule_cache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Requirement statuses as printed by Workday; "Not Satisfied" must be matched
+# before "Satisfied"
+STATUSES = ("Not Satisfied", "Satisfied", "In Progress", "Waived", "Transferred")
+NOT_SATISFIED = "Not Satisfied"
+
+STATUS_PATTERN = re.compile(
+    r"\b(" + "|".join(s.replace(" ", r"\s+") for s in STATUSES) + r")\b",
+    re.IGNORECASE
+)
+COURSE_PATTERN = re.compile(r"\b([A-Z]{2,5})\s*-?\s*(\d{3,4}[A-Z]?)\b")
+
+# Schedule section patterns
+SECTION_PATTERN = re.compile(r"\b([A-Z]{2,5})\s*-?\s*(\d{3,4}[A-Z]?)(?:\s*-\s*|\s+)([A-Z]?\d{2,3}[A-Z]?)\b")
+TIME_RANGE_PATTERN = re.compile(
+    r"(\d{1,2}):(\d{2})\s*([AaPp])\.?[Mm]\.?\s*-\s*(\d{1,2}):(\d{2})\s*([AaPp])\.?[Mm]\.?"
+)
+CREDITS_PATTERN = re.compile(r"(?:^|[\s|])(\d(?:\.\d+)?)\s*(?:credits?|cr\.?|hrs?\.?|units?)?(?=$|[\s|])", re.IGNORECASE)
+
+# Day names/abbreviations, longest first so "Th" wins over "T"
+DAY_TOKENS = [
+    ("monday", 0), ("tuesday", 1), ("wednesday", 2), ("thursday", 3), ("friday", 4),
+    ("saturday", 5), ("sunday", 6),
+    ("mon", 0), ("tue", 1), ("wed", 2), ("thu", 3), ("fri", 4), ("sat", 5), ("sun", 6),
+    ("th", 3), ("tu", 1), ("sa", 5), ("su", 6),
+    ("m", 0), ("t", 1), ("w", 2), ("r", 3), ("f", 4), ("s", 5), ("u", 6),
+]
+DAY_LETTERS = "MTWRFSU"
+
+# Share of a page's course code lines that must parse as requirement rows
+# (progress) or sections (schedule) before the PDF can be replaced by them
+MIN_PAGE_ROW_COVERAGE = 0.5
+
+# Parsing limits
+PARSE_TIMEOUT_SECONDS = 30
+CACHE_MAX_ENTRIES = 256
+
+_cache_lock = threading.Lock()
+_progress_cache: "OrderedDict[str, Optional[Dict[str, Any]]]" = OrderedDict()
+
+_pool_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def local_extraction_enabled() -> bool:
+    """Check whether local extraction is enabled (ADVISEME_LOCAL_EXTRACTION)."""
+    return os.getenv("ADVISEME_LOCAL_EXTRACTION", "on").strip().lower() not in ("off", "false", "0")
+
+
+def file_hash(data) -> str:
+    """Get the SHA-256 hex digest of file bytes (bytes or memoryview)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def normalize_status(status: str) -> str:
+    """Map a status as printed in the PDF to its canonical spelling."""
+    collapsed = " ".join(status.split()).lower()
+    for canonical in STATUSES:
+        if canonical.lower() == collapsed:
+            return canonical
+    return status
+
+
+def normalize_course_code(subject: str, number: str) -> str:
+    """Format a course code as "SUBJ 1234"."""
+    return f"{subject.upper()} {number.upper()}"
+
+
+def extract_page_texts(pdf_bytes: bytes) -> Optional[List[str]]:
+    """
+    Extract the text of each page of a PDF.
+
+    Args:
+        pdf_bytes: PDF file bytes
+
+    Returns:
+        One text per page ("" for pages without text), or None if pypdf is
+        unavailable or the PDF cannot be read
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        logger.warning("pypdf is not installed - local PDF extraction disabled")
+        return None
+
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        return [page.extract_text() or "" for page in reader.pages]
+    except Exception as e:
+        logger.warning(f"Failed to extract PDF text: {e}")
+        return None
+
+
+def extract_pdf_text(pdf_bytes: bytes) -> Optional[str]:
+    """
+    Extract the text of every page of a PDF.
+
+    Args:
+        pdf_bytes: PDF file bytes
+
+    Returns:
+        Page texts joined by newlines, or None if pypdf is unavailable or the
+        PDF cannot be read
+    """
+    pages = extract_page_texts(pdf_bytes)
+    return None if pages is None else "\n".join(pages)
+
+
+def parse_requirement_rows(text: str) -> List[Dict[str, str]]:
+    """
+    Parse academic progress text into requirement rows.
+
+    A line with a course code and a status is a course row. A line with a
+    status but no course code starts a new requirement group.
+
+    Args:
+        text: Extracted PDF text
+
+    Returns:
+        List of row dictionaries (course, title, requirement, status)
+    """
+    rows: List[Dict[str, str]] = []
+    requirement = ""
+
+    for raw_line in text.splitlines():
+        line = " ".join(raw_line.split())
+        if not line:
+            continue
+
+        status_match = STATUS_PATTERN.search(line)
+        course_match = COURSE_PATTERN.search(line)
+
+        if course_match and status_match and course_match.start() < status_match.start():
+            title = line[course_match.end():status_match.start()].strip(" -:|")
+            rows.append({
+                'course': normalize_course_code(*course_match.groups()),
+                'title': title,
+                'requirement': requirement,
+                'status': normalize_status(status_match.group(1)),
+            })
+        elif status_match and not course_match:
+            group = line[:status_match.start()].strip(" -:|")
+            if group:
+                requirement = group
+
+    return rows
+
+
+def summarize_rows(rows: List[Dict[str, str]]) -> Dict[str, Any]:
+    """
+    Build the extraction result from parsed rows.
+
+    Args:
+        rows: Requirement rows
+
+    Returns:
+        Dictionary with 'rows', 'not_satisfied' rows and per-status 'counts'
+    """
+    counts = {status: 0 for status in STATUSES}
+    for row in rows:
+        counts[row['status']] = counts.get(row['status'], 0) + 1
+
+    return {
+        'rows': rows,
+        'not_satisfied': [row for row in rows if row['status'] == NOT_SATISFIED],
+        'counts': counts,
+    }
+
+
+def find_unparsed_pages(pages: List[str], parse_rows=None) -> List[int]:
+    """
+    Find pages whose rows the parser did not read.
+
+    A page is unparsed when fewer than MIN_PAGE_ROW_COVERAGE of its lines
+    with a course code became rows (a layout the patterns do not match), or
+    when it has no text at all (a scanned page).
+
+    Args:
+        pages: Text of each page
+        parse_rows: Parser of a page's text into rows (defaults to
+            parse_requirement_rows; parse_schedule_sections for schedules)
+
+    Returns:
+        Zero-based numbers of the unparsed pages
+    """
+    parse_rows = parse_rows or parse_requirement_rows
+    unparsed = []
+    for number, text in enumerate(pages):
+        if not text.strip():
+            unparsed.append(number)
+            continue
+        course_lines = sum(1 for line in text.splitlines() if COURSE_PATTERN.search(line))
+        if course_lines and len(parse_rows(text)) < MIN_PAGE_ROW_COVERAGE * course_lines:
+            unparsed.append(number)
+    return unparsed
+
+
+def parse_progress_pdf(pdf_bytes: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Parse an academic progress PDF (runs inside the worker process).
+
+    The PDF is only replaced by the parsed rows when every page was read:
+    with any unparsed page (see find_unparsed_pages) the result is None, so
+    the model gets the whole PDF instead of a partial list of requirements.
+
+    Args:
+        pdf_bytes: PDF file bytes
+
+    Returns:
+        Extraction result, or None if no requirement rows were found or
+        some pages could not be parsed
+    """
+    pages = extract_page_texts(pdf_bytes)
+    if not pages:
+        return None
+
+    rows = parse_requirement_rows("\n".join(pages))
+    if not rows:
+        return None
+
+    unparsed = find_unparsed_pages(pages)
+    if unparsed:
+        logger.info(f"Progress PDF pages {[number + 1 for number in unparsed]} were not parsed - "
+                    f"sending the PDF to the model")
+        return None
+
+    return summarize_rows(rows)
+
+
+def parse_days(token: str) -> Optional[List[int]]:
+    """
+    Parse a meeting-days token such as "MWF", "TTh", "TR" or "Mon/Wed".
+
+    Args:
+        token: Days token as printed in the schedule
+
+    Returns:
+        Sorted day indexes (Monday=0), or None if the token is not a days token
+    """
+    text = re.sub(r"[\s/,;-]+", "", token).lower()
+    if not text:
+        return None
+
+    days = set()
+    position = 0
+    while position < len(text):
+        for name, index in DAY_TOKENS:
+            if text.startswith(name, position):
+                days.add(index)
+                position += len(name)
+                break
+        else:
+            return None
+    return sorted(days)
+
+
+def format_days(days: List[int]) -> str:
+    """Format day indexes as a compact string, e.g. [0, 2, 4] -> "MWF"."""
+    return "".join(DAY_LETTERS[day] for day in days)
+
+
+def _to_minutes(hour: str, minute: str, meridiem: str) -> int:
+    """Convert a 12-hour clock time to minutes after midnight."""
+    value = int(hour) % 12 * 60 + int(minute)
+    if meridiem.lower() == "p":
+        value += 12 * 60
+    return value
+
+
+def format_minutes(minutes: int) -> str:
+    """Format minutes after midnight as a 12-hour clock time."""
+    hour, minute = divmod(minutes, 60)
+    return f"{(hour - 1) % 12 + 1}:{minute:02d} {'PM' if hour >= 12 else 'AM'}"
+
+
+def parse_section_line(line: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse one schedule line into a section.
+
+    Expected shape (columns may be separated by spaces or pipes):
+    "ANSC 3303-01 Animal Nutrition 3 MWF 9:00 AM - 9:50 AM Dr. Smith"
+
+    Args:
+        line: Normalized text line
+
+    Returns:
+        Section dictionary, or None if the line is not a section row
+    """
+    section_match = SECTION_PATTERN.search(line)
+    if not section_match:
+        return None
+
+    subject, number, section = section_match.groups()
+    meetings = []
+    first_meeting_start = None
+    last_meeting_end = section_match.end()
+
+    for time_match in TIME_RANGE_PATTERN.finditer(line, section_match.end()):
+        # The days token is the last word before the time range
+        before = line[last_meeting_end:time_match.start()].rstrip(" |")
+        days_token = re.split(r"[\s|]+", before)[-1] if before else ""
+        days = parse_days(days_token)
+        if days is None:
+            continue
+
+        if first_meeting_start is None:
+            first_meeting_start = last_meeting_end + before.rfind(days_token)
+        start = _to_minutes(*time_match.group(1, 2, 3))
+        end = _to_minutes(*time_match.group(4, 5, 6))
+        meetings.append({'days': days, 'start': start, 'end': end})
+        last_meeting_end = time_match.end()
+
+    if first_meeting_start is None:
+        first_meeting_start = len(line)
+
+    # Title and credits sit between the section number and the first meeting
+    middle = line[section_match.end():first_meeting_start]
+    credits = None
+    credits_matches = list(CREDITS_PATTERN.finditer(middle))
+    if credits_matches:
+        credits_match = credits_matches[-1]
+        credits = float(credits_match.group(1))
+        middle = middle[:credits_match.start()]
+
+    return {
+        'course': normalize_course_code(subject, number),
+        'section': section,
+        'title': middle.strip(" -:|"),
+        'credits': credits,
+        'meetings': meetings,
+        'instructor': line[last_meeting_end:].strip(" -:|") if meetings else "",
+    }
+
+
+def parse_schedule_sections(text: str) -> List[Dict[str, Any]]:
+    """
+    Parse course schedule text into sections.
+
+    Args:
+        text: Extracted PDF text
+
+    Returns:
+        List of section dictionaries
+    """
+    sections = []
+    for raw_line in text.splitlines():
+        line = " ".join(raw_line.split())
+        if not line:
+            continue
+        section = parse_section_line(line)
+        if section:
+            sections.append(section)
+    return sections
+
+
+def parse_schedule_pdf(pdf_bytes: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Parse a course schedule PDF (runs inside the worker process).
+
+    Courses missing from the parsed sections are reported as not offered, so
+    the sections only replace the PDF when every page was read (see
+    find_unparsed_pages).
+
+    Args:
+        pdf_bytes: PDF file bytes
+
+    Returns:
+        Dictionary with 'sections', or None if no sections were found or
+        some pages could not be parsed
+    """
+    pages = extract_page_texts(pdf_bytes)
+    if not pages:
+        return None
+
+    sections = parse_schedule_sections("\n".join(pages))
+    if not sections:
+        return None
+
+    unparsed = find_unparsed_pages(pages, parse_schedule_sections)
+    if unparsed:
+        logger.info(f"Schedule PDF pages {[number + 1 for number in unparsed]} were not parsed - "
+                    f"sending the PDF to the model")
+        return None
+
+    return {'sections': sections}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Get the shared parsing pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = int(os.getenv("ADVISEME_PARSE_WORKERS", "0") or 0) or min(2, os.cpu_count() or 1)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+class ParsingUnavailable(Exception):
+    """A PDF could not be parsed in the pool (no worker, timeout or crash)."""
+
+
+def _run_with_deadline(seconds: int, func, *args):
+    """
+    Run a parsing function in a pool worker, interrupted after seconds.
+
+    A hung parse raises TimeoutError in the worker itself, so the worker is
+    free again for other sessions' PDFs (where SIGALRM is available).
+    """
+    if not hasattr(signal, "SIGALRM"):
+        return func(*args)
+
+    def expire(signum, frame):
+        raise TimeoutError(f"Parsing took longer than {seconds} s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.alarm(seconds)
+    try:
+        return func(*args)
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool, unless another thread has already replaced it."""
+    global _pool
+    with _pool_lock:
+        if _pool is not pool:
+            return
+        _pool = None
+    # Its queued parses have already failed with the pool
+    pool.shutdown(wait=False)
+
+
+def run_in_pool(func, *args, timeout: float = PARSE_TIMEOUT_SECONDS):
+    """
+    Run a parsing function in the process pool.
+
+    Args:
+        func: Module-level (picklable) function to run
+        *args: Arguments for func
+        timeout: Seconds to wait for the worker (the worker also stops the
+            parse after this long)
+
+    Returns:
+        The function's result
+
+    Raises:
+        ParsingUnavailable: If no pool could be started, the parse timed out
+            or the worker died
+    """
+    try:
+        pool = _get_pool()
+    except Exception as e:
+        raise ParsingUnavailable(repr(e)) from e
+    try:
+        return pool.submit(_run_with_deadline, max(1, int(timeout)), func, *args).result(timeout=timeout)
+    except (FutureTimeoutError, TimeoutError) as e:
+        raise ParsingUnavailable(f"parsing took longer than {timeout} s") from e
+    except BrokenProcessPool as e:
+        # A worker died; replace this pool (its other parses failed with it)
+        _discard_pool(pool)
+        raise ParsingUnavailable(repr(e)) from e
+    except Exception as e:
+        raise ParsingUnavailable(repr(e)) from e
+
+
+def _cache_get(cache: OrderedDict, key: str):
+    """Look up a cached result, refreshing its LRU position."""
+    with _cache_lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return True, cache[key]
+    return False, None
+
+
+def _cache_put(cache: OrderedDict, key: str, value) -> None:
+    """Store a result, evicting the least recently used entries."""
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
+
+
+@profiling.profiled()
+def extract_progress(pdf_bytes) -> Optional[Dict[str, Any]]:
+    """
+    Extract structured requirement rows from an academic progress PDF.
+
+    Results (including "nothing found") are cached by file hash, so
+    re-generating advice for the same student does not parse again.
+
+    Args:
+        pdf_bytes: PDF file bytes (bytes or memoryview)
+
+    Returns:
+        Extraction result (see summarize_rows), or None if extraction is
+        disabled or the PDF could not be fully parsed (see parse_progress_pdf)
+    """
+    if not local_extraction_enabled():
+        return None
+
+    key = file_hash(pdf_bytes)
+    found, result = _cache_get(_progress_cache, key)
+    if found:
+        return result
+
+    try:
+        result = run_in_pool(parse_progress_pdf, bytes(pdf_bytes))
+    except ParsingUnavailable as e:
+        # Not cached: the next upload of the same PDF tries again
+        logger.warning(f"Could not parse progress PDF ({e}) - sending PDF to model")
+        return None
+    _cache_put(_progress_cache, key, result)
+
+    if result:
+        logger.info(f"Extracted {len(result['rows'])} requirement rows "
+                    f"({len(result['not_satisfied'])} not satisfied)")
+    else:
+        logger.info("Progress PDF not fully parsed - sending PDF to model")
+    return result
+
+
+@profiling.profiled()
+def extract_schedule(pdf_bytes) -> Optional[Dict[str, Any]]:
+    """
+    Extract course sections from a course schedule PDF.
+
+    Results are cached by file hash in schedule_cache, process-wide and on
+    disk; the stored schedule is shared by every student and session advised
+    with it, so it is parsed once.
+
+    Args:
+        pdf_bytes: PDF file bytes (bytes or memoryview)
+
+    Returns:
+        Dictionary with 'hash' and 'sections', or None if extraction is
+        disabled or the PDF could not be fully parsed (see
+        parse_schedule_pdf)
+    """
+    if not local_extraction_enabled():
+        return None
+
+    key = file_hash(pdf_bytes)
+    found, result = schedule_cache.get_schedule(key)
+    if found:
+        return result
+
+    try:
+        result = run_in_pool(parse_schedule_pdf, bytes(pdf_bytes))
+    except ParsingUnavailable as e:
+        logger.warning(f"Could not parse schedule PDF ({e}) - sending PDF to model")
+        return None
+    if result:
+        result['hash'] = key
+        logger.info(f"Extracted {len(result['sections'])} schedule sections")
+    else:
+        logger.info("Schedule PDF not fully parsed - sending PDF to model")
+    schedule_cache.put_schedule(key, result)
+    return result
+
+
+def format_unmet_requirements(progress: Dict[str, Any], filename: str = "") -> str:
+    """
+    Format the extraction result as the student part of the prompt.
+
+    Only the "Not Satisfied" rows are listed; everything else is summarized
+    as counts.
+
+    Args:
+        progress: Extraction result
+        filename: Original progress file name
+
+    Returns:
+        Prompt text describing the student's unmet requirements
+    """
+    counts = progress['counts']
+    other = ", ".join(f"{counts[s]} {s}" for s in STATUSES if s != NOT_SATISFIED and counts.get(s))
+    source = f" from {filename}" if filename else ""
+
+    lines = [
+        f"STUDENT ACADEMIC PROGRESS (extracted{source}; "
+        f"{len(progress['rows'])} requirement rows: {other or 'none other'}):",
+    ]
+
+    if not progress['not_satisfied']:
+        lines.append('The student has ZERO "Not Satisfied" courses - use the CASE 2 format.')
+        return "\n".join(lines)
+
+    lines.append('"Not Satisfied" courses (the ONLY courses that may be scheduled):')
+    lines.append("| Course Code | Course Name | Requirement | Status |")
+    lines.append("|---|---|---|---|")
+    for row in progress['not_satisfied']:
+        lines.append(f"| {row['course']} | {row['title']} | {row['requirement']} | {row['status']} |")
+    lines.append("All other requirements are Satisfied, In Progress, Waived or Transferred - do not schedule them.")
+    return "\n".join(lines)
@@ -0,0 +1,412 @@
+"""
+Profiling Hooks for AdviseMe
+
+This module finds hot paths in production without redeploying.
+
+Call-site timing (always available, cheap):
+- @profiled() and profile_block() time functions and blocks with
+  perf_counter_ns and aggregate calls, total/min/max time per
+  (name, call site), where the call site is the caller's file:line
+- ADVISEME_PROFILE_SAMPLE_RATE: fraction of calls that are timed
+  (default 1.0; lower it to reduce the overhead on very hot functions)
+
+Whole-rerun capture (opt-in, one rerun at a time per process):
+- requested with ?profile=1 in the URL or the admin "Profile my reruns"
+  toggle; the rest of the script run is profiled with cProfile, or with
+  pyinstrument when ADVISEME_PROFILER=pyinstrument and it is installed
+- the last MAX_CAPTURES reports are kept in memory for the admin report
+- ADVISEME_PROFILING=off disables captures entirely
+"""
+
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Deque, Dict, Iterator, List, Any, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_RATE = 1.0
+CPROFILE = "cprofile"
+PYINSTRUMENT = "pyinstrument"
+
+MAX_CAPTURES = 10
+REPORT_LINES = 40
+TOP_FUNCTIONS = 25
+
+# A capture left running (e.g. by st.stop() or st.rerun() before the end of
+# the script) is discarded after this long
+MAX_CAPTURE_SECONDS = 120
+
+# Query parameter values that request a capture
+TRUE_VALUES = ("1", "true", "on", "yes")
+
+_stats_lock = threading.Lock()
+# (name, site) -> [calls, total_ns, min_ns, max_ns]
+_call_stats: Dict[Tuple[str, str], List[int]] = {}
+
+_capture_lock = threading.Lock()
+_active_capture: Optional["RerunCapture"] = None
+_captures: Deque[Dict[str, Any]] = deque(maxlen=MAX_CAPTURES)
+
+
+def get_sample_rate() -> float:
+    """Get the fraction of calls that are timed (ADVISEME_PROFILE_SAMPLE_RATE)."""
+    try:
+        rate = float(os.getenv("ADVISEME_PROFILE_SAMPLE_RATE", DEFAULT_SAMPLE_RATE))
+    except ValueError:
+        logger.warning("Invalid ADVISEME_PROFILE_SAMPLE_RATE, using default")
+        return DEFAULT_SAMPLE_RATE
+    return min(max(rate, 0.0), 1.0)
+
+
+def capture_enabled() -> bool:
+    """Check whether rerun captures are allowed (ADVISEME_PROFILING)."""
+    return os.getenv("ADVISEME_PROFILING", "on").strip().lower() not in ("off", "false", "0")
+
+
+def _sampled(sample_rate: Optional[float]) -> bool:
+    """Decide whether to time this call."""
+    rate = get_sample_rate() if sample_rate is None else sample_rate
+    return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+def call_site(depth: int = 1) -> str:
+    """
+    Describe the code that called the caller.
+
+    Args:
+        depth: Frames to go up from the caller (1 = the caller's caller)
+
+    Returns:
+        "file.py:line", or "unknown" if the stack is not that deep
+    """
+    try:
+        frame = sys._getframe(depth + 1)
+    except ValueError:
+        return "unknown"
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno}"
+
+
+def record(name: str, duration_ns: int, site: str = "unknown") -> None:
+    """
+    Add one timed call to the per-call-site aggregates.
+
+    Args:
+        name: Operation name
+        duration_ns: Duration in nanoseconds
+        site: Call site ("file.py:line")
+    """
+    key = (name, site)
+    with _stats_lock:
+        entry = _call_stats.get(key)
+        if entry is None:
+            _call_stats[key] = [1, duration_ns, duration_ns, duration_ns]
+        else:
+            entry[0] += 1
+            entry[1] += duration_ns
+            if duration_ns < entry[2]:
+                entry[2] = duration_ns
+            if duration_ns > entry[3]:
+                entry[3] = duration_ns
+
+
+def profiled(name: Optional[str] = None, sample_rate: Optional[float] = None) -> Callable:
+    """
+    Decorator that times calls per call site.
+
+    Args:
+        name: Operation name (defaults to module.qualname of the function)
+        sample_rate: Fraction of calls to time (defaults to
+            ADVISEME_PROFILE_SAMPLE_RATE)
+
+    Returns:
+        Decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        operation = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _sampled(sample_rate):
+                return func(*args, **kwargs)
+            site = call_site()
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(operation, time.perf_counter_ns() - start, site)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def profile_block(name: str, sample_rate: Optional[float] = None) -> Iterator[None]:
+    """
+    Time a block per call site.
+
+    Args:
+        name: Operation name
+        sample_rate: Fraction of executions to time (defaults to
+            ADVISEME_PROFILE_SAMPLE_RATE)
+    """
+    if not _sampled(sample_rate):
+        yield
+        return
+    site = call_site(2)
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter_ns() - start, site)
+
+
+def get_profile_stats(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Get the per-call-site aggregates, slowest total first.
+
+    Args:
+        limit: Maximum number of rows
+
+    Returns:
+        List of dictionaries with name, site, calls, total_ms, mean_ms,
+        min_ms and max_ms
+    """
+    with _stats_lock:
+        items = [(key, list(entry)) for key, entry in _call_stats.items()]
+    rows = [
+        {
+            'name': name,
+            'site': site,
+            'calls': calls,
+            'total_ms': total / 1e6,
+            'mean_ms': total / calls / 1e6,
+            'min_ms': low / 1e6,
+            'max_ms': high / 1e6,
+        }
+        for (name, site), (calls, total, low, high) in items
+    ]
+    rows.sort(key=lambda row: row['total_ms'], reverse=True)
+    return rows[:limit] if limit else rows
+
+
+def reset_profile_stats() -> None:
+    """Clear the per-call-site aggregates."""
+    with _stats_lock:
+        _call_stats.clear()
+
+
+# Whole-rerun capture
+
+def get_profiler_name() -> str:
+    """Get the rerun profiler to use (ADVISEME_PROFILER)."""
+    return os.getenv("ADVISEME_PROFILER", CPROFILE).strip().lower()
+
+
+def capture_requested(query_params: Any, session_state: Any, is_admin: bool = False) -> bool:
+    """
+    Check whether the current rerun should be captured.
+
+    Only admins can see the reports, and one capture runs per process at a
+    time, so requests from other professors are ignored.
+
+    Args:
+        query_params: st.query_params
+        session_state: st.session_state
+        is_admin: Whether the logged-in professor is the admin
+
+    Returns:
+        True for an admin with ?profile=1 or the profile_reruns toggle on
+    """
+    if not is_admin:
+        return False
+    try:
+        if str(query_params.get('profile', '')).strip().lower() in TRUE_VALUES:
+            return True
+        return bool(session_state.get('profile_reruns', False))
+    except Exception:
+        return False
+
+
+class RerunCapture:
+    """A running profile of one script rerun."""
+
+    def __init__(self, session_id: Optional[str], label: str):
+        self.session_id = session_id
+        self.label = label
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.profiler_name = get_profiler_name()
+        self._profiler: Any = None
+
+    def start(self) -> None:
+        """Start profiling."""
+        if self.profiler_name == PYINSTRUMENT:
+            try:
+                from pyinstrument import Profiler
+                self._profiler = Profiler()
+                self._profiler.start()
+                return
+            except ImportError:
+                logger.warning("pyinstrument is not installed, using cProfile")
+                self.profiler_name = CPROFILE
+        self.profiler_name = CPROFILE
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    def stop(self) -> Dict[str, Any]:
+        """
+        Stop profiling and build the report.
+
+        Returns:
+            Capture record with label, started_at, duration_ms, profiler,
+            report (text) and, for cProfile, the top functions
+        """
+        duration_ms = (time.perf_counter() - self.started) * 1000
+        capture = {
+            'label': self.label,
+            'started_at': self.started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            'duration_ms': duration_ms,
+            'profiler': self.profiler_name,
+            'top': [],
+        }
+        if self.profiler_name == PYINSTRUMENT:
+            self._profiler.stop()
+            capture['report'] = self._profiler.output_text(unicode=False, color=False)
+            return capture
+
+        self._profiler.disable()
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(REPORT_LINES)
+        capture['report'] = stream.getvalue()
+        capture['top'] = top_functions(stats)
+        return capture
+
+    def discard(self) -> None:
+        """Stop profiling without keeping a report."""
+        try:
+            if self.profiler_name == PYINSTRUMENT:
+                self._profiler.stop()
+            else:
+                self._profiler.disable()
+        except Exception as e:
+            logger.debug(f"Could not stop profiler: {e}")
+
+
+def top_functions(stats: pstats.Stats, limit: int = TOP_FUNCTIONS) -> List[Dict[str, Any]]:
+    """
+    Get the functions with the most cumulative time from cProfile stats.
+
+    Args:
+        stats: Profile statistics
+        limit: Maximum number of functions
+
+    Returns:
+        List of dictionaries with function, calls, self_ms and cumulative_ms
+    """
+    rows = []
+    for (filename, line, function), (_, calls, self_time, cumulative, _) in stats.stats.items():
+        location = f"{os.path.basename(filename)}:{line}" if line else filename
+        rows.append({
+            'function': f"{function} ({location})",
+            'calls': calls,
+            'self_ms': self_time * 1000,
+            'cumulative_ms': cumulative * 1000,
+        })
+    rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+    return rows[:limit]
+
+
+def begin_rerun_capture(session_id: Optional[str], requested: bool, label: str = "rerun") -> Optional[RerunCapture]:
+    """
+    Start profiling the rest of a rerun, if requested and possible.
+
+    Only one rerun is captured at a time per process. A capture the same
+    session left running (the script was stopped or rerun before its end),
+    or any capture older than MAX_CAPTURE_SECONDS, is discarded first.
+
+    Args:
+        session_id: Streamlit session id
+        requested: Whether this rerun should be captured (see
+            capture_requested)
+        label: Description stored with the report
+
+    Returns:
+        The running capture, or None
+    """
+    global _active_capture
+    with _capture_lock:
+        active = _active_capture
+        if active is not None and (
+            active.session_id == session_id or time.perf_counter() - active.started > MAX_CAPTURE_SECONDS
+        ):
+            logger.info(f"Discarding unfinished profile capture '{active.label}'")
+            active.discard()
+            _active_capture = active = None
+
+        if not requested or not capture_enabled():
+            return None
+        if active is not None:
+            logger.info("Another rerun is being profiled, skipping capture")
+            return None
+
+        capture = RerunCapture(session_id, label)
+        try:
+            capture.start()
+        except ValueError as e:
+            # Another profiler (e.g. a debugger) is already active
+            logger.warning(f"Could not start profiler: {e}")
+            return None
+        _active_capture = capture
+        return capture
+
+
+def end_rerun_capture(capture: Optional[RerunCapture]) -> Optional[Dict[str, Any]]:
+    """
+    Stop a rerun capture and keep its report.
+
+    Args:
+        capture: Result of begin_rerun_capture
+
+    Returns:
+        The capture record, or None if there was no (current) capture
+    """
+    global _active_capture
+    if capture is None:
+        return None
+    with _capture_lock:
+        if _active_capture is not capture:
+            return None
+        _active_capture = None
+        result = capture.stop()
+        _captures.appendleft(result)
+    logger.info(f"Profiled '{result['label']}' in {result['duration_ms']:.0f}ms with {result['profiler']}")
+    return result
+
+
+def get_captures() -> List[Dict[str, Any]]:
+    """Get the kept rerun captures, newest first."""
+    with _capture_lock:
+        return list(_captures)
+
+
+def clear_captures() -> None:
+    """Drop the kept rerun captures (a running capture is discarded)."""
+    global _active_capture
+    with _capture_lock:
+        if _active_capture is not None:
+            _active_capture.discard()
+            _active_capture = None
+        _captures.clear()
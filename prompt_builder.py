@@ -0,0 +1,206 @@
+"""
+Prompt Builder for AdviseMe
+
+This module loads the versioned advising prompt templates from ``prompts/``,
+compiles each one once, and memoizes the rendered prompt per
+(semester, year, credit range, variant, version) together with its estimated
+token count.
+
+Two variants exist for every version:
+- full: the original, most explicit instructions
+- compact: the same rules and output format with redundant instructions removed
+
+A separate ``email`` template is used when the schedules were already built
+locally (schedule_solver) and the model only writes the email.
+
+The ``PROMPT_VARIANT`` environment variable selects ``full`` (default),
+``compact`` or ``ab``. In ``ab`` mode each request is assigned a variant
+deterministically from a bucket key so token and latency savings can be
+compared from the logs.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import string
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Template location and defaults
+PROMPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+PROMPT_NAME = "advising"
+PROMPT_VERSION = os.getenv("PROMPT_VERSION", "v1")
+PROMPT_VARIANTS = ("full", "compact")
+DEFAULT_VARIANT = "full"
+EMAIL_VARIANT = "email"
+AB_MODE = "ab"
+
+# Average characters per token for English prose; used instead of a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+class RenderedPrompt(NamedTuple):
+    """A rendered prompt and the metadata needed to measure it."""
+    text: str
+    variant: str
+    version: str
+    tokens: int
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a piece of text.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Approximate number of tokens
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def template_path(variant: str, version: str = PROMPT_VERSION) -> str:
+    """Get the on-disk path of a template variant/version."""
+    return os.path.join(PROMPT_DIR, f"{PROMPT_NAME}_{variant}_{version}.txt")
+
+
+@lru_cache(maxsize=None)
+def load_template(variant: str = DEFAULT_VARIANT, version: str = PROMPT_VERSION) -> string.Template:
+    """
+    Load and compile a prompt template (once per process).
+
+    Args:
+        variant: Template variant ("full", "compact" or "email")
+        version: Template version (e.g. "v1")
+
+    Returns:
+        Compiled string.Template
+
+    Raises:
+        ValueError: If the variant is unknown
+        FileNotFoundError: If no template exists for the variant/version
+    """
+    if variant not in PROMPT_VARIANTS and variant != EMAIL_VARIANT:
+        raise ValueError(f"Unknown prompt variant: {variant}")
+
+    path = template_path(variant, version)
+    with open(path, encoding="utf-8") as f:
+        template = string.Template(f.read())
+
+    logger.info(f"Loaded prompt template {variant}/{version} "
+                f"(~{estimate_tokens(template.template)} tokens)")
+    return template
+
+
+@lru_cache(maxsize=256)
+def render_prompt(
+    semester: str,
+    year: int,
+    credit_range: str,
+    variant: str = DEFAULT_VARIANT,
+    version: str = PROMPT_VERSION
+) -> RenderedPrompt:
+    """
+    Render a prompt, memoized per parameter tuple.
+
+    Args:
+        semester: Semester (Spring, Summer, Fall)
+        year: Year
+        credit_range: Credit range, e.g. "15-18"
+        variant: Template variant
+        version: Template version
+
+    Returns:
+        RenderedPrompt with the text and its estimated token count
+    """
+    text = load_template(variant, version).substitute(
+        semester=semester,
+        semester_lower=str(semester).lower(),
+        year=year,
+        credit_range=credit_range,
+    )
+    return RenderedPrompt(text=text, variant=variant, version=version, tokens=estimate_tokens(text))
+
+
+def get_prompt_variant(bucket_key: Optional[str] = None) -> str:
+    """
+    Select the prompt variant for a request from PROMPT_VARIANT.
+
+    In A/B mode the variant is derived from a hash of bucket_key, so the same
+    key always gets the same variant.
+
+    Args:
+        bucket_key: Stable key for A/B assignment (e.g. the progress file name)
+
+    Returns:
+        Variant name
+    """
+    mode = os.getenv("PROMPT_VARIANT", DEFAULT_VARIANT).strip().lower()
+
+    if mode == AB_MODE:
+        digest = hashlib.sha256((bucket_key or "").encode("utf-8")).digest()
+        return PROMPT_VARIANTS[digest[0] % len(PROMPT_VARIANTS)]
+
+    if mode not in PROMPT_VARIANTS:
+        logger.warning(f"Unknown PROMPT_VARIANT '{mode}', using {DEFAULT_VARIANT}")
+        return DEFAULT_VARIANT
+
+    return mode
+
+
+def build_prompt(
+    semester: str,
+    year: int,
+    credit_range: str,
+    bucket_key: Optional[str] = None
+) -> RenderedPrompt:
+    """
+    Build the advising prompt for a request.
+
+    Args:
+        semester: Semester (Spring, Summer, Fall)
+        year: Year
+        credit_range: Credit range, e.g. "15-18"
+        bucket_key: Stable key for A/B assignment
+
+    Returns:
+        RenderedPrompt for the selected variant
+    """
+    return render_prompt(semester, year, credit_range, get_prompt_variant(bucket_key), PROMPT_VERSION)
+
+
+def build_email_prompt(semester: str, year: int, credit_range: str) -> RenderedPrompt:
+    """
+    Build the email-only prompt used when the schedules were solved locally.
+
+    Args:
+        semester: Semester (Spring, Summer, Fall)
+        year: Year
+        credit_range: Credit range, e.g. "15-18"
+
+    Returns:
+        RenderedPrompt for the email template
+    """
+    return render_prompt(semester, year, credit_range, EMAIL_VARIANT, PROMPT_VERSION)
+
+
+def get_template_token_counts(version: str = PROMPT_VERSION) -> Dict[str, int]:
+    """
+    Get the estimated token count of each template variant.
+
+    Args:
+        version: Template version
+
+    Returns:
+        Dictionary mapping variant name to estimated tokens
+    """
+    return {
+        variant: estimate_tokens(load_template(variant, version).template)
+        for variant in PROMPT_VARIANTS
+    }
@@ -0,0 +1,301 @@
+"""
+Script to create professor accounts in bulk from a CSV file.
+
+Usage:
+    python provision_professors.py professors.csv [--workers N] [--credentials-out FILE [--overwrite]]
+        [--dry-run] [--db PATH]
+
+The CSV has a header row with a "username" column and an optional
+"password" column. Rows without a password get a generated one, written
+with the username to --credentials-out (required in that case, created
+readable by the owner only) so it can be handed out. The file is only
+opened when there are new accounts with generated passwords, before any
+password is hashed, and written before the accounts are committed, so an
+account is never created with a password nobody has. A non-empty file
+(e.g. the credentials of an earlier run) is never replaced unless
+--overwrite is given.
+
+Passwords are hashed with bcrypt across a process pool (one worker per CPU
+by default), then every new account is inserted in one transaction. Each
+row is reported as created, existing, invalid or duplicate. Re-running with
+the same file is safe: existing usernames are skipped before hashing and
+never changed.
+"""
+
+import argparse
+import csv
+import os
+import secrets
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Any, Optional, TextIO
+
+import bcrypt
+
+import database
+
+# Same work factor as auth.hash_password
+BCRYPT_ROUNDS = 12
+
+# Bound parameters per query (older SQLite builds allow 999)
+MAX_QUERY_PARAMETERS = 500
+
+GENERATED_PASSWORD_BYTES = 12
+
+CREATED = "created"
+EXISTS = "exists"
+INVALID = "invalid"
+DUPLICATE = "duplicate"
+
+INSERT_PROFESSOR_SQL = """
+    INSERT INTO professors (username, password_hash) VALUES (?, ?)
+    ON CONFLICT (username) DO NOTHING
+"""
+
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    """Hash one password (runs in a pool worker)."""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def read_rows(path: str) -> List[Dict[str, Any]]:
+    """
+    Read the provisioning CSV.
+
+    Args:
+        path: CSV file with a username column and an optional password column
+
+    Returns:
+        Rows with line (file line number), username and password (None if
+        not given)
+
+    Raises:
+        ValueError: If the file has no username column
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        fields = [name.strip().lower() for name in reader.fieldnames or []]
+        if "username" not in fields:
+            raise ValueError("CSV needs a 'username' column")
+        reader.fieldnames = fields
+        return [
+            {
+                'line': reader.line_num,
+                'username': (row.get('username') or "").strip(),
+                'password': row.get('password') or None,
+            }
+            for row in reader
+            if any((value or "").strip() for value in row.values() if isinstance(value, str))
+        ]
+
+
+def existing_usernames(usernames: List[str]) -> set:
+    """Get which usernames already have accounts."""
+    found = set()
+    with database.get_db_connection() as conn:
+        for start in range(0, len(usernames), MAX_QUERY_PARAMETERS):
+            batch = usernames[start:start + MAX_QUERY_PARAMETERS]
+            placeholders = ", ".join("?" for _ in batch)
+            rows = conn.execute(
+                f"SELECT username FROM professors WHERE username IN ({placeholders})", tuple(batch)
+            ).fetchall()
+            found.update(row['username'] for row in rows)
+    return found
+
+
+def provision(rows: List[Dict[str, Any]], workers: Optional[int] = None, rounds: Optional[int] = None,
+              dry_run: bool = False, credentials_out: Optional[str] = None,
+              overwrite: bool = False) -> List[Dict[str, Any]]:
+    """
+    Create the accounts of the given rows.
+
+    Args:
+        rows: Rows from read_rows
+        workers: Hashing processes (defaults to the CPU count; 1 hashes in
+            this process)
+        rounds: bcrypt work factor (defaults to BCRYPT_ROUNDS)
+        dry_run: Validate and report without hashing or inserting
+        credentials_out: File for the generated passwords, opened with
+            open_credentials before hashing if any new account has one, and
+            written before the new accounts are committed
+        overwrite: Replace a non-empty credentials_out file
+
+    Returns:
+        One result per row: line, username, status (created, exists,
+        invalid or duplicate), message, and the password for generated
+        passwords
+
+    Raises:
+        FileExistsError: If credentials_out is not empty and overwrite is false
+        OSError: If credentials_out cannot be written
+    """
+    database.initialize_database()
+    results = []
+    seen = set()
+    pending = []
+    for row in rows:
+        result = {'line': row['line'], 'username': row['username'], 'status': CREATED, 'message': ""}
+        results.append(result)
+        password = row['password']
+        if password is None:
+            password = secrets.token_urlsafe(GENERATED_PASSWORD_BYTES)
+            result['password'] = password
+        try:
+            database.validate_professor_credentials(row['username'], password)
+        except ValueError as e:
+            result.update(status=INVALID, message=str(e))
+            result.pop('password', None)
+            continue
+        if row['username'] in seen:
+            result.update(status=DUPLICATE, message="Username appears earlier in the file")
+            result.pop('password', None)
+            continue
+        seen.add(row['username'])
+        pending.append((result, password))
+
+    # Skip accounts that already exist before spending time on bcrypt
+    existing = existing_usernames([result['username'] for result, _ in pending])
+    to_create = []
+    for result, password in pending:
+        if result['username'] in existing:
+            result.update(status=EXISTS, message="Account already exists (unchanged)")
+            result.pop('password', None)
+        else:
+            to_create.append((result, password))
+    if dry_run or not to_create:
+        return results
+
+    credentials = None
+    if credentials_out and generated_credentials([result for result, _ in to_create]):
+        # Before hashing, so an unwritable or occupied path fails without creating anything
+        credentials = open_credentials(credentials_out, overwrite)
+    try:
+        _create_accounts(to_create, results, workers, rounds, credentials)
+    finally:
+        if credentials is not None:
+            credentials.close()
+    return results
+
+
+def _create_accounts(to_create: List[tuple], results: List[Dict[str, Any]], workers: Optional[int],
+                     rounds: Optional[int], credentials: Optional[TextIO]) -> None:
+    """Hash the passwords of new accounts and insert them, writing credentials before the commit."""
+    passwords = [password for _, password in to_create]
+    hasher = partial(hash_password, rounds=rounds or BCRYPT_ROUNDS)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        hashes = [hasher(password) for password in passwords]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            hashes = list(pool.map(hasher, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+    with database.get_db_connection() as conn:
+        for (result, _), password_hash in zip(to_create, hashes):
+            # One statement per row inside the transaction, so a row created
+            # concurrently is reported as existing instead of failing the rest
+            cursor = conn.execute(INSERT_PROFESSOR_SQL, (result['username'], password_hash))
+            if cursor.rowcount == 0:
+                result.update(status=EXISTS, message="Account already exists (unchanged)")
+                result.pop('password', None)
+        if credentials is not None:
+            # A failed write leaves the transaction uncommitted
+            write_credentials(credentials, results)
+
+
+def open_credentials(path: str, overwrite: bool = False) -> TextIO:
+    """
+    Open the credentials file, readable by the owner only.
+
+    A missing file is created; an existing non-empty one is only truncated
+    with overwrite, so the passwords of an earlier run are not lost.
+
+    Args:
+        path: Output CSV file
+        overwrite: Truncate a non-empty file instead of refusing it
+
+    Returns:
+        File for write_credentials
+
+    Raises:
+        FileExistsError: If the file is not empty and overwrite is false
+        OSError: If the file cannot be written
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o600)
+    try:
+        if os.fstat(fd).st_size and not overwrite:
+            raise FileExistsError(f"{path} already has credentials; pass --overwrite to replace them")
+        os.ftruncate(fd, 0)
+        os.chmod(path, 0o600)
+    except OSError:
+        os.close(fd)
+        raise
+    return os.fdopen(fd, 'w', newline='', encoding='utf-8')
+
+
+def generated_credentials(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Get the results of created accounts with a generated password."""
+    return [result for result in results if result['status'] == CREATED and 'password' in result]
+
+
+def write_credentials(f: TextIO, results: List[Dict[str, Any]]) -> int:
+    """
+    Write generated passwords of created accounts and sync them to disk.
+
+    Args:
+        f: File from open_credentials
+        results: Results from provision
+
+    Returns:
+        Number of credentials written
+    """
+    generated = generated_credentials(results)
+    writer = csv.writer(f)
+    writer.writerow(["username", "password"])
+    writer.writerows((result['username'], result['password']) for result in generated)
+    f.flush()
+    os.fsync(f.fileno())
+    return len(generated)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Create AdviseMe professor accounts from a CSV file.")
+    parser.add_argument("csv_file")
+    parser.add_argument("--workers", type=int, default=None, help="Hashing processes (default: CPU count)")
+    parser.add_argument("--credentials-out", help="Where to write generated passwords")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Replace a non-empty --credentials-out file (its passwords are lost)")
+    parser.add_argument("--dry-run", action="store_true", help="Validate and report without creating accounts")
+    parser.add_argument("--db", help="SQLite database file (default: database.DB_PATH; ignored with DATABASE_URL)")
+    args = parser.parse_args(argv)
+    if args.db:
+        database.DB_PATH = args.db
+
+    try:
+        rows = read_rows(args.csv_file)
+        if not args.dry_run and not args.credentials_out and any(row['password'] is None for row in rows):
+            print("✗ Some rows have no password; pass --credentials-out to receive the generated ones")
+            return 1
+        results = provision(rows, workers=args.workers, dry_run=args.dry_run,
+                            credentials_out=args.credentials_out, overwrite=args.overwrite)
+    except (ValueError, OSError, sqlite3.Error) as e:
+        print(f"✗ Error: {e}")
+        return 1
+
+    for result in results:
+        if result['status'] in (INVALID, DUPLICATE):
+            print(f"✗ Line {result['line']} ({result['username'] or 'no username'}): {result['message']}")
+    counts = {status: sum(1 for result in results if result['status'] == status)
+              for status in (CREATED, EXISTS, INVALID, DUPLICATE)}
+    verb = "Would create" if args.dry_run else "Created"
+    print(f"✓ {verb} {counts[CREATED]} accounts; {counts[EXISTS]} already existed; "
+          f"{counts[INVALID] + counts[DUPLICATE]} rows rejected")
+    generated = len(generated_credentials(results))
+    if generated and not args.dry_run:
+        print(f"  Wrote {generated} generated passwords to {args.credentials_out}")
+    return 1 if counts[INVALID] or counts[DUPLICATE] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+Rerun Profiler for AdviseMe
+
+This module measures where the time of each Streamlit rerun goes. The app is
+one top-to-bottom script, so every interaction re-executes startup, the
+login gate, the sidebar (including the history query), the upload section
+and the results. The script marks the start of each section; the profiler
+records the duration of every section per rerun and keeps:
+- a rolling per-session summary (last SESSION_WINDOW reruns)
+- a rolling per-process summary per section (last PROCESS_WINDOW reruns)
+
+Reruns whose script overhead exceeds the budget are flagged and logged with
+their slowest sections. Sections that are expected to be slow (the model
+call behind "Generate") do not count against the budget:
+- ADVISEME_RERUN_BUDGET_MS: budget per rerun (default 300)
+
+Usage:
+    rerun = rerun_profiler.start_rerun()
+    ...
+    rerun.mark("sidebar")
+    ...
+    rerun.finish("app", session_id, st.session_state)
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Any, Optional
+
+import metrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET_MS = 300
+
+# Sections that wait on external work by design
+BUDGET_EXEMPT_SECTIONS = ("generate",)
+
+SESSION_WINDOW = 20
+PROCESS_WINDOW = 500
+MAX_SESSIONS = 1000
+
+# Sections named in the over-budget log line
+SLOWEST_SECTIONS_LOGGED = 3
+
+RERUN_SECTION_SECONDS = metrics.histogram(
+    "adviseme_rerun_section_seconds", "Duration of each script section per rerun in seconds.",
+    ("section",), buckets=metrics.log_linear_buckets(0.0001, 512),
+)
+RERUNS_OVER_BUDGET = metrics.counter(
+    "adviseme_reruns_over_budget_total", "Reruns whose script overhead exceeded the budget.", ("page",),
+)
+
+_lock = threading.Lock()
+_process_totals: Deque[float] = deque(maxlen=PROCESS_WINDOW)
+_process_sections: Dict[str, Deque[float]] = {}
+_process_counts = {'reruns': 0, 'over_budget': 0}
+_session_reruns: "OrderedDict[str, Deque[Dict[str, Any]]]" = OrderedDict()
+
+
+def get_budget_ms() -> float:
+    """Get the rerun budget in milliseconds (ADVISEME_RERUN_BUDGET_MS)."""
+    try:
+        return float(os.getenv("ADVISEME_RERUN_BUDGET_MS", DEFAULT_BUDGET_MS))
+    except ValueError:
+        logger.warning("Invalid ADVISEME_RERUN_BUDGET_MS, using default")
+        return DEFAULT_BUDGET_MS
+
+
+class RerunTimer:
+    """Section timings of one script rerun."""
+
+    def __init__(self, first_section: str = "startup"):
+        self.started = time.perf_counter()
+        self.sections: Dict[str, float] = {}
+        self._section: Optional[str] = first_section
+        self._section_start_ns = time.perf_counter_ns()
+        self.finished: Optional[Dict[str, Any]] = None
+
+    def _close_section(self) -> None:
+        """Add the time since the last mark to the current section."""
+        now = time.perf_counter_ns()
+        if self._section is not None:
+            elapsed_ms = (now - self._section_start_ns) / 1e6
+            self.sections[self._section] = self.sections.get(self._section, 0.0) + elapsed_ms
+        self._section_start_ns = now
+
+    def mark(self, section: str) -> None:
+        """
+        End the current section and start the next one.
+
+        Args:
+            section: Name of the section that starts here
+        """
+        self._close_section()
+        self._section = section
+
+    def finish(self, page: str, session_id: Optional[str] = None, session_state: Any = None,
+               session_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """
+        End the rerun and record it.
+
+        Args:
+            page: Page that was rendered ("login" or "app")
+            session_id: Streamlit session id
+            session_state: The session's st.session_state (for metrics)
+            session_bytes: Already measured session state size (for metrics)
+
+        Returns:
+            Rerun record (see record_rerun)
+        """
+        if self.finished is not None:
+            return self.finished
+        self._close_section()
+        self._section = None
+        metrics.observe_rerun(self.started, page, session_id, session_state, session_bytes)
+        self.finished = record_rerun(page, self.sections, session_id)
+        return self.finished
+
+
+def start_rerun(first_section: str = "startup") -> RerunTimer:
+    """Start timing a rerun at its first section."""
+    return RerunTimer(first_section)
+
+
+def record_rerun(page: str, sections: Dict[str, float], session_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Add a rerun's section timings to the summaries and check the budget.
+
+    Args:
+        page: Page that was rendered
+        sections: Milliseconds per section, in script order
+        session_id: Streamlit session id
+
+    Returns:
+        Dictionary with page, timestamp, total_ms, sections, budget_ms,
+        counted_ms (total minus exempt sections) and over_budget
+    """
+    total_ms = sum(sections.values())
+    counted_ms = sum(ms for name, ms in sections.items() if name not in BUDGET_EXEMPT_SECTIONS)
+    budget_ms = get_budget_ms()
+    rerun = {
+        'page': page,
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'total_ms': total_ms,
+        'sections': dict(sections),
+        'budget_ms': budget_ms,
+        'counted_ms': counted_ms,
+        'over_budget': counted_ms > budget_ms,
+    }
+
+    for name, ms in sections.items():
+        RERUN_SECTION_SECONDS.observe(ms / 1000, section=name)
+
+    with _lock:
+        _process_counts['reruns'] += 1
+        _process_totals.append(total_ms)
+        for name, ms in sections.items():
+            window = _process_sections.get(name)
+            if window is None:
+                window = _process_sections[name] = deque(maxlen=PROCESS_WINDOW)
+            window.append(ms)
+        if rerun['over_budget']:
+            _process_counts['over_budget'] += 1
+        if session_id:
+            history = _session_reruns.pop(session_id, None) or deque(maxlen=SESSION_WINDOW)
+            history.append(rerun)
+            _session_reruns[session_id] = history
+            while len(_session_reruns) > MAX_SESSIONS:
+                _session_reruns.popitem(last=False)
+
+    if rerun['over_budget']:
+        RERUNS_OVER_BUDGET.inc(page=page)
+        slowest = sorted(sections.items(), key=lambda item: item[1], reverse=True)[:SLOWEST_SECTIONS_LOGGED]
+        logger.warning(
+            f"Rerun over budget: page={page} {counted_ms:.0f}ms > {budget_ms:.0f}ms; slowest sections: "
+            + ", ".join(f"{name}={ms:.0f}ms" for name, ms in slowest)
+        )
+    return rerun
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of a sorted list."""
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def summarize(values) -> Dict[str, Any]:
+    """
+    Summarize durations.
+
+    Args:
+        values: Durations in milliseconds
+
+    Returns:
+        Dictionary with count, mean_ms, p50_ms, p95_ms and max_ms
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return {'count': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+    return {
+        'count': len(ordered),
+        'mean_ms': sum(ordered) / len(ordered),
+        'p50_ms': _percentile(ordered, 0.5),
+        'p95_ms': _percentile(ordered, 0.95),
+        'max_ms': ordered[-1],
+    }
+
+
+def get_process_summary() -> Dict[str, Any]:
+    """
+    Get the rolling per-process summary.
+
+    Returns:
+        Dictionary with reruns and over_budget counts (since start), the
+        total summary and one summary per section, largest mean first
+    """
+    with _lock:
+        totals = list(_process_totals)
+        sections = {name: list(window) for name, window in _process_sections.items()}
+        counts = dict(_process_counts)
+    rows = [dict(summarize(values), section=name) for name, values in sections.items()]
+    rows.sort(key=lambda row: row['mean_ms'], reverse=True)
+    return {**counts, 'total': summarize(totals), 'sections': rows, 'budget_ms': get_budget_ms()}
+
+
+def get_session_summary(session_id: Optional[str]) -> Dict[str, Any]:
+    """
+    Get the rolling summary of one session.
+
+    Args:
+        session_id: Streamlit session id
+
+    Returns:
+        Dictionary with the session's recent reruns (oldest first), their
+        total summary, the number over budget and the mean per section
+    """
+    with _lock:
+        reruns = list(_session_reruns.get(session_id, ())) if session_id else []
+    sections: Dict[str, List[float]] = {}
+    for rerun in reruns:
+        for name, ms in rerun['sections'].items():
+            sections.setdefault(name, []).append(ms)
+    return {
+        'reruns': reruns,
+        'total': summarize(rerun['total_ms'] for rerun in reruns),
+        'over_budget': sum(1 for rerun in reruns if rerun['over_budget']),
+        'sections': {name: sum(values) / len(values) for name, values in sections.items()},
+    }
+
+
+def reset() -> None:
+    """Clear every summary."""
+    with _lock:
+        _process_totals.clear()
+        _process_sections.clear()
+        _session_reruns.clear()
+        _process_counts['reruns'] = 0
+        _process_counts['over_budget'] = 0
@@ -0,0 +1,250 @@
+"""
+Results View for AdviseMe
+
+This module renders the generated email and schedule tabs. The panel is a
+Streamlit fragment so interactions inside it (copy, download, show/hide) only
+rerun the panel, and the derived view model (tab labels, CSV payloads, file
+names) is cached on a content hash of the results in session_state so full-app
+reruns do not rebuild it.
+"""
+
+import hashlib
+import logging
+from typing import Optional, Dict, List, Any, Mapping
+
+import streamlit as st
+
+import session_memory
+from ui_helpers import get_session_id, get_session_state_store
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Session state keys that make up a set of results
+RESULT_KEYS = (
+    'email_content',
+    'recommended_schedule',
+    'alternative1_schedule',
+    'alternative2_schedule',
+    'semester_info',
+)
+
+
+def parse_schedule_table_to_csv(schedule_markdown: str) -> str:
+    """Convert markdown table to CSV format."""
+    lines = schedule_markdown.strip().split('\n')
+    csv_lines = []
+    for line in lines:
+        if '|' in line and not line.strip().startswith('|---'):
+            # Remove leading/trailing pipes and split
+            cells = [cell.strip() for cell in line.strip('|').split('|')]
+            csv_lines.append(','.join(cells))
+    return '\n'.join(csv_lines)
+
+
+def has_results(state: Mapping) -> bool:
+    """
+    Check whether session state holds a displayable set of results.
+
+    Args:
+        state: Session state (or any mapping with the result keys)
+
+    Returns:
+        True if email and recommended schedule are present
+    """
+    return 'email_content' in state and 'recommended_schedule' in state
+
+
+def results_content_hash(state: Mapping) -> Optional[str]:
+    """
+    Compute a content hash over the results stored in session state.
+
+    The hash changes whenever any result string changes (new generation or a
+    history reload) and is stable across unrelated reruns, so it can be used
+    as the cache key for the rendered view.
+
+    Args:
+        state: Session state (or any mapping with the result keys)
+
+    Returns:
+        Hex digest, or None if there are no results
+    """
+    if not has_results(state):
+        return None
+
+    digest = hashlib.sha256()
+    for key in RESULT_KEYS:
+        value = state.get(key) or ''
+        digest.update(key.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(str(value).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _file_suffix(semester_info: str) -> str:
+    """Build the "<semester>_<year>" suffix used in download file names."""
+    return '_'.join(semester_info.split()) if semester_info else 'results'
+
+
+def build_results_view(results: Mapping) -> Dict[str, Any]:
+    """
+    Build the view model for a set of results.
+
+    Args:
+        results: Mapping with the RESULT_KEYS
+
+    Returns:
+        Dictionary with the semester label, email payload and a list of
+        schedule tab descriptions (label, heading, body, csv, file name)
+    """
+    semester_info = results.get('semester_info') or ''
+    suffix = _file_suffix(semester_info)
+
+    schedules: List[Dict[str, Any]] = []
+    schedule_specs = [
+        ('recommended_schedule', "⭐ Recommended Schedule", "⭐ Recommended",
+         "### ⭐ Recommended Schedule (Best Option)", 'recommended'),
+        ('alternative1_schedule', "📅 Alternative 1", "📅 Alternative 1",
+         "### Alternative Schedule Option 1", 'alternative1'),
+        ('alternative2_schedule', "📅 Alternative 2", "📅 Alternative 2",
+         "### Alternative Schedule Option 2", 'alternative2'),
+    ]
+
+    for key, label, short_label, heading, prefix in schedule_specs:
+        body = results.get(key) or ''
+        # Alternatives are only shown when present; recommended always is
+        if not body and key != 'recommended_schedule':
+            continue
+        is_table = '|' in body
+        schedules.append({
+            'key': key,
+            'label': label,
+            'short_label': short_label,
+            'heading': heading,
+            'body': body,
+            'is_table': is_table,
+            'csv': parse_schedule_table_to_csv(body) if is_table else None,
+            'file_name': f"{prefix}_schedule_{suffix}.csv",
+        })
+
+    return {
+        'semester_info': semester_info,
+        'email': results.get('email_content') or '',
+        'email_file_name': f"academic_advice_{suffix}.txt",
+        'schedules': schedules,
+    }
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _cached_results_view(content_hash: str, _results: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Cached wrapper around build_results_view.
+
+    Only content_hash participates in the cache key; the underscore-prefixed
+    results argument is not hashed by Streamlit.
+    """
+    return build_results_view(_results)
+
+
+def get_results_view(state: Mapping) -> Optional[Dict[str, Any]]:
+    """
+    Get the (cached) view model for the results in session state.
+
+    Args:
+        state: Session state
+
+    Returns:
+        View model dictionary, or None if there are no results
+    """
+    content_hash = results_content_hash(state)
+    if content_hash is None:
+        return None
+    results = {key: state.get(key) for key in RESULT_KEYS}
+    return _cached_results_view(content_hash, results)
+
+
+def _render_fresh_results(view: Dict[str, Any]) -> None:
+    """Render the full results tabs shown right after generation."""
+    tab_objects = st.tabs(["📧 Email"] + [tab['label'] for tab in view['schedules']])
+
+    # Email tab
+    with tab_objects[0]:
+        st.markdown("### Academic Advice Email")
+        st.text_area("Generated Email", view['email'], height=400, label_visibility="collapsed")
+
+        # Download and copy buttons
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                label="📥 Download Email",
+                data=view['email'],
+                file_name=view['email_file_name'],
+                mime="text/plain"
+            )
+        with col2:
+            if st.button("📋 Copy to Clipboard", key="copy_email"):
+                st.toast("Email copied to clipboard!", icon="✅")
+
+    # Schedule tabs
+    for tab_object, tab in zip(tab_objects[1:], view['schedules']):
+        with tab_object:
+            st.markdown(tab['heading'])
+            if tab['is_table']:
+                st.markdown(tab['body'])
+                st.download_button(
+                    label="📥 Download Schedule (CSV)",
+                    data=tab['csv'],
+                    file_name=tab['file_name'],
+                    mime="text/csv",
+                    key=f"download_{tab['key']}"
+                )
+            else:
+                st.info(tab['body'])
+
+
+def _render_previous_results(view: Dict[str, Any]) -> None:
+    """Render the collapsible previous-results panel."""
+    # A toggle (rather than an expander) means collapsed results send no
+    # elements at all; flipping it only reruns this fragment.
+    show = st.toggle("📋 View Previous Results", value=False, key="show_previous_results")
+    if not show:
+        return
+
+    with st.container(border=True):
+        st.caption(f"Last generated for: {view['semester_info'] or 'Unknown semester'}")
+
+        prev_tab_objects = st.tabs(["📧 Email"] + [tab['short_label'] for tab in view['schedules']])
+
+        with prev_tab_objects[0]:
+            st.text_area("Previous Email", view['email'], height=300, label_visibility="collapsed", disabled=True)
+
+        for tab_object, tab in zip(prev_tab_objects[1:], view['schedules']):
+            with tab_object:
+                if tab['is_table']:
+                    st.markdown(tab['body'])
+                else:
+                    st.info(tab['body'])
+
+
+@st.fragment
+def render_results_panel(fresh: bool = False) -> None:
+    """
+    Render the results panel for the results stored in session state.
+
+    Args:
+        fresh: True right after generation (full tabs with download buttons),
+               False for the collapsible previous-results view
+    """
+    # Fragment reruns skip the top of the script; load back results that
+    # were spilled to disk since the last full rerun
+    with session_memory.fragment_rerun(get_session_id(), get_session_state_store()):
+        view = get_results_view(st.session_state)
+        if view is None:
+            return
+
+        if fresh:
+            _render_fresh_results(view)
+        else:
+            _render_previous_results(view)
@@ -0,0 +1,231 @@
+"""
+Schedule Cache for AdviseMe
+
+This module caches parsed course schedules by PDF file hash, shared by every
+session in the process and, through the cache directory, by every process and
+replica that mounts it.
+
+Two levels:
+- memory: an LRU bounded by the serialized size of its entries
+  (ADVISEME_SCHEDULE_CACHE_MB, default 64)
+- disk: one file per schedule in ADVISEME_CACHE_DIR (default .cache/ next to
+  the app). Parsed schedules are stored with pickle protocol 5 and read back
+  through a memory map; slot index masks (see slot_index) are stored as .npy
+  arrays and opened with mmap_mode="r", so processes on the same host share
+  their pages.
+
+A restarted process or a new replica warms from disk instead of reparsing.
+Disk entries live in a directory per CACHE_VERSION, so a deploy that changes
+the parser or the section format does not load schedules parsed by the old
+one.
+The cache directory must only be writable by the app, since cached pickles
+are trusted when loaded.
+"""
+
+import logging
+import mmap
+import os
+import pickle
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+DEFAULT_MEMORY_MB = 64
+PICKLE_PROTOCOL = 5
+
+# Bump whenever pdf_extract.parse_schedule_pdf, the section dictionaries or
+# the slot index masks change; entries of other versions are ignored
+CACHE_VERSION = 2
+
+# Memory size charged for cached "nothing found" results
+EMPTY_ENTRY_BYTES = 64
+
+# Only file hashes are used as disk keys
+DISK_KEY_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+_lock = threading.Lock()
+_memory: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+_memory_bytes = 0
+_stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def get_cache_dir() -> str:
+    """Get the on-disk cache directory (ADVISEME_CACHE_DIR)."""
+    return os.getenv("ADVISEME_CACHE_DIR") or DEFAULT_CACHE_DIR
+
+
+def get_memory_budget() -> int:
+    """Get the in-memory budget in bytes (ADVISEME_SCHEDULE_CACHE_MB)."""
+    try:
+        megabytes = float(os.getenv("ADVISEME_SCHEDULE_CACHE_MB", DEFAULT_MEMORY_MB))
+    except ValueError:
+        logger.warning("Invalid ADVISEME_SCHEDULE_CACHE_MB, using default")
+        megabytes = DEFAULT_MEMORY_MB
+    return int(megabytes * 1024 * 1024)
+
+
+def _disk_path(key: str, suffix: str) -> Optional[str]:
+    """Get the cache file path of a key, or None if it is not a file hash."""
+    if not DISK_KEY_PATTERN.fullmatch(key):
+        return None
+    return os.path.join(get_cache_dir(), f"v{CACHE_VERSION}", f"{key}{suffix}")
+
+
+def _write_atomic(path: str, write) -> bool:
+    """Write a cache file through a temporary file and rename it into place."""
+    tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+        return True
+    except OSError as e:
+        logger.warning(f"Could not write cache file {path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def _remember(key: str, value: Any, nbytes: int) -> None:
+    """Add an entry to the memory LRU, evicting to stay within budget."""
+    global _memory_bytes
+    budget = get_memory_budget()
+    with _lock:
+        if key in _memory:
+            _memory_bytes -= _memory.pop(key)[1]
+        _memory[key] = (value, nbytes)
+        _memory_bytes += nbytes
+        # Always keep the newest entry, even if it alone exceeds the budget
+        while _memory_bytes > budget and len(_memory) > 1:
+            _, (_, evicted_bytes) = _memory.popitem(last=False)
+            _memory_bytes -= evicted_bytes
+            _stats['evictions'] += 1
+
+
+def _load_pickle(path: str) -> Any:
+    """Load a pickled cache file through a read-only memory map."""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return pickle.loads(mapped)
+
+
+def get_schedule(file_hash: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """
+    Look up a parsed schedule.
+
+    Args:
+        file_hash: SHA-256 hex digest of the schedule PDF
+
+    Returns:
+        Tuple of (found, schedule). A found None means the PDF was parsed
+        before and had no sections.
+    """
+    with _lock:
+        if file_hash in _memory:
+            _memory.move_to_end(file_hash)
+            _stats['memory_hits'] += 1
+            return True, _memory[file_hash][0]
+
+    path = _disk_path(file_hash, ".pkl")
+    if path and os.path.exists(path):
+        try:
+            schedule = _load_pickle(path)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache file {path}: {e}")
+        else:
+            _remember(file_hash, schedule, os.path.getsize(path))
+            with _lock:
+                _stats['disk_hits'] += 1
+            logger.info(f"Loaded parsed schedule {file_hash[:12]} from disk cache")
+            return True, schedule
+
+    with _lock:
+        _stats['misses'] += 1
+    return False, None
+
+
+def put_schedule(file_hash: str, schedule: Optional[Dict[str, Any]]) -> None:
+    """
+    Store a parsed schedule in memory and, if it has sections, on disk.
+
+    Args:
+        file_hash: SHA-256 hex digest of the schedule PDF
+        schedule: Parsed schedule, or None if the PDF had no sections
+    """
+    if schedule is None:
+        _remember(file_hash, None, EMPTY_ENTRY_BYTES)
+        return
+
+    data = pickle.dumps(schedule, protocol=PICKLE_PROTOCOL)
+    _remember(file_hash, schedule, len(data))
+
+    path = _disk_path(file_hash, ".pkl")
+    if path and not os.path.exists(path):
+        _write_atomic(path, lambda f: f.write(data))
+
+
+def get_slot_masks(file_hash: str) -> Optional[np.ndarray]:
+    """
+    Open the stored slot index masks of a schedule, memory-mapped.
+
+    Args:
+        file_hash: SHA-256 hex digest of the schedule PDF
+
+    Returns:
+        Read-only (sections x words) uint64 array, or None if not stored
+    """
+    path = _disk_path(file_hash, ".slots.npy")
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return np.load(path, mmap_mode="r")
+    except (OSError, ValueError) as e:
+        logger.warning(f"Discarding unreadable cache file {path}: {e}")
+        return None
+
+
+def put_slot_masks(file_hash: str, masks: np.ndarray) -> None:
+    """
+    Store the slot index masks of a schedule on disk.
+
+    Args:
+        file_hash: SHA-256 hex digest of the schedule PDF
+        masks: (sections x words) uint64 array
+    """
+    path = _disk_path(file_hash, ".slots.npy")
+    if path and not os.path.exists(path):
+        _write_atomic(path, lambda f: np.save(f, masks, allow_pickle=False))
+
+
+def clear_memory() -> None:
+    """Drop every in-memory entry (the disk cache is kept)."""
+    global _memory_bytes
+    with _lock:
+        _memory.clear()
+        _memory_bytes = 0
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """
+    Get cache statistics.
+
+    Returns:
+        Dictionary with hit/miss/eviction counts, entries and memory bytes
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats['entries'] = len(_memory)
+        stats['memory_bytes'] = _memory_bytes
+    stats['memory_budget'] = get_memory_budget()
+    return stats
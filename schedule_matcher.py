@@ -0,0 +1,187 @@
+"""
+Schedule Matcher for AdviseMe
+
+This module joins a student's unmet requirements against the sections in the
+stored course schedule, so the LLM receives a small candidate set with meeting
+times instead of the whole schedule PDF.
+
+Sections are indexed by course code in a hash map; the index is built once
+per schedule (keyed by the schedule's file hash) and reused for every student.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+import profiling
+from pdf_extract import format_days, format_minutes
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INDEX_CACHE_MAX_ENTRIES = 16
+
+_index_lock = threading.Lock()
+_index_cache: "OrderedDict[str, Dict[str, List[Dict[str, Any]]]]" = OrderedDict()
+
+
+def build_section_index(sections: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Index schedule sections by course code.
+
+    Args:
+        sections: Parsed schedule sections
+
+    Returns:
+        Dictionary mapping course code to its sections, in schedule order
+    """
+    index: Dict[str, List[Dict[str, Any]]] = {}
+    for section in sections:
+        index.setdefault(section['course'], []).append(section)
+    return index
+
+
+def get_section_index(schedule: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Get the course-code index for a parsed schedule, building it once.
+
+    Args:
+        schedule: Result of pdf_extract.extract_schedule ('hash', 'sections')
+
+    Returns:
+        Course-code index (see build_section_index)
+    """
+    key = schedule.get('hash')
+    with _index_lock:
+        if key is not None and key in _index_cache:
+            _index_cache.move_to_end(key)
+            return _index_cache[key]
+
+    index = build_section_index(schedule['sections'])
+
+    if key is not None:
+        with _index_lock:
+            _index_cache[key] = index
+            while len(_index_cache) > INDEX_CACHE_MAX_ENTRIES:
+                _index_cache.popitem(last=False)
+    return index
+
+
+@profiling.profiled()
+def match_requirements(
+    unmet_rows: List[Dict[str, str]],
+    index: Dict[str, List[Dict[str, Any]]]
+) -> Dict[str, List]:
+    """
+    Join unmet requirement rows against the section index.
+
+    Args:
+        unmet_rows: "Not Satisfied" rows from pdf_extract.extract_progress
+        index: Course-code index
+
+    Returns:
+        Dictionary with 'candidates' (list of {'requirement': row,
+        'sections': [...]}) and 'unavailable' (rows with no section offered)
+    """
+    candidates = []
+    unavailable = []
+    seen = set()
+
+    for row in unmet_rows:
+        if row['course'] in seen:
+            continue
+        seen.add(row['course'])
+
+        sections = index.get(row['course'])
+        if sections:
+            candidates.append({'requirement': row, 'sections': sections})
+        else:
+            unavailable.append(row)
+
+    return {'candidates': candidates, 'unavailable': unavailable}
+
+
+def format_meetings(section: Dict[str, Any]) -> str:
+    """Format a section's meetings, e.g. "MWF 9:00 AM-9:50 AM"."""
+    if not section['meetings']:
+        return "TBA"
+    return "; ".join(
+        f"{format_days(m['days'])} {format_minutes(m['start'])}-{format_minutes(m['end'])}"
+        for m in section['meetings']
+    )
+
+
+def format_candidates(match: Dict[str, List], semester: str, year: int) -> str:
+    """
+    Format the candidate set as the schedule part of the prompt.
+
+    Args:
+        match: Result of match_requirements
+        semester: Semester of the schedule
+        year: Year of the schedule
+
+    Returns:
+        Prompt text listing candidate sections and unavailable courses
+    """
+    lines = [
+        f"AVAILABLE SECTIONS (pre-filtered from the {semester} {year} class schedule - "
+        f"these are the ONLY sections offering the student's \"Not Satisfied\" courses):",
+    ]
+
+    if match['candidates']:
+        lines.append("| Course Code | Section | Course Name | Credits | Day/Time | Instructor |")
+        lines.append("|---|---|---|---|---|---|")
+        for candidate in match['candidates']:
+            for section in candidate['sections']:
+                credits = section['credits']
+                credits_text = f"{credits:g}" if credits is not None else ""
+                title = section['title'] or candidate['requirement']['title']
+                lines.append(
+                    f"| {section['course']} | {section['section']} | {title} | {credits_text} | "
+                    f"{format_meetings(section)} | {section['instructor']} |"
+                )
+    else:
+        lines.append(f"None of the student's \"Not Satisfied\" courses are offered in {semester} {year}.")
+
+    if match['unavailable']:
+        courses = ", ".join(row['course'] for row in match['unavailable'])
+        lines.append(f"Not offered in {semester} {year}: {courses}")
+
+    return "\n".join(lines)
+
+
+def build_candidate_text(
+    progress: Optional[Dict[str, Any]],
+    schedule: Optional[Dict[str, Any]],
+    semester: str,
+    year: int
+) -> Optional[str]:
+    """
+    Build the pre-filtered schedule text for a student, if possible.
+
+    Args:
+        progress: Result of pdf_extract.extract_progress
+        schedule: Result of pdf_extract.extract_schedule
+        semester: Semester of the schedule
+        year: Year of the schedule
+
+    Returns:
+        Candidate text to send instead of the schedule PDF, or None when the
+        schedule PDF must be sent (progress or schedule could not be parsed)
+    """
+    if not progress:
+        return None
+
+    if not progress['not_satisfied']:
+        # CASE 2 - nothing to schedule, so the schedule is not needed at all
+        return f"No {semester} {year} course sections are needed for this student."
+
+    if not schedule:
+        return None
+
+    match = match_requirements(progress['not_satisfied'], get_section_index(schedule))
+    logger.info(f"Matched {len(match['candidates'])} of {len(progress['not_satisfied'])} "
+                f"unmet courses to {semester} {year} sections")
+    return format_candidates(match, semester, year)
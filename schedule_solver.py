@@ -0,0 +1,434 @@
+"""
+Schedule Solver for AdviseMe
+
+This module builds the recommended and alternative schedules locally from the
+candidate sections of a student's "Not Satisfied" courses (see
+schedule_matcher), so the LLM only has to write the email.
+
+Pairwise time conflicts between the candidate sections are computed once from
+the schedule's slot index (see slot_index) and turned into one conflict bitset
+per section. Schedules are enumerated by backtracking over the courses,
+choosing one section or skipping the course, pruned on:
+- time conflicts (bitwise AND with the sections already chosen)
+- credits above the maximum
+- credits that can no longer reach the minimum with the remaining courses
+
+Only maximal schedules (no skipped course would still fit) are kept. They are
+ranked by the number of required courses covered, total credits, and how
+evenly class time is distributed across the week.
+
+The solver can be disabled with ADVISEME_LOCAL_SOLVER=off, in which case the
+model builds the schedules as before.
+"""
+
+import logging
+import os
+import statistics
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+import profiling
+import schedule_matcher
+import slot_index
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = 5
+
+# Credits assumed for a section whose credits could not be read
+DEFAULT_SECTION_CREDITS = 3.0
+
+# Search limits; they keep the worst case in the milliseconds range
+MAX_SEARCH_NODES = 200_000
+MAX_SOLUTIONS = 2_000
+
+# Number of schedules produced (recommended + alternatives)
+MAX_SCHEDULES = 3
+
+TABLE_HEADER = "| Course Code | Course Name | Credits | Day/Time | Instructor |"
+TABLE_DIVIDER = "|---|---|---|---|---|"
+
+
+def local_solver_enabled() -> bool:
+    """Check whether schedules are built locally (ADVISEME_LOCAL_SOLVER)."""
+    return os.getenv("ADVISEME_LOCAL_SOLVER", "on").strip().lower() not in ("off", "false", "0")
+
+
+def section_credits(section: Dict[str, Any]) -> float:
+    """Get a section's credits, falling back to DEFAULT_SECTION_CREDITS."""
+    return section['credits'] if section['credits'] is not None else DEFAULT_SECTION_CREDITS
+
+
+def build_options(
+    candidates: List[Dict[str, Any]],
+    index: Optional[slot_index.SlotIndex] = None
+) -> List[List[Dict[str, Any]]]:
+    """
+    Precompute the section choices of every candidate course.
+
+    Pairwise conflicts between all candidate sections are computed once with
+    the slot index and stored per option as a bitset of conflicting option
+    ids, so the search itself only does integer ANDs. Courses are ordered by
+    fewest sections first, so the most constrained choices are made near the
+    root of the search tree.
+
+    Args:
+        candidates: 'candidates' from schedule_matcher.match_requirements
+        index: Slot index of the schedule the candidates come from (built
+            from the candidate sections when not given)
+
+    Returns:
+        One list of options per course; each option holds the section, its
+        requirement row, credits, option id and conflicting option ids
+    """
+    options = [
+        {
+            'section': section,
+            'requirement': candidate['requirement'],
+            'credits': section_credits(section),
+        }
+        for candidate in candidates
+        for section in candidate['sections']
+    ]
+    if not options:
+        return []
+
+    sections = [option['section'] for option in options]
+    rows = slot_index.rows_for(index, sections) if index is not None else None
+    if rows is None:
+        index = slot_index.build_slot_index(sections)
+        rows = np.arange(len(sections))
+    conflicts = slot_index.conflict_matrix(index, rows)
+    np.fill_diagonal(conflicts, False)
+
+    by_course: Dict[str, List[Dict[str, Any]]] = {}
+    for option_id, option in enumerate(options):
+        option['id'] = 1 << option_id
+        option['conflicts'] = sum(1 << other for other in np.flatnonzero(conflicts[option_id]).tolist())
+        by_course.setdefault(option['section']['course'], []).append(option)
+
+    return sorted(by_course.values(), key=len)
+
+
+@profiling.profiled()
+def search_schedules(
+    courses: List[List[Dict[str, Any]]],
+    min_credits: float,
+    max_credits: float
+) -> Dict[str, Any]:
+    """
+    Enumerate maximal conflict-free schedules within the credit range.
+
+    Args:
+        courses: Section options per course (see build_options)
+        min_credits: Minimum total credits
+        max_credits: Maximum total credits
+
+    Returns:
+        Dictionary with 'schedules' (lists of options) and 'exhaustive'
+        (False when a search limit was reached)
+    """
+    count = len(courses)
+    # Most credits the courses from index i onwards could still add
+    remaining = [0.0] * (count + 1)
+    for i in range(count - 1, -1, -1):
+        remaining[i] = remaining[i + 1] + max(option['credits'] for option in courses[i])
+
+    schedules: List[List[Dict[str, Any]]] = []
+    chosen: List[Dict[str, Any]] = []
+    skipped: List[int] = []
+    state = {'nodes': 0, 'exhaustive': True}
+
+    def is_maximal(taken: int, credits: float) -> bool:
+        """Check that no skipped course could still be added."""
+        for i in skipped:
+            for option in courses[i]:
+                if not option['conflicts'] & taken and credits + option['credits'] <= max_credits:
+                    return False
+        return True
+
+    def visit(i: int, taken: int, credits: float) -> None:
+        state['nodes'] += 1
+        if state['nodes'] > MAX_SEARCH_NODES or len(schedules) >= MAX_SOLUTIONS:
+            state['exhaustive'] = False
+            return
+        if credits + remaining[i] < min_credits:
+            return
+
+        if i == count:
+            if chosen and is_maximal(taken, credits):
+                schedules.append(list(chosen))
+            return
+
+        for option in courses[i]:
+            if option['conflicts'] & taken or credits + option['credits'] > max_credits:
+                continue
+            chosen.append(option)
+            visit(i + 1, taken | option['id'], credits + option['credits'])
+            chosen.pop()
+
+        skipped.append(i)
+        visit(i + 1, taken, credits)
+        skipped.pop()
+
+    visit(0, 0, 0.0)
+    return {'schedules': schedules, 'exhaustive': state['exhaustive'], 'nodes': state['nodes']}
+
+
+def daily_minutes(schedule: List[Dict[str, Any]]) -> List[int]:
+    """Get the class minutes on each weekday (Monday-Friday)."""
+    minutes = [0] * WEEKDAYS
+    for option in schedule:
+        for meeting in option['section']['meetings']:
+            for day in meeting['days']:
+                if day < WEEKDAYS:
+                    minutes[day] += meeting['end'] - meeting['start']
+    return minutes
+
+
+def gap_minutes(schedule: List[Dict[str, Any]]) -> int:
+    """Get the total idle time between consecutive classes on the same day."""
+    by_day: Dict[int, List[tuple]] = {}
+    for option in schedule:
+        for meeting in option['section']['meetings']:
+            for day in meeting['days']:
+                by_day.setdefault(day, []).append((meeting['start'], meeting['end']))
+
+    total = 0
+    for meetings in by_day.values():
+        meetings.sort()
+        for (_, previous_end), (start, _) in zip(meetings, meetings[1:]):
+            total += max(0, start - previous_end)
+    return total
+
+
+def rank_key(schedule: List[Dict[str, Any]]) -> tuple:
+    """
+    Sort key for schedules (best first).
+
+    More required courses, then more credits, then the most even spread of
+    class time across weekdays, then the fewest idle gaps between classes.
+    """
+    credits = sum(option['credits'] for option in schedule)
+    return (
+        -len(schedule),
+        -credits,
+        statistics.pstdev(daily_minutes(schedule)),
+        gap_minutes(schedule),
+    )
+
+
+def course_set(schedule: List[Dict[str, Any]]) -> frozenset:
+    """Get the set of course codes in a schedule."""
+    return frozenset(option['section']['course'] for option in schedule)
+
+
+def select_schedules(ranked: List[List[Dict[str, Any]]], limit: int = MAX_SCHEDULES) -> List[List[Dict[str, Any]]]:
+    """
+    Pick the recommended schedule and genuinely different alternatives.
+
+    Alternatives with a different set of courses are preferred; different
+    sections of the same courses are only used to fill the remaining slots.
+
+    Args:
+        ranked: Schedules sorted best first
+        limit: Maximum number of schedules to return
+
+    Returns:
+        Selected schedules, best first
+    """
+    if not ranked:
+        return []
+
+    selected = [ranked[0]]
+    seen_courses = {course_set(ranked[0])}
+    for schedule in ranked[1:]:
+        if len(selected) >= limit:
+            break
+        if course_set(schedule) not in seen_courses:
+            selected.append(schedule)
+            seen_courses.add(course_set(schedule))
+
+    for schedule in ranked[1:]:
+        if len(selected) >= limit:
+            break
+        if schedule not in selected:
+            selected.append(schedule)
+
+    return selected
+
+
+def format_schedule_table(schedule: List[Dict[str, Any]]) -> str:
+    """
+    Format a schedule as the markdown table the results view expects.
+
+    Args:
+        schedule: Selected options
+
+    Returns:
+        Markdown table
+    """
+    lines = [TABLE_HEADER, TABLE_DIVIDER]
+    for option in sorted(schedule, key=lambda o: o['section']['course']):
+        section = option['section']
+        title = section['title'] or option['requirement']['title']
+        lines.append(
+            f"| {section['course']}-{section['section']} | {title} | {option['credits']:g} | "
+            f"{schedule_matcher.format_meetings(section)} | {section['instructor'] or 'TBA'} |"
+        )
+    return "\n".join(lines)
+
+
+def describe_days(schedule: List[Dict[str, Any]]) -> str:
+    """Describe which weekdays have classes, e.g. "Monday through Thursday"."""
+    names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+    days = [names[day] for day, minutes in enumerate(daily_minutes(schedule)) if minutes]
+    if not days:
+        return "online or at arranged times only"
+    if len(days) == 1:
+        return f"on {days[0]} only"
+    return "on " + ", ".join(days[:-1]) + f" and {days[-1]}"
+
+
+def explain_recommended(
+    schedule: List[Dict[str, Any]],
+    offered: int,
+    found: int,
+    semester: str,
+    year: int
+) -> str:
+    """Write the explanation shown above the recommended schedule."""
+    credits = sum(option['credits'] for option in schedule)
+    if found > 1:
+        spread = (f"with the most even spread of class time across the week among the "
+                  f"{found} conflict-free options found")
+    else:
+        spread = "and it is the only conflict-free combination of these courses"
+    return (
+        f"This schedule fits {len(schedule)} of the {offered} required courses offered in "
+        f"{semester} {year} into {credits:g} credits with no time conflicts. "
+        f"Classes meet {describe_days(schedule)}, {spread}."
+    )
+
+
+def explain_alternative(schedule: List[Dict[str, Any]], recommended: List[Dict[str, Any]]) -> str:
+    """Write the explanation of how an alternative differs from the recommendation."""
+    ours = {option['section']['course']: option['section']['section'] for option in schedule}
+    theirs = {option['section']['course']: option['section']['section'] for option in recommended}
+
+    differences = []
+    added = sorted(set(ours) - set(theirs))
+    dropped = sorted(set(theirs) - set(ours))
+    changed = sorted(course for course in set(ours) & set(theirs) if ours[course] != theirs[course])
+    if added:
+        differences.append(f"adds {', '.join(added)}")
+    if dropped:
+        differences.append(f"drops {', '.join(dropped)}")
+    if changed:
+        differences.append(f"uses different sections of {', '.join(changed)}")
+
+    credits = sum(option['credits'] for option in schedule)
+    return (
+        f"Compared with the recommended schedule, this option {'; '.join(differences)}. "
+        f"It totals {credits:g} credits, meets {describe_days(schedule)} and has no time conflicts."
+    )
+
+
+def format_section_text(explanation: str, schedule: List[Dict[str, Any]]) -> str:
+    """Combine an explanation and its table as stored in the results."""
+    return f"{explanation}\n\n{format_schedule_table(schedule)}"
+
+
+@profiling.profiled()
+def plan_schedules(
+    progress: Optional[Dict[str, Any]],
+    schedule: Optional[Dict[str, Any]],
+    min_credits: float,
+    max_credits: float,
+    semester: str,
+    year: int
+) -> Optional[Dict[str, str]]:
+    """
+    Build the student's schedule options locally.
+
+    Args:
+        progress: Result of pdf_extract.extract_progress
+        schedule: Result of pdf_extract.extract_schedule
+        min_credits: Minimum credits per schedule
+        max_credits: Maximum credits per schedule
+        semester: Semester of the schedule
+        year: Year of the schedule
+
+    Returns:
+        Dictionary with 'recommended', 'alternative1', 'alternative2' (result
+        texts, empty when not available) and 'summary' (schedule text for the
+        email prompt), or None when the model has to build the schedules
+    """
+    if not local_solver_enabled() or not progress or not progress['not_satisfied'] or not schedule:
+        return None
+
+    match = schedule_matcher.match_requirements(
+        progress['not_satisfied'], schedule_matcher.get_section_index(schedule)
+    )
+    courses = build_options(match['candidates'], slot_index.get_slot_index(schedule))
+    if not courses:
+        return None
+
+    result = search_schedules(courses, min_credits, max_credits)
+    below_minimum = False
+    if not result['schedules']:
+        # Not enough required credits are offered to reach the minimum;
+        # schedule as many of them as fit
+        result = search_schedules(courses, 0, max_credits)
+        below_minimum = True
+    if not result['schedules']:
+        return None
+
+    ranked = sorted(result['schedules'], key=rank_key)
+    selected = select_schedules(ranked)
+    logger.info(f"Solved {semester} {year} schedules: {len(result['schedules'])} found, "
+                f"{result['nodes']} nodes, exhaustive={result['exhaustive']}")
+
+    recommended = selected[0]
+    texts = [explain_recommended(recommended, len(courses), len(ranked), semester, year)]
+    texts += [explain_alternative(alternative, recommended) for alternative in selected[1:]]
+    sections = [format_section_text(text, schedule) for text, schedule in zip(texts, selected)]
+    sections += [""] * (MAX_SCHEDULES - len(sections))
+
+    considerations = []
+    if match['unavailable']:
+        considerations.append(
+            f"Not offered in {semester} {year}: {', '.join(row['course'] for row in match['unavailable'])}"
+        )
+    unscheduled = sorted(
+        {options[0]['section']['course'] for options in courses} - course_set(recommended)
+    )
+    if unscheduled:
+        considerations.append(
+            f"Offered but not in the recommended schedule (time conflict or credit limit): "
+            f"{', '.join(unscheduled)}"
+        )
+    if below_minimum:
+        considerations.append(
+            f"Only {sum(option['credits'] for option in recommended):g} credits of required courses "
+            f"can be scheduled, below the {min_credits:g}-credit minimum"
+        )
+
+    labels = ["RECOMMENDED SCHEDULE", "ALTERNATIVE SCHEDULE 1", "ALTERNATIVE SCHEDULE 2"]
+    summary = [f"SCHEDULE OPTIONS FOR {semester} {year} (already built from the class schedule, conflict-free):"]
+    for label, text in zip(labels, sections):
+        if text:
+            summary.append(f"\n{label}:\n{text}")
+    if considerations:
+        summary.append("\nCONSIDERATIONS:")
+        summary.extend(f"- {item}" for item in considerations)
+
+    return {
+        'recommended': sections[0],
+        'alternative1': sections[1],
+        'alternative2': sections[2],
+        'summary': "\n".join(summary),
+    }
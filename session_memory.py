@@ -0,0 +1,463 @@
+"""
+Session Memory for AdviseMe
+
+This module accounts for the memory held in Streamlit session state and keeps
+the process within a budget, so a spike of concurrent sessions cannot grow
+the process until the task is killed.
+
+Every rerun measures the bytes held per session and per key (see
+metrics.estimate_size). When the total over all sessions exceeds the budget,
+large values (the stored schedule PDF and the generated results) are spilled
+to disk, least recently used sessions first, and replaced in their session
+state by a small SpilledValue placeholder. A session's spilled values are
+loaded back at the start of its next rerun (or fragment rerun), so the rest
+of the app never sees a placeholder.
+
+- ADVISEME_SESSION_MEMORY_MB: budget for all sessions in the process
+  (default 256)
+- ADVISEME_SPILL_MIN_KB: smallest value worth spilling (default 16)
+- ADVISEME_SPILL_DIR: parent directory of the per-process spill directory
+  (default: the system temp directory); the spill directory is removed
+  when the process exits
+- ADVISEME_SESSION_SPILL: spill over budget - "on" (default) or "off"
+  (accounting only)
+
+Spilled values are content-addressed, so a schedule PDF shared by many
+sessions is written once.
+"""
+
+import atexit
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Any, Iterator, NamedTuple, Optional
+
+import metrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET_MB = 256
+DEFAULT_SPILL_MIN_KB = 16
+PICKLE_PROTOCOL = 5
+
+# Session state keys whose values may be spilled (never widget keys)
+SPILLABLE_KEYS = (
+    'stored_schedule_file',
+    'email_content',
+    'recommended_schedule',
+    'alternative1_schedule',
+    'alternative2_schedule',
+)
+
+# Bytes charged for a placeholder left in session state
+PLACEHOLDER_BYTES = 128
+
+
+class SpilledValue(NamedTuple):
+    """Placeholder for a session state value stored on disk."""
+    digest: str
+    nbytes: int
+    path: str
+
+
+class _SessionEntry:
+    """Accounting of one session."""
+
+    def __init__(self):
+        self.state_ref: Optional[weakref.ref] = None
+        self.key_bytes: Dict[str, int] = {}
+        self.spilled: Dict[str, SpilledValue] = {}
+        self.running = False
+        self.last_access = time.monotonic()
+
+
+_lock = threading.RLock()
+_sessions: "OrderedDict[str, _SessionEntry]" = OrderedDict()
+_spill_refs: Dict[str, int] = {}
+_spill_dir: Optional[str] = None
+_stats = {'spills': 0, 'spilled_bytes': 0, 'rehydrations': 0, 'lost': 0}
+
+SPILLS = metrics.counter("adviseme_session_spills_total", "Session state values spilled to disk.")
+REHYDRATIONS = metrics.counter("adviseme_session_rehydrations_total", "Spilled session state values loaded back.")
+SPILLED_BYTES = metrics.gauge("adviseme_session_spilled_bytes", "Bytes of session state currently spilled to disk.")
+SPILLED_BYTES.set_function(lambda: _stats['spilled_bytes'])
+
+
+def get_budget() -> int:
+    """Get the session memory budget in bytes (ADVISEME_SESSION_MEMORY_MB)."""
+    try:
+        megabytes = float(os.getenv("ADVISEME_SESSION_MEMORY_MB", DEFAULT_BUDGET_MB))
+    except ValueError:
+        logger.warning("Invalid ADVISEME_SESSION_MEMORY_MB, using default")
+        megabytes = DEFAULT_BUDGET_MB
+    return int(megabytes * 1024 * 1024)
+
+
+def get_spill_min_bytes() -> int:
+    """Get the smallest value size worth spilling (ADVISEME_SPILL_MIN_KB)."""
+    try:
+        kilobytes = float(os.getenv("ADVISEME_SPILL_MIN_KB", DEFAULT_SPILL_MIN_KB))
+    except ValueError:
+        logger.warning("Invalid ADVISEME_SPILL_MIN_KB, using default")
+        kilobytes = DEFAULT_SPILL_MIN_KB
+    return int(kilobytes * 1024)
+
+
+def spill_enabled() -> bool:
+    """Check whether values are spilled over budget (ADVISEME_SESSION_SPILL)."""
+    return os.getenv("ADVISEME_SESSION_SPILL", "on").strip().lower() not in ("off", "false", "0")
+
+
+def _state_items(state: Any) -> Dict[str, Any]:
+    """Get the user-visible key/value pairs of a session state."""
+    if hasattr(type(state), 'filtered_state'):
+        # A property on SafeSessionState, a method on SessionState
+        items = state.filtered_state
+        return items() if callable(items) else items
+    if hasattr(state, 'to_dict'):
+        return state.to_dict()
+    return dict(state)
+
+
+def measure(state: Any) -> Dict[str, int]:
+    """
+    Measure the bytes held per session state key.
+
+    Args:
+        state: Session state (SafeSessionState, st.session_state or a dict)
+
+    Returns:
+        Dictionary of key -> estimated bytes (placeholders count as
+        PLACEHOLDER_BYTES)
+    """
+    sizes = {}
+    for key, value in _state_items(state).items():
+        if isinstance(value, SpilledValue):
+            sizes[key] = PLACEHOLDER_BYTES
+        else:
+            sizes[key] = metrics.estimate_size(value)
+    return sizes
+
+
+def _get_spill_dir() -> str:
+    """Create the per-process spill directory on first use."""
+    global _spill_dir
+    if _spill_dir is None:
+        parent = os.getenv("ADVISEME_SPILL_DIR") or None
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        _spill_dir = tempfile.mkdtemp(prefix=f"adviseme-spill-{os.getpid()}-", dir=parent)
+        atexit.register(shutil.rmtree, _spill_dir, True)
+    return _spill_dir
+
+
+def spill_value(value: Any) -> SpilledValue:
+    """
+    Write a value to the spill directory.
+
+    Args:
+        value: Session state value
+
+    Returns:
+        Placeholder to store in session state instead
+
+    Raises:
+        OSError: If the value could not be written
+    """
+    data = pickle.dumps(value, protocol=PICKLE_PROTOCOL)
+    digest = hashlib.sha256(data).hexdigest()
+    with _lock:
+        path = os.path.join(_get_spill_dir(), digest)
+        if not _spill_refs.get(digest):
+            tmp_path = f"{path}.tmp{threading.get_ident()}"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            _stats['spilled_bytes'] += len(data)
+        _spill_refs[digest] = _spill_refs.get(digest, 0) + 1
+        _stats['spills'] += 1
+    SPILLS.inc()
+    return SpilledValue(digest=digest, nbytes=len(data), path=path)
+
+
+def _release(spilled: SpilledValue) -> None:
+    """Drop one reference to a spilled value, deleting its file with the last."""
+    with _lock:
+        refs = _spill_refs.get(spilled.digest, 0) - 1
+        if refs > 0:
+            _spill_refs[spilled.digest] = refs
+            return
+        _spill_refs.pop(spilled.digest, None)
+        _stats['spilled_bytes'] -= spilled.nbytes
+        try:
+            os.remove(spilled.path)
+        except OSError:
+            pass
+
+
+def load_value(spilled: SpilledValue) -> Any:
+    """
+    Read a spilled value back and release its file reference.
+
+    Args:
+        spilled: Placeholder returned by spill_value
+
+    Returns:
+        The original value
+
+    Raises:
+        OSError: If the spill file is missing or unreadable
+    """
+    with open(spilled.path, "rb") as f:
+        value = pickle.loads(f.read())
+    _release(spilled)
+    with _lock:
+        _stats['rehydrations'] += 1
+    REHYDRATIONS.inc()
+    return value
+
+
+def rehydrate(state: Any) -> int:
+    """
+    Load a session's spilled values back into its session state.
+
+    A value whose spill file cannot be read is removed from session state
+    (the professor re-uploads or regenerates) instead of failing the rerun.
+
+    Args:
+        state: Session state
+
+    Returns:
+        Number of values loaded back
+    """
+    loaded = 0
+    for key in SPILLABLE_KEYS:
+        if key not in state:
+            continue
+        spilled = state[key]
+        if not isinstance(spilled, SpilledValue):
+            continue
+        try:
+            state[key] = load_value(spilled)
+            loaded += 1
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            logger.error(f"Could not load spilled session value '{key}': {e}")
+            del state[key]
+            _release(spilled)
+            with _lock:
+                _stats['lost'] += 1
+    return loaded
+
+
+def begin_rerun(session_id: Optional[str], state: Any) -> int:
+    """
+    Mark a session as running and load its spilled values back.
+
+    While a session is running its values are never spilled.
+
+    Args:
+        session_id: Streamlit session id
+        state: The session's state
+
+    Returns:
+        Number of values loaded back
+    """
+    if session_id:
+        with _lock:
+            entry = _sessions.pop(session_id, None) or _SessionEntry()
+            entry.running = True
+            entry.last_access = time.monotonic()
+            entry.spilled.clear()
+            _sessions[session_id] = entry
+    return rehydrate(state)
+
+
+@contextmanager
+def fragment_rerun(session_id: Optional[str], state: Any) -> Iterator[None]:
+    """
+    Run a fragment of a session's script with its spilled values loaded.
+
+    A fragment rerun skips begin_rerun and end_rerun at the top and bottom of
+    the script, so the session is marked running here for the duration of
+    the fragment (unless it is already inside a full rerun) and measured
+    afterwards.
+
+    Args:
+        session_id: Streamlit session id
+        state: The session's state
+    """
+    started = False
+    if session_id:
+        with _lock:
+            entry = _sessions.get(session_id)
+            if entry is not None:
+                # rehydrate releases these references
+                entry.spilled.clear()
+                if not entry.running:
+                    entry.running = True
+                    entry.last_access = time.monotonic()
+                    _sessions.move_to_end(session_id)
+                    started = True
+    try:
+        rehydrate(state)
+        yield
+    finally:
+        if started:
+            end_rerun(session_id, state)
+
+
+def end_rerun(session_id: Optional[str], state: Any) -> int:
+    """
+    Measure a session after its rerun and enforce the budget.
+
+    Args:
+        session_id: Streamlit session id
+        state: The session's state (SafeSessionState, so other sessions'
+            reruns can spill it safely)
+
+    Returns:
+        Estimated bytes held by the session
+    """
+    try:
+        sizes = measure(state)
+    except Exception as e:
+        logger.debug(f"Could not measure session state: {e}")
+        return 0
+    total = sum(sizes.values())
+    if not session_id:
+        return total
+
+    with _lock:
+        entry = _sessions.pop(session_id, None) or _SessionEntry()
+        try:
+            entry.state_ref = weakref.ref(state)
+        except TypeError:
+            entry.state_ref = None
+        entry.key_bytes = sizes
+        entry.running = False
+        entry.last_access = time.monotonic()
+        _sessions[session_id] = entry
+    if spill_enabled():
+        enforce_budget()
+    return total
+
+
+def total_bytes() -> int:
+    """Get the bytes held by all tracked sessions."""
+    with _lock:
+        return sum(sum(entry.key_bytes.values()) for entry in _sessions.values())
+
+
+def _spill_session(entry: _SessionEntry, state: Any, min_bytes: int, excess: int) -> int:
+    """Spill a session's large values until excess bytes are freed."""
+    freed = 0
+    for key in SPILLABLE_KEYS:
+        if freed >= excess:
+            break
+        size = entry.key_bytes.get(key, 0)
+        if size < min_bytes or key not in state:
+            continue
+        value = state[key]
+        if isinstance(value, SpilledValue):
+            continue
+        try:
+            state[key] = spill_value(value)
+        except OSError as e:
+            logger.warning(f"Could not spill session value '{key}': {e}")
+            return freed
+        entry.spilled[key] = state[key]
+        entry.key_bytes[key] = PLACEHOLDER_BYTES
+        freed += size - PLACEHOLDER_BYTES
+    return freed
+
+
+def enforce_budget() -> int:
+    """
+    Spill large values of idle sessions, least recently used first, until
+    the process is within budget.
+
+    Returns:
+        Bytes freed
+    """
+    budget = get_budget()
+    min_bytes = get_spill_min_bytes()
+    freed = 0
+    with _lock:
+        excess = sum(sum(entry.key_bytes.values()) for entry in _sessions.values()) - budget
+        if excess <= 0:
+            return 0
+        for session_id, entry in list(_sessions.items()):
+            if freed >= excess:
+                break
+            state = entry.state_ref() if entry.state_ref else None
+            if state is None:
+                # Closed session: forget it
+                freed += sum(entry.key_bytes.values())
+                _forget(session_id)
+                continue
+            if entry.running:
+                continue
+            freed += _spill_session(entry, state, min_bytes, excess - freed)
+    if freed:
+        logger.info(f"Session memory over budget by {excess} bytes; freed {freed} bytes")
+    if freed < excess:
+        logger.warning(f"Session memory still {excess - freed} bytes over budget after spilling")
+    return freed
+
+
+def _forget(session_id: Optional[str]) -> None:
+    """Drop a session's entry and its spill file references."""
+    with _lock:
+        entry = _sessions.pop(session_id, None)
+        if entry is not None:
+            for spilled in entry.spilled.values():
+                _release(spilled)
+
+
+def get_memory_stats(top_keys: int = 10) -> Dict[str, Any]:
+    """
+    Get session memory statistics.
+
+    Args:
+        top_keys: Number of keys to report
+
+    Returns:
+        Dictionary with sessions, total_bytes, budget, spilled_bytes, spills,
+        rehydrations, lost, and the keys holding the most bytes over all
+        sessions
+    """
+    with _lock:
+        per_key: Dict[str, int] = {}
+        for entry in _sessions.values():
+            for key, nbytes in entry.key_bytes.items():
+                per_key[key] = per_key.get(key, 0) + nbytes
+        stats = dict(_stats)
+        stats['sessions'] = len(_sessions)
+    keys: List[Dict[str, Any]] = [
+        {'key': key, 'bytes': nbytes}
+        for key, nbytes in sorted(per_key.items(), key=lambda item: item[1], reverse=True)[:top_keys]
+    ]
+    stats.update(total_bytes=sum(per_key.values()), budget=get_budget(), keys=keys)
+    return stats
+
+
+def reset() -> None:
+    """Forget every session and delete spilled files (for tests)."""
+    global _spill_dir
+    with _lock:
+        _sessions.clear()
+        _spill_refs.clear()
+        _stats.update(spills=0, spilled_bytes=0, rehydrations=0, lost=0)
+        if _spill_dir is not None:
+            shutil.rmtree(_spill_dir, ignore_errors=True)
+            _spill_dir = None
@@ -0,0 +1,567 @@
+"""
+Session Store for AdviseMe
+
+This module keeps the state that must survive a reconnect to another replica
+in a store shared by every process: login failure counters and lockouts, the
+stored class schedule and the latest generated results of each professor.
+Streamlit session state stays the working copy; the store is written when
+that state changes and read when a new session (e.g. one restored from a
+session token on another replica) does not have it yet.
+
+Backends (ADVISEME_SESSION_STORE):
+- "memory" (default): a dictionary shared by the sessions of one process,
+  capped at ADVISEME_SESSION_STORE_MEMORY_MB (default 64); least recently
+  used large entries are evicted first, and expired entries are purged as
+  entries are written
+- "sqlite": a SQLite file (ADVISEME_SESSION_STORE_PATH, default
+  session_store.db next to the app), shared by processes that mount it
+- "redis://..." or "rediss://...": a Redis (or Redis-compatible) server,
+  shared by every replica; needs the redis package
+
+Values are pickled in the SQLite and Redis backends, so the store must only
+be writable by the app. Every entry has a time to live. Errors of a shared
+backend are logged and treated as a miss, so an outage falls back to
+per-session state instead of breaking the app.
+
+share_keys stores large bytes values (the schedule PDF) once under their
+content hash, and the shared entry only references the hash, so the same
+schedule shared by many professors is stored once.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Any, NamedTuple, Optional, Tuple
+
+import metrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MEMORY = "memory"
+SQLITE = "sqlite"
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "session_store.db")
+PICKLE_PROTOCOL = 5
+
+# Prefix of every key in a shared Redis server
+KEY_PREFIX = "adviseme:"
+
+# Shared state lives as long as a login
+DEFAULT_TTL_SECONDS = 8 * 60 * 60
+
+# Expired SQLite rows and memory entries are purged every this many writes
+PURGE_EVERY_WRITES = 100
+
+DEFAULT_MEMORY_MB = 64
+# Memory entries up to this size (counters, lockouts, logout times) are only
+# evicted when no larger entry is left
+SMALL_ENTRY_BYTES = 4096
+
+# share_keys stores bytes values at least this large by content hash
+BLOB_MIN_BYTES = 64 * 1024
+
+_store_lock = threading.Lock()
+_store: Optional["SessionStore"] = None
+
+
+class SessionStore:
+    """Key-value store with per-entry expiry."""
+
+    name = "base"
+
+    def get(self, key: str) -> Any:
+        """
+        Get a value.
+
+        Args:
+            key: Entry key
+
+        Returns:
+            The value, or None if missing or expired
+        """
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = DEFAULT_TTL_SECONDS) -> None:
+        """
+        Store a value.
+
+        Args:
+            key: Entry key
+            value: Picklable value
+            ttl: Seconds until the entry expires (None keeps it)
+        """
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Remove an entry (missing keys are ignored)."""
+        raise NotImplementedError
+
+    def incr(self, key: str, ttl: Optional[float] = DEFAULT_TTL_SECONDS) -> int:
+        """
+        Atomically increment a counter.
+
+        Counters are only read through incr; the time to live is set when the
+        counter is created.
+
+        Args:
+            key: Counter key
+            ttl: Seconds until a new counter expires
+
+        Returns:
+            The new count
+        """
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        raise NotImplementedError
+
+
+def _expires_at(ttl: Optional[float]) -> Optional[float]:
+    """Absolute expiry time of a new entry."""
+    return time.time() + ttl if ttl is not None else None
+
+
+def get_memory_limit() -> int:
+    """Get the memory store's size cap in bytes (ADVISEME_SESSION_STORE_MEMORY_MB)."""
+    try:
+        megabytes = float(os.getenv("ADVISEME_SESSION_STORE_MEMORY_MB", DEFAULT_MEMORY_MB))
+    except ValueError:
+        logger.warning("Invalid ADVISEME_SESSION_STORE_MEMORY_MB, using default")
+        megabytes = DEFAULT_MEMORY_MB
+    return int(megabytes * 1024 * 1024)
+
+
+class _MemoryEntry(NamedTuple):
+    """Value of a memory store entry with its expiry and estimated size."""
+    value: Any
+    expires_at: Optional[float]
+    nbytes: int
+
+
+class MemoryStore(SessionStore):
+    """
+    Store shared by the sessions of one process. Values are not copied.
+
+    The entries are capped at max_bytes (estimated with
+    metrics.estimate_size). Over the cap, least recently used entries are
+    evicted, larger than SMALL_ENTRY_BYTES first; a single value over the
+    cap is not stored.
+    """
+
+    name = MEMORY
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else get_memory_limit()
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _MemoryEntry]" = OrderedDict()
+        self._bytes = 0
+        self._writes = 0
+
+    def _live(self, key: str) -> Optional[_MemoryEntry]:
+        """Get an entry and mark it used, dropping it if expired (caller holds the lock)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at is not None and entry.expires_at <= time.time():
+            self._pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _pop(self, key: str) -> None:
+        """Remove an entry if present (caller holds the lock)."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+
+    def _put(self, key: str, entry: _MemoryEntry) -> None:
+        """Store an entry as the most recently used, then purge and evict (caller holds the lock)."""
+        self._pop(key)
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        self._writes += 1
+        if self._writes % PURGE_EVERY_WRITES == 0 or self._bytes > self.max_bytes:
+            self._purge()
+        while self._bytes > self.max_bytes:
+            victim = next((name for name, other in self._entries.items() if other.nbytes > SMALL_ENTRY_BYTES),
+                          next(iter(self._entries)))
+            logger.debug(f"Session store memory full, evicting {victim}")
+            self._pop(victim)
+
+    def _purge(self) -> None:
+        """Drop every expired entry (caller holds the lock)."""
+        now = time.time()
+        expired = [key for key, entry in self._entries.items()
+                   if entry.expires_at is not None and entry.expires_at <= now]
+        for key in expired:
+            self._pop(key)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._live(key)
+        return entry.value if entry is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = DEFAULT_TTL_SECONDS) -> None:
+        nbytes = metrics.estimate_size(key) + metrics.estimate_size(value)
+        with self._lock:
+            if nbytes > self.max_bytes:
+                self._pop(key)
+                logger.warning(f"Session store value for {key} ({nbytes} bytes) exceeds the memory cap, not stored")
+                return
+            self._put(key, _MemoryEntry(value, _expires_at(ttl), nbytes))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def incr(self, key: str, ttl: Optional[float] = DEFAULT_TTL_SECONDS) -> int:
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                self._put(key, _MemoryEntry(1, _expires_at(ttl), metrics.estimate_size(key) + 8))
+                return 1
+            count = entry.value + 1
+            self._entries[key] = entry._replace(value=count)
+            return count
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def size_bytes(self) -> int:
+        """Estimated bytes held by the entries."""
+        with self._lock:
+            return self._bytes
+
+
+class SQLiteStore(SessionStore):
+    """Store in a SQLite file, shared by the processes that can open it."""
+
+    name = SQLITE
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writes = 0
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS session_store (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    expires_at REAL
+                )
+            """)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection (autocommit; transactions are explicit)."""
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def _purge(self, conn: sqlite3.Connection) -> None:
+        """Delete expired rows every PURGE_EVERY_WRITES writes."""
+        self._writes += 1
+        if self._writes % PURGE_EVERY_WRITES == 0:
+            conn.execute("DELETE FROM session_store WHERE expires_at <= ?", (time.time(),))
+
+    def get(self, key: str) -> Any:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value FROM session_store WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+        finally:
+            conn.close()
+        return pickle.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = DEFAULT_TTL_SECONDS) -> None:
+        data = pickle.dumps(value, protocol=PICKLE_PROTOCOL)
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO session_store (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, data, _expires_at(ttl)),
+            )
+            self._purge(conn)
+        finally:
+            conn.close()
+
+    def delete(self, key: str) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM session_store WHERE key = ?", (key,))
+        finally:
+            conn.close()
+
+    def incr(self, key: str, ttl: Optional[float] = DEFAULT_TTL_SECONDS) -> int:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT value FROM session_store WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                count, expires_at = 1, _expires_at(ttl)
+                conn.execute(
+                    "INSERT OR REPLACE INTO session_store (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, pickle.dumps(count, protocol=PICKLE_PROTOCOL), expires_at),
+                )
+            else:
+                count = pickle.loads(row[0]) + 1
+                conn.execute(
+                    "UPDATE session_store SET value = ? WHERE key = ?",
+                    (pickle.dumps(count, protocol=PICKLE_PROTOCOL), key),
+                )
+            conn.execute("COMMIT")
+            return count
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def clear(self) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM session_store")
+        finally:
+            conn.close()
+
+
+class RedisStore(SessionStore):
+    """Store in a Redis (or Redis-compatible) server, shared by every replica."""
+
+    name = "redis"
+
+    def __init__(self, url: Optional[str] = None, client: Any = None):
+        """
+        Args:
+            url: Server URL (redis://host:port/db)
+            client: Client to use instead of connecting to url (any object
+                with the redis-py get/set/delete/incr/pexpire/scan_iter API)
+        """
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+
+    def get(self, key: str) -> Any:
+        data = self.client.get(KEY_PREFIX + key)
+        return pickle.loads(data) if data is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = DEFAULT_TTL_SECONDS) -> None:
+        px = max(1, int(ttl * 1000)) if ttl is not None else None
+        self.client.set(KEY_PREFIX + key, pickle.dumps(value, protocol=PICKLE_PROTOCOL), px=px)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(KEY_PREFIX + key)
+
+    def incr(self, key: str, ttl: Optional[float] = DEFAULT_TTL_SECONDS) -> int:
+        count = int(self.client.incr(KEY_PREFIX + key))
+        if count == 1 and ttl is not None:
+            self.client.pexpire(KEY_PREFIX + key, max(1, int(ttl * 1000)))
+        return count
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match=KEY_PREFIX + "*"):
+            self.client.delete(key)
+
+
+def create_store(spec: Optional[str] = None) -> SessionStore:
+    """
+    Create the store named by spec.
+
+    Args:
+        spec: "memory", "sqlite" or a Redis URL (defaults to
+            ADVISEME_SESSION_STORE)
+
+    Returns:
+        The store
+
+    Raises:
+        ValueError: If spec names no known backend
+    """
+    spec = (spec if spec is not None else os.getenv("ADVISEME_SESSION_STORE", MEMORY)).strip()
+    if spec.lower() in ("", MEMORY):
+        return MemoryStore()
+    if spec.lower() == SQLITE:
+        return SQLiteStore(os.getenv("ADVISEME_SESSION_STORE_PATH") or DEFAULT_SQLITE_PATH)
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore(url=spec)
+    raise ValueError(f"Unknown session store: {spec}")
+
+
+def get_store() -> SessionStore:
+    """
+    Get the process-wide store, created on first use.
+
+    A store that cannot be created (unknown backend, redis package missing)
+    is replaced by a MemoryStore.
+
+    Returns:
+        The store
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = create_store()
+            except Exception as e:
+                logger.error(f"Could not create session store, using memory: {e}")
+                _store = MemoryStore()
+            logger.info(f"Session store: {_store.name}")
+        return _store
+
+
+def set_store(store: Optional[SessionStore]) -> None:
+    """Use store as the process-wide store (None recreates it from the environment)."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def load(key: str) -> Any:
+    """
+    Get a value from the store, treating backend errors as a miss.
+
+    Args:
+        key: Entry key
+
+    Returns:
+        The value, or None
+    """
+    try:
+        return get_store().get(key)
+    except Exception as e:
+        logger.warning(f"Session store read failed for {key}: {e}")
+        return None
+
+
+def save(key: str, value: Any, ttl: Optional[float] = DEFAULT_TTL_SECONDS) -> bool:
+    """
+    Store a value, logging backend errors.
+
+    Args:
+        key: Entry key
+        value: Picklable value
+        ttl: Seconds until the entry expires
+
+    Returns:
+        True if the value was stored
+    """
+    try:
+        get_store().set(key, value, ttl)
+        return True
+    except Exception as e:
+        logger.warning(f"Session store write failed for {key}: {e}")
+        return False
+
+
+def remove(key: str) -> None:
+    """Remove an entry, logging backend errors."""
+    try:
+        get_store().delete(key)
+    except Exception as e:
+        logger.warning(f"Session store delete failed for {key}: {e}")
+
+
+def increment(key: str, ttl: Optional[float] = DEFAULT_TTL_SECONDS) -> int:
+    """
+    Increment a counter, logging backend errors.
+
+    Args:
+        key: Counter key
+        ttl: Seconds until a new counter expires
+
+    Returns:
+        The new count, or 0 if the backend failed
+    """
+    try:
+        return get_store().incr(key, ttl)
+    except Exception as e:
+        logger.warning(f"Session store increment failed for {key}: {e}")
+        return 0
+
+
+class BlobRef(NamedTuple):
+    """Reference in a shared entry to bytes stored under "blob:<digest>"."""
+    digest: str
+    nbytes: int
+
+
+def share_keys(key: str, state: Any, keys: Iterable[str], ttl: Optional[float] = DEFAULT_TTL_SECONDS) -> bool:
+    """
+    Store some session state keys under one entry.
+
+    Bytes values of at least BLOB_MIN_BYTES are stored once under their
+    SHA-256 digest and referenced from the entry by a BlobRef.
+
+    Args:
+        key: Entry key (e.g. "schedule:<professor_id>")
+        state: st.session_state
+        keys: Session state keys to store (missing keys are skipped)
+        ttl: Seconds until the entry expires
+
+    Returns:
+        True if the entry was stored
+    """
+    values = {}
+    for name in keys:
+        if name not in state:
+            continue
+        value = state[name]
+        if isinstance(value, (bytes, bytearray)) and len(value) >= BLOB_MIN_BYTES:
+            ref = BlobRef(hashlib.sha256(value).hexdigest(), len(value))
+            if not save(f"blob:{ref.digest}", bytes(value), ttl):
+                return False
+            value = ref
+        values[name] = value
+    return save(key, values, ttl)
+
+
+def restore_keys(key: str, state: Any, keys: Iterable[str]) -> bool:
+    """
+    Copy keys stored with share_keys into session state if it lacks them.
+
+    An entry whose referenced bytes are no longer stored restores nothing.
+
+    Args:
+        key: Entry key
+        state: st.session_state
+        keys: Session state keys to restore
+
+    Returns:
+        True if anything was restored
+    """
+    keys = list(keys)
+    if all(name in state for name in keys):
+        return False
+    values = load(key)
+    if not isinstance(values, dict) or not values:
+        return False
+    values = dict(values)
+    for name, value in values.items():
+        if isinstance(value, BlobRef):
+            data = load(f"blob:{value.digest}")
+            if not isinstance(data, bytes):
+                logger.info(f"Shared value {name} of {key} is no longer stored")
+                return False
+            values[name] = data
+    restored = False
+    for name in keys:
+        if name in values and name not in state:
+            state[name] = values[name]
+            restored = True
+    return restored
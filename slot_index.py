@@ -0,0 +1,223 @@
+"""
+Slot Index for AdviseMe
+
+This module precomputes a time slot index over a course schedule so overlap
+tests between sections are vectorized bitwise operations.
+
+Each section's weekly meeting pattern is encoded as a fixed-width bitmask of
+5-minute slots over the 7 days of the week (7 * 288 = 2016 bits), packed into
+32 NumPy uint64 words. The masks of all sections in a schedule form one
+(sections x 32) array; pairwise conflicts for any candidate set are computed
+with a single broadcast AND.
+
+The index is built once per stored schedule (keyed by the schedule's file
+hash) and reused for every student; its masks are also kept in the disk
+schedule cache and memory-mapped by other processes.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+import schedule_cache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Slot layout
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DAYS_PER_WEEK = 7
+SLOTS_PER_WEEK = SLOTS_PER_DAY * DAYS_PER_WEEK
+WORD_BITS = 64
+WORDS = -(-SLOTS_PER_WEEK // WORD_BITS)
+
+INDEX_CACHE_MAX_ENTRIES = 16
+
+_index_lock = threading.Lock()
+_index_cache: "OrderedDict[str, SlotIndex]" = OrderedDict()
+
+
+class SlotIndex(NamedTuple):
+    """Packed weekly slot masks of every section in a schedule."""
+    keys: List[Tuple[str, str]]
+    masks: np.ndarray
+    position: Dict[Tuple[str, str], int]
+
+
+def section_key(section: Dict[str, Any]) -> Tuple[str, str]:
+    """Get the (course, section) key of a parsed section."""
+    return section['course'], section['section']
+
+
+def meeting_slots(days: Sequence[int], start: int, end: int) -> np.ndarray:
+    """
+    Get the weekly slot numbers a meeting occupies.
+
+    Args:
+        days: Day indexes (0 = Monday)
+        start: Start time in minutes after midnight
+        end: End time in minutes after midnight
+
+    Returns:
+        Array of slot numbers (day * SLOTS_PER_DAY + slot of the day)
+    """
+    first = start // SLOT_MINUTES
+    last = -(-end // SLOT_MINUTES)  # round up so partial slots count
+    if last <= first:
+        return np.empty(0, dtype=np.int64)
+    day_offsets = np.asarray(days, dtype=np.int64) * SLOTS_PER_DAY
+    return (day_offsets[:, None] + np.arange(first, last, dtype=np.int64)[None, :]).ravel()
+
+
+def section_slot_mask(section: Dict[str, Any]) -> np.ndarray:
+    """
+    Encode a section's weekly meetings as a packed bitmask.
+
+    Args:
+        section: Parsed schedule section
+
+    Returns:
+        uint64 array of WORDS words (all zero for sections without times)
+    """
+    slots = [meeting_slots(m['days'], m['start'], m['end']) for m in section['meetings']]
+    bits = np.zeros(WORDS * WORD_BITS, dtype=bool)
+    if slots:
+        bits[np.concatenate(slots)] = True
+    return np.packbits(bits, bitorder='little').view(np.uint64)
+
+
+def index_from_masks(sections: List[Dict[str, Any]], masks: np.ndarray) -> SlotIndex:
+    """
+    Build a slot index around precomputed masks.
+
+    Args:
+        sections: Parsed schedule sections
+        masks: One mask row per section, in the same order
+
+    Returns:
+        SlotIndex over the given masks
+    """
+    keys = [section_key(section) for section in sections]
+    position: Dict[Tuple[str, str], int] = {}
+    for row, key in enumerate(keys):
+        position.setdefault(key, row)
+    return SlotIndex(keys=keys, masks=masks, position=position)
+
+
+def build_slot_index(sections: List[Dict[str, Any]]) -> SlotIndex:
+    """
+    Build the slot index of a list of sections.
+
+    Args:
+        sections: Parsed schedule sections
+
+    Returns:
+        SlotIndex with one mask row per section, in the given order
+    """
+    masks = np.zeros((len(sections), WORDS), dtype=np.uint64)
+    for row, section in enumerate(sections):
+        masks[row] = section_slot_mask(section)
+    return index_from_masks(sections, masks)
+
+
+def get_slot_index(schedule: Dict[str, Any]) -> SlotIndex:
+    """
+    Get the slot index of a parsed schedule, building it once per file hash.
+
+    Args:
+        schedule: Result of pdf_extract.extract_schedule ('hash', 'sections')
+
+    Returns:
+        SlotIndex for the schedule's sections
+    """
+    key = schedule.get('hash')
+    with _index_lock:
+        if key is not None and key in _index_cache:
+            _index_cache.move_to_end(key)
+            return _index_cache[key]
+
+    sections = schedule['sections']
+    masks = schedule_cache.get_slot_masks(key) if key is not None else None
+    if masks is not None and masks.shape == (len(sections), WORDS):
+        index = index_from_masks(sections, masks)
+    else:
+        index = build_slot_index(sections)
+        logger.info(f"Built slot index for {len(index.keys)} sections")
+        if key is not None:
+            schedule_cache.put_slot_masks(key, index.masks)
+
+    if key is not None:
+        with _index_lock:
+            _index_cache[key] = index
+            while len(_index_cache) > INDEX_CACHE_MAX_ENTRIES:
+                _index_cache.popitem(last=False)
+    return index
+
+
+def rows_for(index: SlotIndex, sections: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+    """
+    Look up the index rows of sections.
+
+    Args:
+        index: Slot index
+        sections: Sections to look up
+
+    Returns:
+        Array of row numbers, or None if any section is not in the index
+    """
+    try:
+        return np.fromiter((index.position[section_key(s)] for s in sections), dtype=np.int64, count=len(sections))
+    except KeyError:
+        return None
+
+
+def conflict_matrix(index: SlotIndex, rows: np.ndarray) -> np.ndarray:
+    """
+    Compute pairwise conflicts for a candidate set of sections.
+
+    Args:
+        index: Slot index
+        rows: Index rows of the candidate sections
+
+    Returns:
+        (n x n) boolean matrix, True where two sections share a time slot
+        (the diagonal is True for sections with any meeting)
+    """
+    masks = index.masks[rows]
+    return np.bitwise_and(masks[:, None, :], masks[None, :, :]).any(axis=2)
+
+
+def conflicts_with(index: SlotIndex, rows: np.ndarray, taken: np.ndarray) -> np.ndarray:
+    """
+    Check candidate sections against already occupied slots.
+
+    Args:
+        index: Slot index
+        rows: Index rows of the candidate sections
+        taken: Packed mask of occupied slots (see combined_mask)
+
+    Returns:
+        Boolean array, True for each candidate that overlaps taken
+    """
+    return np.bitwise_and(index.masks[rows], taken).any(axis=1)
+
+
+def combined_mask(index: SlotIndex, rows: np.ndarray) -> np.ndarray:
+    """
+    Combine the masks of several sections.
+
+    Args:
+        index: Slot index
+        rows: Index rows of the sections
+
+    Returns:
+        Packed mask of every slot any of the sections occupies
+    """
+    if len(rows) == 0:
+        return np.zeros(WORDS, dtype=np.uint64)
+    return np.bitwise_or.reduce(index.masks[rows], axis=0)
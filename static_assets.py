@@ -0,0 +1,175 @@
+"""
+Static Assets for AdviseMe
+
+This module prepares the banner image once per process and renders it on each
+rerun with a single small markdown element.
+
+The banner is resized to its display height (at 2x for high-DPI screens) and
+re-encoded as WebP (JPEG if WebP is unavailable) into a content-hashed file in
+the ``static/`` directory, which Streamlit serves at ``app/static/`` when
+``server.enableStaticServing`` is on. Browsers then revalidate it with ETags
+instead of receiving the image on every rerun. Without static serving the
+resized bytes are kept in memory and passed to ``st.image``.
+"""
+
+import hashlib
+import io
+import logging
+import os
+from typing import Optional, Dict, Any
+
+import streamlit as st
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Banner source image and display settings
+BANNER_SOURCE = "banner.jpg"
+BANNER_DISPLAY_HEIGHT = 120  # CSS pixels
+BANNER_SCALE = 2  # Render at 2x for high-DPI screens
+
+# Directory served by Streamlit static file serving (relative to the app)
+STATIC_DIR = "static"
+STATIC_URL_PREFIX = "app/static"
+
+BANNER_CSS = f"""
+<style>
+[data-testid="stImage"] {{
+    max-height: {BANNER_DISPLAY_HEIGHT}px;
+    overflow: hidden;
+}}
+[data-testid="stImage"] img, img.adviseme-banner {{
+    object-fit: cover;
+    object-position: center;
+    width: 100%;
+    height: {BANNER_DISPLAY_HEIGHT}px;
+}}
+</style>
+"""
+
+
+def encode_banner(source_path: str, display_height: int = BANNER_DISPLAY_HEIGHT,
+                  scale: int = BANNER_SCALE) -> Optional[Dict[str, Any]]:
+    """
+    Resize the banner to its display height and re-encode it.
+
+    Args:
+        source_path: Path to the source banner image
+        display_height: Height in CSS pixels the banner is shown at
+        scale: Device pixel ratio to render for
+
+    Returns:
+        Dictionary with 'data' (bytes), 'format' and 'extension', or None if
+        the source image is missing or cannot be decoded
+    """
+    if not os.path.exists(source_path):
+        return None
+
+    try:
+        from PIL import Image, features
+
+        with Image.open(source_path) as image:
+            image = image.convert("RGB")
+            target_height = display_height * scale
+            if image.height > target_height:
+                target_width = max(1, round(image.width * target_height / image.height))
+                image = image.resize((target_width, target_height), Image.LANCZOS)
+
+            buffer = io.BytesIO()
+            if features.check("webp"):
+                image.save(buffer, format="WEBP", quality=80, method=6)
+                image_format, extension = "WEBP", "webp"
+            else:
+                image.save(buffer, format="JPEG", quality=80, optimize=True, progressive=True)
+                image_format, extension = "JPEG", "jpg"
+
+        return {'data': buffer.getvalue(), 'format': image_format, 'extension': extension}
+
+    except Exception as e:
+        logger.error(f"Failed to prepare banner image {source_path}: {e}")
+        return None
+
+
+def write_static_asset(data: bytes, stem: str, extension: str, static_dir: str = STATIC_DIR) -> str:
+    """
+    Write an asset into the static directory under a content-hashed name.
+
+    The hash in the file name means the URL changes whenever the content does,
+    so an existing file is never rewritten.
+
+    Args:
+        data: Asset bytes
+        stem: File name prefix (e.g. "banner")
+        extension: File extension without the dot
+        static_dir: Directory served as app/static
+
+    Returns:
+        File name (relative to static_dir)
+    """
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    filename = f"{stem}-{digest}.{extension}"
+    path = os.path.join(static_dir, filename)
+
+    if not os.path.exists(path):
+        os.makedirs(static_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        logger.info(f"Wrote static asset {path} ({len(data)} bytes)")
+
+    return filename
+
+
+def _static_serving_enabled() -> bool:
+    """Check whether Streamlit serves the static/ directory."""
+    try:
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+
+@st.cache_resource(show_spinner=False)
+def load_banner_asset(source_path: str = BANNER_SOURCE) -> Optional[Dict[str, Any]]:
+    """
+    Prepare the banner once per process.
+
+    Returns:
+        Dictionary with the resized 'data', and 'url' when the banner is
+        available through static serving, or None if there is no banner
+    """
+    banner = encode_banner(source_path)
+    if banner is None:
+        return None
+
+    banner['url'] = None
+    if _static_serving_enabled():
+        try:
+            filename = write_static_asset(banner['data'], "banner", banner['extension'])
+            banner['url'] = f"{STATIC_URL_PREFIX}/{filename}"
+        except OSError as e:
+            logger.warning(f"Static banner unavailable, serving inline: {e}")
+
+    logger.info(f"Banner prepared: {len(banner['data'])} bytes {banner['format']}")
+    return banner
+
+
+def banner_html(url: str) -> str:
+    """Build the markdown/HTML snippet that displays the banner from a URL."""
+    return f'{BANNER_CSS}<img class="adviseme-banner" src="{url}" alt="AdviseMe banner">'
+
+
+def render_banner(source_path: str = BANNER_SOURCE) -> None:
+    """Render the banner, or a warning if the banner image is missing."""
+    banner = load_banner_asset(source_path)
+
+    if banner is None:
+        st.warning("Banner image not found at: " + os.path.abspath(source_path))
+        return
+
+    if banner['url']:
+        st.markdown(banner_html(banner['url']), unsafe_allow_html=True)
+    else:
+        st.markdown(BANNER_CSS, unsafe_allow_html=True)
+        st.image(banner['data'], use_container_width=True)
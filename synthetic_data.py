@@ -0,0 +1,238 @@
+"""
+Script to fill a database with synthetic professors and advising sessions.
+
+Used by the database benchmarks (bench_database.py) and for load testing a
+staging environment. The data is deterministic for a given seed and shaped
+like production: professors with very different workloads, sessions spread
+over several years and emails and schedule tables of realistic length.
+
+Usage:
+    python synthetic_data.py --db bench.db [--professors 40] [--sessions 100000] [--seed 7] [--password PW]
+    python synthetic_data.py --use-database-url [...]
+
+The target database is never implied: pass an SQLite file with --db, or
+--use-database-url to fill the PostgreSQL database at DATABASE_URL. A
+database with professors that are not synthetic is refused. Synthetic
+professors cannot log in unless --password gives them a password.
+"""
+
+import argparse
+import random
+import secrets
+import sys
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+import bcrypt
+
+import database
+import postgres_backend
+
+DEFAULT_PROFESSORS = 40
+DEFAULT_SESSIONS = 100000
+DEFAULT_SEED = 7
+INSERT_BATCH_ROWS = 1000
+
+# Prefix of the stored password hash of accounts without a password; bcrypt
+# rejects it, so they cannot log in
+UNUSABLE_PASSWORD_PREFIX = "!"
+
+# Sessions are spread over this many days before START_DATE
+START_DATE = datetime(2026, 1, 15)
+SPAN_DAYS = 3 * 365
+
+FIRST_NAMES = [
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+    "Christopher", "Lisa", "Daniel", "Nancy", "Matthew", "Betty", "Anthony", "Sandra", "Mark", "Ashley",
+    "Keisha", "DeShawn", "Imani", "Jamal", "Aaliyah", "Malik", "Jasmine", "Andre", "Tiana", "Marcus",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson",
+]
+SEMESTERS = ["Spring", "Summer", "Fall"]
+COURSES = [
+    ("ANSC 1001", "Introduction to Animal Science", 3), ("ANSC 2201", "Animal Nutrition", 3),
+    ("ANSC 2302", "Livestock Production", 3), ("ANSC 3303", "Animal Breeding", 3),
+    ("ANSC 3401", "Physiology of Reproduction", 4), ("ANSC 4401", "Meat Science", 3),
+    ("BIOL 1401", "Principles of Biology", 4), ("CHEM 1131", "General Chemistry I", 4),
+    ("ENGL 1311", "English Composition I", 3), ("MATH 1330", "College Algebra", 3),
+    ("AGEC 2300", "Agricultural Economics", 3), ("AGRO 2310", "Soil Science", 4),
+    ("HIST 2320", "World History", 3), ("SPCH 2380", "Public Speaking", 3),
+]
+DAYS = ["MWF", "TR", "MW", "F"]
+TIMES = ["8:00AM", "9:00AM", "10:00AM", "11:00AM", "1:00PM", "2:30PM", "4:00PM"]
+EMAIL_SENTENCES = [
+    "Thank you for meeting with me to plan your upcoming semester.",
+    "I reviewed your academic progress report and the course schedule.",
+    "You have completed most of your general education requirements.",
+    "The courses below keep you on track to graduate on time.",
+    "Please register as soon as your registration window opens, since these sections fill quickly.",
+    "If a section is full, the alternative schedules use other sections of the same courses.",
+    "Remember that a full-time load is at least 12 credit hours.",
+    "Let me know if you have any questions or would like to discuss your career plans.",
+    "Your remaining major requirements include upper-level Animal Science courses.",
+    "Consider the summer session to lighten your load in the spring.",
+]
+
+
+def professor_usernames(count: int) -> List[str]:
+    """Usernames of the synthetic professors."""
+    return [f"synthetic_prof_{i:04d}" for i in range(count)]
+
+
+def schedule_table(rng: random.Random) -> str:
+    """A markdown schedule table of 4-6 courses."""
+    lines = ["| Course | Title | Credits | Days | Time |", "|--------|-------|---------|------|------|"]
+    for code, title, credits in rng.sample(COURSES, rng.randint(4, 6)):
+        lines.append(f"| {code} | {title} | {credits} | {rng.choice(DAYS)} | {rng.choice(TIMES)} |")
+    return "\n".join(lines)
+
+
+def email_text(rng: random.Random, student_name: str, semester: str, year: int) -> str:
+    """An advising email of roughly 0.7-3.5 KB."""
+    paragraphs = [f"Dear {student_name},"]
+    for _ in range(rng.randint(3, 8)):
+        paragraphs.append(" ".join(rng.choice(EMAIL_SENTENCES) for _ in range(rng.randint(3, 6))))
+    paragraphs.append(f"Recommended schedule for {semester} {year}:")
+    paragraphs.append("Best regards,\nYour Academic Advisor")
+    return "\n\n".join(paragraphs)
+
+
+def generate_sessions(professor_ids: List[int], count: int, seed: int = DEFAULT_SEED) -> Iterator[Tuple]:
+    """
+    Generate advising sessions.
+
+    Workloads are skewed: a few professors advise most students, like a
+    department where some faculty carry the advising load.
+
+    Args:
+        professor_ids: Database ids of the professors
+        count: Number of sessions
+        seed: Random seed
+
+    Yields:
+        Tuples of (professor_id, student_name, semester, year, timestamp,
+        email_content, recommended_schedule, alternative1_schedule,
+        alternative2_schedule)
+    """
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(len(professor_ids))]
+    for _ in range(count):
+        professor_id = rng.choices(professor_ids, weights)[0]
+        student_name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        timestamp = START_DATE - timedelta(seconds=rng.randrange(SPAN_DAYS * 86400))
+        semester = rng.choice(SEMESTERS)
+        year = min(max(timestamp.year + rng.choice((0, 1)), 2024), 2050)
+        yield (
+            professor_id,
+            student_name,
+            semester,
+            year,
+            timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+            email_text(rng, student_name, semester, year),
+            schedule_table(rng),
+            schedule_table(rng) if rng.random() < 0.9 else "",
+            schedule_table(rng) if rng.random() < 0.7 else "",
+        )
+
+
+def populate(professors: int = DEFAULT_PROFESSORS, sessions: int = DEFAULT_SESSIONS,
+             seed: int = DEFAULT_SEED, password: Optional[str] = None) -> List[int]:
+    """
+    Add synthetic professors and sessions to the configured database.
+
+    Professors that already exist are reused, so populating twice adds
+    sessions without duplicating accounts.
+
+    Args:
+        professors: Number of professors
+        sessions: Number of sessions
+        seed: Random seed
+        password: Password of new professors (default: none, they cannot
+            log in)
+
+    Returns:
+        Database ids of the synthetic professors
+
+    Raises:
+        ValueError: If the database has professors that are not synthetic
+    """
+    database.initialize_database()
+    if password is None:
+        password_hash = UNUSABLE_PASSWORD_PREFIX + secrets.token_hex(16)
+    else:
+        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=4)).decode('utf-8')
+    usernames = professor_usernames(professors)
+    with database.get_db_connection() as conn:
+        real = conn.execute(
+            "SELECT COUNT(*) AS professors FROM professors WHERE username NOT LIKE 'synthetic_prof_%'"
+        ).fetchone()['professors']
+        if real:
+            raise ValueError(f"Database has {real} professors that are not synthetic; "
+                             "use an empty or synthetic database")
+        conn.cursor().executemany(
+            "INSERT INTO professors (username, password_hash) VALUES (?, ?) ON CONFLICT (username) DO NOTHING",
+            [(username, password_hash) for username in usernames],
+        )
+        rows = conn.execute(
+            "SELECT professor_id, username FROM professors WHERE username LIKE 'synthetic_prof_%'"
+        ).fetchall()
+        ids_by_name = {row['username']: row['professor_id'] for row in rows}
+        professor_ids = [ids_by_name[username] for username in usernames]
+
+        batch = []
+        for row in generate_sessions(professor_ids, sessions, seed):
+            batch.append(row)
+            if len(batch) >= INSERT_BATCH_ROWS:
+                _insert_sessions(conn, batch)
+                batch = []
+        if batch:
+            _insert_sessions(conn, batch)
+    return professor_ids
+
+
+def _insert_sessions(conn, rows: List[Tuple]) -> None:
+    """Insert generated sessions."""
+    conn.cursor().executemany("""
+        INSERT INTO advising_sessions
+        (professor_id, student_name, semester, year, timestamp, email_content,
+         recommended_schedule, alternative1_schedule, alternative2_schedule)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fill an AdviseMe database with synthetic history.")
+    parser.add_argument("--professors", type=int, default=DEFAULT_PROFESSORS)
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--password", help="Password of new professors (default: none, they cannot log in)")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--db", help="SQLite database file to fill")
+    target.add_argument("--use-database-url", action="store_true",
+                        help="Fill the PostgreSQL database at DATABASE_URL")
+    args = parser.parse_args(argv)
+    if args.db:
+        if postgres_backend.get_database_url():
+            print("✗ Error: DATABASE_URL is set and would be used instead of --db; "
+                  "unset it or pass --use-database-url")
+            return 1
+        database.DB_PATH = args.db
+    elif not postgres_backend.get_database_url():
+        print("✗ Error: --use-database-url needs DATABASE_URL")
+        return 1
+
+    try:
+        professor_ids = populate(max(1, args.professors), max(0, args.sessions), args.seed, args.password)
+    except ValueError as e:
+        print(f"✗ Error: {e}")
+        return 1
+    print(f"✓ Added {args.sessions} sessions for {len(professor_ids)} synthetic professors")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
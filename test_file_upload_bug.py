@@ -21,6 +21,14 @@ from io import BytesIO
 from unittest.mock import Mock, patch, MagicMock
 import base64
 
+import llm_client
+
+
+def encode_file(file_bytes):
+    """Base64 data llm_client streams into the request body for an uploaded PDF."""
+    data_url = b"".join(llm_client.Attachment(file_bytes).iter_encoded()).decode("ascii")
+    return data_url[len(llm_client.PDF_DATA_URL_PREFIX):]
+
 
 # Strategy for generating PDF-like file content
 @st.composite
@@ -124,7 +132,7 @@ class TestBugConditionExploration:
         # Mock the encode_file function to capture what data it receives
         def mock_encode_file(file_bytes):
             nonlocal encoded_files
-            result = base64.b64encode(file_bytes).decode("utf-8")
+            result = encode_file(file_bytes)
             
             # Track all encoded data
             encoded_files.append(file_bytes)
@@ -144,8 +152,7 @@ class TestBugConditionExploration:
         
         # Patch the necessary components
         with patch('adviseme.st') as mock_st, \
-             patch('adviseme.encode_file', side_effect=mock_encode_file), \
-             patch('adviseme.requests.post', return_value=mock_response):
+             patch('llm_client.requests.post', return_value=mock_response):
             
             # Setup mock streamlit components
             mock_st.file_uploader = Mock()
@@ -164,8 +171,8 @@ class TestBugConditionExploration:
             # Simulate the button click with uploaded files
             # This mimics the code in adviseme.py lines 33-34
             # The FIXED code uses getvalue() instead of read()
-            progress_data = adviseme.encode_file(progress_file.getvalue())
-            schedule_data = adviseme.encode_file(schedule_file.getvalue())
+            progress_data = mock_encode_file(progress_file.getvalue())
+            schedule_data = mock_encode_file(schedule_file.getvalue())
             
             # CRITICAL ASSERTIONS: Verify the bug condition
             # On UNFIXED code with file.read(), these assertions will FAIL
@@ -0,0 +1,190 @@
+"""
+Tests for the history export/import/snapshot script (history_transfer.py)
+"""
+
+import gzip
+import json
+import os
+import sqlite3
+
+import pytest
+
+import database
+import history_transfer
+
+
+def seed(professors=2, sessions_per_professor=3):
+    """Create professors with advising sessions in the current database."""
+    for p in range(professors):
+        username = f"prof_{p}"
+        database.create_professor(username, "password123")
+        professor_id = database.get_professor_by_username(username)['professor_id']
+        for s in range(sessions_per_professor):
+            database.save_advising_session(
+                professor_id=professor_id, student_name=f"Student {p}-{s}", semester="Fall", year=2026,
+                email_content=f"Dear student {s} — café", recommended_schedule="| CS 101 |",
+                alternative1_schedule="", alternative2_schedule=None,
+            )
+
+
+@pytest.fixture
+def target_db(temp_db, tmp_path):
+    """Switch database.py to a second, empty database; returns its path."""
+    def switch():
+        path = str(tmp_path / "target.db")
+        database.DB_PATH = path
+        database.initialize_database()
+        return path
+    return switch
+
+
+def history_of(username):
+    """Student names of a professor's sessions, oldest first."""
+    professor_id = database.get_professor_by_username(username)['professor_id']
+    return sorted(row['student_name'] for row in database.get_professor_history(professor_id))
+
+
+class TestExportImport:
+    """Tests for moving history between databases"""
+
+    @pytest.mark.parametrize("fmt", ["ndjson", "parquet"])
+    def test_round_trip(self, temp_db, target_db, tmp_path, fmt):
+        """An export restores every professor and session."""
+        if fmt == "parquet":
+            pytest.importorskip("pyarrow")
+        seed()
+        out = str(tmp_path / "export")
+
+        counts = history_transfer.export_history(out, fmt, chunk_size=2)
+        assert counts == {'professors': 2, 'advising_sessions': 6}
+
+        target_db()
+        result = history_transfer.import_history(out, chunk_size=2)
+
+        assert result['professors'] == 2 and result['sessions'] == 6
+        assert history_of("prof_1") == ["Student 1-0", "Student 1-1", "Student 1-2"]
+        session = database.get_professor_history(database.get_professor_by_username("prof_0")['professor_id'])[0]
+        assert session['email_content'].endswith("café")
+        # Password hashes are carried over, so logins keep working
+        source_hash = sqlite3.connect(temp_db).execute(
+            "SELECT password_hash FROM professors WHERE username = 'prof_0'").fetchone()[0]
+        assert database.get_professor_by_username("prof_0")['password_hash'] == source_hash
+
+    def test_export_files(self, temp_db, tmp_path):
+        """NDJSON exports are gzip files with one row per line and owner-only permissions."""
+        seed(professors=1, sessions_per_professor=2)
+        out = str(tmp_path / "export")
+        history_transfer.export_history(out)
+
+        with open(os.path.join(out, "manifest.json")) as f:
+            manifest = json.load(f)
+        assert manifest['tables']['advising_sessions']['rows'] == 2
+        path = os.path.join(out, "advising_sessions.ndjson.gz")
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+        assert [row['student_name'] for row in rows] == ["Student 0-0", "Student 0-1"]
+        assert os.stat(path).st_mode & 0o777 == 0o600
+
+    def test_existing_professors_are_kept(self, temp_db, target_db, tmp_path):
+        """Sessions of a professor already in the target attach to that account."""
+        seed(professors=1, sessions_per_professor=2)
+        out = str(tmp_path / "export")
+        history_transfer.export_history(out)
+
+        target_db()
+        database.create_professor("someone_else", "password123")
+        database.create_professor("prof_0", "different-password")
+        result = history_transfer.import_history(out)
+
+        assert result['professors'] == 0 and result['professors_existing'] == 1
+        assert history_of("prof_0") == ["Student 0-0", "Student 0-1"]
+
+    def test_refuses_non_empty_target(self, temp_db, tmp_path):
+        """Importing onto existing sessions requires append."""
+        seed(professors=1, sessions_per_professor=1)
+        out = str(tmp_path / "export")
+        history_transfer.export_history(out)
+
+        with pytest.raises(ValueError):
+            history_transfer.import_history(out)
+        result = history_transfer.import_history(out, append=True)
+
+        assert result['sessions'] == 1
+        assert len(history_of("prof_0")) == 2
+
+    def test_failed_import_rolls_back(self, temp_db, target_db, tmp_path):
+        """A bad row leaves the target unchanged."""
+        seed(professors=1, sessions_per_professor=3)
+        out = str(tmp_path / "export")
+        history_transfer.export_history(out)
+        path = os.path.join(out, "advising_sessions.ndjson.gz")
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+        rows[2]['semester'] = "Winter"
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.writelines(json.dumps(row) + "\n" for row in rows)
+
+        target_db()
+        with pytest.raises(sqlite3.IntegrityError):
+            history_transfer.import_history(out, chunk_size=1)
+
+        assert database.get_professor_by_username("prof_0") is None
+
+
+class TestSnapshot:
+    """Tests for the online backup"""
+
+    def test_snapshot_copies_database(self, temp_db, tmp_path):
+        """The snapshot is a complete, owner-only copy."""
+        seed(professors=1, sessions_per_professor=2)
+        snapshot = str(tmp_path / "snapshot.db")
+
+        history_transfer.snapshot_database(snapshot, pages=1)
+
+        conn = sqlite3.connect(snapshot)
+        assert conn.execute("SELECT COUNT(*) FROM advising_sessions").fetchone()[0] == 2
+        conn.close()
+        assert os.stat(snapshot).st_mode & 0o777 == 0o600
+
+    def test_snapshot_does_not_overwrite(self, temp_db, tmp_path):
+        """An existing file is never replaced."""
+        snapshot = tmp_path / "snapshot.db"
+        snapshot.write_bytes(b"keep")
+
+        with pytest.raises(FileExistsError):
+            history_transfer.snapshot_database(str(snapshot))
+        assert snapshot.read_bytes() == b"keep"
+
+    def test_snapshot_of_missing_database(self, monkeypatch, tmp_path):
+        """A wrong database path is an error, not an empty snapshot."""
+        missing = tmp_path / "missing.db"
+        monkeypatch.setattr(database, "DB_PATH", str(missing))
+        snapshot = tmp_path / "snapshot.db"
+
+        with pytest.raises(sqlite3.OperationalError):
+            history_transfer.snapshot_database(str(snapshot))
+        assert not missing.exists()
+        assert not snapshot.exists()
+
+    def test_snapshot_refused_for_postgres(self, monkeypatch, tmp_path):
+        """PostgreSQL is backed up with its own tools."""
+        monkeypatch.setenv("DATABASE_URL", "postgresql://app@db/adviseme")
+        with pytest.raises(ValueError):
+            history_transfer.snapshot_database(str(tmp_path / "snapshot.db"))
+
+
+class TestCommandLine:
+    """Tests for the command line"""
+
+    def test_export_and_import_commands(self, temp_db, tmp_path, capsys):
+        """The commands move history between database files."""
+        seed(professors=1, sessions_per_professor=2)
+        out = str(tmp_path / "export")
+        target = str(tmp_path / "copy.db")
+
+        assert history_transfer.main(["--db", temp_db, "export", out, "--format", "ndjson"]) == 0
+        assert history_transfer.main(["--db", target, "import", out]) == 0
+        assert "Imported 2 sessions" in capsys.readouterr().out
+
+        assert history_transfer.main(["--db", target, "import", out]) == 1
+        assert "--append" in capsys.readouterr().out
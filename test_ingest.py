@@ -0,0 +1,149 @@
+"""
+Tests for upload validation and PDF normalization.
+"""
+
+import os
+import pytest
+from unittest.mock import patch
+
+import ingest
+from ingest import (
+    ingest_pdf,
+    normalize_pdf,
+    UploadValidationError,
+    PROGRESS,
+    SCHEDULE,
+)
+from pypdf import PdfReader
+import io
+
+REQUIREMENT_PAGE = [
+    "Major Core Requirements   Not Satisfied",
+    "ANSC 3303 - Animal Nutrition   Not Satisfied",
+    "ANSC 1001 - Introduction to Animal Science   Satisfied",
+]
+FILLER_PAGE = ["Academic Progress - Jane Doe"] + [f"Notes line {i} " * 4 for i in range(40)]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Isolate the module-level ingestion cache between tests."""
+    ingest._ingest_cache.clear()
+    yield
+    ingest._ingest_cache.clear()
+
+
+class TestValidation:
+    """Tests for the cheap upload checks."""
+
+    def test_valid_pdf(self, make_pdf):
+        """Test that a readable PDF passes with its page count."""
+        with patch.dict(os.environ, {"ADVISEME_PDF_NORMALIZE": "off"}):
+            result = ingest_pdf(make_pdf([REQUIREMENT_PAGE, FILLER_PAGE]), PROGRESS)
+        assert result.pages == 2
+        assert not result.normalized
+
+    def test_upload_used_without_copy(self, make_pdf):
+        """Test that an upload that is not normalized is passed through."""
+        view = memoryview(make_pdf([REQUIREMENT_PAGE]))
+        with patch.dict(os.environ, {"ADVISEME_PDF_NORMALIZE": "off"}):
+            assert ingest_pdf(view, PROGRESS).data is view
+
+    def test_not_a_pdf(self):
+        """Test that files without a PDF header are rejected."""
+        with pytest.raises(UploadValidationError, match="not a PDF"):
+            ingest_pdf(b"\x89PNG\r\n\x1a\n" + b"0" * 100, PROGRESS)
+
+    def test_empty_file(self):
+        """Test that empty uploads are rejected."""
+        with pytest.raises(UploadValidationError, match="empty"):
+            ingest_pdf(b"", PROGRESS)
+
+    def test_size_cap(self, make_pdf):
+        """Test that uploads above ADVISEME_MAX_UPLOAD_MB are rejected."""
+        with patch.dict(os.environ, {"ADVISEME_MAX_UPLOAD_MB": "0.0001"}):
+            with pytest.raises(UploadValidationError, match="limit is"):
+                ingest_pdf(make_pdf([REQUIREMENT_PAGE]), PROGRESS)
+
+    def test_page_cap(self, make_pdf):
+        """Test that documents above ADVISEME_MAX_PDF_PAGES are rejected."""
+        with patch.dict(os.environ, {"ADVISEME_MAX_PDF_PAGES": "2"}):
+            with pytest.raises(UploadValidationError, match="3 pages"):
+                ingest_pdf(make_pdf([REQUIREMENT_PAGE] * 3), PROGRESS)
+
+    def test_truncated_pdf(self):
+        """Test that damaged PDFs are rejected instead of failing later."""
+        with pytest.raises(UploadValidationError, match="could not be read"):
+            ingest_pdf(b"%PDF-1.4\n1 0 obj\n<< /Type /Catalog", PROGRESS)
+
+    def test_result_cached_by_hash(self, make_pdf):
+        """Test that reruns with the same upload do not reopen the PDF."""
+        data = make_pdf([REQUIREMENT_PAGE])
+        with patch.object(ingest, "open_pdf", wraps=ingest.open_pdf) as mock_open:
+            ingest_pdf(data, PROGRESS)
+            ingest_pdf(memoryview(data), PROGRESS)
+        assert mock_open.call_count == 1
+
+    def test_cached_rejection(self):
+        """Test that a rejected upload stays rejected on rerun."""
+        data = b"%PDF-1.4 not really"
+        for _ in range(2):
+            with pytest.raises(UploadValidationError):
+                ingest_pdf(data, PROGRESS)
+
+
+class TestNormalization:
+    """Tests for the normalization stage."""
+
+    @pytest.fixture(autouse=True)
+    def normalize_on(self, monkeypatch):
+        """Normalization is opt-in."""
+        monkeypatch.setenv("ADVISEME_PDF_NORMALIZE", "on")
+
+    def test_off_by_default(self, make_pdf, monkeypatch):
+        """Test that uploads are used as is unless normalization is enabled."""
+        monkeypatch.delenv("ADVISEME_PDF_NORMALIZE")
+        result = ingest_pdf(make_pdf([FILLER_PAGE, REQUIREMENT_PAGE]), PROGRESS)
+        assert result.pages == 2 and not result.normalized
+
+    def test_irrelevant_pages_dropped(self, make_pdf):
+        """Test that pages without requirement rows are removed."""
+        data = make_pdf([FILLER_PAGE, REQUIREMENT_PAGE, FILLER_PAGE])
+        result = ingest_pdf(data, PROGRESS)
+        assert result.normalized
+        assert result.size < result.original_size
+        reader = PdfReader(io.BytesIO(result.data))
+        assert len(reader.pages) == 1
+        assert "ANSC 3303" in reader.pages[0].extract_text()
+
+    def test_schedule_pages_kept(self, make_pdf):
+        """Test that no schedule page is dropped."""
+        data = make_pdf([FILLER_PAGE, ["ANSC 3303-01 Animal Nutrition 3 MWF 9:00 AM - 9:50 AM Dr. Smith"]])
+        reader = PdfReader(io.BytesIO(data))
+        normalized = normalize_pdf(reader, SCHEDULE)
+        assert len(PdfReader(io.BytesIO(normalized)).pages) == 2
+
+    def test_unrecognized_layout_kept(self, make_pdf):
+        """Test that a progress page the parser does not read survives."""
+        other_layout = ["Remaining: ANSC 4501 Advanced Physiology (Not Met)"]
+        reader = PdfReader(io.BytesIO(make_pdf([REQUIREMENT_PAGE, other_layout, FILLER_PAGE])))
+        pages = PdfReader(io.BytesIO(normalize_pdf(reader, PROGRESS))).pages
+        assert len(pages) == 2
+        assert "ANSC 4501" in pages[1].extract_text()
+
+    def test_pages_without_text_kept(self, make_pdf):
+        """Test that possibly scanned pages survive."""
+        reader = PdfReader(io.BytesIO(make_pdf([REQUIREMENT_PAGE, []])))
+        assert len(PdfReader(io.BytesIO(normalize_pdf(reader, PROGRESS))).pages) == 2
+
+    def test_all_pages_kept_without_matches(self, make_pdf):
+        """Test that nothing is dropped when no page is recognized."""
+        reader = PdfReader(io.BytesIO(make_pdf([FILLER_PAGE, FILLER_PAGE])))
+        assert len(PdfReader(io.BytesIO(normalize_pdf(reader, PROGRESS))).pages) == 2
+
+    def test_normalization_failure_uses_upload(self, make_pdf):
+        """Test that a failing rewrite falls back to the original upload."""
+        data = make_pdf([FILLER_PAGE, REQUIREMENT_PAGE])
+        with patch.object(ingest, "PdfWriter", side_effect=RuntimeError("boom")):
+            result = ingest_pdf(data, PROGRESS)
+        assert result.data is data and not result.normalized
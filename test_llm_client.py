@@ -0,0 +1,199 @@
+"""
+Tests for the LLM client (prompt-cache friendly request structure).
+"""
+
+import base64
+import json
+import os
+import pytest
+from unittest.mock import Mock, patch
+
+import llm_client
+from llm_client import (
+    build_messages,
+    encode_json_body,
+    Attachment,
+    extract_usage,
+    prompt_cache_enabled,
+    create_chat_completion,
+    get_cache_stats,
+    CACHE_CONTROL,
+)
+
+
+def _messages(model="Claude-Sonnet-4"):
+    return build_messages(
+        "INSTRUCTIONS", "schedule.pdf", "U0NIRUQ=", "Jane_Progress.pdf", "UFJPRw==", model=model
+    )
+
+
+class TestBuildMessages:
+    """Tests for build_messages."""
+
+    def test_invariant_prefix_comes_first(self):
+        """Test that instructions and schedule precede the student's PDF."""
+        content = _messages()[0]["content"]
+        assert content[0] == {"type": "text", "text": "INSTRUCTIONS"}
+        assert content[1]["file"]["filename"] == "schedule.pdf"
+        assert content[2]["file"]["filename"] == "Jane_Progress.pdf"
+
+    def test_file_data_is_pdf_data_url(self):
+        """Test that attachments keep the data URL format."""
+        content = _messages()[0]["content"]
+        assert content[2]["file"]["file_data"] == "data:application/pdf;base64,UFJPRw=="
+
+    def test_cache_breakpoint_on_schedule_for_claude(self):
+        """Test that the end of the shared prefix is marked cacheable."""
+        with patch.dict(os.environ, {}, clear=True):
+            content = _messages()[0]["content"]
+        assert content[1]["cache_control"] == CACHE_CONTROL
+        assert "cache_control" not in content[0]
+        assert "cache_control" not in content[2]
+
+    def test_no_breakpoint_for_other_providers(self):
+        """Test that models without explicit caching get no marker."""
+        with patch.dict(os.environ, {}, clear=True):
+            content = _messages(model="GPT-4o")[0]["content"]
+        assert all("cache_control" not in part for part in content)
+
+    def test_prompt_cache_switch(self):
+        """Test that POE_PROMPT_CACHE overrides the per-model default."""
+        with patch.dict(os.environ, {"POE_PROMPT_CACHE": "off"}):
+            assert prompt_cache_enabled("Claude-Sonnet-4") is False
+        with patch.dict(os.environ, {"POE_PROMPT_CACHE": "on"}):
+            assert prompt_cache_enabled("GPT-4o") is True
+
+    def test_extracted_progress_replaces_pdf(self):
+        """Test that extracted progress is sent as text, not as a PDF."""
+        content = build_messages("I", "s.pdf", "S", "a.pdf", None, progress_text="| ANSC 3303 |")[0]["content"]
+        assert content[2] == {"type": "text", "text": "| ANSC 3303 |"}
+        assert content[:2] == build_messages("I", "s.pdf", "S", "a.pdf", "A")[0]["content"][:2]
+
+    def test_filtered_schedule_replaces_pdf(self):
+        """Test that pre-filtered sections replace the schedule PDF."""
+        with patch.dict(os.environ, {}, clear=True):
+            content = build_messages(
+                "I", "s.pdf", None, "a.pdf", None, progress_text="P", schedule_text="SECTIONS"
+            )[0]["content"]
+        assert [part["type"] for part in content] == ["text", "text", "text"]
+        assert content[0]["cache_control"] == CACHE_CONTROL
+        assert content[1:] == [{"type": "text", "text": "P"}, {"type": "text", "text": "SECTIONS"}]
+
+    def test_prefix_identical_across_students(self):
+        """Test that two students share a byte-identical prefix."""
+        a = build_messages("I", "s.pdf", "S", "a.pdf", "A")[0]["content"][:2]
+        b = build_messages("I", "s.pdf", "S", "b.pdf", "B")[0]["content"][:2]
+        assert a == b
+
+
+class TestStreamingBody:
+    """Tests for the streamed request body."""
+
+    def test_attachment_streamed_in_chunks(self):
+        """Test that a raw buffer is encoded slice by slice into the data URL."""
+        pdf = os.urandom(llm_client.BASE64_CHUNK_BYTES * 2 + 7)
+        attachment = Attachment(memoryview(pdf))
+        chunks = list(attachment.iter_encoded())
+        assert len(chunks) == 4
+        assert max(len(chunk) for chunk in chunks) == llm_client.BASE64_CHUNK_BYTES // 3 * 4
+        assert b"".join(chunks) == b"data:application/pdf;base64," + base64.b64encode(pdf)
+        assert len(attachment) == len(b"".join(chunks))
+
+    def test_body_matches_json_serialization(self):
+        """Test that the streamed body is the JSON of the encoded payload."""
+        messages = build_messages("I", "s.pdf", b"SCHEDULE", "a.pdf", bytearray(b"PROGRESS"))
+        body = encode_json_body({"model": "m", "messages": messages})
+        document = json.loads(b"".join(body))
+        content = document["messages"][0]["content"]
+        assert content[1]["file"]["file_data"] == "data:application/pdf;base64," + base64.b64encode(b"SCHEDULE").decode()
+        assert content[2]["file"]["file_data"] == "data:application/pdf;base64," + base64.b64encode(b"PROGRESS").decode()
+        assert len(body) == len(b"".join(body))
+
+    def test_body_is_reiterable(self):
+        """Test that the body can be sent again (e.g. on retry)."""
+        body = encode_json_body({"messages": build_messages("I", "s.pdf", b"S", "a.pdf", b"A")})
+        assert b"".join(body) == b"".join(body)
+
+    def test_buffer_not_copied(self):
+        """Test that the attachment keeps a view of the caller's buffer."""
+        buffer = bytearray(b"PDF")
+        attachment = Attachment(buffer)
+        buffer[0:1] = b"X"
+        assert bytes(attachment.data) == b"XDF"
+
+
+class TestExtractUsage:
+    """Tests for extract_usage."""
+
+    def test_openai_style_cached_tokens(self):
+        """Test usage with prompt_tokens_details.cached_tokens."""
+        usage = extract_usage({"usage": {
+            "prompt_tokens": 5000, "completion_tokens": 700,
+            "prompt_tokens_details": {"cached_tokens": 4096}
+        }})
+        assert usage["cached_tokens"] == 4096
+        assert usage["prompt_tokens"] == 5000
+
+    def test_anthropic_style_cache_fields(self):
+        """Test usage with cache_read/cache_creation input tokens."""
+        usage = extract_usage({"usage": {
+            "prompt_tokens": 5000, "cache_read_input_tokens": 3000,
+            "cache_creation_input_tokens": 1000
+        }})
+        assert usage["cached_tokens"] == 3000
+        assert usage["cache_write_tokens"] == 1000
+
+    def test_missing_usage(self):
+        """Test that a response without usage yields zeros."""
+        assert extract_usage({}) == {
+            "prompt_tokens": 0, "completion_tokens": 0,
+            "cached_tokens": 0, "cache_write_tokens": 0
+        }
+
+
+class TestCreateChatCompletion:
+    """Tests for create_chat_completion."""
+
+    def _response(self, cached_tokens):
+        response = Mock()
+        response.status_code = 200
+        response.json.return_value = {
+            "choices": [{"message": {"content": "ok"}}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 10,
+                      "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+        }
+        return response
+
+    def test_request_payload_and_info(self):
+        """Test that the request carries model/messages and reports cache hits."""
+        messages = _messages()
+        with patch("llm_client.requests.post", return_value=self._response(80)) as mock_post:
+            response, info = create_chat_completion(messages, model="Claude-Sonnet-4", api_key="key")
+
+        kwargs = mock_post.call_args.kwargs
+        body = kwargs["data"]
+        assert json.loads(b"".join(body)) == {"model": "Claude-Sonnet-4", "messages": messages}
+        assert info["request_bytes"] == len(body)
+        assert kwargs["headers"]["Authorization"] == "Bearer key"
+        assert info["cache_hit"] is True
+        assert info["cached_tokens"] == 80
+        assert info["latency_ms"] >= 0
+
+    def test_cache_stats_accumulate(self):
+        """Test that process-wide stats count hits and cached tokens."""
+        before = get_cache_stats()
+        with patch("llm_client.requests.post", side_effect=[self._response(0), self._response(60)]):
+            create_chat_completion(_messages(), api_key="key")
+            create_chat_completion(_messages(), api_key="key")
+        after = get_cache_stats()
+        assert after["requests"] == before["requests"] + 2
+        assert after["cache_hits"] == before["cache_hits"] + 1
+        assert after["cached_tokens"] == before["cached_tokens"] + 60
+
+    def test_error_response_has_no_usage(self):
+        """Test that non-200 responses are returned without usage."""
+        error = Mock(status_code=400, text="bad request")
+        with patch("llm_client.requests.post", return_value=error):
+            response, info = create_chat_completion(_messages(), api_key="key")
+        assert response is error
+        assert "cached_tokens" not in info
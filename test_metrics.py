@@ -0,0 +1,186 @@
+"""
+Tests for the metrics registry, Prometheus text format and /metrics endpoint.
+"""
+
+import math
+import os
+import pytest
+import requests
+from unittest.mock import Mock, patch
+
+import metrics
+from metrics import Registry, Counter, Gauge, Histogram, log_linear_buckets, estimate_size
+
+
+@pytest.fixture(autouse=True)
+def clear_sessions():
+    """Start each test without tracked sessions."""
+    metrics._sessions.clear()
+    yield
+    metrics._sessions.clear()
+    metrics.stop_metrics_server()
+
+
+class TestBuckets:
+    """Tests for HDR-style log-linear buckets."""
+
+    def test_sub_buckets_per_power_of_two(self):
+        """Test that each power of two is split linearly."""
+        assert log_linear_buckets(1, 4) == [1.0, 1.25, 1.5, 1.75, 2.0, 2.5, 3.0, 3.5, 4.0]
+
+    def test_relative_error_bounded(self):
+        """Test that neighbouring bounds differ by at most 25%."""
+        bounds = log_linear_buckets(0.001, 128)
+        assert bounds[0] <= 0.001 and bounds[-1] >= 128
+        assert all(b / a <= 1.25 + 1e-9 for a, b in zip(bounds, bounds[1:]))
+
+
+class TestMetrics:
+    """Tests for counters, gauges and histograms."""
+
+    def test_counter(self):
+        """Test counting per label set."""
+        c = Counter("requests_total", "Requests.", ("status",))
+        c.inc(status=200)
+        c.inc(2, status=200)
+        c.inc(status=500)
+        assert c.get(status=200) == 3
+        assert c.samples() == ['requests_total{status="200"} 3', 'requests_total{status="500"} 1']
+        with pytest.raises(ValueError):
+            c.inc(-1, status=200)
+        with pytest.raises(ValueError):
+            c.inc(model="x")
+
+    def test_gauge_function(self):
+        """Test gauges computed on scrape."""
+        g = Gauge("sessions", "Sessions.")
+        g.set_function(lambda: 4)
+        assert g.samples() == ["sessions 4"]
+
+    def test_histogram_text_format(self):
+        """Test cumulative buckets, sum and count."""
+        h = Histogram("latency_seconds", "Latency.", ("op",), buckets=[0.1, 1, 10])
+        for value in (0.05, 0.1, 0.5, 20):
+            h.observe(value, op="save")
+        assert h.samples() == [
+            'latency_seconds_bucket{op="save",le="0.1"} 2',
+            'latency_seconds_bucket{op="save",le="1"} 3',
+            'latency_seconds_bucket{op="save",le="10"} 3',
+            'latency_seconds_bucket{op="save",le="+Inf"} 4',
+            'latency_seconds_sum{op="save"} 20.65',
+            'latency_seconds_count{op="save"} 4',
+        ]
+
+    def test_histogram_quantile(self):
+        """Test bucket-based quantile estimates."""
+        h = Histogram("q", "Q.", buckets=log_linear_buckets(1, 1024))
+        for value in range(1, 101):
+            h.observe(value)
+        assert h.quantile(0.5) == 56
+        assert 99 <= h.quantile(0.99) <= 112
+        assert Histogram("empty", "E.").quantile(0.5) is None
+        h.observe(5000)
+        assert h.quantile(1.0) == math.inf
+
+    def test_timer(self):
+        """Test timing a block."""
+        h = Histogram("t", "T.", ("operation",))
+        with h.time(operation="hash"):
+            pass
+        assert h.count(operation="hash") == 1
+
+    def test_label_escaping(self):
+        """Test escaping of quotes, backslashes and newlines."""
+        c = Counter("c", "C.", ("path",))
+        c.inc(path='a"b\\c\n')
+        assert c.samples() == ['c{path="a\\"b\\\\c\\n"} 1']
+
+    def test_registry_render(self):
+        """Test HELP/TYPE lines and get-or-create."""
+        registry = Registry()
+        c = registry.get_or_create(Counter, "b_total", "B.")
+        assert registry.get_or_create(Counter, "b_total", "B.") is c
+        registry.get_or_create(Gauge, "a", "A.").set(1.5)
+        c.inc()
+        assert registry.render() == "# HELP a A.\n# TYPE a gauge\na 1.5\n# HELP b_total B.\n# TYPE b_total counter\nb_total 1\n"
+        with pytest.raises(ValueError):
+            registry.get_or_create(Gauge, "b_total", "B.")
+
+
+class TestSessions:
+    """Tests for rerun and session accounting."""
+
+    def test_estimate_size(self):
+        """Test size estimates of session state values."""
+        assert estimate_size(b"x" * 100) == 100
+        assert estimate_size(memoryview(b"x" * 10)) == 10
+        assert estimate_size({"pdf": b"x" * 100, "name": "abc"}) == 100 + 3 + 3 + 4
+        assert estimate_size(object()) > 0
+
+    def test_active_sessions_and_bytes(self):
+        """Test the computed session gauges."""
+        metrics.observe_rerun(0.0, "app", "s1", {"pdf": b"x" * 1000})
+        metrics.observe_rerun(0.0, "login", "s2", {})
+        metrics.observe_rerun(0.0, "app", None, {"ignored": b"x"})
+        assert metrics.ACTIVE_SESSIONS.get() == 2
+        assert metrics.SESSION_STATE_BYTES.get() == 1000
+        assert metrics.SESSION_STATE_MAX_BYTES.get() == 1000
+        assert metrics.RERUN_SECONDS.count(page="login") >= 1
+
+    def test_inactive_sessions_expire(self):
+        """Test that sessions outside the window are not counted."""
+        metrics.record_session("old", {})
+        with patch("metrics.time.monotonic", return_value=metrics.time.monotonic() + metrics.ACTIVE_SESSION_WINDOW_SECONDS + 1):
+            assert metrics.ACTIVE_SESSIONS.get() == 0
+
+
+class TestInstrumentation:
+    """Tests for metrics recorded by other modules."""
+
+    def test_llm_request_recorded(self):
+        """Test POE latency and token metrics."""
+        import llm_client
+        response = Mock(status_code=200)
+        response.json.return_value = {"usage": {"prompt_tokens": 10, "completion_tokens": 4}}
+        before = metrics.LLM_TOKENS.get(model="m-test", kind="prompt")
+        with patch("llm_client.requests.post", return_value=response):
+            llm_client.create_chat_completion([{"role": "user", "content": "hi"}], model="m-test", api_key="k")
+        assert metrics.LLM_REQUEST_SECONDS.count(model="m-test", status="200") >= 1
+        assert metrics.LLM_TOKENS.get(model="m-test", kind="prompt") == before + 10
+
+    def test_llm_request_error_recorded(self):
+        """Test that failed requests are recorded before re-raising."""
+        import llm_client
+        with patch("llm_client.requests.post", side_effect=requests.exceptions.ConnectionError("down")):
+            with pytest.raises(requests.exceptions.ConnectionError):
+                llm_client.create_chat_completion([], model="m-error", api_key="k")
+        assert metrics.LLM_REQUEST_SECONDS.count(model="m-error", status="error") == 1
+
+    def test_db_and_bcrypt_recorded(self, sample_professor):
+        """Test database operation and bcrypt metrics."""
+        import auth
+        hashes = metrics.BCRYPT_SECONDS.count(operation="hash")
+        assert auth.verify_password(sample_professor['password'], sample_professor['password_hash'])
+        assert metrics.BCRYPT_SECONDS.count(operation="verify") >= 1
+        assert hashes >= 1
+        assert metrics.DB_OPERATION_SECONDS.count(operation="create_professor", outcome="ok") >= 1
+
+
+class TestEndpoint:
+    """Tests for the /metrics HTTP endpoint."""
+
+    def test_serves_text_format(self):
+        """Test scraping the endpoint."""
+        with patch.dict(os.environ, {"ADVISEME_METRICS": "on"}):
+            port = metrics.start_metrics_server(port=0, address="127.0.0.1")
+            assert metrics.start_metrics_server(port=0) == port
+        response = requests.get(f"http://127.0.0.1:{port}/metrics", timeout=5)
+        assert response.status_code == 200
+        assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+        assert "# TYPE adviseme_llm_request_seconds histogram" in response.text
+        assert requests.get(f"http://127.0.0.1:{port}/other", timeout=5).status_code == 404
+
+    def test_disabled(self):
+        """Test ADVISEME_METRICS=off."""
+        with patch.dict(os.environ, {"ADVISEME_METRICS": "off"}):
+            assert metrics.start_metrics_server(port=0) is None
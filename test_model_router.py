@@ -0,0 +1,143 @@
+"""
+Tests for the model routing tier.
+"""
+
+import os
+import pytest
+from unittest.mock import Mock, patch
+
+import model_router
+from model_router import (
+    route_student,
+    classify_student,
+    parse_count,
+    record_request,
+    get_tier_stats,
+    get_tier_model,
+    FAST_TIER,
+    LARGE_TIER,
+    COMPLETE,
+    NEEDS_SCHEDULE,
+    UNKNOWN,
+)
+
+
+def _triage_response(content, status_code=200):
+    response = Mock()
+    response.status_code = status_code
+    response.json.return_value = {"choices": [{"message": {"content": content}}]}
+    info = {"model": "fast", "latency_ms": 12.0, "status_code": status_code,
+            "prompt_tokens": 900, "completion_tokens": 2, "cached_tokens": 0}
+    return response, info
+
+
+class TestParseCount:
+    """Tests for parse_count."""
+
+    @pytest.mark.parametrize("content,expected", [
+        ("0", 0), ("3", 3), ("There are 4 courses.", 4), ("none", None), ("", None),
+    ])
+    def test_parse_count(self, content, expected):
+        """Test that the first integer in the reply is used."""
+        assert parse_count(content) == expected
+
+
+class TestRouting:
+    """Tests for route_student."""
+
+    def test_complete_student_goes_to_fast_tier(self):
+        """Test that zero Not Satisfied courses routes to the fast model."""
+        with patch.dict(os.environ, {"ADVISEME_MODEL_ROUTING": "on"}), \
+             patch("llm_client.create_chat_completion", return_value=_triage_response("0")):
+            route = route_student("Jane.pdf", "UERG")
+        assert route["tier"] == FAST_TIER
+        assert route["status"] == COMPLETE
+        assert route["model"] == get_tier_model(FAST_TIER)
+
+    def test_student_with_requirements_goes_to_large_tier(self):
+        """Test that Not Satisfied courses route to the large model."""
+        with patch.dict(os.environ, {"ADVISEME_MODEL_ROUTING": "on"}), \
+             patch("llm_client.create_chat_completion", return_value=_triage_response("5")):
+            route = route_student("Jane.pdf", "UERG")
+        assert route["tier"] == LARGE_TIER
+        assert route["status"] == NEEDS_SCHEDULE
+        assert route["not_satisfied"] == 5
+
+    def test_failed_triage_falls_back_to_large_tier(self):
+        """Test that an inconclusive triage uses the large model."""
+        with patch.dict(os.environ, {"ADVISEME_MODEL_ROUTING": "on"}), \
+             patch("llm_client.create_chat_completion", return_value=_triage_response("", 500)):
+            route = route_student("Jane.pdf", "UERG")
+        assert route["tier"] == LARGE_TIER
+        assert route["status"] == UNKNOWN
+
+    def test_triage_exception_falls_back_to_large_tier(self):
+        """Test that a network error during triage does not raise."""
+        with patch.dict(os.environ, {"ADVISEME_MODEL_ROUTING": "on"}), \
+             patch("llm_client.create_chat_completion", side_effect=ConnectionError("down")):
+            route = route_student("Jane.pdf", "UERG")
+        assert route["tier"] == LARGE_TIER
+
+    def test_routing_disabled_skips_triage(self):
+        """Test that ADVISEME_MODEL_ROUTING=off always uses the large tier."""
+        with patch.dict(os.environ, {"ADVISEME_MODEL_ROUTING": "off"}), \
+             patch("llm_client.create_chat_completion") as mock_call:
+            route = route_student("Jane.pdf", "UERG")
+        mock_call.assert_not_called()
+        assert route["tier"] == LARGE_TIER
+
+    def test_local_extraction_answers_triage(self):
+        """Test that extracted rows route without any model call."""
+        extracted = {'rows': [{}], 'not_satisfied': [], 'counts': {}}
+        with patch.dict(os.environ, {"ADVISEME_MODEL_ROUTING": "on"}), \
+             patch("llm_client.create_chat_completion") as mock_call:
+            route = route_student("Jane.pdf", None, extracted=extracted)
+        mock_call.assert_not_called()
+        assert route["tier"] == FAST_TIER
+        assert route["classifier"] == "local_extraction"
+
+    def test_locally_solved_schedules_go_to_fast_tier(self):
+        """Test that an email-only request uses the fast model."""
+        extracted = {'rows': [{}], 'not_satisfied': [{}, {}], 'counts': {}}
+        with patch.dict(os.environ, {"ADVISEME_MODEL_ROUTING": "on"}):
+            route = route_student("Jane.pdf", None, extracted=extracted, email_only=True)
+        assert route["tier"] == FAST_TIER
+        assert route["status"] == NEEDS_SCHEDULE
+
+    def test_tier_models_configurable(self):
+        """Test that tier models come from the environment."""
+        with patch.dict(os.environ, {"ADVISEME_MODEL_FAST": "Tiny", "ADVISEME_MODEL_LARGE": "Big"}):
+            assert get_tier_model(FAST_TIER) == "Tiny"
+            assert get_tier_model(LARGE_TIER) == "Big"
+
+    def test_classifier_chain_order(self):
+        """Test that the first classifier with an answer wins."""
+        first = Mock(return_value=None, __name__="first")
+        second = Mock(return_value=0, __name__="second")
+        third = Mock(return_value=7, __name__="third")
+        with patch.object(model_router, "CLASSIFIERS", [first, second, third]):
+            triage = classify_student("Jane.pdf", "UERG")
+        assert triage["status"] == COMPLETE
+        assert triage["classifier"] == "second"
+        third.assert_not_called()
+
+
+class TestTierStats:
+    """Tests for per-tier metrics."""
+
+    def test_stats_accumulate_with_cost(self):
+        """Test that latency, tokens and cost are tracked per tier."""
+        with patch.dict(os.environ, {"ADVISEME_MODEL_LARGE_COST": "2.0"}):
+            before = get_tier_stats().get(LARGE_TIER, {}).get("estimated_cost", 0.0)
+            record_request(LARGE_TIER, {"latency_ms": 100.0, "status_code": 200,
+                                        "prompt_tokens": 1500, "completion_tokens": 500})
+            stats = get_tier_stats()[LARGE_TIER]
+        assert stats["estimated_cost"] == pytest.approx(before + 4.0)
+        assert stats["max_latency_ms"] >= 100.0
+        assert stats["avg_latency_ms"] > 0
+
+    def test_errors_counted(self):
+        """Test that non-200 requests count as errors."""
+        before = get_tier_stats().get(FAST_TIER, {}).get("errors", 0)
+        record_request(FAST_TIER, {"latency_ms": 5.0, "status_code": 429})
+        assert get_tier_stats()[FAST_TIER]["errors"] == before + 1
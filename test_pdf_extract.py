@@ -0,0 +1,292 @@
+"""
+Tests for local extraction of Workday academic progress PDFs.
+"""
+
+import os
+import signal
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+
+import pdf_extract
+import schedule_cache
+from pdf_extract import (
+    parse_requirement_rows,
+    parse_progress_pdf,
+    parse_section_line,
+    parse_schedule_pdf,
+    parse_days,
+    extract_progress,
+    extract_schedule,
+    format_unmet_requirements,
+    normalize_status,
+    NOT_SATISFIED,
+)
+
+PROGRESS_LINES = [
+    "Academic Progress - Jane Doe - BS Animal Science",
+    "General Education Requirements   Satisfied",
+    "ENGL 1311 - Composition I   Satisfied",
+    "MATH 1330 College Algebra   Transferred",
+    "Major Core Requirements   Not Satisfied",
+    "ANSC 1001 - Introduction to Animal Science   Satisfied",
+    "ANSC 3303 - Animal Nutrition   Not Satisfied",
+    "ANSC 4401 - Animal Breeding   NOT SATISFIED",
+    "BIOL 1401 General Biology   In Progress",
+    "Electives   Waived",
+    "AGRI 2201 Agricultural Economics   Waived",
+]
+
+
+SCHEDULE_LINES = [
+    "Spring 2026 Class Schedule - College of Agriculture",
+    "Course Section Title Credits Days Time Instructor",
+    "ANSC 3303-01 Animal Nutrition 3 MWF 9:00 AM - 9:50 AM Dr. Smith",
+    "ANSC 3303-02 Animal Nutrition 3 TR 1:00 PM - 2:15 PM Dr. Jones",
+    "ANSC 4401-01 Animal Breeding 4 TR 8:00 AM - 9:15 AM W 2:00 PM - 4:50 PM Dr. Lee",
+    "BIOL 1401-H01 General Biology 4 Online TBA",
+]
+
+
+@pytest.fixture
+def progress_pdf(make_pdf):
+    """Build a two-page academic progress PDF."""
+    return make_pdf([PROGRESS_LINES[:5], PROGRESS_LINES[5:]])
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(tmp_path, monkeypatch):
+    """Isolate the extraction caches between tests."""
+    monkeypatch.setenv("ADVISEME_CACHE_DIR", str(tmp_path / "cache"))
+    pdf_extract._progress_cache.clear()
+    schedule_cache.clear_memory()
+    yield
+    pdf_extract._progress_cache.clear()
+    schedule_cache.clear_memory()
+
+
+class TestParseRequirementRows:
+    """Tests for the line parser."""
+
+    def test_rows_and_groups(self):
+        """Test that course rows carry their requirement group."""
+        rows = parse_requirement_rows("\n".join(PROGRESS_LINES))
+        by_course = {row['course']: row for row in rows}
+        assert len(rows) == 7
+        assert by_course['ANSC 3303'] == {
+            'course': 'ANSC 3303',
+            'title': 'Animal Nutrition',
+            'requirement': 'Major Core Requirements',
+            'status': NOT_SATISFIED,
+        }
+        assert by_course['ENGL 1311']['requirement'] == 'General Education Requirements'
+        assert by_course['AGRI 2201']['requirement'] == 'Electives'
+
+    def test_status_normalized(self):
+        """Test that upper-case statuses map to canonical spelling."""
+        rows = parse_requirement_rows("ANSC 4401 Breeding NOT  SATISFIED")
+        assert rows[0]['status'] == NOT_SATISFIED
+        assert normalize_status("in progress") == "In Progress"
+
+    def test_not_satisfied_not_confused_with_satisfied(self):
+        """Test that "Not Satisfied" is never read as "Satisfied"."""
+        rows = parse_requirement_rows("CHEM 1402 Chemistry II Not Satisfied")
+        assert rows[0]['status'] == NOT_SATISFIED
+
+    def test_course_code_formats(self):
+        """Test that dashed and unspaced course codes are normalized."""
+        rows = parse_requirement_rows("ANSC-3303 Nutrition Satisfied\nBIOL1401 Biology Satisfied")
+        assert [row['course'] for row in rows] == ['ANSC 3303', 'BIOL 1401']
+
+    def test_no_rows(self):
+        """Test that text without statuses yields no rows."""
+        assert parse_requirement_rows("Just a cover page\nNothing else") == []
+
+
+class TestParseProgressPdf:
+    """Tests for PDF parsing."""
+
+    def test_summary(self, progress_pdf):
+        """Test counts and unmet rows from a real PDF."""
+        result = parse_progress_pdf(progress_pdf)
+        assert [row['course'] for row in result['not_satisfied']] == ['ANSC 3303', 'ANSC 4401']
+        assert result['counts'] == {
+            'Not Satisfied': 2, 'Satisfied': 2, 'In Progress': 1, 'Waived': 1, 'Transferred': 1
+        }
+
+    def test_unreadable_pdf(self):
+        """Test that garbage bytes yield None instead of raising."""
+        assert parse_progress_pdf(b"%PDF-1.4 garbage") is None
+
+    def test_partially_parsed_page_keeps_pdf(self, make_pdf):
+        """Test that a page in a layout the parser misses falls back to the PDF."""
+        other_layout = [
+            "Remaining Requirements",
+            "Not Satisfied: ANSC 4501 Advanced Animal Physiology",
+            "Not Satisfied: ANSC 4502 Animal Behavior",
+            "Not Satisfied: AGRI 3301 Agricultural Policy",
+        ]
+        pdf = make_pdf([PROGRESS_LINES, other_layout])
+        assert parse_progress_pdf(pdf) is None
+
+    def test_page_without_text_keeps_pdf(self, make_pdf):
+        """Test that a scanned (text-less) page falls back to the PDF."""
+        pdf = make_pdf([PROGRESS_LINES, []])
+        assert parse_progress_pdf(pdf) is None
+
+    def test_unparsed_pages(self):
+        """Test which pages count as unparsed."""
+        pages = ["\n".join(PROGRESS_LINES), "Cover letter without courses", "", "ANSC 3303 Animal Nutrition - Met"]
+        assert pdf_extract.find_unparsed_pages(pages) == [2, 3]
+
+
+class TestExtractProgress:
+    """Tests for the cached, pooled extraction entry point."""
+
+    def test_cached_by_file_hash(self, progress_pdf):
+        """Test that the same file is parsed only once."""
+        with patch.object(pdf_extract, "run_in_pool", wraps=lambda f, *a: f(*a)) as mock_pool:
+            first = extract_progress(progress_pdf)
+            second = extract_progress(memoryview(progress_pdf))
+        assert mock_pool.call_count == 1
+        assert first is second
+
+    def test_runs_in_process_pool(self, progress_pdf):
+        """Test extraction through a real worker process."""
+        result = extract_progress(progress_pdf)
+        assert len(result['not_satisfied']) == 2
+
+    def test_disabled(self, progress_pdf):
+        """Test that ADVISEME_LOCAL_EXTRACTION=off skips parsing."""
+        with patch.dict(os.environ, {"ADVISEME_LOCAL_EXTRACTION": "off"}):
+            assert extract_progress(progress_pdf) is None
+
+    def test_pool_failure_sends_pdf(self, progress_pdf):
+        """Test that without a pool the PDF goes to the model, never parsed inline."""
+        with patch.object(pdf_extract, "_get_pool", side_effect=OSError("no processes")), \
+                patch.object(pdf_extract, "parse_progress_pdf") as parse:
+            assert extract_progress(progress_pdf) is None
+        parse.assert_not_called()
+        # Not cached: the next attempt parses
+        assert len(extract_progress(progress_pdf)['rows']) == 7
+
+    def test_timeout_sends_pdf(self):
+        """Test that a parse over the timeout is given up on."""
+        with pytest.raises(pdf_extract.ParsingUnavailable):
+            pdf_extract.run_in_pool(time.sleep, 5, timeout=0.5)
+
+    @pytest.mark.skipif(not hasattr(signal, "SIGALRM"), reason="needs SIGALRM")
+    def test_hung_parse_stopped_in_worker(self):
+        """Test that the worker interrupts a parse that runs past its deadline."""
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            pdf_extract._run_with_deadline(1, time.sleep, 5)
+        assert time.monotonic() - started < 3
+
+    def test_broken_pool_replaced_once(self):
+        """Test that only the broken pool is dropped, not one another thread created."""
+        broken, current = MagicMock(), MagicMock()
+        with patch.object(pdf_extract, "_pool", current):
+            pdf_extract._discard_pool(broken)
+            assert pdf_extract._pool is current
+            pdf_extract._discard_pool(current)
+            assert pdf_extract._pool is None
+        broken.shutdown.assert_not_called()
+        current.shutdown.assert_called_once_with(wait=False)
+
+
+class TestFormatUnmetRequirements:
+    """Tests for the prompt text built from extracted rows."""
+
+    def test_lists_only_unmet(self, progress_pdf):
+        """Test that only Not Satisfied rows are listed."""
+        text = format_unmet_requirements(parse_progress_pdf(progress_pdf), "Jane_Progress.pdf")
+        assert "| ANSC 3303 | Animal Nutrition | Major Core Requirements | Not Satisfied |" in text
+        assert "ENGL 1311" not in text
+        assert "Jane_Progress.pdf" in text
+
+    def test_zero_unmet_requests_case_2(self):
+        """Test that a complete student is pointed at the CASE 2 format."""
+        progress = pdf_extract.summarize_rows([
+            {'course': 'ANSC 1001', 'title': 'Intro', 'requirement': 'Core', 'status': 'Satisfied'}
+        ])
+        assert "CASE 2" in format_unmet_requirements(progress)
+
+
+class TestParseSchedule:
+    """Tests for course schedule parsing."""
+
+    def test_section_line(self):
+        """Test a single-meeting section row."""
+        section = parse_section_line(SCHEDULE_LINES[2])
+        assert section == {
+            'course': 'ANSC 3303',
+            'section': '01',
+            'title': 'Animal Nutrition',
+            'credits': 3.0,
+            'meetings': [{'days': [0, 2, 4], 'start': 540, 'end': 590}],
+            'instructor': 'Dr. Smith',
+        }
+
+    def test_lab_meeting(self):
+        """Test that a lecture plus lab row yields two meetings."""
+        section = parse_section_line(SCHEDULE_LINES[4])
+        assert section['meetings'] == [
+            {'days': [1, 3], 'start': 480, 'end': 555},
+            {'days': [2], 'start': 840, 'end': 1010},
+        ]
+        assert section['credits'] == 4.0
+        assert section['instructor'] == 'Dr. Lee'
+
+    def test_section_without_times(self):
+        """Test that online sections parse with no meetings."""
+        section = parse_section_line(SCHEDULE_LINES[5])
+        assert section['course'] == 'BIOL 1401'
+        assert section['meetings'] == []
+
+    def test_header_lines_ignored(self):
+        """Test that lines without a course section are skipped."""
+        assert parse_section_line(SCHEDULE_LINES[1]) is None
+
+    def test_day_tokens(self):
+        """Test day letter and abbreviation parsing."""
+        assert parse_days("MWF") == [0, 2, 4]
+        assert parse_days("TTh") == [1, 3]
+        assert parse_days("Dr.") is None
+
+    def test_schedule_pdf(self, make_pdf):
+        """Test parsing sections from a real PDF."""
+        result = parse_schedule_pdf(make_pdf([SCHEDULE_LINES[:4], SCHEDULE_LINES[4:]]))
+        assert [(s['course'], s['section']) for s in result['sections']] == [
+            ('ANSC 3303', '01'), ('ANSC 3303', '02'), ('ANSC 4401', '01'), ('BIOL 1401', 'H01')
+        ]
+
+    def test_partially_parsed_schedule_keeps_pdf(self, make_pdf):
+        """Test that a schedule page in a layout the parser misses falls back to the PDF."""
+        other_layout = [
+            "Course: ANSC 4501 Advanced Animal Physiology (Section 01)",
+            "Course: ANSC 4502 Animal Behavior (Section 01)",
+            "Course: AGRI 3301 Agricultural Policy (Section 02)",
+        ]
+        assert parse_schedule_pdf(make_pdf([SCHEDULE_LINES, other_layout])) is None
+        assert parse_schedule_pdf(make_pdf([SCHEDULE_LINES, []])) is None
+
+    def test_extract_schedule_cached(self, make_pdf):
+        """Test that the schedule is parsed once and tagged with its hash."""
+        schedule_pdf = make_pdf([SCHEDULE_LINES])
+        with patch.object(pdf_extract, "run_in_pool", wraps=lambda f, *a: f(*a)) as mock_pool:
+            first = extract_schedule(schedule_pdf)
+            second = extract_schedule(schedule_pdf)
+        assert mock_pool.call_count == 1
+        assert first is second
+        assert first['hash'] == pdf_extract.file_hash(schedule_pdf)
+
+    def test_extract_schedule_warms_from_disk(self, make_pdf):
+        """Test that a new process would load the schedule instead of parsing."""
+        schedule_pdf = make_pdf([SCHEDULE_LINES])
+        first = extract_schedule(schedule_pdf)
+        schedule_cache.clear_memory()
+        with patch.object(pdf_extract, "run_in_pool") as mock_pool:
+            second = extract_schedule(schedule_pdf)
+        mock_pool.assert_not_called()
+        assert second == first
@@ -24,6 +24,14 @@ from unittest.mock import Mock, patch, MagicMock, call
 import base64
 import json
 
+import llm_client
+
+
+def encode_file(file_bytes):
+    """Base64 data llm_client streams into the request body for an uploaded PDF."""
+    data_url = b"".join(llm_client.Attachment(file_bytes).iter_encoded()).decode("ascii")
+    return data_url[len(llm_client.PDF_DATA_URL_PREFIX):]
+
 
 # Strategy for generating PDF-like file content
 @st.composite
@@ -101,7 +109,7 @@ class TestPreservationProperties:
         }
         
         with patch('adviseme.st') as mock_st, \
-             patch('adviseme.requests.post', return_value=mock_response) as mock_post, \
+             patch('llm_client.requests.post', return_value=mock_response) as mock_post, \
              patch('adviseme.os.getenv', return_value='test_api_key'):
             
             # Setup mock streamlit components
@@ -111,9 +119,6 @@ class TestPreservationProperties:
             mock_st.success = Mock()
             mock_st.text_area = Mock()
             
-            # Import the encode function
-            from adviseme import encode_file
-            
             # Simulate multiple button clicks
             for click_num in range(click_count):
                 # Each click should successfully encode and send data
@@ -211,7 +216,7 @@ class TestPreservationProperties:
         mock_response.text = error_message
         
         with patch('adviseme.st') as mock_st, \
-             patch('adviseme.requests.post', return_value=mock_response), \
+             patch('llm_client.requests.post', return_value=mock_response), \
              patch('adviseme.os.getenv', return_value='test_api_key'):
             
             mock_st.spinner = MagicMock()
@@ -219,9 +224,6 @@ class TestPreservationProperties:
             mock_st.spinner.return_value.__exit__ = Mock()
             mock_st.error = Mock()
             
-            # Import the encode function
-            from adviseme import encode_file
-            
             # Encode files (this should work)
             progress_data = encode_file(progress_file.read())
             schedule_data = encode_file(schedule_file.read())
@@ -275,7 +277,7 @@ class TestPreservationProperties:
         }
         
         with patch('adviseme.st') as mock_st, \
-             patch('adviseme.requests.post', return_value=mock_response), \
+             patch('llm_client.requests.post', return_value=mock_response), \
              patch('adviseme.os.getenv', return_value='test_api_key'):
             
             mock_st.spinner = MagicMock()
@@ -285,9 +287,6 @@ class TestPreservationProperties:
             mock_st.text_area = Mock()
             mock_st.markdown = Mock()
             
-            # Import the encode function
-            from adviseme import encode_file
-            
             # Encode files
             progress_data = encode_file(progress_file.read())
             schedule_data = encode_file(schedule_file.read())
@@ -345,7 +344,7 @@ class TestPreservationProperties:
         }
         
         with patch('adviseme.st') as mock_st, \
-             patch('adviseme.requests.post', return_value=mock_response), \
+             patch('llm_client.requests.post', return_value=mock_response), \
              patch('adviseme.os.getenv', return_value='test_api_key'):
             
             # Setup spinner mock
@@ -357,8 +356,7 @@ class TestPreservationProperties:
             
             # Simulate the spinner usage
             with mock_st.spinner("Analyzing documents and generating advice..."):
-                # Import and use encode function
-                from adviseme import encode_file
+                # Encode the files
                 progress_data = encode_file(progress_file.read())
                 schedule_data = encode_file(schedule_file.read())
             
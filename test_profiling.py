@@ -0,0 +1,152 @@
+"""
+Tests for call-site profiling hooks and whole-rerun captures.
+"""
+
+import os
+import pytest
+from unittest.mock import patch
+
+import profiling
+from profiling import profiled, profile_block, get_profile_stats, begin_rerun_capture, end_rerun_capture
+from ui_helpers import timed_operation, timed_span
+
+
+@pytest.fixture(autouse=True)
+def clear_profiling():
+    """Start each test without aggregates or captures."""
+    profiling.reset_profile_stats()
+    profiling.clear_captures()
+    yield
+    profiling.reset_profile_stats()
+    profiling.clear_captures()
+
+
+def busy(n):
+    return sum(i * i for i in range(n))
+
+
+class TestCallSites:
+    """Tests for per-call-site aggregation."""
+
+    def test_aggregates_per_call_site(self):
+        """Test that calls are counted per caller line."""
+        @profiled("work")
+        def work():
+            return busy(100)
+
+        for _ in range(3):
+            work()
+        work()
+
+        rows = [row for row in get_profile_stats() if row['name'] == "work"]
+        assert sorted(row['calls'] for row in rows) == [1, 3]
+        assert all(row['site'].startswith("test_profiling.py:") for row in rows)
+        row = rows[0]
+        assert row['min_ms'] <= row['mean_ms'] <= row['max_ms']
+        assert work.__name__ == "work"
+
+    def test_default_name(self):
+        """Test that the operation defaults to module.qualname."""
+        @profiled()
+        def helper():
+            return 1
+
+        helper()
+        assert get_profile_stats()[0]['name'] == "test_profiling.TestCallSites.test_default_name.<locals>.helper"
+
+    def test_sampling(self):
+        """Test that unsampled calls still run but are not timed."""
+        @profiled("never", sample_rate=0.0)
+        def never():
+            return 7
+
+        assert never() == 7
+        with patch.dict(os.environ, {"ADVISEME_PROFILE_SAMPLE_RATE": "0"}):
+            with profile_block("block"):
+                pass
+        assert get_profile_stats() == []
+
+    def test_profile_block_and_exceptions(self):
+        """Test that blocks are timed even when they raise."""
+        with pytest.raises(KeyError):
+            with profile_block("lookup"):
+                raise KeyError("x")
+        (row,) = get_profile_stats()
+        assert row['name'] == "lookup" and row['calls'] == 1
+        assert row['site'].startswith("test_profiling.py:")
+
+    def test_sorted_by_total(self):
+        """Test that the slowest total comes first."""
+        profiling.record("fast", 1_000, "a.py:1")
+        profiling.record("slow", 5_000_000, "b.py:2")
+        assert [row['name'] for row in get_profile_stats()] == ["slow", "fast"]
+        assert len(get_profile_stats(limit=1)) == 1
+
+    def test_timed_helpers_record_call_sites(self):
+        """Test that ui_helpers timing feeds the aggregates with perf_counter_ns."""
+        @timed_operation("database_query")
+        def query():
+            return 1
+
+        query()
+        with timed_span("save_session"):
+            pass
+        rows = {row['name']: row for row in get_profile_stats()}
+        assert rows["database_query"]['site'].startswith("test_profiling.py:")
+        assert rows["save_session"]['site'].startswith("test_profiling.py:")
+
+
+class TestRerunCapture:
+    """Tests for opt-in whole-rerun captures."""
+
+    def test_capture_requested(self):
+        """Test the query parameter and the admin toggle."""
+        assert profiling.capture_requested({"profile": "1"}, {}, is_admin=True)
+        assert profiling.capture_requested({}, {"profile_reruns": True}, is_admin=True)
+        assert not profiling.capture_requested({"profile": "0"}, {}, is_admin=True)
+        assert not profiling.capture_requested({}, {}, is_admin=True)
+
+    def test_capture_admin_only(self):
+        """Test that other professors cannot start a capture."""
+        assert not profiling.capture_requested({"profile": "1"}, {})
+        assert not profiling.capture_requested({"profile": "1"}, {"profile_reruns": True}, is_admin=False)
+
+    def test_capture_report(self):
+        """Test a cProfile capture with its report."""
+        capture = begin_rerun_capture("s1", True, label="admin rerun")
+        busy(10_000)
+        result = end_rerun_capture(capture)
+        assert result['profiler'] == profiling.CPROFILE
+        assert "busy" in result['report']
+        assert any("busy" in row['function'] for row in result['top'])
+        assert profiling.get_captures()[0] is result
+
+    def test_not_requested_or_disabled(self):
+        """Test that nothing is captured unless requested and enabled."""
+        assert begin_rerun_capture("s1", False) is None
+        with patch.dict(os.environ, {"ADVISEME_PROFILING": "off"}):
+            assert begin_rerun_capture("s1", True) is None
+        assert end_rerun_capture(None) is None
+
+    def test_one_capture_at_a_time(self):
+        """Test that a second session is not captured concurrently."""
+        first = begin_rerun_capture("s1", True)
+        assert begin_rerun_capture("s2", True) is None
+        assert end_rerun_capture(first) is not None
+
+    def test_interrupted_capture_discarded(self):
+        """Test that a capture left running by st.stop()/st.rerun() is dropped."""
+        stale = begin_rerun_capture("s1", True)
+        fresh = begin_rerun_capture("s1", True)
+        assert fresh is not None and fresh is not stale
+        assert end_rerun_capture(stale) is None
+        assert end_rerun_capture(fresh) is not None
+        assert len(profiling.get_captures()) == 1
+
+    def test_pyinstrument_fallback(self):
+        """Test that cProfile is used when pyinstrument is unavailable."""
+        with patch.dict(os.environ, {"ADVISEME_PROFILER": "pyinstrument"}), \
+             patch.dict("sys.modules", {"pyinstrument": None}):
+            capture = begin_rerun_capture("s1", True)
+            result = end_rerun_capture(capture)
+        assert result['profiler'] == profiling.CPROFILE
@@ -0,0 +1,122 @@
+"""
+Tests for the template-compiled prompt builder.
+"""
+
+import os
+import pytest
+from unittest.mock import patch
+
+from prompt_builder import (
+    render_prompt,
+    build_prompt,
+    build_email_prompt,
+    get_prompt_variant,
+    get_template_token_counts,
+    estimate_tokens,
+    load_template,
+    PROMPT_VARIANTS,
+)
+
+# Section markers the response parser in adviseme.py relies on
+RESPONSE_MARKERS = [
+    "---EMAIL---", "---END EMAIL---",
+    "---RECOMMENDED---", "---END RECOMMENDED---",
+    "---ALTERNATIVE1---", "---END ALTERNATIVE1---",
+    "---ALTERNATIVE2---", "---END ALTERNATIVE2---",
+]
+
+
+class TestRenderPrompt:
+    """Tests for template rendering."""
+
+    @pytest.mark.parametrize("variant", PROMPT_VARIANTS)
+    def test_all_placeholders_substituted(self, variant):
+        """Test that no template placeholder survives rendering."""
+        prompt = render_prompt("Fall", 2027, "12-15", variant)
+        assert "$" not in prompt.text
+        assert "Fall 2027" in prompt.text
+        assert "12-15 credits" in prompt.text
+
+    @pytest.mark.parametrize("variant", PROMPT_VARIANTS)
+    def test_response_markers_present(self, variant):
+        """Test that every variant asks for the parseable output format."""
+        text = render_prompt("Spring", 2026, "15-18", variant).text
+        for marker in RESPONSE_MARKERS:
+            assert marker in text
+
+    def test_full_variant_keeps_original_wording(self):
+        """Test that the full variant is the original prompt."""
+        text = render_prompt("Spring", 2026, "15-18", "full").text
+        assert text.startswith("You are an academic advisor at UAPB.")
+        assert "course schedule for spring 2026." in text
+        assert "Create schedule options with 15-18 credits each for Spring 2026" in text
+
+    def test_render_is_memoized(self):
+        """Test that repeated renders of the same tuple hit the cache."""
+        render_prompt("Summer", 2028, "12-14", "full")
+        hits = render_prompt.cache_info().hits
+        again = render_prompt("Summer", 2028, "12-14", "full")
+        assert render_prompt.cache_info().hits == hits + 1
+        assert again.tokens == estimate_tokens(again.text)
+
+    def test_template_compiled_once(self):
+        """Test that templates are loaded from disk once."""
+        assert load_template("compact") is load_template("compact")
+
+    def test_email_prompt(self):
+        """Test the email-only template used with locally solved schedules."""
+        prompt = build_email_prompt("Fall", 2026, "15-18")
+        assert prompt.variant == "email"
+        assert "---EMAIL---" in prompt.text and "---END EMAIL---" in prompt.text
+        assert "---RECOMMENDED---" not in prompt.text
+        assert "Fall 2026" in prompt.text and "$" not in prompt.text
+
+    def test_unknown_variant_rejected(self):
+        """Test that an unknown variant raises ValueError."""
+        with pytest.raises(ValueError):
+            load_template("verbose")
+
+
+class TestVariantSelection:
+    """Tests for the PROMPT_VARIANT A/B switch."""
+
+    def test_default_is_full(self):
+        """Test that the full prompt is used when nothing is configured."""
+        with patch.dict(os.environ, {}, clear=True):
+            assert get_prompt_variant("any") == "full"
+
+    def test_explicit_compact(self):
+        """Test that PROMPT_VARIANT=compact selects the compact prompt."""
+        with patch.dict(os.environ, {"PROMPT_VARIANT": "compact"}):
+            assert build_prompt("Spring", 2026, "15-18").variant == "compact"
+
+    def test_unknown_mode_falls_back(self):
+        """Test that an invalid PROMPT_VARIANT falls back to full."""
+        with patch.dict(os.environ, {"PROMPT_VARIANT": "bogus"}):
+            assert get_prompt_variant("x") == "full"
+
+    def test_ab_assignment_is_deterministic(self):
+        """Test that A/B mode gives the same key the same variant."""
+        with patch.dict(os.environ, {"PROMPT_VARIANT": "ab"}):
+            assert get_prompt_variant("Jane_Progress.pdf") == get_prompt_variant("Jane_Progress.pdf")
+
+    def test_ab_uses_both_variants(self):
+        """Test that A/B mode splits keys across both variants."""
+        with patch.dict(os.environ, {"PROMPT_VARIANT": "ab"}):
+            seen = {get_prompt_variant(f"student_{i}.pdf") for i in range(50)}
+        assert seen == set(PROMPT_VARIANTS)
+
+
+class TestTokenCounts:
+    """Tests for precomputed token counts."""
+
+    def test_compact_is_smaller(self):
+        """Test that the compact template costs fewer tokens."""
+        counts = get_template_token_counts()
+        assert counts["compact"] < counts["full"]
+
+    def test_estimate_tokens(self):
+        """Test the character-based token estimate."""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("abcd") == 1
+        assert estimate_tokens("abcde") == 2
@@ -0,0 +1,205 @@
+"""
+Tests for bulk professor provisioning (provision_professors.py)
+"""
+
+import csv
+import os
+from unittest.mock import patch
+
+import bcrypt
+import pytest
+
+import database
+import provision_professors
+
+# Cheap work factor so the tests do not spend seconds in bcrypt
+TEST_ROUNDS = 4
+
+
+def write_csv(path, rows, header=("username", "password")):
+    """Write a provisioning CSV."""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def cheap_bcrypt(monkeypatch):
+    """Use a low bcrypt work factor."""
+    monkeypatch.setattr(provision_professors, 'BCRYPT_ROUNDS', TEST_ROUNDS)
+
+
+class TestProvision:
+    """Tests for provision()"""
+
+    def test_creates_accounts(self, temp_db, tmp_path):
+        """Valid rows become accounts whose passwords verify."""
+        rows = provision_professors.read_rows(write_csv(tmp_path / "p.csv", [
+            ("dr_smith", "password123"), ("dr_jones", "password456"),
+        ]))
+
+        results = provision_professors.provision(rows, workers=1)
+
+        assert [result['status'] for result in results] == ["created", "created"]
+        professor = database.get_professor_by_username("dr_jones")
+        assert bcrypt.checkpw(b"password456", professor['password_hash'].encode())
+
+    def test_process_pool(self, temp_db, tmp_path):
+        """Hashing in worker processes gives the same accounts."""
+        rows = [{'line': i + 2, 'username': f"prof_{i}", 'password': f"password-{i}"} for i in range(6)]
+
+        results = provision_professors.provision(rows, workers=2, rounds=TEST_ROUNDS)
+
+        assert all(result['status'] == "created" for result in results)
+        professor = database.get_professor_by_username("prof_5")
+        assert bcrypt.checkpw(b"password-5", professor['password_hash'].encode())
+
+    def test_per_row_errors(self, temp_db, tmp_path):
+        """Invalid and duplicate rows are reported without stopping the others."""
+        rows = provision_professors.read_rows(write_csv(tmp_path / "p.csv", [
+            ("dr_smith", "password123"),
+            ("bad name", "password123"),
+            ("dr_short", "short"),
+            ("dr_smith", "password999"),
+            ("dr_jones", "password456"),
+        ]))
+
+        results = provision_professors.provision(rows, workers=1)
+
+        assert [(r['line'], r['status']) for r in results] == [
+            (2, "created"), (3, "invalid"), (4, "invalid"), (5, "duplicate"), (6, "created"),
+        ]
+        assert "alphanumeric" in results[1]['message']
+        assert database.get_professor_by_username("dr_jones") is not None
+
+    def test_idempotent(self, temp_db, tmp_path):
+        """Re-running leaves existing accounts unchanged."""
+        path = write_csv(tmp_path / "p.csv", [("dr_smith", "password123")])
+        provision_professors.provision(provision_professors.read_rows(path), workers=1)
+        original = database.get_professor_by_username("dr_smith")['password_hash']
+
+        path = write_csv(tmp_path / "p.csv", [("dr_smith", "changed-password"), ("dr_new", "password123")])
+        results = provision_professors.provision(provision_professors.read_rows(path), workers=1)
+
+        assert [result['status'] for result in results] == ["exists", "created"]
+        assert database.get_professor_by_username("dr_smith")['password_hash'] == original
+
+    def test_dry_run(self, temp_db, tmp_path):
+        """A dry run reports without creating accounts."""
+        rows = provision_professors.read_rows(write_csv(tmp_path / "p.csv", [("dr_smith", "password123")]))
+
+        results = provision_professors.provision(rows, workers=1, dry_run=True)
+
+        assert results[0]['status'] == "created"
+        assert database.get_professor_by_username("dr_smith") is None
+
+
+class TestCommandLine:
+    """Tests for the command line"""
+
+    def test_generated_passwords(self, temp_db, tmp_path, capsys):
+        """Rows without passwords get generated ones in an owner-only file."""
+        path = write_csv(tmp_path / "p.csv", [("dr_smith",), ("dr_jones",)], header=("username",))
+        credentials = str(tmp_path / "credentials.csv")
+
+        assert provision_professors.main([path, "--workers", "1", "--credentials-out", credentials]) == 0
+
+        with open(credentials, newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert [row['username'] for row in rows] == ["dr_smith", "dr_jones"]
+        professor = database.get_professor_by_username("dr_smith")
+        assert bcrypt.checkpw(rows[0]['password'].encode(), professor['password_hash'].encode())
+        assert os.stat(credentials).st_mode & 0o777 == 0o600
+        assert "Created 2 accounts" in capsys.readouterr().out
+
+    def test_generated_passwords_need_output(self, temp_db, tmp_path, capsys):
+        """Generated passwords are never created without somewhere to put them."""
+        path = write_csv(tmp_path / "p.csv", [("dr_smith",)], header=("username",))
+
+        assert provision_professors.main([path]) == 1
+        assert database.get_professor_by_username("dr_smith") is None
+
+    def test_unwritable_credentials_create_nothing(self, temp_db, tmp_path, capsys):
+        """An unwritable credentials path fails before any account is created."""
+        path = write_csv(tmp_path / "p.csv", [("dr_smith",)], header=("username",))
+        credentials = str(tmp_path / "missing" / "credentials.csv")
+
+        with patch.object(provision_professors, 'hash_password') as hash_password:
+            assert provision_professors.main([path, "--workers", "1", "--credentials-out", credentials]) == 1
+        hash_password.assert_not_called()
+        assert database.get_professor_by_username("dr_smith") is None
+        assert "Error" in capsys.readouterr().out
+
+    def test_failed_credentials_write_creates_nothing(self, temp_db, tmp_path, capsys):
+        """Accounts are only committed once their passwords are on disk."""
+        path = write_csv(tmp_path / "p.csv", [("dr_smith",)], header=("username",))
+        credentials = str(tmp_path / "credentials.csv")
+
+        with patch.object(provision_professors.os, 'fsync', side_effect=OSError("disk full")):
+            assert provision_professors.main([path, "--workers", "1", "--credentials-out", credentials]) == 1
+        assert database.get_professor_by_username("dr_smith") is None
+
+    def test_rerun_keeps_credentials(self, temp_db, tmp_path, capsys):
+        """Re-running with nothing new to create leaves the earlier passwords on disk."""
+        path = write_csv(tmp_path / "p.csv", [("dr_smith",)], header=("username",))
+        credentials = str(tmp_path / "credentials.csv")
+        assert provision_professors.main([path, "--workers", "1", "--credentials-out", credentials]) == 0
+        with open(credentials) as f:
+            first = f.read()
+        capsys.readouterr()
+
+        assert provision_professors.main([path, "--workers", "1", "--credentials-out", credentials]) == 0
+        with open(credentials) as f:
+            assert f.read() == first
+        assert "Wrote" not in capsys.readouterr().out
+
+    def test_existing_credentials_refused(self, temp_db, tmp_path, capsys):
+        """New passwords are not written over a non-empty file without --overwrite."""
+        path = write_csv(tmp_path / "p.csv", [("dr_smith",)], header=("username",))
+        credentials = tmp_path / "credentials.csv"
+        credentials.write_text("username,password\ndr_jones,secret-from-last-run\n")
+
+        with patch.object(provision_professors, 'hash_password') as hash_password:
+            assert provision_professors.main([path, "--workers", "1", "--credentials-out", str(credentials)]) == 1
+        hash_password.assert_not_called()
+        assert "secret-from-last-run" in credentials.read_text()
+        assert database.get_professor_by_username("dr_smith") is None
+        assert "--overwrite" in capsys.readouterr().out
+
+    def test_overwrite_replaces_credentials(self, temp_db, tmp_path, capsys):
+        """--overwrite replaces a non-empty credentials file."""
+        path = write_csv(tmp_path / "p.csv", [("dr_smith",)], header=("username",))
+        credentials = tmp_path / "credentials.csv"
+        credentials.write_text("username,password\ndr_jones,secret-from-last-run\n")
+
+        assert provision_professors.main(
+            [path, "--workers", "1", "--credentials-out", str(credentials), "--overwrite"]
+        ) == 0
+        with open(credentials, newline='') as f:
+            assert [row['username'] for row in csv.DictReader(f)] == ["dr_smith"]
+
+    def test_no_generated_passwords_no_file(self, temp_db, tmp_path, capsys):
+        """Rows that all carry passwords never create the credentials file."""
+        path = write_csv(tmp_path / "p.csv", [("dr_smith", "password123")])
+        credentials = tmp_path / "credentials.csv"
+
+        assert provision_professors.main([path, "--workers", "1", "--credentials-out", str(credentials)]) == 0
+        assert not credentials.exists()
+
+    def test_rejected_rows_fail_the_run(self, temp_db, tmp_path, capsys):
+        """Rejected rows are listed and make the exit status non-zero."""
+        path = write_csv(tmp_path / "p.csv", [("dr_smith", "password123"), ("bad name", "password123")])
+
+        assert provision_professors.main([path, "--workers", "1"]) == 1
+        output = capsys.readouterr().out
+        assert "Line 3 (bad name)" in output
+        assert database.get_professor_by_username("dr_smith") is not None
+
+    def test_missing_username_column(self, tmp_path, capsys):
+        """A CSV without a username column is rejected."""
+        path = write_csv(tmp_path / "p.csv", [("x",)], header=("email",))
+
+        assert provision_professors.main([path]) == 1
+        assert "username" in capsys.readouterr().out
@@ -0,0 +1,112 @@
+"""
+Tests for per-section rerun timings, rolling summaries and budget flags.
+"""
+
+import logging
+import os
+import pytest
+from unittest.mock import patch
+
+import metrics
+import rerun_profiler
+from rerun_profiler import record_rerun, start_rerun, summarize, get_process_summary, get_session_summary
+
+
+@pytest.fixture(autouse=True)
+def clear_summaries():
+    """Start each test with empty summaries."""
+    rerun_profiler.reset()
+    yield
+    rerun_profiler.reset()
+    metrics._sessions.clear()
+
+
+class TestRerunTimer:
+    """Tests for marking sections within a rerun."""
+
+    def test_sections_in_order(self):
+        """Test that each mark closes the previous section."""
+        timer = start_rerun("startup")
+        timer.mark("auth")
+        timer.mark("sidebar")
+        timer.mark("auth")
+        rerun = timer.finish("app", "s1", {})
+        assert list(rerun['sections']) == ["startup", "auth", "sidebar"]
+        assert rerun['total_ms'] == pytest.approx(sum(rerun['sections'].values()))
+        assert all(ms >= 0 for ms in rerun['sections'].values())
+
+    def test_finish_once(self):
+        """Test that a rerun is recorded once and feeds the rerun metrics."""
+        before = metrics.RERUN_SECONDS.count(page="login")
+        timer = start_rerun()
+        first = timer.finish("login", "s1", {"key": "value"})
+        assert timer.finish("login", "s1", {}) is first
+        assert metrics.RERUN_SECONDS.count(page="login") == before + 1
+        assert get_process_summary()['reruns'] == 1
+
+
+class TestBudget:
+    """Tests for over-budget flags."""
+
+    def test_over_budget_flagged_and_logged(self, caplog):
+        """Test that slow reruns are flagged with their slowest sections."""
+        with patch.dict(os.environ, {"ADVISEME_RERUN_BUDGET_MS": "100"}), \
+             caplog.at_level(logging.WARNING, logger="rerun_profiler"):
+            rerun = record_rerun("app", {"startup": 5.0, "sidebar": 150.0, "results": 20.0}, "s1")
+        assert rerun['over_budget']
+        assert "sidebar=150ms" in caplog.text
+        assert get_process_summary()['over_budget'] == 1
+
+    def test_generate_section_exempt(self):
+        """Test that the model call does not count against the budget."""
+        with patch.dict(os.environ, {"ADVISEME_RERUN_BUDGET_MS": "100"}):
+            rerun = record_rerun("app", {"sidebar": 50.0, "generate": 20000.0})
+        assert not rerun['over_budget']
+        assert rerun['counted_ms'] == 50.0
+        assert rerun['total_ms'] == 20050.0
+
+
+class TestSummaries:
+    """Tests for rolling per-session and per-process summaries."""
+
+    def test_summarize(self):
+        """Test nearest-rank percentiles."""
+        summary = summarize(float(i) for i in range(1, 101))
+        assert summary['count'] == 100
+        assert summary['p50_ms'] == 50.0
+        assert summary['p95_ms'] == 95.0
+        assert summary['max_ms'] == 100.0
+        assert summarize([])['count'] == 0
+
+    def test_process_summary_sorted_by_mean(self):
+        """Test that the most expensive section comes first."""
+        for _ in range(3):
+            record_rerun("app", {"startup": 1.0, "sidebar": 30.0, "results": 10.0}, "s1")
+        summary = get_process_summary()
+        assert [row['section'] for row in summary['sections']] == ["sidebar", "results", "startup"]
+        assert summary['total']['mean_ms'] == 41.0
+
+    def test_process_window_rolls(self):
+        """Test that only the last PROCESS_WINDOW reruns are summarized."""
+        with patch.object(rerun_profiler, "_process_totals", rerun_profiler.deque(maxlen=2)):
+            for ms in (100.0, 1.0, 2.0):
+                record_rerun("app", {"startup": ms})
+            assert get_process_summary()['total']['max_ms'] == 2.0
+
+    def test_session_summary(self):
+        """Test per-session history and section means."""
+        record_rerun("app", {"sidebar": 10.0}, "s1")
+        record_rerun("app", {"sidebar": 30.0, "generate": 5.0}, "s1")
+        record_rerun("app", {"sidebar": 99.0}, "s2")
+        summary = get_session_summary("s1")
+        assert len(summary['reruns']) == 2
+        assert summary['sections'] == {"sidebar": 20.0, "generate": 5.0}
+        assert get_session_summary(None)['reruns'] == []
+
+    def test_session_window_rolls(self):
+        """Test that a session keeps its last SESSION_WINDOW reruns."""
+        for i in range(rerun_profiler.SESSION_WINDOW + 5):
+            record_rerun("app", {"sidebar": float(i)}, "s1")
+        reruns = get_session_summary("s1")['reruns']
+        assert len(reruns) == rerun_profiler.SESSION_WINDOW
+        assert reruns[-1]['sections']['sidebar'] == rerun_profiler.SESSION_WINDOW + 4
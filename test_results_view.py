@@ -0,0 +1,104 @@
+"""
+Tests for the results view (render-once result fragments).
+
+Verifies the content hash used as the cache key and the view model built for
+the email and schedule tabs.
+"""
+
+import pytest
+from results_view import (
+    parse_schedule_table_to_csv,
+    has_results,
+    results_content_hash,
+    build_results_view,
+    get_results_view,
+)
+
+
+@pytest.fixture
+def results():
+    """Provide a complete set of results as stored in session state."""
+    return {
+        'email_content': 'Dear student, here is your plan for Spring 2026.',
+        'recommended_schedule': '| Course | Credits |\n|--------|--------|\n| CS 101 | 3 |',
+        'alternative1_schedule': '| Course | Credits |\n|--------|--------|\n| CS 102 | 3 |',
+        'alternative2_schedule': '',
+        'semester_info': 'Spring 2026',
+    }
+
+
+class TestResultsContentHash:
+    """Tests for results_content_hash."""
+
+    def test_no_results_returns_none(self):
+        """Test that an empty state has no hash."""
+        assert results_content_hash({}) is None
+        assert has_results({}) is False
+
+    def test_hash_is_stable(self, results):
+        """Test that the same results always hash the same."""
+        assert results_content_hash(results) == results_content_hash(dict(results))
+
+    def test_hash_ignores_unrelated_keys(self, results):
+        """Test that unrelated session state does not change the hash."""
+        other = dict(results, min_credits=12, history_dropdown=3)
+        assert results_content_hash(other) == results_content_hash(results)
+
+    def test_hash_changes_with_content(self, results):
+        """Test that any change in a result string changes the hash."""
+        changed = dict(results, alternative2_schedule='| A | B |')
+        assert results_content_hash(changed) != results_content_hash(results)
+
+    def test_hash_distinguishes_field_boundaries(self, results):
+        """Test that moving text between fields changes the hash."""
+        a = dict(results, email_content='ab', recommended_schedule='c')
+        b = dict(results, email_content='a', recommended_schedule='bc')
+        assert results_content_hash(a) != results_content_hash(b)
+
+
+class TestBuildResultsView:
+    """Tests for build_results_view."""
+
+    def test_tabs_skip_missing_alternatives(self, results):
+        """Test that only present alternatives get a tab."""
+        view = build_results_view(results)
+        keys = [tab['key'] for tab in view['schedules']]
+        assert keys == ['recommended_schedule', 'alternative1_schedule']
+
+    def test_csv_payload_precomputed(self, results):
+        """Test that table tabs carry their CSV download payload."""
+        view = build_results_view(results)
+        recommended = view['schedules'][0]
+        assert recommended['is_table'] is True
+        assert recommended['csv'] == parse_schedule_table_to_csv(results['recommended_schedule'])
+
+    def test_non_table_schedule_has_no_csv(self, results):
+        """Test that a text-only recommendation is shown without CSV."""
+        results['recommended_schedule'] = 'No courses needed - all degree requirements satisfied.'
+        view = build_results_view(results)
+        assert view['schedules'][0]['is_table'] is False
+        assert view['schedules'][0]['csv'] is None
+
+    def test_file_names_use_semester_info(self, results):
+        """Test that download names keep the semester_year format."""
+        view = build_results_view(results)
+        assert view['email_file_name'] == 'academic_advice_Spring_2026.txt'
+        assert view['schedules'][0]['file_name'] == 'recommended_schedule_Spring_2026.csv'
+        assert view['schedules'][1]['file_name'] == 'alternative1_schedule_Spring_2026.csv'
+
+    def test_get_results_view_returns_none_without_results(self):
+        """Test that no view is built for an empty session."""
+        assert get_results_view({}) is None
+
+    def test_get_results_view_matches_uncached_build(self, results):
+        """Test that the cached view equals a fresh build."""
+        assert get_results_view(results) == build_results_view(results)
+
+
+class TestParseScheduleTableToCsv:
+    """Tests for parse_schedule_table_to_csv."""
+
+    def test_separator_row_dropped(self):
+        """Test that the markdown separator row is not emitted."""
+        csv = parse_schedule_table_to_csv('| A | B |\n|---|---|\n| 1 | 2 |')
+        assert csv == 'A,B\n1,2'
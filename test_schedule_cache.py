@@ -0,0 +1,129 @@
+"""
+Tests for the process-wide parsed-schedule cache.
+"""
+
+import hashlib
+import os
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+import schedule_cache
+import slot_index
+from schedule_cache import (
+    get_schedule,
+    put_schedule,
+    get_slot_masks,
+    put_slot_masks,
+    clear_memory,
+    get_cache_stats,
+)
+
+
+def make_key(name):
+    """Build a file-hash style key."""
+    return hashlib.sha256(name.encode("utf-8")).hexdigest()
+
+
+SCHEDULE = {'hash': make_key("spring"), 'sections': [
+    {'course': 'ANSC 3303', 'section': '01', 'title': 'Animal Nutrition', 'credits': 3.0,
+     'meetings': [{'days': [0, 2, 4], 'start': 540, 'end': 590}], 'instructor': 'Dr. Smith'},
+]}
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Use an empty cache directory and memory per test."""
+    directory = tmp_path / "cache"
+    monkeypatch.setenv("ADVISEME_CACHE_DIR", str(directory))
+    clear_memory()
+    slot_index._index_cache.clear()
+    yield directory
+    clear_memory()
+    slot_index._index_cache.clear()
+
+
+class TestScheduleCache:
+    """Tests for the memory and disk levels."""
+
+    def test_miss(self):
+        """Test that unknown hashes are not found."""
+        assert get_schedule(make_key("unknown")) == (False, None)
+
+    def test_memory_hit_returns_same_object(self):
+        """Test that sessions in one process share the parsed structure."""
+        put_schedule(SCHEDULE['hash'], SCHEDULE)
+        found, schedule = get_schedule(SCHEDULE['hash'])
+        assert found and schedule is SCHEDULE
+
+    def test_warm_from_disk(self, cache_dir):
+        """Test that a restarted process loads from disk."""
+        put_schedule(SCHEDULE['hash'], SCHEDULE)
+        assert (cache_dir / f"v{schedule_cache.CACHE_VERSION}" / f"{SCHEDULE['hash']}.pkl").exists()
+        clear_memory()
+        disk_hits = get_cache_stats()['disk_hits']
+        found, schedule = get_schedule(SCHEDULE['hash'])
+        assert found and schedule == SCHEDULE
+        assert get_cache_stats()['disk_hits'] == disk_hits + 1
+
+    def test_empty_result_memory_only(self, cache_dir):
+        """Test that "no sections" is cached in memory but not persisted."""
+        key = make_key("empty")
+        put_schedule(key, None)
+        assert get_schedule(key) == (True, None)
+        assert not cache_dir.exists()
+
+    def test_lru_by_bytes(self):
+        """Test that the least recently used entries are evicted by size."""
+        evictions = get_cache_stats()['evictions']
+        with patch.dict(os.environ, {"ADVISEME_SCHEDULE_CACHE_MB": "0.001"}):
+            big = {'sections': ["x" * 600]}
+            put_schedule("a", big)
+            put_schedule("b", big)
+            assert get_schedule("a") == (False, None)
+            assert get_schedule("b")[0]
+        stats = get_cache_stats()
+        assert stats['entries'] == 1 and stats['evictions'] == evictions + 1
+
+    def test_non_hash_keys_not_written(self, cache_dir):
+        """Test that only file hashes become file names."""
+        put_schedule("../escape", SCHEDULE)
+        assert not cache_dir.exists()
+
+    def test_corrupt_file_ignored(self, cache_dir):
+        """Test that an unreadable cache file is treated as a miss."""
+        version_dir = cache_dir / f"v{schedule_cache.CACHE_VERSION}"
+        version_dir.mkdir(parents=True)
+        (version_dir / f"{SCHEDULE['hash']}.pkl").write_bytes(b"not a pickle")
+        assert get_schedule(SCHEDULE['hash']) == (False, None)
+
+    def test_other_versions_ignored(self, cache_dir):
+        """Test that schedules parsed by another parser version are not loaded."""
+        put_schedule(SCHEDULE['hash'], SCHEDULE)
+        put_slot_masks(SCHEDULE['hash'], np.zeros((1, 32), dtype=np.uint64))
+        clear_memory()
+        with patch.object(schedule_cache, "CACHE_VERSION", schedule_cache.CACHE_VERSION + 1):
+            assert get_schedule(SCHEDULE['hash']) == (False, None)
+            assert get_slot_masks(SCHEDULE['hash']) is None
+
+
+class TestSlotMasks:
+    """Tests for the memory-mapped slot index masks."""
+
+    def test_round_trip_memory_mapped(self):
+        """Test that stored masks come back as a read-only memory map."""
+        masks = np.arange(64, dtype=np.uint64).reshape(2, 32)
+        put_slot_masks(SCHEDULE['hash'], masks)
+        loaded = get_slot_masks(SCHEDULE['hash'])
+        assert isinstance(loaded, np.memmap)
+        assert np.array_equal(loaded, masks)
+        assert get_slot_masks(make_key("other")) is None
+
+    def test_slot_index_warms_from_disk(self):
+        """Test that the slot index is not rebuilt in a new process."""
+        first = slot_index.get_slot_index(SCHEDULE)
+        slot_index._index_cache.clear()
+        with patch.object(slot_index, "section_slot_mask") as mock_mask:
+            second = slot_index.get_slot_index(SCHEDULE)
+        mock_mask.assert_not_called()
+        assert np.array_equal(first.masks, second.masks)
@@ -0,0 +1,106 @@
+"""
+Tests for matching unmet requirements against schedule sections.
+"""
+
+import pytest
+
+import schedule_matcher
+from schedule_matcher import (
+    build_section_index,
+    get_section_index,
+    match_requirements,
+    format_candidates,
+    build_candidate_text,
+)
+
+
+def make_section(course, section, meetings=None, title="Title", credits=3.0, instructor="Staff"):
+    """Build a parsed section dictionary."""
+    return {
+        'course': course,
+        'section': section,
+        'title': title,
+        'credits': credits,
+        'meetings': meetings or [],
+        'instructor': instructor,
+    }
+
+
+def make_row(course, title="Title"):
+    """Build a Not Satisfied requirement row."""
+    return {'course': course, 'title': title, 'requirement': 'Core', 'status': 'Not Satisfied'}
+
+
+SECTIONS = [
+    make_section('ANSC 3303', '01', [{'days': [0, 2, 4], 'start': 540, 'end': 590}],
+                 title='Animal Nutrition', instructor='Dr. Smith'),
+    make_section('ANSC 3303', '02', [{'days': [1, 3], 'start': 780, 'end': 855}]),
+    make_section('ENGL 1311', '01'),
+]
+
+SCHEDULE = {'hash': 'abc123', 'sections': SECTIONS}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Isolate the module-level index cache between tests."""
+    schedule_matcher._index_cache.clear()
+    yield
+    schedule_matcher._index_cache.clear()
+
+
+class TestSectionIndex:
+    """Tests for the course-code index."""
+
+    def test_groups_by_course(self):
+        """Test that sections are grouped under their course code."""
+        index = build_section_index(SECTIONS)
+        assert [s['section'] for s in index['ANSC 3303']] == ['01', '02']
+        assert len(index['ENGL 1311']) == 1
+
+    def test_index_reused_per_schedule(self):
+        """Test that the index is built once per schedule hash."""
+        assert get_section_index(SCHEDULE) is get_section_index(SCHEDULE)
+
+
+class TestMatchRequirements:
+    """Tests for the requirement/section join."""
+
+    def test_candidates_and_unavailable(self):
+        """Test that offered and unoffered courses are separated."""
+        match = match_requirements(
+            [make_row('ANSC 3303'), make_row('ANSC 4401'), make_row('ANSC 3303')],
+            build_section_index(SECTIONS)
+        )
+        assert [c['requirement']['course'] for c in match['candidates']] == ['ANSC 3303']
+        assert len(match['candidates'][0]['sections']) == 2
+        assert [row['course'] for row in match['unavailable']] == ['ANSC 4401']
+
+
+class TestCandidateText:
+    """Tests for the prompt text built from the join."""
+
+    def test_table_rows(self):
+        """Test that candidate sections are listed with meeting times."""
+        match = match_requirements([make_row('ANSC 3303')], build_section_index(SECTIONS))
+        text = format_candidates(match, "Spring", 2026)
+        assert "| ANSC 3303 | 01 | Animal Nutrition | 3 | MWF 9:00 AM-9:50 AM | Dr. Smith |" in text
+        assert "ENGL 1311" not in text
+
+    def test_no_candidates(self):
+        """Test the message when nothing unmet is offered."""
+        match = match_requirements([make_row('ANSC 4401')], build_section_index(SECTIONS))
+        text = format_candidates(match, "Fall", 2026)
+        assert "None of the student's" in text
+        assert "Not offered in Fall 2026: ANSC 4401" in text
+
+    def test_needs_pdf_without_progress_or_schedule(self):
+        """Test that None is returned when the schedule PDF must be sent."""
+        progress = {'not_satisfied': [make_row('ANSC 3303')]}
+        assert build_candidate_text(None, SCHEDULE, "Fall", 2026) is None
+        assert build_candidate_text(progress, None, "Fall", 2026) is None
+
+    def test_complete_student_needs_no_schedule(self):
+        """Test that a student with nothing unmet skips the schedule."""
+        text = build_candidate_text({'not_satisfied': []}, None, "Fall", 2026)
+        assert text == "No Fall 2026 course sections are needed for this student."
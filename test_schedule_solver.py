@@ -0,0 +1,197 @@
+"""
+Tests for the local schedule solver.
+"""
+
+import os
+import pytest
+from unittest.mock import patch
+
+import schedule_solver
+import slot_index
+from schedule_solver import (
+    build_options,
+    search_schedules,
+    rank_key,
+    select_schedules,
+    format_schedule_table,
+    plan_schedules,
+)
+
+MWF = [0, 2, 4]
+TR = [1, 3]
+
+
+def make_section(course, section, meetings, credits=3.0):
+    """Build a parsed section from (days, start, end) tuples."""
+    return {
+        'course': course,
+        'section': section,
+        'title': f"{course} Title",
+        'credits': credits,
+        'meetings': [{'days': days, 'start': start, 'end': end} for days, start, end in meetings],
+        'instructor': "Dr. Smith",
+    }
+
+
+def make_candidates(*sections):
+    """Group sections into schedule_matcher candidates."""
+    by_course = {}
+    for section in sections:
+        by_course.setdefault(section['course'], []).append(section)
+    return [
+        {'requirement': {'course': course, 'title': course, 'requirement': 'Core', 'status': 'Not Satisfied'},
+         'sections': course_sections}
+        for course, course_sections in by_course.items()
+    ]
+
+
+def make_progress(*courses):
+    """Build an extraction result with the given Not Satisfied courses."""
+    rows = [{'course': c, 'title': c, 'requirement': 'Core', 'status': 'Not Satisfied'} for c in courses]
+    return {'rows': rows, 'not_satisfied': rows, 'counts': {'Not Satisfied': len(rows)}}
+
+
+class TestSearch:
+    """Tests for the backtracking search."""
+
+    def test_conflicting_sections_never_combined(self):
+        """Test that no returned schedule contains overlapping sections."""
+        courses = build_options(make_candidates(
+            make_section('ANSC 3303', '01', [(MWF, 540, 590)]),
+            make_section('ANSC 4401', '01', [(MWF, 560, 610)]),
+            make_section('ANSC 4401', '02', [(TR, 560, 635)]),
+        ))
+        result = search_schedules(courses, 0, 18)
+        assert result['exhaustive']
+        for schedule in result['schedules']:
+            taken = 0
+            for option in schedule:
+                assert not taken & option['conflicts']
+                taken |= option['id']
+        # ANSC 4401-01 alone is maximal: the only ANSC 3303 section conflicts with it
+        sections = {tuple(sorted((o['section']['course'], o['section']['section']) for o in s))
+                    for s in result['schedules']}
+        assert sections == {
+            (('ANSC 3303', '01'), ('ANSC 4401', '02')),
+            (('ANSC 4401', '01'),),
+        }
+
+    def test_credit_range_respected(self):
+        """Test that schedules stay within the credit range."""
+        courses = build_options(make_candidates(*[
+            make_section(f"ANSC {3300 + i}", '01', [([i % 5], 480, 530)], credits=4.0) for i in range(6)
+        ]))
+        result = search_schedules(courses, 12, 16)
+        assert result['schedules']
+        for schedule in result['schedules']:
+            assert 12 <= sum(option['credits'] for option in schedule) <= 16
+
+    def test_only_maximal_schedules(self):
+        """Test that schedules that could still take a course are dropped."""
+        courses = build_options(make_candidates(
+            make_section('ANSC 3303', '01', [(MWF, 540, 590)]),
+            make_section('BIOL 1401', '01', [(TR, 540, 615)]),
+        ))
+        result = search_schedules(courses, 0, 18)
+        assert [len(schedule) for schedule in result['schedules']] == [2]
+
+    def test_uses_schedule_slot_index(self):
+        """Test that options are looked up in the schedule's slot index."""
+        sections = [
+            make_section('ANSC 3303', '01', [(MWF, 540, 590)]),
+            make_section('ANSC 4401', '01', [(MWF, 560, 610)]),
+        ]
+        index = slot_index.build_slot_index(sections)
+        with patch.object(slot_index, "build_slot_index") as mock_build:
+            first, second = build_options(make_candidates(*sections), index)
+        mock_build.assert_not_called()
+        assert first[0]['conflicts'] == second[0]['id']
+
+    def test_node_limit(self):
+        """Test that the search stops at the node limit."""
+        courses = build_options(make_candidates(*[
+            make_section(f"ANSC {3300 + i}", f"0{s}", [([s % 5], 480 + 60 * i, 530 + 60 * i)])
+            for i in range(8) for s in range(3)
+        ]))
+        with patch.object(schedule_solver, "MAX_SEARCH_NODES", 50):
+            result = search_schedules(courses, 0, 30)
+        assert not result['exhaustive']
+
+
+class TestRanking:
+    """Tests for ranking and selection."""
+
+    def test_more_courses_rank_first(self):
+        """Test that covering more courses beats a better spread."""
+        one = build_options(make_candidates(make_section('A 1000', '01', [(MWF, 480, 530)])))[0]
+        two = build_options(make_candidates(
+            make_section('B 1000', '01', [([0], 480, 600)]),
+            make_section('C 1000', '01', [([0], 600, 720)]),
+        ))
+        assert rank_key([two[0][0], two[1][0]]) < rank_key([one[0]])
+
+    def test_even_spread_ranks_first(self):
+        """Test that spreading classes across the week ranks higher."""
+        packed = build_options(make_candidates(
+            make_section('A 1000', '01', [([0], 480, 600)]),
+            make_section('B 1000', '01', [([0], 600, 720)]),
+        ))
+        spread = build_options(make_candidates(
+            make_section('A 1000', '02', [([0], 480, 600)]),
+            make_section('B 1000', '02', [([2], 480, 600)]),
+        ))
+        assert rank_key([o[0] for o in spread]) < rank_key([o[0] for o in packed])
+
+    def test_alternatives_prefer_different_courses(self):
+        """Test that alternatives with another course set come first."""
+        courses = build_options(make_candidates(
+            make_section('A 1000', '01', []), make_section('A 1000', '02', []),
+            make_section('B 1000', '01', []),
+        ))
+        a1, a2 = sorted(courses, key=len)[-1]
+        b = sorted(courses, key=len)[0][0]
+        selected = select_schedules([[a1], [a2], [b]], limit=2)
+        assert selected == [[a1], [b]]
+
+
+class TestPlanSchedules:
+    """Tests for the end-to-end plan."""
+
+    SCHEDULE = {'hash': 'plan', 'sections': [
+        make_section('ANSC 3303', '01', [(MWF, 540, 590)]),
+        make_section('ANSC 3303', '02', [(TR, 780, 855)]),
+        make_section('ANSC 4401', '01', [(MWF, 560, 610)], credits=4.0),
+        make_section('BIOL 1401', '01', [(TR, 780, 855)], credits=4.0),
+        make_section('CHEM 1402', '01', [(TR, 480, 555)]),
+        make_section('MATH 2300', '01', [([0, 2], 660, 735)]),
+    ]}
+
+    def test_plan(self):
+        """Test the result texts and the summary for the email prompt."""
+        progress = make_progress('ANSC 3303', 'ANSC 4401', 'BIOL 1401', 'CHEM 1402', 'MATH 2300', 'HIST 1000')
+        plan = plan_schedules(progress, self.SCHEDULE, 12, 16, "Spring", 2026)
+        assert "| Course Code | Course Name | Credits | Day/Time | Instructor |" in plan['recommended']
+        assert plan['alternative1']
+        assert "Not offered in Spring 2026: HIST 1000" in plan['summary']
+        assert "RECOMMENDED SCHEDULE:" in plan['summary']
+
+    def test_below_minimum(self):
+        """Test that too few offered credits still yields a schedule."""
+        plan = plan_schedules(make_progress('CHEM 1402'), self.SCHEDULE, 15, 18, "Spring", 2026)
+        assert "| CHEM 1402-01 |" in plan['recommended']
+        assert plan['alternative1'] == ""
+        assert "below the 15-credit minimum" in plan['summary']
+
+    def test_falls_back_to_model(self):
+        """Test the cases where the model still builds the schedules."""
+        progress = make_progress('CHEM 1402')
+        assert plan_schedules(progress, None, 12, 18, "Spring", 2026) is None
+        assert plan_schedules(make_progress('HIST 1000'), self.SCHEDULE, 12, 18, "Spring", 2026) is None
+        with patch.dict(os.environ, {"ADVISEME_LOCAL_SOLVER": "off"}):
+            assert plan_schedules(progress, self.SCHEDULE, 12, 18, "Spring", 2026) is None
+
+    def test_table_format(self):
+        """Test a table row."""
+        option = build_options(make_candidates(make_section('ANSC 3303', '01', [(MWF, 540, 590)])))[0][0]
+        assert format_schedule_table([option]).splitlines()[2] == \
+            "| ANSC 3303-01 | ANSC 3303 Title | 3 | MWF 9:00 AM-9:50 AM | Dr. Smith |"
@@ -0,0 +1,180 @@
+"""
+Tests for session state accounting, spilling and rehydration.
+"""
+
+import os
+import pytest
+from unittest.mock import patch
+
+import session_memory
+from session_memory import SpilledValue, begin_rerun, end_rerun, fragment_rerun, measure, rehydrate
+
+
+class State(dict):
+    """Session state stand-in (plain dicts cannot be weakly referenced)."""
+
+
+@pytest.fixture(autouse=True)
+def spill_dir(tmp_path):
+    """Spill into a temporary directory with a small budget."""
+    env = {
+        "ADVISEME_SPILL_DIR": str(tmp_path),
+        "ADVISEME_SESSION_MEMORY_MB": "1",
+        "ADVISEME_SPILL_MIN_KB": "16",
+    }
+    session_memory.reset()
+    with patch.dict(os.environ, env):
+        yield tmp_path
+    session_memory.reset()
+
+
+def make_state(pdf_kb=600, email_kb=1):
+    return State(
+        stored_schedule_file=b"%PDF-" + b"x" * (pdf_kb * 1024),
+        email_content="e" * (email_kb * 1024),
+        failed_attempts={"alice": 1},
+        username="prof",
+    )
+
+
+class TestAccounting:
+    """Tests for per-key byte accounting."""
+
+    def test_measure_per_key(self):
+        """Test that each key is measured."""
+        sizes = measure(make_state(pdf_kb=10))
+        assert sizes['stored_schedule_file'] == 5 + 10 * 1024
+        assert sizes['email_content'] == 1024
+        assert sizes['username'] == 4
+
+    def test_stats_per_key(self):
+        """Test process-wide totals and the heaviest keys."""
+        end_rerun("s1", make_state(pdf_kb=10))
+        end_rerun("s2", make_state(pdf_kb=10))
+        stats = session_memory.get_memory_stats()
+        assert stats['sessions'] == 2
+        assert stats['keys'][0]['key'] == 'stored_schedule_file'
+        assert stats['keys'][0]['bytes'] == 2 * (5 + 10 * 1024)
+        assert stats['total_bytes'] == session_memory.total_bytes()
+
+
+class TestSpilling:
+    """Tests for the LRU spill policy."""
+
+    def test_within_budget_nothing_spilled(self):
+        """Test that nothing is spilled under the budget."""
+        state = make_state(pdf_kb=100)
+        end_rerun("s1", state)
+        assert isinstance(state['stored_schedule_file'], bytes)
+
+    def test_least_recently_used_spilled_first(self):
+        """Test that the idle session used longest ago is spilled."""
+        old, new = make_state(), make_state(pdf_kb=601)
+        end_rerun("old", old)
+        end_rerun("new", new)
+        assert isinstance(old['stored_schedule_file'], SpilledValue)
+        assert isinstance(new['stored_schedule_file'], bytes)
+        # Small values are left in memory
+        assert isinstance(old['email_content'], str)
+        assert session_memory.total_bytes() <= session_memory.get_budget()
+
+    def test_running_sessions_not_spilled(self):
+        """Test that a session in the middle of a rerun is left alone."""
+        old, new = make_state(), make_state(pdf_kb=601)
+        end_rerun("old", old)
+        begin_rerun("old", old)
+        end_rerun("new", new)
+        assert isinstance(old['stored_schedule_file'], bytes)
+        assert isinstance(new['stored_schedule_file'], SpilledValue)
+
+    def test_rehydrated_on_next_rerun(self, spill_dir):
+        """Test that spilled values come back unchanged and the file is removed."""
+        old, new = make_state(), make_state(pdf_kb=601)
+        original = bytes(old['stored_schedule_file'])
+        end_rerun("old", old)
+        end_rerun("new", new)
+        assert any(spill_dir.iterdir())
+        assert begin_rerun("old", old) == 1
+        assert old['stored_schedule_file'] == original
+        assert session_memory.get_memory_stats()['spilled_bytes'] == 0
+        assert not any(p.is_file() for p in spill_dir.rglob("*"))
+
+    def test_identical_values_written_once(self):
+        """Test content-addressed spill files."""
+        first = session_memory.spill_value(b"same" * 10000)
+        second = session_memory.spill_value(b"same" * 10000)
+        assert first.path == second.path
+        assert session_memory.load_value(first) == b"same" * 10000
+        assert os.path.exists(second.path)
+        assert session_memory.load_value(second) == b"same" * 10000
+        assert not os.path.exists(second.path)
+
+    def test_missing_spill_file_drops_key(self):
+        """Test that an unreadable spill file does not fail the rerun."""
+        state = State(email_content=session_memory.spill_value("x" * 100000))
+        os.remove(state['email_content'].path)
+        assert rehydrate(state) == 0
+        assert 'email_content' not in state
+        assert session_memory.get_memory_stats()['lost'] == 1
+
+    def test_spill_disabled(self):
+        """Test accounting-only mode."""
+        old, new = make_state(), make_state(pdf_kb=601)
+        with patch.dict(os.environ, {"ADVISEME_SESSION_SPILL": "off"}):
+            end_rerun("old", old)
+            end_rerun("new", new)
+        assert isinstance(old['stored_schedule_file'], bytes)
+
+    def test_closed_sessions_forgotten(self):
+        """Test that sessions that no longer exist are dropped from the total."""
+        end_rerun("gone", make_state())
+        new = make_state(pdf_kb=601)
+        end_rerun("new", new)
+        assert session_memory.get_memory_stats()['sessions'] == 1
+        assert isinstance(new['stored_schedule_file'], bytes)
+
+
+class TestFragmentRerun:
+    """Tests for fragment reruns, which skip begin_rerun and end_rerun."""
+
+    def spill_shared(self):
+        """Two idle sessions whose identical PDFs are spilled to one file."""
+        first, second = make_state(), make_state()
+        end_rerun("first", first)
+        end_rerun("second", second)
+        end_rerun("new", make_state(pdf_kb=601))
+        assert isinstance(first['stored_schedule_file'], SpilledValue)
+        assert isinstance(second['stored_schedule_file'], SpilledValue)
+        assert first['stored_schedule_file'].path == second['stored_schedule_file'].path
+        return first, second
+
+    def test_rehydrated_and_running(self):
+        """Test that values are loaded back and not spilled during the fragment."""
+        first, second = self.spill_shared()
+        with fragment_rerun("first", first):
+            assert isinstance(first['stored_schedule_file'], bytes)
+            end_rerun("other", make_state(pdf_kb=602))
+            assert isinstance(first['stored_schedule_file'], bytes)
+
+    def test_shared_spill_file_released_once(self, spill_dir):
+        """Test that closing sessions after a fragment keeps shared files intact."""
+        first, second = self.spill_shared()
+        path = second['stored_schedule_file'].path
+        with fragment_rerun("first", first):
+            pass
+        session_memory._forget("first")
+        assert os.path.exists(path)
+        assert begin_rerun("second", second) == 1
+        assert isinstance(second['stored_schedule_file'], bytes)
+        session_memory._forget("second")
+        on_disk = sum(p.stat().st_size for p in spill_dir.rglob("*") if p.is_file())
+        assert session_memory.get_memory_stats()['spilled_bytes'] == on_disk
+
+    def test_inside_full_rerun(self):
+        """Test that a fragment inside a full rerun leaves the session running."""
+        state = make_state()
+        begin_rerun("s1", state)
+        with fragment_rerun("s1", state):
+            pass
+        end_rerun("new", make_state(pdf_kb=601))
+        assert isinstance(state['stored_schedule_file'], bytes)
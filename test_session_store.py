@@ -0,0 +1,326 @@
+"""
+Unit tests for the shared session store (session_store.py)
+
+Tests every backend against the same contract (the Redis backend with an
+in-process stand-in for the server), the fallback on backend errors, and
+sharing lockouts and results between sessions.
+"""
+
+import fnmatch
+import threading
+import time
+import pytest
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+
+import auth
+import history
+import session_store
+
+
+class FakeRedis:
+    """In-process stand-in for the parts of redis-py the store uses."""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+        self.lock = threading.Lock()
+
+    def _expire(self, key):
+        if key in self.expiry and self.expiry[key] <= time.time():
+            self.data.pop(key, None)
+            del self.expiry[key]
+
+    def get(self, key):
+        with self.lock:
+            self._expire(key)
+            return self.data.get(key)
+
+    def set(self, key, value, px=None):
+        with self.lock:
+            self.data[key] = value
+            self.expiry.pop(key, None)
+            if px is not None:
+                self.expiry[key] = time.time() + px / 1000
+
+    def delete(self, key):
+        with self.lock:
+            self.expiry.pop(key, None)
+            return int(self.data.pop(key, None) is not None)
+
+    def incr(self, key):
+        with self.lock:
+            self._expire(key)
+            value = int(self.data.get(key, 0)) + 1
+            self.data[key] = str(value).encode()
+            return value
+
+    def pexpire(self, key, ms):
+        with self.lock:
+            self.expiry[key] = time.time() + ms / 1000
+
+    def scan_iter(self, match="*"):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, match)]
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path):
+    """Each backend, empty."""
+    if request.param == "memory":
+        return session_store.MemoryStore()
+    if request.param == "sqlite":
+        return session_store.SQLiteStore(str(tmp_path / "store.db"))
+    return session_store.RedisStore(client=FakeRedis())
+
+
+@pytest.fixture
+def mock_st():
+    """Replace streamlit in auth and history with a plain session state."""
+    fake = MagicMock()
+    fake.session_state = {}
+    fake.query_params = {}
+    fake.context.cookies = {}
+    with patch.object(auth, 'st', fake), patch.object(history, 'st', fake):
+        yield fake
+
+
+class TestBackends:
+    """Tests for the contract every backend implements"""
+
+    def test_set_get_delete(self, store):
+        """Values round-trip and can be removed."""
+        value = {'file': b"%PDF-1.4", 'info': {'semester': 'Fall', 'year': 2026}}
+        store.set("schedule:1", value)
+
+        assert store.get("schedule:1") == value
+        store.delete("schedule:1")
+        assert store.get("schedule:1") is None
+        store.delete("schedule:1")
+
+    def test_missing_key(self, store):
+        """Missing keys read as None."""
+        assert store.get("nothing") is None
+
+    def test_expiry(self, store):
+        """Entries disappear after their time to live."""
+        store.set("short", "value", ttl=0.05)
+        store.set("long", "value", ttl=60)
+        time.sleep(0.1)
+
+        assert store.get("short") is None
+        assert store.get("long") == "value"
+
+    def test_incr(self, store):
+        """Counters start at 1 and expire from their first increment."""
+        assert store.incr("count", ttl=0.1) == 1
+        assert store.incr("count", ttl=0.1) == 2
+        time.sleep(0.15)
+        assert store.incr("count", ttl=0.1) == 1
+
+    def test_incr_concurrent(self, store):
+        """Concurrent increments are not lost."""
+        def work():
+            for _ in range(25):
+                store.incr("count")
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert store.incr("count") == 101
+
+    def test_clear(self, store):
+        """clear removes every entry."""
+        store.set("a", 1)
+        store.set("b", 2)
+        store.clear()
+
+        assert store.get("a") is None and store.get("b") is None
+
+    def test_sqlite_shared_between_instances(self, tmp_path):
+        """Two processes opening the same SQLite file see each other's writes."""
+        path = str(tmp_path / "store.db")
+        session_store.SQLiteStore(path).set("key", [1, 2, 3])
+
+        assert session_store.SQLiteStore(path).get("key") == [1, 2, 3]
+
+
+class TestMemoryLimit:
+    """Tests for the size cap of the memory store"""
+
+    def test_large_entries_evicted_first(self):
+        """Over the cap, least recently used large entries go before small ones."""
+        store = session_store.MemoryStore(max_bytes=100_000)
+        store.set("logout_at:1", 123.0)
+        store.set("schedule:1", b"a" * 40_000)
+        store.set("schedule:2", b"b" * 40_000)
+        store.get("schedule:1")
+        store.set("schedule:3", b"c" * 40_000)
+
+        assert store.get("schedule:2") is None
+        assert store.get("schedule:1") is not None and store.get("schedule:3") is not None
+        assert store.get("logout_at:1") == 123.0
+        assert store.size_bytes() <= 100_000
+
+    def test_oversized_value_not_stored(self):
+        """A value larger than the whole cap is dropped instead of emptying the store."""
+        store = session_store.MemoryStore(max_bytes=10_000)
+        store.set("small", 1)
+        store.set("big", b"x" * 20_000)
+
+        assert store.get("big") is None
+        assert store.get("small") == 1
+
+    def test_expired_entries_purged_on_write(self):
+        """Expired entries are released without being read again."""
+        store = session_store.MemoryStore()
+        store.set("schedule:1", b"x" * 50_000, ttl=0.01)
+        time.sleep(0.02)
+        for n in range(session_store.PURGE_EVERY_WRITES):
+            store.set(f"key:{n}", n)
+
+        assert "schedule:1" not in store._entries
+        assert store.size_bytes() < 50_000
+
+    def test_limit_from_environment(self, monkeypatch):
+        """ADVISEME_SESSION_STORE_MEMORY_MB sets the cap."""
+        monkeypatch.setenv("ADVISEME_SESSION_STORE_MEMORY_MB", "2")
+        assert session_store.MemoryStore().max_bytes == 2 * 1024 * 1024
+
+
+class TestConfiguration:
+    """Tests for choosing and replacing the process-wide store"""
+
+    def test_default_memory(self, monkeypatch):
+        """Without configuration the store lives in memory."""
+        monkeypatch.delenv("ADVISEME_SESSION_STORE", raising=False)
+        assert isinstance(session_store.create_store(), session_store.MemoryStore)
+
+    def test_sqlite_path(self, monkeypatch, tmp_path):
+        """The SQLite backend uses ADVISEME_SESSION_STORE_PATH."""
+        monkeypatch.setenv("ADVISEME_SESSION_STORE_PATH", str(tmp_path / "shared.db"))
+        store = session_store.create_store("sqlite")
+
+        assert store.path == str(tmp_path / "shared.db")
+
+    def test_unknown_backend(self):
+        """Unknown backends are rejected."""
+        with pytest.raises(ValueError):
+            session_store.create_store("memcached://localhost")
+
+    def test_unavailable_backend_falls_back(self, monkeypatch):
+        """A store that cannot be created is replaced by a memory store."""
+        monkeypatch.setenv("ADVISEME_SESSION_STORE", "bogus")
+        session_store.set_store(None)
+
+        assert isinstance(session_store.get_store(), session_store.MemoryStore)
+
+    def test_backend_errors_are_misses(self):
+        """A failing backend reads as empty instead of raising."""
+        broken = MagicMock(spec=session_store.SessionStore)
+        broken.get.side_effect = ConnectionError("down")
+        broken.set.side_effect = ConnectionError("down")
+        broken.incr.side_effect = ConnectionError("down")
+        broken.delete.side_effect = ConnectionError("down")
+        session_store.set_store(broken)
+
+        assert session_store.load("key") is None
+        assert session_store.save("key", 1) is False
+        assert session_store.increment("key") == 0
+        session_store.remove("key")
+
+
+class TestSharedKeys:
+    """Tests for share_keys and restore_keys"""
+
+    def test_restore_into_new_session(self):
+        """A new session gets the keys shared by another one."""
+        first = {'stored_schedule_file': b"pdf", 'stored_schedule_info': {'year': 2026}}
+        session_store.share_keys("schedule:1", first, ('stored_schedule_file', 'stored_schedule_info'))
+        second = {}
+
+        assert session_store.restore_keys("schedule:1", second, ('stored_schedule_file', 'stored_schedule_info'))
+        assert second == first
+
+    def test_large_bytes_shared_by_hash(self):
+        """A schedule PDF is stored once by content hash, referenced from each entry."""
+        pdf = b"%PDF" + b"x" * session_store.BLOB_MIN_BYTES
+        keys = ('stored_schedule_file', 'stored_schedule_info')
+        session_store.share_keys("schedule:1", {'stored_schedule_file': pdf, 'stored_schedule_info': {}}, keys)
+        session_store.share_keys("schedule:2", {'stored_schedule_file': pdf, 'stored_schedule_info': {}}, keys)
+
+        entry = session_store.load("schedule:1")
+        assert isinstance(entry['stored_schedule_file'], session_store.BlobRef)
+        assert session_store.load("schedule:2")['stored_schedule_file'] == entry['stored_schedule_file']
+        state = {}
+        assert session_store.restore_keys("schedule:2", state, keys)
+        assert state['stored_schedule_file'] == pdf
+
+    def test_missing_blob_restores_nothing(self):
+        """An entry whose PDF was evicted leaves the session without a partial schedule."""
+        pdf = b"x" * session_store.BLOB_MIN_BYTES
+        keys = ('stored_schedule_file', 'stored_schedule_info')
+        session_store.share_keys("schedule:1", {'stored_schedule_file': pdf, 'stored_schedule_info': {}}, keys)
+        digest = session_store.load("schedule:1")['stored_schedule_file'].digest
+        session_store.remove(f"blob:{digest}")
+        state = {}
+
+        assert session_store.restore_keys("schedule:1", state, keys) is False
+        assert state == {}
+
+    def test_existing_state_wins(self):
+        """Keys the session already has are not overwritten."""
+        session_store.share_keys("results:1", {'email_content': "old"}, ('email_content',))
+        state = {'email_content': "new"}
+
+        assert session_store.restore_keys("results:1", state, ('email_content',)) is False
+        assert state['email_content'] == "new"
+
+
+class TestSharedSessionState:
+    """Tests for lockouts and results shared between sessions"""
+
+    def test_lockout_shared_between_sessions(self, mock_st):
+        """Failed attempts from several sessions add up to one lockout."""
+        with patch('database.get_professor_by_username', return_value=None):
+            for _ in range(3):
+                mock_st.session_state.clear()
+                auth.authenticate_user("dr.smith", "wrong")
+
+        mock_st.session_state.clear()
+        assert auth.check_lockout("dr.smith") is True
+        assert auth.get_lockout_remaining_time("dr.smith") == 5
+
+    def test_successful_login_resets_shared_attempts(self, mock_st):
+        """Resetting failed attempts also clears the shared counter."""
+        auth.record_failed_attempt("dr.smith")
+        auth.record_failed_attempt("dr.smith")
+        auth.reset_failed_attempts("dr.smith")
+        mock_st.session_state.clear()
+        auth.record_failed_attempt("dr.smith")
+
+        assert mock_st.session_state['failed_attempts']["dr.smith"] == 1
+        assert auth.check_lockout("dr.smith") is False
+
+    def test_results_restored_in_new_session(self, mock_st):
+        """Results shared by one session are restored in another."""
+        mock_st.session_state.update(
+            email_content="Dear student", recommended_schedule="| CS 101 |", semester_info="Fall 2026"
+        )
+        history.share_results(7)
+        mock_st.session_state.clear()
+
+        assert history.restore_results(7) is True
+        assert mock_st.session_state['email_content'] == "Dear student"
+        assert mock_st.session_state['semester_info'] == "Fall 2026"
+
+    def test_results_not_restored_for_other_professor(self, mock_st):
+        """Results are shared per professor."""
+        mock_st.session_state['email_content'] = "Dear student"
+        history.share_results(7)
+        mock_st.session_state.clear()
+
+        assert history.restore_results(8) is False
+        assert 'email_content' not in mock_st.session_state
@@ -0,0 +1,222 @@
+"""
+Unit tests for signed session tokens (auth.py)
+
+Tests token signing, validation, secret rotation and restoring a session
+in a new Streamlit session (e.g. on another replica) from the URL token.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock
+import auth
+
+
+@pytest.fixture(autouse=True)
+def session_secret(monkeypatch):
+    """Configure a session secret for each test."""
+    monkeypatch.setenv("SESSION_SECRET", "test-secret")
+    monkeypatch.delenv("SESSION_SECRET_PREVIOUS", raising=False)
+
+
+@pytest.fixture
+def mock_st():
+    """Replace streamlit in auth with plain dictionaries for state and URL."""
+    fake = MagicMock()
+    fake.session_state = {}
+    fake.query_params = {}
+    with patch.object(auth, 'st', fake):
+        yield fake
+
+
+class TestTokenSigning:
+    """Tests for sign_session_token and verify_session_token"""
+
+    def test_round_trip(self):
+        """A fresh token yields the professor id, username and login time."""
+        login_time = datetime.now().replace(microsecond=0)
+        token = auth.sign_session_token(7, "dr.smith", login_time)
+
+        claims = auth.verify_session_token(token)
+
+        assert claims['professor_id'] == 7
+        assert claims['username'] == "dr.smith"
+        assert claims['login_timestamp'] == login_time
+        assert claims['expired'] is False
+
+    def test_no_secret_disables_tokens(self, monkeypatch):
+        """Without SESSION_SECRET no token is issued or accepted."""
+        token = auth.sign_session_token(7, "dr.smith", datetime.now())
+        monkeypatch.delenv("SESSION_SECRET")
+
+        assert auth.sign_session_token(7, "dr.smith", datetime.now()) is None
+        assert auth.verify_session_token(token) is None
+
+    def test_tampered_token_rejected(self):
+        """Changing the professor id invalidates the signature."""
+        token = auth.sign_session_token(7, "dr.smith", datetime.now())
+        parts = token.split(".")
+        parts[1] = "8"
+
+        assert auth.verify_session_token(".".join(parts)) is None
+
+    def test_other_secret_rejected(self, monkeypatch):
+        """A token signed with another secret is rejected."""
+        token = auth.sign_session_token(7, "dr.smith", datetime.now())
+        monkeypatch.setenv("SESSION_SECRET", "other-secret")
+
+        assert auth.verify_session_token(token) is None
+
+    def test_previous_secret_accepted(self, monkeypatch):
+        """Tokens signed with the previous secret stay valid during rotation."""
+        token = auth.sign_session_token(7, "dr.smith", datetime.now())
+        monkeypatch.setenv("SESSION_SECRET", "new-secret")
+        monkeypatch.setenv("SESSION_SECRET_PREVIOUS", "test-secret")
+
+        assert auth.verify_session_token(token)['professor_id'] == 7
+
+    def test_expired_token(self):
+        """A token older than the session timeout is marked expired."""
+        token = auth.sign_session_token(7, "dr.smith", datetime.now() - timedelta(hours=9))
+
+        assert auth.verify_session_token(token)['expired'] is True
+
+    def test_future_token_rejected(self):
+        """A login time beyond the allowed clock skew is rejected."""
+        token = auth.sign_session_token(7, "dr.smith", datetime.now() + timedelta(hours=1))
+
+        assert auth.verify_session_token(token) is None
+
+    def test_login_time_keeps_microseconds(self):
+        """The signed login time is exact to the microsecond."""
+        login_time = datetime(2024, 3, 10, 9, 30, 15, 123456)
+        token = auth.sign_session_token(7, "dr.smith", login_time)
+
+        assert auth.verify_session_token(token, now=login_time)['login_timestamp'] == login_time
+
+    def test_seconds_token_rejected(self):
+        """Tokens of the old version, with whole-second login times, are rejected."""
+        token = auth.sign_session_token(7, "dr.smith", datetime.now())
+        payload = ".".join(["v1", "7", str(int(datetime.now().timestamp())), token.split(".")[3]])
+        old = f"{payload}.{auth._token_signature(b'test-secret', payload)}"
+
+        assert auth.verify_session_token(old) is None
+
+    @pytest.mark.parametrize("token", ["", "garbage", "v1.a.b.c.d", "v2.1.2.3.4", None, 42])
+    def test_malformed_tokens(self, token):
+        """Malformed tokens are rejected without raising."""
+        assert auth.verify_session_token(token) is None
+
+
+class TestSessionRestore:
+    """Tests for the token in create_session, is_authenticated and logout"""
+
+    def test_create_session_stores_token(self, mock_st):
+        """Logging in puts a valid token in the URL."""
+        auth.create_session(7, "dr.smith")
+
+        claims = auth.verify_session_token(mock_st.query_params[auth.TOKEN_PARAM])
+        assert claims['professor_id'] == 7
+
+    def test_new_session_restored_from_url(self, mock_st):
+        """A new session with the token in the URL is authenticated."""
+        auth.create_session(7, "dr.smith")
+        mock_st.session_state.clear()
+
+        assert auth.is_authenticated() is True
+        assert mock_st.session_state['professor_id'] == 7
+        assert mock_st.session_state['username'] == "dr.smith"
+
+    def test_expired_token_sets_timeout(self, mock_st):
+        """An expired token shows the timeout message and leaves the URL."""
+        mock_st.query_params[auth.TOKEN_PARAM] = auth.sign_session_token(
+            7, "dr.smith", datetime.now() - timedelta(hours=9)
+        )
+
+        assert auth.is_authenticated() is False
+        assert mock_st.session_state['session_timeout'] is True
+        assert auth.TOKEN_PARAM not in mock_st.query_params
+
+    def test_invalid_token_removed(self, mock_st):
+        """An invalid token is dropped from the URL."""
+        mock_st.query_params[auth.TOKEN_PARAM] = "v1.7.0.x.bad"
+
+        assert auth.is_authenticated() is False
+        assert auth.TOKEN_PARAM not in mock_st.query_params
+        assert 'session_timeout' not in mock_st.session_state
+
+    def test_logout_removes_token(self, mock_st):
+        """Logging out removes the token, so a reload shows the login page."""
+        auth.create_session(7, "dr.smith")
+        auth.logout()
+
+        assert auth.TOKEN_PARAM not in mock_st.query_params
+        assert auth.is_authenticated() is False
+
+    def test_logout_revokes_token(self, mock_st):
+        """A token copied before logout no longer restores a session."""
+        auth.create_session(7, "dr.smith")
+        token = mock_st.query_params[auth.TOKEN_PARAM]
+        auth.logout()
+        mock_st.query_params[auth.TOKEN_PARAM] = token
+
+        assert auth.verify_session_token(token) is None
+        assert auth.is_authenticated() is False
+        assert auth.TOKEN_PARAM not in mock_st.query_params
+
+    def test_logout_keeps_later_and_other_tokens(self, mock_st):
+        """Tokens issued after the logout, or to other professors, stay valid."""
+        auth.create_session(7, "dr.smith")
+        auth.logout()
+        later = auth.sign_session_token(7, "dr.smith", datetime.now() + timedelta(seconds=1))
+        other = auth.sign_session_token(8, "dr.jones", datetime.now())
+
+        assert auth.verify_session_token(later)['professor_id'] == 7
+        assert auth.verify_session_token(other)['professor_id'] == 8
+
+    def test_login_in_logout_second_kept(self, mock_st):
+        """A login in the same second as the logout, but after it, stays valid."""
+        logout_time = datetime(2024, 3, 10, 9, 30, 15, 100000)
+        auth.create_session(7, "dr.smith")
+        with patch.object(auth, 'datetime', wraps=datetime) as fake_datetime:
+            fake_datetime.now.return_value = logout_time
+            auth.logout()
+        before = auth.sign_session_token(7, "dr.smith", logout_time - timedelta(microseconds=1))
+        after = auth.sign_session_token(7, "dr.smith", logout_time + timedelta(microseconds=1))
+
+        assert auth.verify_session_token(before, now=logout_time) is None
+        assert auth.verify_session_token(after, now=logout_time)['professor_id'] == 7
+
+    def test_timeout_does_not_revoke(self, mock_st):
+        """A session timing out leaves the professor's other logins alone."""
+        auth.create_session(7, "dr.smith")
+        mock_st.session_state['login_timestamp'] = datetime.now() - timedelta(hours=9)
+        other = auth.sign_session_token(7, "dr.smith", datetime.now())
+
+        assert auth.is_authenticated() is False
+        assert auth.verify_session_token(other)['professor_id'] == 7
+
+    def test_memory_store_warning(self, caplog):
+        """Issuing tokens with the per-process store warns once that logouts stay local."""
+        with patch.object(auth, '_revocation_warning_logged', False):
+            auth.sign_session_token(7, "dr.smith", datetime.now())
+            auth.sign_session_token(8, "dr.jones", datetime.now())
+
+        warnings = [r for r in caplog.records if "only revokes tokens on this replica" in r.getMessage()]
+        assert len(warnings) == 1
+
+    def test_shared_store_no_warning(self, caplog, tmp_path):
+        """A shared session store issues tokens without the warning."""
+        import session_store
+        session_store.set_store(session_store.SQLiteStore(str(tmp_path / "store.db")))
+        with patch.object(auth, '_revocation_warning_logged', False):
+            auth.sign_session_token(7, "dr.smith", datetime.now())
+
+        assert not [r for r in caplog.records if "only revokes tokens on this replica" in r.getMessage()]
+
+    def test_restored_session_admin(self, mock_st):
+        """Admin rights follow the username carried by the token."""
+        with patch.dict('os.environ', {'ADMIN_USERNAME': 'admin'}):
+            auth.create_session(1, "admin")
+            mock_st.session_state.clear()
+
+            assert auth.is_admin() is True
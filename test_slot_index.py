@@ -0,0 +1,129 @@
+"""
+Tests for the packed time slot index.
+"""
+
+import numpy as np
+import pytest
+
+import slot_index
+from slot_index import (
+    meeting_slots,
+    section_slot_mask,
+    build_slot_index,
+    get_slot_index,
+    rows_for,
+    conflict_matrix,
+    conflicts_with,
+    combined_mask,
+    SLOTS_PER_DAY,
+    WORDS,
+)
+
+MWF = [0, 2, 4]
+TR = [1, 3]
+
+
+def make_section(course, section, meetings):
+    """Build a parsed section from (days, start, end) tuples."""
+    return {
+        'course': course,
+        'section': section,
+        'title': "",
+        'credits': 3.0,
+        'meetings': [{'days': days, 'start': start, 'end': end} for days, start, end in meetings],
+        'instructor': "",
+    }
+
+
+SECTIONS = [
+    make_section('ANSC 3303', '01', [(MWF, 540, 590)]),
+    make_section('ANSC 3303', '02', [(TR, 780, 855)]),
+    make_section('ANSC 4401', '01', [(MWF, 560, 610)]),
+    make_section('BIOL 1401', '01', [(MWF, 590, 640), ([6], 600, 720)]),
+    make_section('ENGL 2300', '01', []),
+]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Isolate the module-level index cache between tests."""
+    slot_index._index_cache.clear()
+    yield
+    slot_index._index_cache.clear()
+
+
+def _set_slots(mask):
+    """Unpack a mask into the set of occupied slot numbers."""
+    bits = np.unpackbits(mask.view(np.uint8), bitorder='little')
+    return set(np.flatnonzero(bits).tolist())
+
+
+class TestMasks:
+    """Tests for encoding meetings as packed bitmasks."""
+
+    def test_mask_width(self):
+        """Test that 7 days of 5-minute slots fit the packed words."""
+        assert WORDS == 32
+        mask = section_slot_mask(SECTIONS[0])
+        assert mask.dtype == np.uint64 and mask.shape == (WORDS,)
+
+    def test_slots_round_partial_slots_up(self):
+        """Test that a meeting ending mid-slot still occupies that slot."""
+        assert meeting_slots([1], 0, 7).tolist() == [SLOTS_PER_DAY, SLOTS_PER_DAY + 1]
+
+    def test_mask_matches_slots(self):
+        """Test that packed bits equal the meeting's slot numbers."""
+        expected = set(meeting_slots(MWF, 540, 590).tolist())
+        assert _set_slots(section_slot_mask(SECTIONS[0])) == expected
+
+    def test_weekend_meeting(self):
+        """Test that Sunday meetings land in the last word."""
+        assert _set_slots(section_slot_mask(make_section('X 1000', '01', [([6], 1435, 1440)]))) == {2015}
+
+    def test_no_meetings(self):
+        """Test that sections without times have an empty mask."""
+        assert not section_slot_mask(SECTIONS[4]).any()
+
+
+class TestIndex:
+    """Tests for the per-schedule index."""
+
+    def test_rows_follow_schedule_order(self):
+        """Test that rows and keys follow the section order."""
+        index = build_slot_index(SECTIONS)
+        assert index.masks.shape == (5, WORDS)
+        assert index.keys[2] == ('ANSC 4401', '01')
+        assert rows_for(index, [SECTIONS[3], SECTIONS[0]]).tolist() == [3, 0]
+
+    def test_unknown_section(self):
+        """Test that sections missing from the index are reported."""
+        assert rows_for(build_slot_index(SECTIONS), [make_section('X 1000', '01', [])]) is None
+
+    def test_built_once_per_hash(self):
+        """Test that the index is reused for the same schedule hash."""
+        schedule = {'hash': 'abc', 'sections': SECTIONS}
+        assert get_slot_index(schedule) is get_slot_index({'hash': 'abc', 'sections': []})
+
+
+class TestConflicts:
+    """Tests for the vectorized overlap checks."""
+
+    def test_conflict_matrix(self):
+        """Test pairwise overlaps, including back-to-back classes."""
+        index = build_slot_index(SECTIONS)
+        matrix = conflict_matrix(index, np.arange(5))
+        assert matrix[0, 2] and matrix[2, 0]
+        assert matrix[2, 3]
+        assert not matrix[0, 3]  # 9:00-9:50 then 9:50-10:40
+        assert not matrix[0, 1]
+        assert not matrix[4].any()
+
+    def test_conflicts_with_taken_slots(self):
+        """Test checking candidates against a combined schedule."""
+        index = build_slot_index(SECTIONS)
+        taken = combined_mask(index, np.array([0, 1]))
+        assert conflicts_with(index, np.arange(5), taken).tolist() == [True, True, True, False, False]
+
+    def test_empty_combination(self):
+        """Test that combining no sections gives an empty mask."""
+        assert not combined_mask(build_slot_index(SECTIONS), np.array([], dtype=np.int64)).any()
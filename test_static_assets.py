@@ -0,0 +1,84 @@
+"""
+Tests for static asset preparation (banner served once per process).
+"""
+
+import io
+import os
+import pytest
+from PIL import Image
+
+from static_assets import (
+    encode_banner,
+    write_static_asset,
+    banner_html,
+    BANNER_DISPLAY_HEIGHT,
+    BANNER_SCALE,
+)
+
+
+@pytest.fixture
+def source_banner(tmp_path):
+    """Create a large source banner image."""
+    path = tmp_path / "banner.jpg"
+    Image.new("RGB", (1200, 800), color=(120, 30, 30)).save(path, format="JPEG")
+    return str(path)
+
+
+class TestEncodeBanner:
+    """Tests for encode_banner."""
+
+    def test_missing_source_returns_none(self, tmp_path):
+        """Test that a missing banner is reported as None."""
+        assert encode_banner(str(tmp_path / "missing.jpg")) is None
+
+    def test_resized_to_display_height(self, source_banner):
+        """Test that the banner is scaled to display height at 2x."""
+        banner = encode_banner(source_banner)
+        with Image.open(io.BytesIO(banner['data'])) as image:
+            assert image.height == BANNER_DISPLAY_HEIGHT * BANNER_SCALE
+            assert image.width == 1200 * image.height // 800
+
+    def test_resized_banner_is_smaller(self, source_banner):
+        """Test that the encoded banner is smaller than the source."""
+        banner = encode_banner(source_banner)
+        assert len(banner['data']) < os.path.getsize(source_banner)
+        assert banner['format'] in ('WEBP', 'JPEG')
+
+    def test_small_source_not_upscaled(self, tmp_path):
+        """Test that images shorter than the target height keep their size."""
+        path = tmp_path / "small.jpg"
+        Image.new("RGB", (300, 100)).save(path, format="JPEG")
+        banner = encode_banner(str(path))
+        with Image.open(io.BytesIO(banner['data'])) as image:
+            assert image.size == (300, 100)
+
+    def test_corrupt_source_returns_none(self, tmp_path):
+        """Test that an undecodable file does not raise."""
+        path = tmp_path / "banner.jpg"
+        path.write_bytes(b"not an image")
+        assert encode_banner(str(path)) is None
+
+
+class TestWriteStaticAsset:
+    """Tests for write_static_asset."""
+
+    def test_content_hashed_name(self, tmp_path):
+        """Test that different content gets a different file name."""
+        a = write_static_asset(b"one", "banner", "webp", static_dir=str(tmp_path))
+        b = write_static_asset(b"two", "banner", "webp", static_dir=str(tmp_path))
+        assert a != b
+        assert a.startswith("banner-") and a.endswith(".webp")
+        assert (tmp_path / a).read_bytes() == b"one"
+
+    def test_existing_asset_not_rewritten(self, tmp_path):
+        """Test that writing the same content twice reuses the file."""
+        name = write_static_asset(b"same", "banner", "webp", static_dir=str(tmp_path))
+        mtime = os.path.getmtime(tmp_path / name)
+        assert write_static_asset(b"same", "banner", "webp", static_dir=str(tmp_path)) == name
+        assert os.path.getmtime(tmp_path / name) == mtime
+
+    def test_banner_html_references_url(self):
+        """Test that the rendered snippet points at the static URL."""
+        html = banner_html("app/static/banner-abc.webp")
+        assert 'src="app/static/banner-abc.webp"' in html
+        assert f"height: {BANNER_DISPLAY_HEIGHT}px" in html
@@ -0,0 +1,90 @@
+"""
+Tests for the synthetic history generator used by the benchmarks.
+"""
+
+import pytest
+
+import database
+import synthetic_data
+
+
+class TestGenerateSessions:
+    """Generated sessions"""
+
+    def test_deterministic_for_seed(self):
+        first = list(synthetic_data.generate_sessions([1, 2, 3], 20, seed=5))
+        again = list(synthetic_data.generate_sessions([1, 2, 3], 20, seed=5))
+        other = list(synthetic_data.generate_sessions([1, 2, 3], 20, seed=6))
+        assert first == again
+        assert first != other
+
+    def test_values_pass_schema_constraints(self):
+        for row in synthetic_data.generate_sessions([1, 2], 200):
+            professor_id, student_name, semester, year = row[:4]
+            assert professor_id in (1, 2)
+            assert student_name
+            assert semester in ("Spring", "Summer", "Fall")
+            assert 2024 <= year <= 2050
+            assert 500 <= len(row[5]) <= 5000
+            assert row[6].startswith("| Course |")
+
+    def test_workload_is_skewed(self):
+        """The first professor advises more students than the last"""
+        ids = [row[0] for row in synthetic_data.generate_sessions(list(range(10)), 2000)]
+        assert ids.count(0) > 3 * ids.count(9)
+
+
+class TestPopulate:
+    """Filling a database"""
+
+    def test_inserts_professors_and_sessions(self, temp_db):
+        professor_ids = synthetic_data.populate(professors=3, sessions=250)
+        assert len(professor_ids) == 3
+        total = sum(len(database.get_professor_history(pid, limit=1000)) for pid in professor_ids)
+        assert total == 250
+
+    def test_rerun_reuses_professors(self, temp_db):
+        first = synthetic_data.populate(professors=2, sessions=10)
+        assert synthetic_data.populate(professors=2, sessions=10) == first
+
+    def test_professors_cannot_log_in_by_default(self, temp_db):
+        import auth
+
+        synthetic_data.populate(professors=1, sessions=0)
+        professor = database.get_professor_by_username("synthetic_prof_0000")
+        assert professor['password_hash'].startswith(synthetic_data.UNUSABLE_PASSWORD_PREFIX)
+        assert not auth.verify_password("", professor['password_hash'])
+
+    def test_password_on_request(self, temp_db):
+        import auth
+
+        synthetic_data.populate(professors=1, sessions=0, password="staging-password")
+        professor = database.get_professor_by_username("synthetic_prof_0000")
+        assert auth.verify_password("staging-password", professor['password_hash'])
+
+    def test_refuses_database_with_real_professors(self, temp_db, sample_professor):
+        with pytest.raises(ValueError):
+            synthetic_data.populate(professors=1, sessions=10)
+        assert database.get_professor_by_username("synthetic_prof_0000") is None
+
+
+class TestMain:
+    """Command line"""
+
+    def test_main(self, temp_db, capsys):
+        assert synthetic_data.main(["--professors", "2", "--sessions", "5", "--db", temp_db]) == 0
+        assert "✓ Added 5 sessions" in capsys.readouterr().out
+
+    def test_database_required(self, temp_db):
+        with pytest.raises(SystemExit):
+            synthetic_data.main(["--sessions", "5"])
+
+    def test_database_url_not_implied(self, temp_db, monkeypatch, capsys):
+        """--db is refused when DATABASE_URL would silently take over"""
+        monkeypatch.setenv("DATABASE_URL", "postgresql://app@db/adviseme")
+        assert synthetic_data.main(["--sessions", "5", "--db", temp_db]) == 1
+        assert "DATABASE_URL" in capsys.readouterr().out
+
+    def test_database_url_needs_url(self, monkeypatch, capsys):
+        monkeypatch.delenv("DATABASE_URL", raising=False)
+        assert synthetic_data.main(["--use-database-url"]) == 1
@@ -0,0 +1,152 @@
+"""
+Tests for tracing spans, structured span logs and OTLP export.
+"""
+
+import json
+import logging
+import os
+import pytest
+from unittest.mock import Mock, patch
+
+import tracing
+from tracing import span, traced, current_span, build_export_request, otlp_attribute, STATUS_ERROR
+from ui_helpers import timed_span, timed_operation
+
+
+@pytest.fixture(autouse=True)
+def no_export():
+    """Disable export unless a test configures a collector."""
+    with patch.dict(os.environ, {}, clear=False):
+        os.environ.pop("OTEL_EXPORTER_OTLP_ENDPOINT", None)
+        os.environ.pop("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT", None)
+        tracing._pending.clear()
+        yield
+        tracing._pending.clear()
+
+
+class TestSpans:
+    """Tests for span nesting and attributes."""
+
+    def test_nesting(self):
+        """Test that child spans share the trace and point at their parent."""
+        with span("generate_advice") as root:
+            with span("extract_progress", pdf_bytes=1024) as child:
+                assert current_span() is child
+            assert current_span() is root
+        assert current_span() is None
+        assert child.trace_id == root.trace_id
+        assert child.parent is root
+        assert child.attributes == {"pdf_bytes": 1024}
+        assert root.duration_ns >= child.duration_ns > 0
+
+    def test_attribute_coercion(self):
+        """Test that attributes are kept as primitives."""
+        with span("stage") as active:
+            active.set_attributes({"model": "m", "cache_hit": True, "ratio": 0.5, "path": ["a"], "none": None})
+        assert active.attributes == {"model": "m", "cache_hit": True, "ratio": 0.5, "path": "['a']"}
+
+    def test_exception_marks_error(self):
+        """Test that an exception is recorded and re-raised."""
+        with pytest.raises(RuntimeError):
+            with span("llm_request") as active:
+                raise RuntimeError("boom")
+        assert active.status == STATUS_ERROR
+        assert active.attributes["exception.type"] == "RuntimeError"
+
+    def test_traced_decorator(self):
+        """Test that the decorator runs the function in a span."""
+        @traced("db_save")
+        def save():
+            return current_span().name
+
+        assert save() == "db_save"
+        assert save.__name__ == "save"
+
+
+class TestStructuredLog:
+    """Tests for the JSON span log."""
+
+    def test_span_logged_as_json(self, caplog):
+        """Test that finished spans are logged as JSON records."""
+        with caplog.at_level(logging.INFO, logger="tracing"):
+            with span("parse_response", response_chars=12):
+                pass
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record["type"] == "span"
+        assert record["name"] == "parse_response"
+        assert record["attributes"] == {"response_chars": 12}
+        assert record["status"] == "ok"
+
+    def test_log_can_be_disabled(self, caplog):
+        """Test ADVISEME_TRACE_LOG=off."""
+        with patch.dict(os.environ, {"ADVISEME_TRACE_LOG": "off"}), caplog.at_level(logging.INFO, logger="tracing"):
+            with span("quiet"):
+                pass
+        assert not caplog.records
+
+
+class TestOtlpExport:
+    """Tests for the OpenTelemetry export."""
+
+    def test_attribute_types(self):
+        """Test OTLP attribute value encoding."""
+        assert otlp_attribute("n", 3) == {"key": "n", "value": {"intValue": "3"}}
+        assert otlp_attribute("b", False) == {"key": "b", "value": {"boolValue": False}}
+        assert otlp_attribute("f", 1.5) == {"key": "f", "value": {"doubleValue": 1.5}}
+        assert otlp_attribute("s", "x") == {"key": "s", "value": {"stringValue": "x"}}
+
+    def test_export_request_format(self):
+        """Test the ExportTraceServiceRequest layout."""
+        with span("root") as root:
+            with span("child") as child:
+                pass
+        body = build_export_request([child, root])
+        spans = body["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert body["resourceSpans"][0]["resource"]["attributes"][0]["value"]["stringValue"] == "adviseme"
+        assert spans[0]["parentSpanId"] == root.span_id
+        assert "parentSpanId" not in spans[1]
+        assert len(spans[1]["traceId"]) == 32 and len(spans[1]["spanId"]) == 16
+        assert int(spans[1]["endTimeUnixNano"]) >= int(spans[1]["startTimeUnixNano"])
+
+    def test_trace_exported_when_root_ends(self):
+        """Test that a whole trace is posted to the collector once."""
+        with patch.dict(os.environ, {"OTEL_EXPORTER_OTLP_ENDPOINT": "http://localhost:4318/"}), \
+             patch("tracing.requests.post", return_value=Mock(status_code=200)) as mock_post:
+            with span("generate_advice"):
+                with span("extract_progress"):
+                    pass
+                assert mock_post.call_count == 0
+            assert tracing.flush()
+        assert mock_post.call_count == 1
+        assert mock_post.call_args.args[0] == "http://localhost:4318/v1/traces"
+        spans = mock_post.call_args.kwargs["json"]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert [s["name"] for s in spans] == ["extract_progress", "generate_advice"]
+
+    def test_export_failure_does_not_raise(self):
+        """Test that an unreachable collector only logs a warning."""
+        with patch.dict(os.environ, {"OTEL_EXPORTER_OTLP_TRACES_ENDPOINT": "http://localhost:1/v1/traces"}), \
+             patch("tracing.requests.post", side_effect=OSError("refused")):
+            with span("generate_advice"):
+                pass
+            assert tracing.flush()
+
+
+class TestTimedSpan:
+    """Tests for the ui_helpers integration."""
+
+    def test_timed_span_threshold_log(self, caplog):
+        """Test that slow operations are logged with their duration."""
+        with caplog.at_level(logging.INFO, logger="ui_helpers"):
+            with timed_span("save_session", threshold_ms=0, rows=1) as active:
+                pass
+        assert active.attributes == {"rows": 1}
+        assert any("save_session took" in r.getMessage() for r in caplog.records)
+
+    def test_timed_operation_traces(self):
+        """Test that decorated operations run inside a span."""
+        @timed_operation("database_query", threshold_ms=500)
+        def query():
+            return current_span().name
+
+        assert query() == "database_query"
+        assert query.__name__ == "query"
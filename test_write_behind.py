@@ -0,0 +1,208 @@
+"""
+Unit tests for write-behind saves (write_behind.py)
+
+Tests batching by size and time, durable acknowledgement, per-row retry of a
+failed batch, the synchronous fallback and flushing on shutdown.
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+import database
+import write_behind
+
+
+@pytest.fixture(autouse=True)
+def stop_writer():
+    """Stop the process-wide writer after each test."""
+    yield
+    write_behind.shutdown()
+
+
+def make_session(professor_id, student_name="John Doe", **overrides):
+    """save_advising_session arguments for one session."""
+    session = {
+        'professor_id': professor_id,
+        'student_name': student_name,
+        'semester': 'Spring',
+        'year': 2026,
+        'email_content': 'Email',
+        'recommended_schedule': 'Schedule',
+        'alternative1_schedule': '',
+        'alternative2_schedule': '',
+    }
+    session.update(overrides)
+    return session
+
+
+class TestBatching:
+    """Tests for coalescing saves into transactions"""
+
+    def test_batches_by_size(self):
+        """Saves are written at most batch_rows per transaction."""
+        sizes = []
+        release = threading.Event()
+
+        def save(sessions):
+            release.wait(5)
+            sizes.append(len(sessions))
+            return len(sessions)
+
+        with patch.object(database, 'save_advising_sessions', side_effect=save):
+            writer = write_behind.Writer(batch_ms=1000, batch_rows=5)
+            futures = [writer.submit(make_session(1, f"Student {i}")) for i in range(12)]
+            release.set()
+            assert writer.flush(5)
+            writer.close(5)
+
+        assert sum(sizes) == 12
+        assert max(sizes) == 5
+        assert all(future.result() is True for future in futures)
+
+    def test_batch_written_after_window(self):
+        """A lone save is written once the batch window passes."""
+        with patch.object(database, 'save_advising_sessions', return_value=1) as save:
+            writer = write_behind.Writer(batch_ms=20, batch_rows=100)
+            future = writer.submit(make_session(1))
+
+            assert future.result(timeout=2) is True
+            save.assert_called_once()
+            writer.close(5)
+
+    def test_future_pending_until_commit(self):
+        """The acknowledgement waits for the transaction."""
+        committed = threading.Event()
+
+        def save(sessions):
+            committed.wait(5)
+            return len(sessions)
+
+        with patch.object(database, 'save_advising_sessions', side_effect=save):
+            writer = write_behind.Writer(batch_ms=1, batch_rows=1)
+            future = writer.submit(make_session(1))
+            time.sleep(0.05)
+
+            assert not future.done()
+            committed.set()
+            assert future.result(timeout=2) is True
+            writer.close(5)
+
+
+    def test_saves_cannot_be_cancelled(self):
+        """A queued save keeps its place and the writer keeps running."""
+        with patch.object(database, 'save_advising_sessions', return_value=1):
+            writer = write_behind.Writer(batch_ms=50, batch_rows=100)
+            future = writer.submit(make_session(1))
+
+            assert future.cancel() is False
+            assert future.result(timeout=2) is True
+            assert writer.submit(make_session(1)).result(timeout=2) is True
+            writer.close(5)
+
+    def test_writer_survives_failed_batch(self):
+        """An unexpected error fails its batch, not the saves queued after it."""
+        with patch.object(write_behind.WRITE_BATCH_ROWS, 'observe', side_effect=[RuntimeError("boom"), None]), \
+                patch.object(database, 'save_advising_sessions', return_value=1):
+            writer = write_behind.Writer(batch_ms=1, batch_rows=1)
+
+            assert writer.submit(make_session(1)).result(timeout=2) is False
+            assert writer.submit(make_session(1)).result(timeout=2) is True
+            writer.close(5)
+
+
+class TestWaitSaved:
+    """Tests for waiting on a save's acknowledgement"""
+
+    def test_committed(self):
+        """A save committed within the batch window is acknowledged."""
+        with patch.object(database, 'save_advising_sessions', return_value=1):
+            future = write_behind.submit_advising_session(**make_session(1))
+
+            assert write_behind.wait_saved(future) is True
+
+    def test_failed(self):
+        """A save that could not be written reports False."""
+        with patch.object(database, 'save_advising_sessions', side_effect=Exception("locked")), \
+                patch.object(database, 'save_advising_session', return_value=False):
+            future = write_behind.submit_advising_session(**make_session(1))
+
+            assert write_behind.wait_saved(future) is False
+
+    def test_still_pending(self):
+        """A save still being written reports None."""
+        committed = threading.Event()
+
+        def save(sessions):
+            committed.wait(5)
+            return len(sessions)
+
+        with patch.object(database, 'save_advising_sessions', side_effect=save):
+            future = write_behind.submit_advising_session(**make_session(1))
+
+            assert write_behind.wait_saved(future, timeout=0.05) is None
+            committed.set()
+            assert write_behind.wait_saved(future) is True
+
+
+class TestDatabase:
+    """Tests against a real SQLite database"""
+
+    def test_sessions_committed(self, sample_professor):
+        """Acknowledged sessions are in the database."""
+        professor_id = sample_professor['professor_id']
+        futures = [
+            write_behind.submit_advising_session(**make_session(professor_id, f"Student {i}"))
+            for i in range(10)
+        ]
+
+        assert all(future.result(timeout=5) for future in futures)
+        assert len(database.get_professor_history(professor_id)) == 10
+
+    def test_bad_row_does_not_fail_batch(self, sample_professor):
+        """A failed batch is retried row by row."""
+        professor_id = sample_professor['professor_id']
+        writer = write_behind.Writer(batch_ms=200, batch_rows=10)
+        good = writer.submit(make_session(professor_id, "Good Student"))
+        bad = writer.submit(make_session(professor_id, "Bad Student", semester="Winter"))
+        other = writer.submit(make_session(professor_id, "Other Student"))
+        writer.close(5)
+
+        assert good.result() is True and other.result() is True
+        assert bad.result() is False
+        names = {row['student_name'] for row in database.get_professor_history(professor_id)}
+        assert names == {"Good Student", "Other Student"}
+
+    def test_shutdown_flushes(self, sample_professor):
+        """Queued saves are written before the writer stops."""
+        professor_id = sample_professor['professor_id']
+        with patch.dict('os.environ', {'ADVISEME_WRITE_BATCH_MS': '10000'}):
+            futures = [write_behind.submit_advising_session(**make_session(professor_id)) for _ in range(3)]
+
+            assert write_behind.shutdown(5) is True
+
+        assert all(future.done() and future.result() for future in futures)
+        assert len(database.get_professor_history(professor_id)) == 3
+
+    def test_disabled_saves_synchronously(self, sample_professor):
+        """ADVISEME_WRITE_BEHIND=off commits before returning."""
+        professor_id = sample_professor['professor_id']
+        with patch.dict('os.environ', {'ADVISEME_WRITE_BEHIND': 'off'}):
+            future = write_behind.submit_advising_session(**make_session(professor_id))
+
+        assert future.done() and future.result() is True
+        assert write_behind._writer is None
+
+    def test_batch_transaction_is_atomic(self, sample_professor):
+        """save_advising_sessions saves every row or none."""
+        professor_id = sample_professor['professor_id']
+
+        with pytest.raises(Exception):
+            database.save_advising_sessions([
+                make_session(professor_id),
+                make_session(professor_id, semester="Winter"),
+            ])
+
+        assert database.get_professor_history(professor_id) == []
@@ -0,0 +1,310 @@
+"""
+Tracing for AdviseMe
+
+This module records nested timing spans with attributes, so the time of a
+request can be broken down by stage (validation, parsing, model call, saving).
+
+Every finished span is written as one structured JSON log line (logger
+"tracing", disable with ADVISEME_TRACE_LOG=off). When an OpenTelemetry
+collector is configured, finished traces are also exported in OTLP/HTTP JSON
+format by a background thread, so exporting never delays the app:
+- OTEL_EXPORTER_OTLP_TRACES_ENDPOINT: full traces URL, or
+- OTEL_EXPORTER_OTLP_ENDPOINT: collector base URL ("/v1/traces" is appended),
+  e.g. http://localhost:4318
+- OTEL_SERVICE_NAME: service name reported to the collector (default adviseme)
+
+Usage:
+    with tracing.span("extract_progress", pdf_bytes=len(data)) as s:
+        result = parse(data)
+        s.set_attribute("rows", len(result))
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import requests
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVICE_NAME = "adviseme"
+SCOPE_NAME = "adviseme"
+EXPORT_TIMEOUT_SECONDS = 2
+EXPORT_QUEUE_SIZE = 256
+
+# Unfinished traces kept while waiting for their root span to end
+MAX_PENDING_TRACES = 1024
+
+# OTLP span kind and status codes
+SPAN_KIND_INTERNAL = 1
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+_pending_lock = threading.Lock()
+_pending: Dict[str, List["Span"]] = {}
+
+_export_lock = threading.Lock()
+_export_queue: "queue.Queue[List[Span]]" = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+_export_thread: Optional[threading.Thread] = None
+
+
+class Span:
+    """A timed operation with attributes, part of a trace."""
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.attributes: Dict[str, Any] = {}
+        self.status = STATUS_OK
+        self.status_message = ""
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns: Optional[int] = None
+        self._start_counter_ns = time.perf_counter_ns()
+        self.duration_ns = 0
+        if attributes:
+            self.set_attributes(attributes)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set one attribute (None values are ignored)."""
+        if value is None:
+            return
+        if not isinstance(value, (str, bool, int, float)):
+            value = str(value)
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        """Set several attributes."""
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_exception(self, error: BaseException) -> None:
+        """Mark the span as failed by an exception."""
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+        self.set_attribute("exception.type", type(error).__name__)
+
+    def end(self) -> None:
+        """Stop the span's clock."""
+        if self.end_time_ns is None:
+            self.duration_ns = time.perf_counter_ns() - self._start_counter_ns
+            self.end_time_ns = self.start_time_ns + self.duration_ns
+
+    @property
+    def duration_ms(self) -> float:
+        """Span duration in milliseconds."""
+        return self.duration_ns / 1_000_000
+
+    def to_log_record(self) -> Dict[str, Any]:
+        """Build the structured log record of a finished span."""
+        return {
+            'type': 'span',
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent.span_id if self.parent else None,
+            'start_time_ns': self.start_time_ns,
+            'duration_ms': round(self.duration_ms, 3),
+            'status': 'error' if self.status == STATUS_ERROR else 'ok',
+            'attributes': self.attributes,
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Build the OTLP/JSON representation of a finished span."""
+        otlp = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': SPAN_KIND_INTERNAL,
+            'startTimeUnixNano': str(self.start_time_ns),
+            'endTimeUnixNano': str(self.end_time_ns),
+            'attributes': [otlp_attribute(key, value) for key, value in self.attributes.items()],
+            'status': {'code': self.status},
+        }
+        if self.parent:
+            otlp['parentSpanId'] = self.parent.span_id
+        if self.status_message:
+            otlp['status']['message'] = self.status_message
+        return otlp
+
+
+def otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    """Convert an attribute to an OTLP key/value pair."""
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
+
+
+def log_enabled() -> bool:
+    """Check whether finished spans are logged (ADVISEME_TRACE_LOG)."""
+    return os.getenv("ADVISEME_TRACE_LOG", "on").strip().lower() not in ("off", "false", "0")
+
+
+def get_export_url() -> Optional[str]:
+    """Get the OTLP/HTTP traces URL, or None when export is not configured."""
+    url = os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT")
+    if url:
+        return url
+    base = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    if base:
+        return base.rstrip("/") + "/v1/traces"
+    return None
+
+
+def current_span() -> Optional[Span]:
+    """Get the innermost active span, if any."""
+    return _current_span.get()
+
+
+def build_export_request(spans: List[Span]) -> Dict[str, Any]:
+    """
+    Build an OTLP/JSON ExportTraceServiceRequest.
+
+    Args:
+        spans: Finished spans
+
+    Returns:
+        Request body as a dictionary
+    """
+    service_name = os.getenv("OTEL_SERVICE_NAME", DEFAULT_SERVICE_NAME)
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [otlp_attribute('service.name', service_name)]},
+            'scopeSpans': [{
+                'scope': {'name': SCOPE_NAME},
+                'spans': [s.to_otlp() for s in spans],
+            }],
+        }]
+    }
+
+
+def _export_worker() -> None:
+    """Send queued traces to the collector (runs in a daemon thread)."""
+    while True:
+        spans = _export_queue.get()
+        try:
+            url = get_export_url()
+            if url:
+                response = requests.post(url, json=build_export_request(spans), timeout=EXPORT_TIMEOUT_SECONDS)
+                if response.status_code >= 300:
+                    logger.warning(f"Trace export failed with status {response.status_code}")
+        except Exception as e:
+            logger.warning(f"Trace export failed: {e}")
+        finally:
+            _export_queue.task_done()
+
+
+def _submit_export(spans: List[Span]) -> None:
+    """Queue a finished trace for export, starting the exporter once."""
+    global _export_thread
+    with _export_lock:
+        if _export_thread is None or not _export_thread.is_alive():
+            _export_thread = threading.Thread(target=_export_worker, name="otlp-exporter", daemon=True)
+            _export_thread.start()
+    try:
+        _export_queue.put_nowait(spans)
+    except queue.Full:
+        logger.warning("Trace export queue full, dropping trace")
+
+
+def flush(timeout: float = EXPORT_TIMEOUT_SECONDS) -> bool:
+    """
+    Wait until queued traces have been exported.
+
+    Args:
+        timeout: Seconds to wait at most
+
+    Returns:
+        True if the queue drained in time
+    """
+    deadline = time.monotonic() + timeout
+    while _export_queue.unfinished_tasks:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _finish(finished: Span) -> None:
+    """Log a finished span and export its trace once the root span ends."""
+    if log_enabled():
+        logger.info(json.dumps(finished.to_log_record()))
+
+    if not get_export_url():
+        return
+
+    with _pending_lock:
+        if finished.parent is None:
+            spans = _pending.pop(finished.trace_id, [])
+            spans.append(finished)
+        else:
+            if finished.trace_id not in _pending and len(_pending) >= MAX_PENDING_TRACES:
+                return
+            _pending.setdefault(finished.trace_id, []).append(finished)
+            return
+    _submit_export(spans)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Time a block as a span, nested under the current span.
+
+    Args:
+        name: Span name
+        **attributes: Initial attributes
+
+    Yields:
+        The active Span, for adding attributes
+    """
+    active = Span(name, parent=_current_span.get(), attributes=attributes)
+    token = _current_span.set(active)
+    try:
+        yield active
+    except BaseException as e:
+        active.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        active.end()
+        _finish(active)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorator that runs a function inside a span.
+
+    Args:
+        name: Span name (defaults to the function's qualified name)
+
+    Returns:
+        Decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
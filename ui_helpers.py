@@ -8,11 +8,17 @@ Validates: Requirements 11.4
 """
 
 import streamlit as st
+import functools
 import time
 from contextlib import contextmanager
-from typing import Callable, Any
+from typing import Callable, Any, Optional
 import logging
 
+import profiling
+import rerun_profiler
+import session_memory
+import tracing
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -51,9 +57,43 @@ def operation_spinner(message: str, threshold_ms: int = 500):
                 logger.debug(f"Operation '{message}' took {elapsed_ms:.0f}ms (threshold: {threshold_ms}ms)")
 
 
+@contextmanager
+def timed_span(operation_name: str, threshold_ms: int = 500, site: Optional[str] = None, **attributes: Any):
+    """
+    Context manager that traces an operation and logs it when slow.
+    
+    The operation is recorded as a tracing span (see tracing.py) with the
+    given attributes and added to the per-call-site profiling aggregates
+    (see profiling.py); operations exceeding the threshold are also logged.
+    
+    Args:
+        operation_name: Name of the operation (span name)
+        threshold_ms: Threshold in milliseconds (default 500ms)
+        site: Call site to aggregate under (defaults to the caller)
+        **attributes: Span attributes
+        
+    Yields:
+        The active span, for adding attributes
+        
+    Example:
+        with timed_span("llm_request", model=model) as span:
+            response = send(request)
+            span.set_attribute("status_code", response.status_code)
+    """
+    site = site or profiling.call_site(2)
+    with tracing.span(operation_name, **attributes) as active:
+        try:
+            yield active
+        finally:
+            active.end()
+            profiling.record(operation_name, active.duration_ns, site)
+            if active.duration_ms >= threshold_ms:
+                logger.info(f"{operation_name} took {active.duration_ms:.0f}ms (threshold: {threshold_ms}ms)")
+
+
 def timed_operation(operation_name: str, threshold_ms: int = 500):
     """
-    Decorator that logs operations exceeding the time threshold.
+    Decorator that traces an operation and logs it when slow.
     
     This helps identify slow database operations and authentication attempts
     for monitoring and optimization purposes.
@@ -71,15 +111,142 @@ def timed_operation(operation_name: str, threshold_ms: int = 500):
             return database.query(professor_id)
     """
     def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            start_time = time.time()
-            result = func(*args, **kwargs)
-            elapsed_ms = (time.time() - start_time) * 1000
-            
-            if elapsed_ms >= threshold_ms:
-                logger.info(f"{operation_name} took {elapsed_ms:.0f}ms (threshold: {threshold_ms}ms)")
-            
-            return result
+            with timed_span(operation_name, threshold_ms, site=profiling.call_site()):
+                return func(*args, **kwargs)
         
         return wrapper
     return decorator
+
+
+def get_session_state_store() -> Any:
+    """
+    Get the current session's own state object.
+    
+    Unlike the st.session_state proxy, which always refers to the session of
+    the calling thread, this object can be used from other sessions' reruns
+    (see session_memory.py).
+    
+    Returns:
+        The session's SafeSessionState, or st.session_state outside a
+        Streamlit script run
+    """
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except Exception:
+        ctx = None
+    return ctx.session_state if ctx else st.session_state
+
+
+def get_session_id() -> Optional[str]:
+    """
+    Get the id of the Streamlit session running the current script.
+    
+    Returns:
+        Session id, or None outside a Streamlit script run
+    """
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except Exception:
+        return None
+    return ctx.session_id if ctx else None
+
+
+def render_profiling_report() -> None:
+    """
+    Render the profiling report for administrators.
+    
+    Shows the rerun section summaries (see rerun_profiler.py), session
+    memory per key (see session_memory.py), the per-call-site timing
+    aggregates and the kept whole-rerun captures (see profiling.py).
+    """
+    summary = rerun_profiler.get_process_summary()
+    total = summary['total']
+    st.markdown(
+        f"**Rerun sections** - last {total['count']} reruns in this process: "
+        f"p50 {total['p50_ms']:.0f}ms, p95 {total['p95_ms']:.0f}ms; "
+        f"{summary['over_budget']} of {summary['reruns']} over the {summary['budget_ms']:.0f}ms budget"
+    )
+    session = rerun_profiler.get_session_summary(get_session_id())
+    session_means = session['sections']
+    if summary['sections']:
+        st.dataframe(
+            [
+                {
+                    'Section': row['section'],
+                    'Mean ms': round(row['mean_ms'], 1),
+                    'p95 ms': round(row['p95_ms'], 1),
+                    'Max ms': round(row['max_ms'], 1),
+                    'Your mean ms': round(session_means[row['section']], 1) if row['section'] in session_means else None,
+                }
+                for row in summary['sections']
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+    
+    memory = session_memory.get_memory_stats()
+    st.markdown(
+        f"**Session memory** - {memory['total_bytes'] / 1e6:.1f} MB in {memory['sessions']} sessions "
+        f"(budget {memory['budget'] / 1e6:.0f} MB); {memory['spilled_bytes'] / 1e6:.1f} MB spilled, "
+        f"{memory['spills']} spills, {memory['rehydrations']} loaded back"
+    )
+    if memory['keys']:
+        st.dataframe(
+            [{'Key': row['key'], 'KB': round(row['bytes'] / 1024, 1)} for row in memory['keys']],
+            use_container_width=True,
+            hide_index=True,
+        )
+    
+    stats = profiling.get_profile_stats(limit=50)
+    st.markdown("**Call sites** (slowest total first)")
+    if stats:
+        st.dataframe(
+            [
+                {
+                    'Operation': row['name'],
+                    'Call site': row['site'],
+                    'Calls': row['calls'],
+                    'Total ms': round(row['total_ms'], 1),
+                    'Mean ms': round(row['mean_ms'], 2),
+                    'Max ms': round(row['max_ms'], 1),
+                }
+                for row in stats
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+    else:
+        st.caption("No timed calls yet.")
+    
+    captures = profiling.get_captures()
+    st.markdown("**Rerun captures**")
+    if not captures:
+        st.caption("Turn on \"Profile my reruns\" or add ?profile=1 to the URL to capture a rerun.")
+        return
+    selected = st.selectbox(
+        "Capture",
+        range(len(captures)),
+        format_func=lambda i: f"{captures[i]['started_at']} - {captures[i]['label']} ({captures[i]['duration_ms']:.0f}ms)",
+        key="profiling_capture",
+    )
+    capture = captures[selected]
+    if capture['top']:
+        st.dataframe(
+            [
+                {
+                    'Function': row['function'],
+                    'Calls': row['calls'],
+                    'Self ms': round(row['self_ms'], 1),
+                    'Cumulative ms': round(row['cumulative_ms'], 1),
+                }
+                for row in capture['top']
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+    if st.checkbox(f"Show the full {capture['profiler']} report", key="profiling_full_report"):
+        st.code(capture['report'], language=None)
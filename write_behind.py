@@ -0,0 +1,327 @@
+"""
+Write-Behind Saves for AdviseMe
+
+This module takes saving an advising session out of the rerun that generated
+it. Saves are queued and a single writer thread inserts them in batches, one
+transaction (and one disk sync) per batch instead of per session, so
+concurrent generations no longer serialize on the database and the page
+shows the results without waiting for the commit.
+
+A batch is written when it holds ADVISEME_WRITE_BATCH_ROWS sessions (default
+100) or ADVISEME_WRITE_BATCH_MS milliseconds (default 50) after its first
+session was queued, whichever comes first.
+
+Acknowledgement is durable: the Future returned for a save resolves to True
+only after its transaction committed, and to False if the session could not
+be saved; saves cannot be cancelled once submitted. wait_saved gives the
+rerun that submitted a save the batch window plus a margin to see its outcome.
+When a batch fails, its sessions are retried one by one so a single bad row
+does not fail the others. Queued saves are flushed when the process
+exits. ADVISEME_WRITE_BEHIND=off saves synchronously.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import CancelledError, Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Any, Optional, Tuple
+
+import database
+import metrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_MS = 50
+DEFAULT_BATCH_ROWS = 100
+
+# Saves queued beyond this are written synchronously instead
+MAX_QUEUED = 10000
+
+# Longest wait for queued saves when the process exits
+EXIT_FLUSH_SECONDS = 10
+
+# Time allowed for a transaction, on top of the batch window, when waiting
+# for a save's acknowledgement
+ACK_MARGIN_SECONDS = 0.5
+
+WRITE_BATCH_ROWS = metrics.histogram(
+    "adviseme_write_batch_rows", "Advising sessions written per transaction.",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+WRITE_QUEUE_DEPTH = metrics.gauge(
+    "adviseme_write_queue_depth", "Advising session saves waiting for the writer thread.",
+)
+WRITE_FAILURES = metrics.counter(
+    "adviseme_write_failures_total", "Advising sessions the writer thread could not save.",
+)
+
+_STOP = object()
+
+_writer_lock = threading.Lock()
+_writer: Optional["Writer"] = None
+
+
+def enabled() -> bool:
+    """Check whether saves are written behind (ADVISEME_WRITE_BEHIND)."""
+    return os.getenv("ADVISEME_WRITE_BEHIND", "on").strip().lower() not in ("off", "false", "0")
+
+
+def _positive_env(name: str, default: int) -> int:
+    """Read a positive integer setting."""
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except ValueError:
+        logger.warning(f"Invalid {name}, using default")
+        return default
+
+
+def _save_one(session: Dict[str, Any]) -> bool:
+    """Save one session synchronously, reporting any error as False."""
+    try:
+        return bool(database.save_advising_session(**session))
+    except Exception as e:
+        logger.error(f"Could not save advising session: {e}")
+        return False
+
+
+class Writer:
+    """Queue of advising session saves and the thread that writes them."""
+
+    def __init__(self, batch_ms: Optional[int] = None, batch_rows: Optional[int] = None):
+        """
+        Args:
+            batch_ms: Longest wait for a batch to fill (defaults to
+                ADVISEME_WRITE_BATCH_MS)
+            batch_rows: Most sessions per transaction (defaults to
+                ADVISEME_WRITE_BATCH_ROWS)
+        """
+        self.batch_seconds = (batch_ms or _positive_env("ADVISEME_WRITE_BATCH_MS", DEFAULT_BATCH_MS)) / 1000
+        self.batch_rows = batch_rows or _positive_env("ADVISEME_WRITE_BATCH_ROWS", DEFAULT_BATCH_ROWS)
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=MAX_QUEUED)
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="adviseme-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        """Saves queued or being written."""
+        with self._idle:
+            return self._pending
+
+    def submit(self, session: Dict[str, Any]) -> "Future[bool]":
+        """
+        Queue a save.
+
+        Args:
+            session: save_advising_session arguments
+
+        Returns:
+            Future resolving to True once the session is committed, or False
+            if it could not be saved
+        """
+        future: "Future[bool]" = Future()
+        # A save cannot be taken back once queued
+        future.set_running_or_notify_cancel()
+        if not self._thread.is_alive():
+            future.set_result(_save_one(session))
+            return future
+        with self._idle:
+            self._pending += 1
+        try:
+            self._queue.put_nowait((session, future))
+        except queue.Full:
+            self._done(1)
+            logger.warning("Write-behind queue full, saving synchronously")
+            future.set_result(_save_one(session))
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued save is written.
+
+        Args:
+            timeout: Longest wait in seconds (None waits indefinitely)
+
+        Returns:
+            True if the queue was drained
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        Flush and stop the writer thread.
+
+        Args:
+            timeout: Longest wait in seconds for the queued saves
+
+        Returns:
+            True if every queued save was written
+        """
+        # The stop marker also ends the batch being collected, so the
+        # queued saves are written without waiting for the batch window
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        return self.flush(0)
+
+    def _done(self, count: int) -> None:
+        """Count finished saves and wake flush() when none are left."""
+        with self._idle:
+            self._pending -= count
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def _next_batch(self) -> Tuple[List[Tuple[Dict[str, Any], "Future[bool]"]], bool]:
+        """
+        Wait for the next batch.
+
+        Returns:
+            (batch, stop) where stop tells the thread to exit after writing
+        """
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.batch_seconds
+        while len(batch) < self.batch_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        """Writer thread: write batches until stopped."""
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    # Keep the thread alive for the saves still queued
+                    logger.exception(f"Writer thread failed on a batch of {len(batch)} sessions: {e}")
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_result(False)
+                finally:
+                    self._done(len(batch))
+
+    def _write(self, batch: List[Tuple[Dict[str, Any], "Future[bool]"]]) -> None:
+        """Write one batch and resolve its futures."""
+        sessions = [session for session, _ in batch]
+        try:
+            database.save_advising_sessions(sessions)
+            results = [True] * len(batch)
+        except Exception as e:
+            logger.warning(f"Batch of {len(batch)} sessions failed, saving one by one: {e}")
+            results = [_save_one(session) for session in sessions]
+        WRITE_BATCH_ROWS.observe(len(batch))
+        failures = results.count(False)
+        if failures:
+            WRITE_FAILURES.inc(failures)
+            logger.error(f"Could not save {failures} advising sessions")
+        for (_, future), saved in zip(batch, results):
+            future.set_result(saved)
+
+
+def get_writer() -> Writer:
+    """Get the process-wide writer, starting its thread on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = Writer()
+            WRITE_QUEUE_DEPTH.set_function(lambda: _writer.pending if _writer is not None else 0)
+        return _writer
+
+
+def submit_advising_session(**session: Any) -> "Future[bool]":
+    """
+    Save an advising session behind the current rerun.
+
+    Args:
+        **session: save_advising_session arguments
+
+    Returns:
+        Future resolving to True once the session is committed, or False if
+        it could not be saved; already resolved when write-behind is off
+    """
+    if not enabled():
+        future: "Future[bool]" = Future()
+        future.set_result(_save_one(session))
+        return future
+    return get_writer().submit(session)
+
+
+def wait_saved(future: "Future[bool]", timeout: Optional[float] = None) -> Optional[bool]:
+    """
+    Wait briefly for a save's acknowledgement.
+
+    Args:
+        future: Future returned by submit_advising_session
+        timeout: Longest wait in seconds (defaults to the batch window plus
+            ACK_MARGIN_SECONDS)
+
+    Returns:
+        True if the session was committed, False if it could not be saved,
+        or None if it is still queued or being written
+    """
+    if timeout is None:
+        timeout = _positive_env("ADVISEME_WRITE_BATCH_MS", DEFAULT_BATCH_MS) / 1000 + ACK_MARGIN_SECONDS
+    try:
+        return future.result(timeout)
+    except FutureTimeoutError:
+        return None
+    except CancelledError:
+        return False
+
+
+def flush(timeout: Optional[float] = None) -> bool:
+    """
+    Wait until every queued save is written.
+
+    Args:
+        timeout: Longest wait in seconds (None waits indefinitely)
+
+    Returns:
+        True if nothing is left queued
+    """
+    with _writer_lock:
+        writer = _writer
+    return writer.flush(timeout) if writer is not None else True
+
+
+def shutdown(timeout: Optional[float] = EXIT_FLUSH_SECONDS) -> bool:
+    """
+    Flush the queued saves and stop the writer thread.
+
+    Args:
+        timeout: Longest wait in seconds
+
+    Returns:
+        True if every queued save was written
+    """
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is None:
+        return True
+    drained = writer.close(timeout)
+    if not drained:
+        logger.error(f"{writer.pending} advising sessions were not saved before shutdown")
+    return drained
+
+
+atexit.register(shutdown)